@@ -0,0 +1,83 @@
+# coding: utf-8
+"""
+memory and throughput of pmx.Model against pmx.ArrayModel.
+
+usage: python benchmarks/pmx_array_model.py [vertex_count]
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import pymeshio.generator
+import pymeshio.pmx.reader
+import pymeshio.pmx.writer
+
+
+def measure(function):
+    """
+    time a run, then trace the memory of another run.
+    tracemalloc slows allocation heavy code, so both are not measured at once.
+    """
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = function()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current, peak
+
+
+def bounding_box_of_objects(model):
+    xs = [v.position.x for v in model.vertices]
+    ys = [v.position.y for v in model.vertices]
+    zs = [v.position.z for v in model.vertices]
+    return (min(xs), min(ys), min(zs)), (max(xs), max(ys), max(zs))
+
+
+def bounding_box_of_arrays(model):
+    p = model.vertices.position
+    return tuple(p.min(axis=0)), tuple(p.max(axis=0))
+
+
+def main():
+    vertex_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    out = io.BytesIO()
+    pymeshio.pmx.writer.write(
+        out, pymeshio.generator.create_pmx(vertex_count))
+    data = out.getvalue()
+    print("{0} vertices, {1} bytes".format(vertex_count, len(data)))
+    print("{0:<28}{1:>10}{2:>16}{3:>16}".format(
+        "", "seconds", "retained B/v", "peak B/v"))
+
+    def report(label, elapsed, current, peak):
+        print("{0:<28}{1:>10.3f}{2:>16.1f}{3:>16.1f}".format(
+            label, elapsed, current / vertex_count, peak / vertex_count))
+
+    model, elapsed, current, peak = measure(
+        lambda: pymeshio.pmx.reader.read(io.BytesIO(data)))
+    report("pmx.Model read", elapsed, current, peak)
+    array_model, elapsed, current, peak = measure(
+        lambda: pymeshio.pmx.reader.read(io.BytesIO(data), arrays=True))
+    report("pmx.ArrayModel read", elapsed, current, peak)
+
+    _, elapsed, current, peak = measure(
+        lambda: pymeshio.pmx.writer.write(io.BytesIO(), model))
+    report("pmx.Model write", elapsed, current, peak)
+    _, elapsed, current, peak = measure(
+        lambda: pymeshio.pmx.writer.write(io.BytesIO(), array_model))
+    report("pmx.ArrayModel write", elapsed, current, peak)
+
+    _, elapsed, current, peak = measure(
+        lambda: bounding_box_of_objects(model))
+    report("pmx.Model bounding box", elapsed, current, peak)
+    _, elapsed, current, peak = measure(
+        lambda: bounding_box_of_arrays(array_model))
+    report("pmx.ArrayModel bounding box", elapsed, current, peak)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# coding: utf-8
+"""
+bytes per vertex and per morph offset of the pmx and pmd object models.
+
+the records declare __slots__ and common.Diff declares empty __slots__,
+so records carry no __dict__. 'with __dict__' rebuilds the same records
+from subclasses without __slots__, which is how they were allocated
+before common.Diff declared __slots__.
+
+usage: python benchmarks/record_memory.py [vertex_count]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import pymeshio.common
+import pymeshio.pmd
+import pymeshio.pmx
+
+
+def with_dict(cls):
+    """
+    return a subclass of cls that has a per-instance __dict__.
+    """
+    return type(cls.__name__, (cls,), {})
+
+
+def traced(function):
+    """
+    return (result, retained bytes) of function.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def pmx_vertices(count, vertex, bdef1, bdef2):
+    v3 = pymeshio.common.Vector3
+    v2 = pymeshio.common.Vector2
+    return [vertex(v3(i, i, i), v3(0, 1, 0), v2(0.5, 0.5),
+                   bdef1(i % 64) if i % 2 else bdef2(0, i % 64, 0.5), 1.0)
+            for i in range(count)]
+
+
+def pmx_offsets(count, offset):
+    v3 = pymeshio.common.Vector3
+    return [offset(i, v3(0, 0.1, 0)) for i in range(count)]
+
+
+def pmd_vertices(count, vertex):
+    v3 = pymeshio.common.Vector3
+    v2 = pymeshio.common.Vector2
+    return [vertex(v3(i, i, i), v3(0, 1, 0), v2(0.5, 0.5), 0, i % 64, 50, 0)
+            for i in range(count)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    cases = [
+        ("pmx vertex", lambda d: pmx_vertices(
+            count,
+            with_dict(pymeshio.pmx.Vertex) if d else pymeshio.pmx.Vertex,
+            with_dict(pymeshio.pmx.Bdef1) if d else pymeshio.pmx.Bdef1,
+            with_dict(pymeshio.pmx.Bdef2) if d else pymeshio.pmx.Bdef2)),
+        ("pmx vertex morph offset", lambda d: pmx_offsets(
+            count,
+            with_dict(pymeshio.pmx.VertexMorphOffset) if d
+            else pymeshio.pmx.VertexMorphOffset)),
+        ("pmd vertex", lambda d: pmd_vertices(
+            count,
+            with_dict(pymeshio.pmd.Vertex) if d else pymeshio.pmd.Vertex)),
+    ]
+    print("{0} records".format(count))
+    print("{0:<26}{1:>16}{2:>16}".format("", "with __dict__", "slots"))
+    for label, create in cases:
+        sizes = []
+        for d in (True, False):
+            records, size = traced(lambda: create(d))
+            del records
+            sizes.append(size / float(count))
+        print("{0:<26}{1:>14.1f} B{2:>14.1f} B".format(label, *sizes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+# coding: utf-8
+"""
+benchmark suite of the readers, writers and converters.
+
+every case runs on pymeshio.generator models at each scale(vertex count) and
+reports the best time of the repeats, vertices/s, MB/s of the file and
+the tracemalloc peak of one more run. results are written as json and
+compared against a baseline json, a case slower than the baseline by
+more than the threshold is a regression.
+
+usage: python benchmarks/suite.py [-s 1000,10000] [-k pmx] [-o out.json]
+                                  [-b baseline.json] [-t 0.2]
+
+benchmarks/baseline.json is the stored baseline of all cases at the
+default scales. timings depend on the machine, so record a local baseline
+before a change and compare after it:
+
+    python benchmarks/suite.py -o benchmarks/baseline.json
+    python benchmarks/suite.py -b benchmarks/baseline.json
+
+commit the regenerated file when the cases or the reference machine
+change.
+"""
+import argparse
+import fnmatch
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import numpy
+import pymeshio
+import pymeshio.common
+import pymeshio.converter
+import pymeshio.diff
+import pymeshio.generator
+import pymeshio.mqo.reader
+import pymeshio.obj.reader
+import pymeshio.obj.reader_parallel
+import pymeshio.pmd.reader
+import pymeshio.pmd.reader_konbu
+import pymeshio.pmd.writer
+import pymeshio.pmx.reader
+import pymeshio.pmx.writer
+import pymeshio.vmd.reader
+import pymeshio.vmd.writer
+import pymeshio.x
+import pymeshio.x.reader
+import pymeshio.x.writer
+
+
+SCALES = (1000, 10000, 100000)
+
+
+def create_pmx(scale):
+    return pymeshio.generator.create_pmx(scale)
+
+
+def create_pmd(scale):
+    return pymeshio.generator.create_pmd(
+        min(scale, pymeshio.generator.PMD_MAX_VERTICES))
+
+
+def create_vmd(scale):
+    return pymeshio.generator.create_vmd(scale)
+
+
+def create_obj(scale):
+    return pymeshio.generator.generate_bytes('.obj', vertex_count=scale)
+
+
+def create_mqo(scale):
+    return pymeshio.generator.generate_bytes('.mqo', vertex_count=scale)
+
+
+def _triangles(vertex_count):
+    return numpy.arange(vertex_count - vertex_count % 3).reshape(-1, 3)
+
+
+def create_x(vertex_count):
+    """
+    x.Model with vertex_count vertices, normals and uvs and triangles.
+    """
+    random = numpy.random.RandomState(0)
+    v3 = pymeshio.common.Vector3
+    model = pymeshio.x.Model()
+    model.vertices = [v3(*p) for p in
+                      random.uniform(-10, 10, (vertex_count, 3)).tolist()]
+    model.normals = [v3(*n) for n in
+                     random.uniform(-1, 1, (vertex_count, 3)).tolist()]
+    model.uvs = [pymeshio.common.Vector2(*uv) for uv in
+                 random.uniform(0, 1, (vertex_count, 2)).tolist()]
+    model.faces = _triangles(vertex_count).tolist()
+    model.face_normals = model.faces
+    model.face_materials = [0] * len(model.faces)
+    material = pymeshio.x.Material()
+    material.diffuse = pymeshio.common.RGBA(1, 1, 1, 1)
+    material.shininess = 5.0
+    material.specular = pymeshio.common.RGB(0, 0, 0)
+    material.emit = pymeshio.common.RGB(0, 0, 0)
+    model.materials = [material]
+    return model
+
+
+def pmx_bytes(model):
+    out = io.BytesIO()
+    pymeshio.pmx.writer.write(out, model)
+    return out.getvalue()
+
+
+def pmd_bytes(model):
+    out = io.BytesIO()
+    pymeshio.pmd.writer.write(out, model)
+    return out.getvalue()
+
+
+def vmd_bytes(motion):
+    out = io.BytesIO()
+    pymeshio.vmd.writer.write(out, motion)
+    return out.getvalue()
+
+
+def x_bytes(model):
+    out = io.StringIO()
+    pymeshio.x.writer.write(out, model)
+    return out.getvalue().encode('ascii')
+
+
+class Case(object):
+    """
+    a benchmark.
+
+    :IVariables:
+        name
+            case name
+        setup
+            function(scale) that returns (argument, vertices, bytes).
+            vertices and bytes are the work of a run
+        run
+            function(argument) that is timed
+    """
+    __slots__ = ['name', 'setup', 'run']
+
+    def __init__(self, name, setup, run):
+        self.name = name
+        self.setup = setup
+        self.run = run
+
+
+def _pmx(scale):
+    model = create_pmx(scale)
+    return model, len(model.vertices), len(pmx_bytes(model))
+
+
+def _pmx_data(scale):
+    data = pmx_bytes(create_pmx(scale))
+    return data, scale, len(data)
+
+
+def _pmd(scale):
+    model = create_pmd(scale)
+    return model, len(model.vertices), len(pmd_bytes(model))
+
+
+def _pmd_data(scale):
+    model = create_pmd(scale)
+    data = pmd_bytes(model)
+    return data, len(model.vertices), len(data)
+
+
+def _vmd_data(scale):
+    data = vmd_bytes(create_vmd(scale))
+    return data, scale, len(data)
+
+
+def _vmd(scale):
+    motion = create_vmd(scale)
+    return motion, scale, len(vmd_bytes(motion))
+
+
+def _text(create):
+    def setup(scale):
+        data = create(scale)
+        return data, scale, len(data)
+    return setup
+
+
+def _x(scale):
+    model = create_x(scale)
+    return model, scale, len(x_bytes(model))
+
+
+def _pmd_object_model(scale):
+    data, vertices, size = _pmd_data(scale)
+    return pymeshio.pmd.reader.read(io.BytesIO(data)), vertices, size
+
+
+def _pmd_array_model(scale):
+    data, vertices, size = _pmd_data(scale)
+    return (pymeshio.pmd.reader.read(io.BytesIO(data), arrays=True),
+            vertices, size)
+
+
+def _obj_model(scale):
+    data = create_obj(scale)
+    return pymeshio.obj.reader.read(io.BytesIO(data)), scale, len(data)
+
+
+def _diff_models(scale):
+    data = pmx_bytes(create_pmx(scale))
+    lhs = pymeshio.pmx.reader.read(io.BytesIO(data), arrays=True)
+    rhs = pymeshio.pmx.reader.read(io.BytesIO(data), arrays=True)
+    rhs.vertices.position[::100] += 1
+    return (lhs, rhs), scale, len(data)
+
+
+def _pmx_round_trip(data):
+    return pmx_bytes(pymeshio.pmx.reader.read(io.BytesIO(data), arrays=True))
+
+
+def _pmd_round_trip(data):
+    return pmd_bytes(pymeshio.pmd.reader.read(io.BytesIO(data), arrays=True))
+
+
+CASES = [
+    Case('pmx.read', _pmx_data,
+         lambda data: pymeshio.pmx.reader.read(io.BytesIO(data))),
+    Case('pmx.read_arrays', _pmx_data,
+         lambda data: pymeshio.pmx.reader.read(io.BytesIO(data), arrays=True)),
+    Case('pmx.scan', _pmx_data,
+         lambda data: pymeshio.pmx.reader.read(io.BytesIO(data), lazy=True)),
+    Case('pmx.write', _pmx, pmx_bytes),
+    Case('pmx.round_trip', _pmx_data, _pmx_round_trip),
+    Case('pmd.read', _pmd_data,
+         lambda data: pymeshio.pmd.reader.read(io.BytesIO(data))),
+    Case('pmd.read_konbu', _pmd_data, pymeshio.pmd.reader_konbu.read_from_bytes),
+    Case('pmd.read_arrays', _pmd_data,
+         lambda data: pymeshio.pmd.reader.read(io.BytesIO(data), arrays=True)),
+    Case('pmd.write', _pmd, pmd_bytes),
+    Case('pmd.round_trip', _pmd_data, _pmd_round_trip),
+    Case('vmd.read', _vmd_data,
+         lambda data: pymeshio.vmd.reader.read(io.BytesIO(data))),
+    Case('vmd.read_arrays', _vmd_data,
+         lambda data: pymeshio.vmd.reader.read(io.BytesIO(data), arrays=True)),
+    Case('vmd.write', _vmd, vmd_bytes),
+    Case('obj.read', _text(create_obj),
+         lambda data: pymeshio.obj.reader.read(io.BytesIO(data))),
+    Case('obj.read_parallel', _text(create_obj),
+         lambda data: pymeshio.obj.reader_parallel.read(io.BytesIO(data))),
+    Case('mqo.read', _text(create_mqo),
+         lambda data: pymeshio.mqo.reader.read(io.BytesIO(data))),
+    Case('mqo.read_arrays', _text(create_mqo),
+         lambda data: pymeshio.mqo.reader.read(io.BytesIO(data), arrays=True)),
+    Case('x.read', _text(lambda scale: x_bytes(create_x(scale))),
+         lambda data: pymeshio.x.reader.read(io.BytesIO(data))),
+    Case('x.write', _x, x_bytes),
+    Case('converter.pmd_to_pmx', _pmd_object_model,
+         pymeshio.converter.pmd_to_pmx),
+    Case('converter.pmd_to_pmx_arrays', _pmd_array_model,
+         pymeshio.converter.pmd_to_pmx),
+    Case('converter.obj_to_pmx', _obj_model,
+         lambda model: pymeshio.converter.obj_to_pmx(model, 'obj', 1.0)),
+    Case('diff.pmx', _diff_models,
+         lambda models: pymeshio.diff.diff(*models)),
+]
+
+
+def measure(case, scale, repeat):
+    """
+    return the result dict of case at scale.
+    """
+    argument, vertices, size = case.setup(scale)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case.run(argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    # tracemalloc slows allocation heavy code, so it is a separate run
+    tracemalloc.start()
+    case.run(argument)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    seconds = best or 1e-9
+    return {
+        'name': case.name,
+        'scale': scale,
+        'vertices': vertices,
+        'bytes': size,
+        'seconds': best,
+        'vertices_per_second': vertices / seconds,
+        'mb_per_second': size / seconds / 1e6,
+        'peak_bytes': peak,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    set 'baseline_seconds' and 'ratio' of results found in baseline,
+    then return the results slower than baseline by more than threshold.
+    """
+    seconds = dict(((r['name'], r['scale']), r['seconds'])
+                   for r in baseline['results'])
+    regressions = []
+    for r in results:
+        base = seconds.get((r['name'], r['scale']))
+        if not base:
+            continue
+        r['baseline_seconds'] = base
+        r['ratio'] = r['seconds'] / base
+        if r['ratio'] > 1 + threshold:
+            regressions.append(r)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="benchmark pymeshio readers, writers and converters")
+    parser.add_argument('-s', '--scales', default=','.join(map(str, SCALES)),
+                        help="comma separated vertex counts")
+    parser.add_argument('-k', '--keyword', action='append',
+                        help="run cases matching this glob. repeatable")
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help="timed runs per case. the best is reported")
+    parser.add_argument('-o', '--output', help="write results json")
+    parser.add_argument('-b', '--baseline', help="compare with this json")
+    parser.add_argument('-t', '--threshold', type=float, default=0.2,
+                        help="allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(',')]
+    cases = [c for c in CASES if not args.keyword or any(
+        fnmatch.fnmatch(c.name, k if '*' in k else '*' + k + '*')
+        for k in args.keyword)]
+    results = []
+    print("{0:<30}{1:>9}{2:>10}{3:>14}{4:>10}{5:>12}".format(
+        "case", "scale", "seconds", "vertices/s", "MB/s", "peak MB"))
+    for case in cases:
+        for scale in scales:
+            r = measure(case, scale, args.repeat)
+            results.append(r)
+            print("{name:<30}{scale:>9}{seconds:>10.4f}"
+                  "{vertices_per_second:>14.0f}{mb_per_second:>10.2f}"
+                  "{0:>12.2f}".format(r['peak_bytes'] / 1e6, **r))
+
+    regressions = []
+    if args.baseline:
+        with io.open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r in regressions:
+            print("regression: {name} at {scale}: {seconds:.4f}s"
+                  " against {baseline_seconds:.4f}s".format(**r))
+    if args.output:
+        document = {
+            'pymeshio': pymeshio.__version__,
+            'python': platform.python_version(),
+            'numpy': numpy.__version__,
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with io.open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=1)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+# coding: utf-8
+"""
+batch pmd to pmx conversion
+
+pmd.reader.read_from_file -> converter.pmd_to_pmx -> pmx.writer.write
+for many files over a process pool. outputs newer than their input are
+skipped, so an interrupted batch resumes where it stopped.
+
+>>> import pymeshio.batch
+>>> jobs = pymeshio.batch.plan(['models/'], 'out/')
+>>> for result in pymeshio.batch.run(jobs, workers=8):
+...     print(result)
+"""
+import concurrent.futures
+import glob
+import io
+import os
+import time
+from .pmd import reader
+from .pmx import writer
+from . import converter
+
+
+def find_inputs(patterns, extension='.pmd'):
+    """
+    generate (path, root) of input files.
+
+    a pattern is a file, a directory searched recursively for extension,
+    or a glob pattern('**' matches sub directories). root is the directory
+    outputs are made relative to.
+    """
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for current, dirs, files in os.walk(pattern):
+                dirs.sort()
+                for f in sorted(files):
+                    if os.path.splitext(f)[1].lower() == extension:
+                        yield os.path.join(current, f), pattern
+        elif os.path.isfile(pattern):
+            yield pattern, os.path.dirname(pattern)
+        else:
+            root = pattern.split('*')[0].split('?')[0].split('[')[0]
+            root = root if root.endswith(os.sep) else os.path.dirname(root)
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    yield path, root
+
+
+def output_path(path, root, output_dir=None, extension='.pmx'):
+    """
+    return the output path of path. the relative path from root is kept
+    under output_dir, or the output is put beside the input if output_dir
+    is None.
+    """
+    base = os.path.splitext(path)[0] + extension
+    if output_dir is None:
+        return base
+    return os.path.join(output_dir, os.path.relpath(base, root or '.'))
+
+
+def is_up_to_date(src, dst):
+    """
+    return True if dst exists and is not older than src.
+    """
+    try:
+        return os.path.getmtime(dst) >= os.path.getmtime(src)
+    except OSError:
+        return False
+
+
+def plan(patterns, output_dir=None):
+    """
+    return (src, dst) list for patterns. see find_inputs and output_path.
+    """
+    return [(path, output_path(path, root, output_dir))
+            for path, root in find_inputs(patterns)]
+
+
+class Result(object):
+    """
+    outcome of a file.
+
+    :IVariables:
+        src
+            input path
+        dst
+            output path
+        status
+            'converted', 'skipped' or 'failed'
+        seconds
+            conversion time
+        size
+            input bytes
+        error
+            error message if failed
+    """
+    __slots__ = ['src', 'dst', 'status', 'seconds', 'size', 'error']
+
+    def __init__(self, src, dst, status, seconds=0.0, size=0, error=None):
+        self.src = src
+        self.dst = dst
+        self.status = status
+        self.seconds = seconds
+        self.size = size
+        self.error = error
+
+    def __str__(self):
+        if self.status == 'failed':
+            return '{0} {1}: {2}'.format(self.status, self.src, self.error)
+        return '{0} {1} -> {2} {3:.3f}s'.format(
+            self.status, self.src, self.dst, self.seconds)
+
+
+def convert(src, dst):
+    """
+    convert pmd file src to pmx file dst, then return Result.
+
+    the output is written to a temporary file, then renamed, so a
+    failed or interrupted conversion never leaves a file that looks
+    up to date.
+    """
+    start = time.perf_counter()
+    try:
+        size = os.path.getsize(src)
+        pmd = reader.read_from_file(src)
+        if pmd is None:
+            raise ValueError("can not read pmd")
+        pmx = converter.pmd_to_pmx(pmd)
+        directory = os.path.dirname(dst)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        tmp = dst + '.tmp'
+        try:
+            with io.open(tmp, 'wb') as f:
+                writer.write(f, pmx)
+            os.replace(tmp, dst)
+        except:
+            # no partial output next to the others
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    except Exception as e:
+        return Result(src, dst, 'failed', time.perf_counter() - start,
+                      error=getattr(e, 'message', None) or repr(e))
+    return Result(src, dst, 'converted', time.perf_counter() - start, size)
+
+
+def run(jobs, workers=None, queue_size=None, force=False):
+    """
+    convert (src, dst) jobs, then generate Result in completion order.
+
+    :Parameters:
+        jobs
+            (src, dst) iterable. consumed lazily
+        workers
+            worker processes. default is os.cpu_count(). 1 converts in
+            this process
+        queue_size
+            max jobs submitted but not finished. default is workers * 4
+        force
+            convert even if the output is up to date
+    """
+    workers = workers or os.cpu_count() or 1
+    queue_size = queue_size or workers * 4
+    if workers == 1:
+        for src, dst in jobs:
+            if not force and is_up_to_date(src, dst):
+                yield Result(src, dst, 'skipped')
+            else:
+                yield convert(src, dst)
+        return
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        pending = set()
+        for src, dst in jobs:
+            if not force and is_up_to_date(src, dst):
+                yield Result(src, dst, 'skipped')
+                continue
+            if len(pending) >= queue_size:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(convert, src, dst))
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
+
+
+class Summary(object):
+    """
+    totals of Result.
+
+    :IVariables:
+        counts
+            status to file count
+        size
+            converted input bytes
+        cpu_seconds
+            sum of conversion times
+        seconds
+            wall clock time from the first to the last add
+    """
+    __slots__ = ['counts', 'size', 'cpu_seconds', 'start', 'seconds']
+
+    def __init__(self):
+        self.counts = {'converted': 0, 'skipped': 0, 'failed': 0}
+        self.size = 0
+        self.cpu_seconds = 0.0
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+
+    def add(self, result):
+        self.counts[result.status] += 1
+        self.size += result.size
+        self.cpu_seconds += result.seconds
+        self.seconds = time.perf_counter() - self.start
+
+    def __str__(self):
+        seconds = self.seconds or 1e-9
+        return ('{converted} converted, {skipped} skipped, {failed} failed'
+                ' in {0:.2f}s ({1:.1f} files/s, {2:.2f} MB/s,'
+                ' {3:.2f}s in workers)').format(
+                    self.seconds,
+                    self.counts['converted'] / seconds,
+                    self.size / seconds / 1e6,
+                    self.cpu_seconds,
+                    **self.counts)
@@ -0,0 +1,548 @@
+# coding: utf-8
+"""
+parsed model caches
+
+DiskCache is a persistent cache shared by processes, MemoryCache keeps
+parsed models in a long running process.
+
+A parsed pmd, pmx or vmd model is stored on disk keyed by the hash of the
+file content and the library version. numpy arrays of the model
+(arrays=True) are written to one blob file and restored as copy on write
+views of a memory map, the rest of the model is a pickle. A warm load
+maps the blob and unpickles the small object part instead of parsing.
+
+pmx and pmd models are always stored in their array form, so warm loads
+with arrays=False still rebuild the vertex objects. use arrays=True to
+get the full benefit.
+
+Entries are evicted least recently used first when the cache grows over
+max_bytes. An entry is touched when it is loaded.
+
+>>> import pymeshio.cache
+>>> cache = pymeshio.cache.DiskCache('~/.cache/pymeshio')
+>>> model = cache.read_from_file('model.pmx', arrays=True)
+
+MemoryCache is bounded by the estimated size of the models and drops an
+entry when the size or mtime of its file changes. install() routes the
+read_from_file functions of pmx.reader, pmd.reader and vmd.reader through
+it, so existing callers use it unchanged. cached models are shared, so
+callers must not modify them.
+
+>>> pymeshio.cache.install(pymeshio.cache.MemoryCache(512 << 20))
+>>> model = pymeshio.pmx.reader.read_from_file('model.pmx')
+"""
+import collections
+import functools
+import hashlib
+import io
+import mmap
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+from . import __version__
+from . import common
+from . import pmd
+from .pmd import reader as pmd_reader
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# arrays smaller than this are pickled inline
+MIN_BLOB_BYTES = 4096
+# blob offsets are aligned to this
+BLOB_ALIGNMENT = 64
+HASH_CHUNK = 1 << 24
+# estimate_size walks this many elements of a longer list
+SIZE_SAMPLE = 64
+
+META_FILE = 'meta.pickle'
+BLOB_FILE = 'arrays.bin'
+
+
+def _reader_module(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.pmx':
+        from .pmx import reader
+    elif ext == '.pmd':
+        from .pmd import reader
+    elif ext == '.vmd':
+        from .vmd import reader
+    else:
+        raise common.ParseException(
+            "unknown extension: {0}".format(ext))
+    return reader
+
+
+def content_hash(path):
+    """
+    return the hex digest of the file content.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    with io.open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class _Pickler(pickle.Pickler):
+    """
+    pickle that writes large numpy arrays to blob.
+    """
+
+    def __init__(self, ios, blob):
+        super(_Pickler, self).__init__(ios, pickle.HIGHEST_PROTOCOL)
+        self.blob = blob
+
+    def persistent_id(self, obj):
+        if (numpy is None or type(obj) is not numpy.ndarray
+                or obj.dtype.hasobject or obj.nbytes < MIN_BLOB_BYTES):
+            return None
+        pad = -self.blob.tell() % BLOB_ALIGNMENT
+        self.blob.write(b'\x00' * pad)
+        offset = self.blob.tell()
+        self.blob.write(numpy.ascontiguousarray(obj).tobytes())
+        return (offset, obj.dtype, obj.shape)
+
+
+class _Unpickler(pickle.Unpickler):
+    """
+    unpickle with arrays as views of a copy on write memory map of blob.
+    """
+
+    def __init__(self, ios, mapped):
+        super(_Unpickler, self).__init__(ios)
+        self.mapped = mapped
+
+    def persistent_load(self, pid):
+        offset, dtype, shape = pid
+        count = 1
+        for n in shape:
+            count *= n
+        return numpy.frombuffer(
+            self.mapped, dtype, count, offset).reshape(shape)
+
+
+def _unlink_bones(model):
+    """
+    drop the parent, children and tail links of the pmd bones, which
+    pickle recurses as deep as the bone chain. return the dropped links.
+    """
+    links = ([(b.parent, b.children, b.tail) for b in model.bones],
+             model.no_parent_bones)
+    for b in model.bones:
+        b.parent = None
+        b.children = []
+        b.tail = common.Vector3(0, 0, 0)
+    model.no_parent_bones = []
+    return links
+
+
+def _relink_bones(model, links):
+    bone_links, model.no_parent_bones = links
+    for b, (parent, children, tail) in zip(model.bones, bone_links):
+        b.parent = parent
+        b.children = children
+        b.tail = tail
+
+
+def dump(model, directory):
+    """
+    write model to directory as META_FILE and BLOB_FILE. pmd bones are
+    written by their indices and linked again by load.
+    """
+    links = _unlink_bones(model) if isinstance(model, pmd.Model) else None
+    try:
+        with io.open(os.path.join(directory, BLOB_FILE), 'wb') as blob:
+            with io.open(os.path.join(directory, META_FILE), 'wb') as meta:
+                _Pickler(meta, blob).dump(model)
+    finally:
+        if links is not None:
+            _relink_bones(model, links)
+
+
+def load(directory):
+    """
+    load a model written by dump.
+    """
+    mapped = None
+    blob_path = os.path.join(directory, BLOB_FILE)
+    if os.path.getsize(blob_path) > 0:
+        with io.open(blob_path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    with io.open(os.path.join(directory, META_FILE), 'rb') as meta:
+        model = _Unpickler(meta, mapped).load()
+    if isinstance(model, pmd.Model):
+        pmd_reader.build_bone_tree(model)
+    return model
+
+
+def _entry_size(directory):
+    size = 0
+    for name in os.listdir(directory):
+        try:
+            size += os.path.getsize(os.path.join(directory, name))
+        except OSError:
+            pass
+    return size
+
+
+class DiskCache(object):
+    """
+    size bounded on disk cache of parsed models.
+
+    :IVariables:
+        directory
+            cache root. an entry is a sub directory named by its key
+        max_bytes
+            entries are evicted least recently used first over this
+        hits
+            loads from the cache
+        misses
+            loads that parsed the file
+    """
+    __slots__ = ['directory', 'max_bytes', 'hits', 'misses']
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+
+    def __str__(self):
+        return '<DiskCache {0} {1} hits {2} misses>'.format(
+            self.directory, self.hits, self.misses)
+
+    def key(self, path, arrays=False):
+        """
+        return the entry name of path. it changes with the file content,
+        the library version and arrays.
+        """
+        return '{0}-{1}-{2}{3}'.format(
+            content_hash(path), __version__,
+            os.path.splitext(path)[1].lower().lstrip('.'),
+            '-arrays' if arrays else '')
+
+    def read_from_file(self, path, arrays=False):
+        """
+        return the model of path from the cache, or read it with
+        pmx.reader, pmd.reader or vmd.reader by the extension, then store it.
+
+        pmx and pmd models are always stored as ArrayModel. arrays=False
+        returns ArrayModel.to_model() of it, since unpickling millions of
+        vertex objects is slower than parsing them.
+        """
+        stored_arrays = arrays or (
+            numpy is not None
+            and os.path.splitext(path)[1].lower() in ('.pmx', '.pmd'))
+        model = self._read(path, stored_arrays)
+        if model is not None and stored_arrays and not arrays:
+            model = model.to_model()
+        return model
+
+    def _read(self, path, arrays):
+        key = self.key(path, arrays)
+        entry = os.path.join(self.directory, key)
+        if os.path.isdir(entry):
+            try:
+                model = load(entry)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                # broken or half evicted entry
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                self.hits += 1
+                os.utime(entry)
+                if hasattr(model, 'path'):
+                    model.path = path
+                return model
+        self.misses += 1
+        model = _reader_module(path).read_from_file(path, arrays=arrays)
+        if model is not None:
+            self.store(key, model)
+        return model
+
+    def store(self, key, model):
+        """
+        write model as entry key, then evict entries over max_bytes.
+        """
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=self.directory)
+        try:
+            dump(model, tmp)
+            os.rename(tmp, os.path.join(self.directory, key))
+        except OSError:
+            # another process stored the same key
+            shutil.rmtree(tmp, ignore_errors=True)
+        except:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.evict()
+
+    def entries(self):
+        """
+        return (last used time, size, path) of the entries,
+        least recently used first.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith('.tmp-'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append(
+                    (os.path.getmtime(path), _entry_size(path), path))
+            except OSError:
+                pass
+        entries.sort()
+        return entries
+
+    def evict(self, max_bytes=None):
+        """
+        remove least recently used entries until the cache fits max_bytes.
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+        return total
+
+    def clear(self):
+        """
+        remove all entries.
+        """
+        self.evict(0)
+
+
+def read_from_file(path, arrays=False, cache=None):
+    """
+    read path through cache(DiskCache). read without cache if None.
+    """
+    if cache is None:
+        return _reader_module(path).read_from_file(path, arrays=arrays)
+    return cache.read_from_file(path, arrays)
+
+
+def estimate_size(obj, sample=SIZE_SAMPLE):
+    """
+    return the estimated bytes held by obj and the objects it refers to.
+
+    lists longer than sample are estimated from sample elements spread
+    over the list, numpy arrays count their data even if it is a view.
+    the objects are walked with a stack, so linked chains like pmd bones
+    add no recursion.
+    """
+    seen = set()
+    total = 0.0
+    # (object, weight). a sampled element stands for count / sample
+    stack = [(obj, 1.0)]
+    while stack:
+        o, weight = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        if numpy is not None and isinstance(o, numpy.ndarray):
+            total += weight * (
+                sys.getsizeof(o) + (0 if o.flags.owndata else o.nbytes))
+            continue
+        total += weight * sys.getsizeof(o)
+        if isinstance(o, (str, bytes, bytearray, int, float, bool)):
+            continue
+        if isinstance(o, (list, tuple, set, frozenset)):
+            count = len(o)
+            if count > sample:
+                items = list(o) if not isinstance(o, (list, tuple)) else o
+                step = count / float(sample)
+                scaled = weight * count / float(sample)
+                stack.extend((items[int(i * step)], scaled)
+                             for i in range(sample))
+            else:
+                stack.extend((x, weight) for x in o)
+            continue
+        if isinstance(o, dict):
+            for k, v in o.items():
+                stack.append((k, weight))
+                stack.append((v, weight))
+            continue
+        d = getattr(o, '__dict__', None)
+        if d is not None:
+            stack.append((d, weight))
+        for cls in type(o).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                try:
+                    stack.append((getattr(o, name), weight))
+                except AttributeError:
+                    pass
+    return int(total)
+
+
+def _stat(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class MemoryCache(object):
+    """
+    in process cache of parsed models bounded by their estimated size.
+
+    an entry is dropped when the mtime or size of its file changes, and
+    least recently used entries are evicted over max_bytes. a model
+    estimated over max_bytes is returned but not kept.
+
+    :IVariables:
+        max_bytes
+            upper bound of the estimated bytes of the entries
+        size
+            estimated bytes of the entries
+        hits
+            reads returned from the cache
+        misses
+            reads that called the reader
+        evictions
+            entries removed to fit max_bytes or because the file changed
+    """
+    __slots__ = ['max_bytes', 'entries', 'size', 'hits', 'misses',
+                 'evictions', 'lock']
+
+    def __init__(self, max_bytes=256 << 20):
+        self.max_bytes = max_bytes
+        # key: (stat, model, bytes)
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return ('<MemoryCache {0} entries {1}/{2} bytes'
+                ' {3} hits {4} misses {5} evictions>').format(
+                    len(self.entries), self.size, self.max_bytes,
+                    self.hits, self.misses, self.evictions)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def read(self, function, path, *args, **kwargs):
+        """
+        return function(path, *args, **kwargs) from the cache, or call it
+        and keep the result.
+        """
+        key = (function.__module__, os.path.abspath(path), args,
+               tuple(sorted(kwargs.items())))
+        try:
+            stat = _stat(path)
+        except OSError:
+            # the reader reports a missing file its own way
+            return function(path, *args, **kwargs)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] == stat:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._remove(key)
+            self.misses += 1
+        # parse without the lock. concurrent misses of a key both parse
+        model = function(path, *args, **kwargs)
+        if model is None:
+            return model
+        size = estimate_size(model)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            if size <= self.max_bytes:
+                self.entries[key] = (stat, model, size)
+                self.size += size
+                self._evict(self.max_bytes)
+        return model
+
+    def read_from_file(self, path, arrays=False):
+        """
+        read path with pmx.reader, pmd.reader or vmd.reader by the
+        extension through the cache.
+        """
+        return self.read(_reader_module(path).read_from_file, path,
+                         arrays=arrays)
+
+    def wrap(self, function):
+        """
+        return function(path, ...) that reads through the cache.
+        lazy=True reads are not cached, the model holds the open file.
+        profiled reads are not cached either, they measure the reader.
+        """
+        @functools.wraps(function)
+        def read_from_file(path, *args, **kwargs):
+            if kwargs.get('lazy') or kwargs.get('profile'):
+                return function(path, *args, **kwargs)
+            return self.read(function, path, *args, **kwargs)
+        read_from_file.__wrapped__ = function
+        return read_from_file
+
+    def _remove(self, key):
+        _, _, size = self.entries.pop(key)
+        self.size -= size
+        self.evictions += 1
+
+    def _evict(self, max_bytes):
+        while self.entries and self.size > max_bytes:
+            self._remove(next(iter(self.entries)))
+
+    def evict(self, max_bytes=None):
+        """
+        remove least recently used entries until the cache fits max_bytes.
+        """
+        with self.lock:
+            self._evict(self.max_bytes if max_bytes is None else max_bytes)
+            return self.size
+
+    def clear(self):
+        """
+        remove all entries. the counters are kept.
+        """
+        self.evict(0)
+
+
+def _reader_modules():
+    from .pmx import reader as pmx_reader
+    from .pmd import reader as pmd_reader
+    from .vmd import reader as vmd_reader
+    return [pmx_reader, pmd_reader, vmd_reader]
+
+
+def install(cache=None):
+    """
+    replace read_from_file of pmx.reader, pmd.reader and vmd.reader with
+    cache.wrap of it, then return cache. a MemoryCache is made if None.
+    callers that imported read_from_file itself before install keep the
+    uncached function.
+    """
+    if cache is None:
+        cache = MemoryCache()
+    uninstall()
+    for module in _reader_modules():
+        module.read_from_file = cache.wrap(module.read_from_file)
+    return cache
+
+
+def uninstall():
+    """
+    restore the read_from_file functions replaced by install.
+    """
+    for module in _reader_modules():
+        original = getattr(module.read_from_file, '__wrapped__', None)
+        if original is not None:
+            module.read_from_file = original
@@ -3,9 +3,14 @@
 common utilities.
 """
 import math
+import mmap
+import os
 import struct
 import sys
 import io
+from logging import getLogger
+
+logger = getLogger(__name__)
 
 
 def unicode(src):
@@ -413,8 +418,95 @@ def readall(path):
         return f.read()
 
 
+class MemoryStream(io.IOBase):
+    """read only stream over a bytes like object(bytes, memoryview, mmap)
+
+    BinaryReader decodes a MemoryStream in place with struct.unpack_from,
+    without copying the whole buffer.
+
+    Attributes:
+        buffer: memoryview of the data
+        pos: current position
+    """
+
+    def __init__(self, buffer, mapped=None):
+        self.buffer = memoryview(buffer)
+        self.pos = 0
+        self.mapped = mapped
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            self.pos = offset
+        elif whence == 1:
+            self.pos += offset
+        elif whence == 2:
+            self.pos = len(self.buffer) + offset
+        else:
+            raise ValueError("invalid whence: {0}".format(whence))
+        return self.pos
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            end = len(self.buffer)
+        else:
+            end = min(self.pos + size, len(self.buffer))
+        # past the end reads nothing and keeps the position, as io.BytesIO
+        end = max(self.pos, end)
+        data = self.buffer[self.pos:end].tobytes()
+        self.pos = end
+        return data
+
+    def getbuffer(self):
+        return self.buffer
+
+    def close(self):
+        if not self.closed:
+            self.buffer.release()
+            if self.mapped:
+                self.mapped.close()
+        super(MemoryStream, self).close()
+
+
+def open_mapped(path):
+    """open path as MemoryStream over a read only mmap
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # empty file can not be mapped
+            return MemoryStream(b"")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return MemoryStream(mapped, mapped)
+
+
+INT_STRUCTS = {
+    1: struct.Struct("<b"),
+    2: struct.Struct("<h"),
+    4: struct.Struct("<i"),
+}
+UINT_STRUCTS = {
+    1: struct.Struct("<B"),
+    2: struct.Struct("<H"),
+    4: struct.Struct("<I"),
+}
+FLOAT_STRUCT = struct.Struct("<f")
+VECTOR2_STRUCT = struct.Struct("<2f")
+VECTOR3_STRUCT = struct.Struct("<3f")
+VECTOR4_STRUCT = struct.Struct("<4f")
+
+
 class BinaryReader(object):
     """general BinaryReader
+
+    reads an io stream, or a MemoryStream in place.
     """
 
     def __init__(self, ios):
@@ -424,6 +516,10 @@ class BinaryReader(object):
         self.end = ios.tell()
         ios.seek(current)
         self.ios = ios
+        if isinstance(ios, MemoryStream):
+            self.unpack = self._unpack_from
+            self.unpack_struct = self._unpack_struct_from
+            self.read_bytes = self._read_bytes_from
 
     def __str__(self):
         return "<BinaryReader %d/%d>" % (self.ios.tell(), self.end)
@@ -433,84 +529,94 @@ class BinaryReader(object):
         return self.ios.tell() >= self.end
         # return not self.ios.readable()
 
+    def tell(self):
+        return self.ios.tell()
+
+    def seek(self, pos):
+        self.ios.seek(pos)
+
+    def skip(self, size):
+        self.ios.seek(size, 1)
+
     def unpack(self, fmt, size):
         result = struct.unpack(fmt, self.ios.read(size))
         return result[0]
 
+    def unpack_struct(self, s):
+        """read a record of struct.Struct s, then return the tuple"""
+        return s.unpack(self.ios.read(s.size))
+
+    def read_bytes(self, size):
+        """read size bytes as a bytes like object"""
+        data = self.ios.read(size)
+        if len(data) < size:
+            raise ParseException("unexpected end of buffer")
+        return data
+
+    def peek(self):
+        """
+        return remaining bytes as a bytes like object without advancing.
+        zero copy if the stream has getbuffer().
+        """
+        if hasattr(self.ios, "getbuffer"):
+            return self.ios.getbuffer()[self.ios.tell():]
+        current = self.ios.tell()
+        data = self.ios.read()
+        self.ios.seek(current)
+        return data
+
+    def _unpack_from(self, fmt, size):
+        ios = self.ios
+        result = struct.unpack_from(fmt, ios.buffer, ios.pos)
+        ios.pos += size
+        return result[0]
+
+    def _unpack_struct_from(self, s):
+        ios = self.ios
+        result = s.unpack_from(ios.buffer, ios.pos)
+        ios.pos += s.size
+        return result
+
+    def _read_bytes_from(self, size):
+        ios = self.ios
+        if ios.pos + size > len(ios.buffer):
+            raise ParseException("unexpected end of buffer")
+        data = ios.buffer[ios.pos:ios.pos + size]
+        ios.pos += size
+        return data
+
     def read_int(self, size):
-        if size == 1:
-            return self.unpack("b", size)
-        if size == 2:
-            return self.unpack("h", size)
-        if size == 4:
-            return self.unpack("i", size)
-        print("not reach here")
-        raise ParseException("invalid int size: " + size)
+        try:
+            return self.unpack_struct(INT_STRUCTS[size])[0]
+        except KeyError:
+            raise ParseException("invalid int size: {0}".format(size))
 
     def read_uint(self, size):
-        if size == 1:
-            return self.unpack("B", size)
-        if size == 2:
-            return self.unpack("H", size)
-        if size == 4:
-            return self.unpack("I", size)
-        print("not reach here")
-        raise ParseException("invalid int size: " + size)
+        try:
+            return self.unpack_struct(UINT_STRUCTS[size])[0]
+        except KeyError:
+            raise ParseException("invalid int size: {0}".format(size))
 
     def read_float(self):
-        return self.unpack("f", 4)
+        return self.unpack_struct(FLOAT_STRUCT)[0]
 
     def read_vector2(self):
-        return Vector2(
-            self.read_float(),
-            self.read_float()
-        )
+        return Vector2(*self.unpack_struct(VECTOR2_STRUCT))
 
     def read_vector3(self):
-        return Vector3(
-            self.read_float(),
-            self.read_float(),
-            self.read_float()
-        )
+        return Vector3(*self.unpack_struct(VECTOR3_STRUCT))
 
     def read_vector4(self):
-        return Vector4(
-            self.read_float(),
-            self.read_float(),
-            self.read_float(),
-            self.read_float()
-        )
+        return Vector4(*self.unpack_struct(VECTOR4_STRUCT))
 
     def read_quaternion(self):
-        return Quaternion(
-            self.read_float(),
-            self.read_float(),
-            self.read_float(),
-            self.read_float()
-        )
-
-    def read_quaternion(self):
-        return Quaternion(
-            self.read_float(),
-            self.read_float(),
-            self.read_float(),
-            self.read_float()
-        )
+        return Quaternion(*self.unpack_struct(VECTOR4_STRUCT))
 
     def read_rgba(self):
-        return RGBA(
-            self.read_float(),
-            self.read_float(),
-            self.read_float(),
-            self.read_float()
-        )
+        return RGBA(*self.unpack_struct(VECTOR4_STRUCT))
 
     def read_rgb(self):
-        return RGB(
-            self.read_float(),
-            self.read_float(),
-            self.read_float()
-        )
+        return RGB(*self.unpack_struct(VECTOR3_STRUCT))
 
 
 class WriteException(Exception):
@@ -582,6 +688,12 @@ class DifferenceException(Exception):
 
 
 class Diff(object):
+    """
+    base of the model records. subclasses declare __slots__, so records
+    carry no per-instance __dict__.
+    """
+    __slots__ = ()
+
     def _diff(self, rhs, key):
         l = getattr(self, key)
         r = getattr(rhs, key)
@@ -632,4 +744,4 @@ class TextReader(object):
         return line.strip()
 
     def printError(self, method, msg):
-        print("%s:%s:%d" % (method, msg, self.lines))
+        logger.warning("%s:%s:%d", method, msg, self.lines)
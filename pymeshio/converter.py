@@ -8,6 +8,10 @@ from . import common
 from .common import unicode as u
 from . import pmx
 from . import pmd
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class ConvertException(Exception):
@@ -17,15 +21,42 @@ class ConvertException(Exception):
     pass
 
 
+def _pmd_vertex_array(src):
+    """
+    return pmx.VertexArray converted from pmd.VERTEX_DTYPE array.
+    """
+    dst = pmx.VertexArray(len(src))
+    dst.position[:] = src['pos']
+    dst.normal[:] = src['normal']
+    dst.uv[:] = src['uv']
+    dst.edge_factor[:] = numpy.where(src['edge_flag'] == 0, 1.0, 0.0)
+    bone0 = src['bone0']
+    bone1 = src['bone1']
+    weight0 = src['weight0']
+    # weight0 0: Bdef1(bone1), 100: Bdef1(bone0), others: Bdef2
+    dst.deform_type[:] = pmx.DEFORM_BDEF2
+    dst.deform_type[weight0 == 0] = pmx.DEFORM_BDEF1
+    dst.deform_type[weight0 == 100] = pmx.DEFORM_BDEF1
+    dst.bone_indices[:, 0] = numpy.where(weight0 == 0, bone1, bone0)
+    bdef2 = dst.deform_type == pmx.DEFORM_BDEF2
+    dst.bone_indices[bdef2, 1] = bone1[bdef2]
+    w0 = weight0.astype(numpy.float64) * 0.01
+    dst.weights[:, 0] = numpy.where(bdef2, w0, 1.0)
+    dst.weights[bdef2, 1] = 1.0 - w0[bdef2]
+    return dst
+
+
 def pmd_to_pmx(src):
     """
     return pymeshio.pmx.Model.
 
     :Parameters:
         src
-            pymeshio.pmd.Model
+            pymeshio.pmd.Model. if pymeshio.pmd.ArrayModel,
+            return pymeshio.pmx.ArrayModel.
     """
-    dst = pmx.Model()
+    arrays = isinstance(src, pmd.ArrayModel)
+    dst = pmx.ArrayModel() if arrays else pmx.Model()
     # model info
     dst.name = src.name.decode("cp932")
     dst.english_name = src.english_name.decode("cp932")
@@ -43,17 +74,23 @@ def pmd_to_pmx(src):
         else:
             return pmx.Bdef2(bone0, bone1, weight0 * 0.01)
 
-    dst.vertices = [
-        pmx.Vertex(
-            v.pos,
-            v.normal,
-            v.uv,
-            createDeform(v.bone0, v.bone1, v.weight0),
-            1.0 if v.edge_flag == 0 else 0.0
-        )
-        for v in src.vertices]
+    if arrays:
+        dst.vertices = _pmd_vertex_array(src.vertices)
+    else:
+        dst.vertices = [
+            pmx.Vertex(
+                v.pos,
+                v.normal,
+                v.uv,
+                createDeform(v.bone0, v.bone1, v.weight0),
+                1.0 if v.edge_flag == 0 else 0.0
+            )
+            for v in src.vertices]
     # indices
-    dst.indices = src.indices[:]
+    if arrays:
+        dst.indices = src.indices.astype(numpy.int32)
+    else:
+        dst.indices = src.indices[:]
     # materials
     texture_map = {}
 
@@ -322,6 +359,15 @@ def pmd_to_pmx(src):
     def get_panel(m):
         return m.type
 
+    def get_offsets(base, m):
+        if arrays:
+            offsets = pmx.VertexMorphOffsetArray(len(m.indices))
+            offsets.vertex_index[:] = base.indices[m.indices]
+            offsets.position_offset[:] = m.pos_list
+            return offsets
+        return [pmx.VertexMorphOffset(base.indices[i], pos)
+                for i, pos in zip(m.indices, m.pos_list)]
+
     if len(src.morphs) > 0:
         base = src.morphs[0]
         assert (base.name == b"base")
@@ -331,8 +377,7 @@ def pmd_to_pmx(src):
                 english_name=m.english_name.decode('cp932'),
                 panel=get_panel(m),
                 morph_type=1,
-                offsets=[pmx.VertexMorphOffset(base.indices[i], pos)
-                         for i, pos in zip(m.indices, m.pos_list)]
+                offsets=get_offsets(base, m)
             )
             for i, m in enumerate(src.morphs) if m.name != b"base"]
 
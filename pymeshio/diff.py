@@ -0,0 +1,370 @@
+# coding: utf-8
+"""
+full report diff of pmd and pmx models
+
+common.Diff.diff stops at the first difference. diff() compares every
+section and returns a Report that lists all of them. vertices and indices
+are compared as numpy arrays with a tolerance and reported as index
+ranges, other sections are reported per element with the differing
+attributes. a section whose digest is the same on both sides is skipped
+without comparing its elements.
+
+>>> import pymeshio.diff
+>>> import pymeshio.pmx.reader
+>>> lhs = pymeshio.pmx.reader.read_from_file('a.pmx', arrays=True)
+>>> rhs = pymeshio.pmx.reader.read_from_file('b.pmx', arrays=True)
+>>> print(pymeshio.diff.diff(lhs, rhs))
+vertices[120:136] changed: position, normal
+bones[3] "腕" changed: position
+"""
+import hashlib
+import pickle
+from . import pmd
+from . import pmx
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+HEADER_FIELDS = ('version', 'name', 'english_name',
+                 'comment', 'english_comment')
+
+PMX_SECTIONS = ('vertices', 'indices', 'textures', 'materials', 'bones',
+                'morphs', 'display_slots', 'rigidbodies', 'joints')
+
+PMD_SECTIONS = ('vertices', 'indices', 'materials', 'bones', 'ik_list',
+                'morphs', 'morph_indices', 'bone_group_list',
+                'bone_display_list', 'toon_textures', 'rigidbodies', 'joints')
+
+# attributes that link to other elements. they are compared and digested
+# through the index attributes instead
+LINK_FIELDS = ('parent', 'children')
+
+
+class Change(object):
+    """
+    a difference of lhs and rhs.
+
+    :IVariables:
+        section
+            'header' or a model section name
+        kind
+            'changed', 'added'(only in rhs) or 'removed'(only in lhs)
+        start
+            first element index
+        stop
+            end element index(exclusive)
+        name
+            element name, or the attribute name for 'header'
+        fields
+            differing attribute names. empty if unknown
+    """
+    __slots__ = ['section', 'kind', 'start', 'stop', 'name', 'fields']
+
+    def __init__(self, section, kind, start=0, stop=0, name=None,
+                 fields=None):
+        self.section = section
+        self.kind = kind
+        self.start = start
+        self.stop = stop
+        self.name = name
+        self.fields = fields or []
+
+    def __str__(self):
+        if self.section == 'header':
+            return 'header changed: {0}'.format(self.name)
+        if self.stop - self.start == 1:
+            where = '{0}[{1}]'.format(self.section, self.start)
+        else:
+            where = '{0}[{1}:{2}]'.format(self.section, self.start, self.stop)
+        if self.name is not None:
+            where += ' "{0}"'.format(_text(self.name))
+        if self.fields:
+            return '{0} {1}: {2}'.format(
+                where, self.kind, ', '.join(self.fields))
+        return '{0} {1}'.format(where, self.kind)
+
+    def __eq__(self, rhs):
+        return (self.section == rhs.section
+                and self.kind == rhs.kind
+                and self.start == rhs.start
+                and self.stop == rhs.stop
+                and self.name == rhs.name
+                and self.fields == rhs.fields)
+
+    def __ne__(self, rhs):
+        return not self.__eq__(rhs)
+
+    def to_dict(self):
+        return {
+            'section': self.section,
+            'kind': self.kind,
+            'start': self.start,
+            'stop': self.stop,
+            'name': None if self.name is None else _text(self.name),
+            'fields': list(self.fields),
+        }
+
+
+class Report(object):
+    """
+    result of diff.
+
+    :IVariables:
+        changes
+            Change list in section order
+        identical
+            section names skipped because their digests matched
+    """
+    __slots__ = ['changes', 'identical']
+
+    def __init__(self):
+        self.changes = []
+        self.identical = []
+
+    def __str__(self):
+        if not self.changes:
+            return 'identical'
+        return '\n'.join(str(c) for c in self.changes)
+
+    def __len__(self):
+        return len(self.changes)
+
+    def is_identical(self):
+        return not self.changes
+
+    def sections(self):
+        """
+        return the names of the sections that differ.
+        """
+        sections = []
+        for c in self.changes:
+            if c.section not in sections:
+                sections.append(c.section)
+        return sections
+
+    def by_section(self, section):
+        return [c for c in self.changes if c.section == section]
+
+    def to_dict(self):
+        return {
+            'identical': list(self.identical),
+            'changes': [c.to_dict() for c in self.changes],
+        }
+
+
+def _text(value):
+    if isinstance(value, bytes):
+        return value.decode('cp932', 'replace')
+    return str(value)
+
+
+def _array_digest(h, array):
+    array = numpy.ascontiguousarray(array)
+    h.update(str(array.dtype).encode('ascii'))
+    h.update(repr(array.shape).encode('ascii'))
+    h.update(array.data if array.size else b'')
+
+
+def _value_digest(h, value):
+    """
+    hash the value fields of value. records are walked through their
+    slots without LINK_FIELDS, so bone chains add no depth.
+    """
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        _array_digest(h, value)
+    elif isinstance(value, (list, tuple)):
+        h.update('{0}:{1}'.format(
+            type(value).__name__, len(value)).encode('ascii'))
+        for v in value:
+            _value_digest(h, v)
+    elif hasattr(type(value), '__slots__'):
+        h.update(type(value).__name__.encode('ascii'))
+        for key in _slots(value):
+            _value_digest(h, getattr(value, key, None))
+    else:
+        h.update(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def digest(value):
+    """
+    return a digest of a model section. arrays are hashed by their bytes,
+    records by their value fields. equal digests mean equal sections,
+    different digests do not mean the sections differ within tolerance.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    if isinstance(value, pmx.VertexArray):
+        for key in pmx.VertexArray.__slots__:
+            _array_digest(h, getattr(value, key))
+    else:
+        _value_digest(h, value)
+    return h.digest()
+
+
+def _columns(vertices):
+    """
+    return (name, array) list of the vertex attributes.
+    """
+    if isinstance(vertices, pmx.VertexArray):
+        return [(key, getattr(vertices, key))
+                for key in pmx.VertexArray.__slots__]
+    return [(key, vertices[key]) for key in vertices.dtype.names]
+
+
+def _mismatch(lhs, rhs, atol):
+    """
+    return bool array of rows that differ. floats are compared with atol.
+    """
+    count = len(lhs)
+    if lhs.dtype.kind == 'f':
+        mask = ~numpy.isclose(lhs, rhs, rtol=0, atol=atol, equal_nan=True)
+    else:
+        mask = lhs != rhs
+    return mask.reshape(count, -1).any(axis=1)
+
+
+def _runs(mask):
+    """
+    return (starts, stops) of the runs of True in mask.
+    """
+    edges = numpy.flatnonzero(numpy.diff(numpy.concatenate(
+        ([0], mask.view(numpy.int8), [0]))))
+    return edges[0::2], edges[1::2]
+
+
+def _diff_columns(report, section, lhs, rhs, atol):
+    """
+    compare column lists of the same names and report changed ranges
+    with the columns that differ in each range.
+    """
+    lcount = len(lhs[0][1])
+    rcount = len(rhs[0][1])
+    count = min(lcount, rcount)
+    names = []
+    masks = []
+    for (name, l), (_, r) in zip(lhs, rhs):
+        names.append(name)
+        masks.append(_mismatch(l[:count], r[:count], atol))
+    if count:
+        masks = numpy.array(masks)
+        starts, stops = _runs(masks.any(axis=0))
+        # changed rows of each column in each run
+        totals = numpy.zeros((len(names), count + 1), numpy.int64)
+        numpy.cumsum(masks, axis=1, out=totals[:, 1:])
+        changed = (totals[:, stops] - totals[:, starts]).T > 0
+        for start, stop, columns in zip(
+                starts.tolist(), stops.tolist(), changed.tolist()):
+            report.changes.append(Change(
+                section, 'changed', start, stop,
+                fields=[n for n, c in zip(names, columns) if c]))
+    _diff_count(report, section, lcount, rcount)
+
+
+def _diff_count(report, section, lcount, rcount):
+    if lcount < rcount:
+        report.changes.append(Change(section, 'added', lcount, rcount))
+    elif lcount > rcount:
+        report.changes.append(Change(section, 'removed', rcount, lcount))
+
+
+def _equal(lhs, rhs):
+    if numpy is not None and (isinstance(lhs, numpy.ndarray)
+                              or isinstance(rhs, numpy.ndarray)):
+        return len(lhs) == len(rhs) and numpy.array_equal(
+            numpy.asarray(lhs), numpy.asarray(rhs))
+    return lhs == rhs
+
+
+def _slots(o):
+    for cls in type(o).__mro__:
+        for key in getattr(cls, '__slots__', ()):
+            if key not in LINK_FIELDS:
+                yield key
+
+
+def _fields(lhs, rhs):
+    """
+    return the attribute names that differ.
+    """
+    if type(lhs) is not type(rhs):
+        return ['type']
+    fields = []
+    for key in _slots(lhs):
+        if not _equal(getattr(lhs, key, None), getattr(rhs, key, None)):
+            fields.append(key)
+    return fields
+
+
+def _diff_elements(report, section, lhs, rhs):
+    for i, (l, r) in enumerate(zip(lhs, rhs)):
+        if hasattr(type(l), '__slots__'):
+            # records compare their value fields. __eq__ of a pmd bone
+            # follows the children links
+            fields = _fields(l, r)
+            if not fields:
+                continue
+        elif _equal(l, r):
+            continue
+        else:
+            fields = []
+        report.changes.append(Change(
+            section, 'changed', i, i + 1,
+            getattr(l, 'name', None), fields))
+    _diff_count(report, section, len(lhs), len(rhs))
+
+
+def _diff_indices(report, lhs, rhs):
+    count = min(len(lhs), len(rhs))
+    starts, stops = _runs(numpy.asarray(lhs[:count]).astype(numpy.int64)
+                          != numpy.asarray(rhs[:count]))
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        report.changes.append(Change('indices', 'changed', start, stop))
+    _diff_count(report, 'indices', len(lhs), len(rhs))
+
+
+def _to_arrays(model):
+    if isinstance(model, (pmx.ArrayModel, pmd.ArrayModel)):
+        return model
+    if isinstance(model, pmx.Model):
+        return pmx.ArrayModel.from_model(model)
+    return pmd.ArrayModel.from_model(model)
+
+
+def diff(lhs, rhs, atol=1e-5):
+    """
+    compare two pmx.Model or two pmd.Model, then return Report.
+
+    models that are not array models are converted with
+    ArrayModel.from_model, so reading with arrays=True is faster.
+    vertex floats are compared with atol, other sections use the
+    equality of their elements.
+    """
+    if not numpy:
+        raise ImportError("pymeshio.diff requires numpy")
+    if isinstance(lhs, pmx.Model) and isinstance(rhs, pmx.Model):
+        sections = PMX_SECTIONS
+    elif isinstance(lhs, pmd.Model) and isinstance(rhs, pmd.Model):
+        sections = PMD_SECTIONS
+    else:
+        raise ValueError("can not diff {0} with {1}".format(
+            type(lhs).__name__, type(rhs).__name__))
+    lhs = _to_arrays(lhs)
+    rhs = _to_arrays(rhs)
+
+    report = Report()
+    for key in HEADER_FIELDS:
+        if getattr(lhs, key) != getattr(rhs, key):
+            report.changes.append(Change('header', 'changed', name=key))
+    for section in sections:
+        l = getattr(lhs, section)
+        r = getattr(rhs, section)
+        if digest(l) == digest(r):
+            report.identical.append(section)
+        elif section == 'vertices':
+            _diff_columns(report, section, _columns(l), _columns(r), atol)
+        elif section == 'indices':
+            _diff_indices(report, l, r)
+        else:
+            _diff_elements(report, section, l, r)
+    return report
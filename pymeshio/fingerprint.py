@@ -0,0 +1,436 @@
+# coding: utf-8
+"""
+section fingerprints of pmd and pmx files
+
+a fingerprint is a digest per content section, computed in one pass over
+the file without building the model. vertices and indices are hashed in
+array chunks, the other records are decoded one at a time.
+
+======== ===========================================================
+section  content
+======== ===========================================================
+geometry vertex position, normal, uv, edge factor, deform and indices
+skeleton bone name, position, parent and ik chain
+morphs   morph name, panel, type and offsets
+materials colors, flags, edge, textures, toon and vertex count
+physics  rigidbodies and joints
+======== ===========================================================
+
+pmd records are hashed in the form converter.pmd_to_pmx gives them, so a
+pmd file and the pmx converted from it have the same fingerprint. pmx
+attributes the converter synthesizes from the pmd bone type(flags,
+layer, tail, effect and axes) and display slots are not covered.
+
+>>> import pymeshio.fingerprint
+>>> lhs = pymeshio.fingerprint.fingerprint_file('model.pmd')
+>>> rhs = pymeshio.fingerprint.fingerprint_file('model.pmx')
+>>> lhs.changed(rhs)
+[]
+"""
+import hashlib
+import struct
+from . import common
+from . import converter
+from . import pmd
+from . import pmx
+from .pmd import reader as pmd_reader
+from .pmx import reader as pmx_reader
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+SECTIONS = ('geometry', 'skeleton', 'morphs', 'materials', 'physics')
+
+# sub digests of each section. a part is fed in file order, so the
+# formats may write them in different orders
+PARTS = {
+    'geometry': ('position', 'normal', 'uv', 'edge_factor', 'deform_type',
+                 'bone_indices', 'weights', 'sdef', 'indices'),
+    'skeleton': ('bones', 'english_names', 'ik'),
+    'morphs': ('morphs', 'english_names'),
+    'materials': ('materials',),
+    'physics': ('rigidbodies', 'joints'),
+}
+
+# pmd vertices hashed at once
+VERTEX_CHUNK = 1 << 16
+
+DIGEST_SIZE = 20
+
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<f')
+
+
+class Fingerprint(object):
+    """
+    section digests of a model.
+
+    :IVariables:
+        format
+            'pmd' or 'pmx'
+        digests
+            section name to bytes digest
+    """
+    __slots__ = ['format', 'digests']
+
+    def __init__(self, format, digests):
+        self.format = format
+        self.digests = digests
+
+    def __str__(self):
+        return '<Fingerprint {0} {1}>'.format(self.format, ' '.join(
+            '{0}={1}'.format(s, self.digests[s].hex()[:12])
+            for s in SECTIONS))
+
+    def __eq__(self, rhs):
+        return self.digests == rhs.digests
+
+    def __ne__(self, rhs):
+        return not self.__eq__(rhs)
+
+    def __hash__(self):
+        return hash(self.digest())
+
+    def digest(self):
+        """
+        return the digest of all sections.
+        """
+        h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        for s in SECTIONS:
+            h.update(self.digests[s])
+        return h.digest()
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+    def changed(self, rhs):
+        """
+        return the sections whose digests differ from rhs.
+        """
+        return [s for s in SECTIONS if self.digests[s] != rhs.digests[s]]
+
+    def to_dict(self):
+        d = dict((s, self.digests[s].hex()) for s in SECTIONS)
+        d['format'] = self.format
+        d['digest'] = self.hexdigest()
+        return d
+
+
+def _update(h, value):
+    """
+    feed value to hash h in a type tagged, float32 canonical form.
+    """
+    if value is None:
+        h.update(b'N')
+    elif isinstance(value, (bool, int)):
+        h.update(b'i')
+        h.update(_INT.pack(value))
+    elif isinstance(value, float):
+        h.update(b'f')
+        h.update(_FLOAT.pack(value))
+    elif isinstance(value, (bytes, str)):
+        if isinstance(value, bytes):
+            value = value.decode('cp932', 'replace')
+        value = value.encode('utf-8')
+        h.update(b's')
+        h.update(_INT.pack(len(value)))
+        h.update(value)
+    elif isinstance(value, (list, tuple)):
+        h.update(b'l')
+        h.update(_INT.pack(len(value)))
+        for v in value:
+            _update(h, v)
+    elif numpy is not None and isinstance(value, numpy.ndarray):
+        value = numpy.ascontiguousarray(value)
+        h.update(b'a')
+        h.update(value.dtype.str.encode('ascii'))
+        h.update(_INT.pack(len(value)))
+        h.update(value.data if value.size else b'')
+    elif isinstance(value, pmx.VertexMorphOffsetArray):
+        _update(h, value.vertex_index)
+        _update(h, value.position_offset)
+    else:
+        # value types and morph data
+        h.update(b'o')
+        for cls in type(value).__mro__:
+            for key in getattr(cls, '__slots__', ()):
+                _update(h, getattr(value, key))
+
+
+class _Builder(object):
+    """
+    blake2b per part of each section.
+    """
+    __slots__ = ['format', 'parts']
+
+    def __init__(self, format):
+        self.format = format
+        self.parts = dict(
+            ((section, part), hashlib.blake2b(digest_size=DIGEST_SIZE))
+            for section in SECTIONS for part in PARTS[section])
+
+    def update(self, section, part, value):
+        _update(self.parts[section, part], value)
+
+    def update_array(self, section, part, array):
+        """
+        feed array bytes only, so chunks hash like the whole array.
+        """
+        self.parts[section, part].update(
+            numpy.ascontiguousarray(array).data)
+
+    def update_vertices(self, vertices):
+        """
+        feed pmx.VertexArray. weights that follow from the deform type
+        are cleared, so Bdef1 and the second Bdef2 weight do not depend
+        on how they were computed.
+        """
+        for key in ('position', 'normal', 'uv', 'edge_factor',
+                    'deform_type', 'bone_indices', 'sdef'):
+            self.update_array('geometry', key, getattr(vertices, key))
+        weights = vertices.weights.copy()
+        t = vertices.deform_type
+        weights[t == pmx.DEFORM_BDEF1] = 0
+        weights[(t == pmx.DEFORM_BDEF2) | (t == pmx.DEFORM_SDEF), 1:] = 0
+        self.update_array('geometry', 'weights', weights)
+
+    def update_indices(self, indices):
+        self.update_array('geometry', 'indices',
+                          numpy.asarray(indices, '<i4'))
+
+    def build(self):
+        digests = {}
+        for section in SECTIONS:
+            h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+            for part in PARTS[section]:
+                h.update(self.parts[section, part].digest())
+            digests[section] = h.digest()
+        return Fingerprint(self.format, digests)
+
+
+def _material_record(name, english_name, m, flag, edge_color, edge_size,
+                     texture, sphere, sphere_mode, toon_sharing_flag, toon,
+                     comment):
+    return (name, english_name, m.diffuse_color, m.alpha,
+            m.specular_factor, m.specular_color, m.ambient_color,
+            flag, edge_color, edge_size, texture, sphere, sphere_mode,
+            toon_sharing_flag, toon, comment, m.vertex_count)
+
+
+def _rigidbody_record(r, english_name, position, param):
+    return (r.name, english_name, r.bone_index, r.collision_group,
+            r.no_collision_group, r.shape_type, r.shape_size, position,
+            r.shape_rotation, param.mass, param.linear_damping,
+            param.angular_damping, param.restitution, param.friction,
+            r.mode)
+
+
+def _joint_record(j, english_name, joint_type):
+    return (j.name, english_name, joint_type,
+            j.rigidbody_index_a, j.rigidbody_index_b,
+            j.position, j.rotation,
+            j.translation_limit_min, j.translation_limit_max,
+            j.rotation_limit_min, j.rotation_limit_max,
+            j.spring_constant_translation, j.spring_constant_rotation)
+
+
+def _pmd_textures(texture_file):
+    """
+    return (texture, sphere, sphere_mode) as converter.pmd_to_pmx splits
+    texture_file.
+    """
+    if not texture_file:
+        return None, None, 0
+    if texture_file.find(b'*') == -1:
+        return texture_file, None, 0
+    texture, sphere = texture_file.split(b'*')[:2]
+    if sphere.endswith(b'.sph'):
+        return texture or None, sphere or None, 1
+    elif sphere.endswith(b'.spa'):
+        return texture or None, sphere or None, 2
+    return texture or None, sphere or None, 0
+
+
+def fingerprint_pmd(ios):
+    """
+    fingerprint a pmd stream.
+    """
+    if not numpy:
+        raise ImportError("pymeshio.fingerprint requires numpy")
+    reader = pmd_reader.Reader(ios, 0)
+    signature = reader.unpack("3s", 3)
+    if signature != b"Pmd":
+        raise common.ParseException(
+            "invalid signature: {0}".format(signature))
+    reader.version = reader.read_float()
+    reader.skip(20 + 256)
+    builder = _Builder('pmd')
+
+    # geometry
+    count = reader.read_uint(4)
+    for start in range(0, count, VERTEX_CHUNK):
+        n = min(VERTEX_CHUNK, count - start)
+        builder.update_vertices(converter._pmd_vertex_array(
+            reader.read_vertex_array(n)))
+    count = reader.read_uint(4)
+    for start in range(0, count, VERTEX_CHUNK):
+        builder.update_indices(reader.read_index_array(
+            min(VERTEX_CHUNK, count - start)))
+
+    for _ in range(reader.read_uint(4)):
+        m = reader.read_material()
+        texture, sphere, sphere_mode = _pmd_textures(m.texture_file)
+        edge = 2 + 16 if m.edge_flag & 1 else 0
+        builder.update('materials', 'materials', _material_record(
+            '', '', m, 4 + 8 + edge, common.RGBA(0.0, 0.0, 0.0, 1.0), 1.0,
+            texture, sphere, sphere_mode, 1, m.toon_index, ''))
+
+    # skeleton
+    bones = [reader.read_bone() for _ in range(reader.read_uint(2))]
+    for b in bones:
+        parent = b.parent_index if b.parent_index != 0xFFFF else -1
+        builder.update('skeleton', 'bones', (b.name, b.pos, parent))
+    ik_list = [reader.read_ik() for _ in range(reader.read_uint(2))]
+    for ik in sorted(ik_list, key=lambda ik: ik.index):
+        # converter.pmd_to_pmx keeps the ik of ik bones only
+        if ik.index < len(bones) and isinstance(bones[ik.index], pmd.Bone_IK):
+            builder.update('skeleton', 'ik', (
+                ik.index, ik.target, ik.iterations, ik.weight * 4,
+                ik.children))
+
+    # morphs. offsets of the base are the vertex indices of the others
+    base = None
+    morph_count = 0
+    for _ in range(reader.read_uint(2)):
+        morph = reader.read_morph(True)
+        if morph.name == b'base':
+            base = morph.indices
+            continue
+        if base is None:
+            raise common.ParseException(
+                "morph {0} before the base morph".format(morph.name))
+        morph_count += 1
+        offsets = pmx.VertexMorphOffsetArray(len(morph.indices))
+        offsets.vertex_index[:] = base[morph.indices]
+        offsets.position_offset[:] = morph.pos_list
+        builder.update('morphs', 'morphs',
+                       (morph.name, morph.type, 1, offsets))
+
+    # morph_indices, bone_group_list and bone_display_list
+    reader.skip(2 * reader.read_uint(1))
+    group_count = reader.read_uint(1)
+    reader.skip(50 * group_count)
+    reader.skip(3 * reader.read_uint(4))
+
+    english = not reader.is_end() and reader.read_uint(1) == 1
+    if english:
+        reader.skip(20 + 256)
+    for _ in bones:
+        builder.update('skeleton', 'english_names',
+                       reader.read_text(20) if english else b'')
+    for _ in range(morph_count):
+        builder.update('morphs', 'english_names',
+                       reader.read_text(20) if english else b'')
+    if english:
+        reader.skip(50 * group_count)
+
+    # physics
+    if not reader.is_end():
+        # toon textures
+        reader.skip(100 * 10)
+    if not reader.is_end():
+        for _ in range(reader.read_uint(4)):
+            r = reader.read_rigidbody()
+            bone = (bones[r.bone_index] if 0 <= r.bone_index < len(bones)
+                    else bones[0])
+            builder.update('physics', 'rigidbodies', _rigidbody_record(
+                r, '', r.shape_position + bone.pos, r))
+        for _ in range(reader.read_uint(4)):
+            builder.update('physics', 'joints',
+                           _joint_record(reader.read_joint(), '', 0))
+    return builder.build()
+
+
+def fingerprint_pmx(ios):
+    """
+    fingerprint a pmx stream.
+    """
+    if not numpy:
+        raise ImportError("pymeshio.fingerprint requires numpy")
+    _, reader = pmx_reader.read_header(ios)
+    for _ in range(4):
+        reader.read_text()
+    builder = _Builder('pmx')
+
+    builder.update_vertices(reader.read_vertex_array(reader.read_int(4)))
+    builder.update_indices(reader.read_index_array(reader.read_int(4)))
+    textures = [reader.read_text() for _ in range(reader.read_int(4))]
+
+    def texture(index):
+        return textures[index] if 0 <= index < len(textures) else None
+
+    for _ in range(reader.read_int(4)):
+        m = reader.read_material()
+        toon = (m.toon_texture_index if m.toon_sharing_flag == 1
+                else texture(m.toon_texture_index))
+        builder.update('materials', 'materials', _material_record(
+            m.name, m.english_name, m, m.flag, m.edge_color, m.edge_size,
+            texture(m.texture_index), texture(m.sphere_texture_index),
+            m.sphere_mode, m.toon_sharing_flag, toon, m.comment))
+
+    for i in range(reader.read_int(4)):
+        b = reader.read_bone()
+        builder.update('skeleton', 'bones', (b.name, b.position,
+                                             b.parent_index))
+        builder.update('skeleton', 'english_names', b.english_name)
+        if b.getIkFlag() and b.ik:
+            builder.update('skeleton', 'ik', (
+                i, b.ik.target_index, b.ik.loop, b.ik.limit_radian,
+                [link.bone_index for link in b.ik.link]))
+
+    for _ in range(reader.read_int(4)):
+        m = reader.read_morgh(True)
+        builder.update('morphs', 'morphs',
+                       (m.name, m.panel, m.morph_type, m.offsets))
+        builder.update('morphs', 'english_names', m.english_name)
+
+    reader.read_section('display_slots', reader.read_int(4))
+
+    for _ in range(reader.read_int(4)):
+        r = reader.read_rigidbody()
+        builder.update('physics', 'rigidbodies', _rigidbody_record(
+            r, r.english_name, r.shape_position, r.param))
+    for _ in range(reader.read_int(4)):
+        j = reader.read_joint()
+        builder.update('physics', 'joints',
+                       _joint_record(j, j.english_name, j.joint_type))
+    return builder.build()
+
+
+FINGERPRINTS = {
+    b'Pmd': fingerprint_pmd,
+    b'PMX ': fingerprint_pmx,
+}
+
+
+def fingerprint(ios):
+    """
+    fingerprint a pmd or pmx stream by its signature.
+    """
+    current = ios.tell()
+    head = ios.read(4)
+    ios.seek(current)
+    for signature, function in FINGERPRINTS.items():
+        if head.startswith(signature):
+            return function(ios)
+    raise common.ParseException("unknown signature: {0}".format(head))
+
+
+def fingerprint_file(path):
+    """
+    fingerprint file path.
+    """
+    with common.open_mapped(path) as ios:
+        return fingerprint(ios)
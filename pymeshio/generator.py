@@ -0,0 +1,435 @@
+# coding: utf-8
+"""
+synthetic pmx, pmd, vmd, obj and mqo data
+
+creates models and motions of any size from a seed, so that readers
+and writers can be measured without external resources. the same
+arguments always make the same bytes.
+
+pmx, pmd and vmd are built as array models and encoded by the existing
+writers. obj and mqo have no writers, their text is written in chunks
+of CHUNK lines.
+
+>>> import pymeshio.generator
+>>> model = pymeshio.generator.create_pmx(1000000, rigidbody_count=32)
+>>> pymeshio.generator.generate_file('big.pmx', vertex_count=1000000)
+"""
+import io
+import os
+from . import common
+from . import pmd
+from . import pmx
+from . import vmd
+from .pmd import writer as pmd_writer
+from .pmx import writer as pmx_writer
+from .vmd import writer as vmd_writer
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# relative frequency of each deform type
+DEFAULT_DEFORM_MIX = {
+    pmx.DEFORM_BDEF1: 0.4,
+    pmx.DEFORM_BDEF2: 0.4,
+    pmx.DEFORM_BDEF4: 0.15,
+    pmx.DEFORM_SDEF: 0.05,
+}
+
+# pmd indices are uint16
+PMD_MAX_VERTICES = 65535
+
+# text lines formatted at once
+CHUNK = 65536
+
+EXTENSIONS = ('.pmx', '.pmd', '.vmd', '.obj', '.mqo')
+
+
+def _random(seed):
+    if not numpy:
+        raise ImportError("pymeshio.generator requires numpy")
+    return numpy.random.RandomState(seed)
+
+
+def _deform_types(random, count, deform_mix, allowed):
+    types = sorted(deform_mix)
+    for t in types:
+        if t not in allowed:
+            raise ValueError("unsupported deform type: {0}".format(t))
+    p = numpy.array([deform_mix[t] for t in types], numpy.float64)
+    if p.sum() <= 0:
+        raise ValueError("deform_mix has no positive weight")
+    return random.choice(types, count, p=p / p.sum()).astype(numpy.int8)
+
+
+def _triangles(vertex_count):
+    """
+    return (n, 3) int64 triangles of a strip over the vertices.
+    """
+    first = numpy.arange(max(vertex_count - 2, 0))
+    triangles = numpy.stack((first, first + 1, first + 2), axis=1)
+    # keep the winding of the strip
+    triangles[1::2, 1:] = triangles[1::2, :0:-1]
+    return triangles
+
+
+def _material_faces(face_count, material_count):
+    """
+    return face counts of the materials. the last one takes the rest.
+    """
+    material_count = max(material_count, 1)
+    counts = [face_count // material_count] * material_count
+    counts[-1] += face_count - sum(counts)
+    return counts
+
+
+def _names(prefix, count):
+    return ['{0}{1}'.format(prefix, i) for i in range(count)]
+
+
+def create_pmx(vertex_count=1000, bone_count=64, morph_count=16,
+               morph_offset_count=None, material_count=4,
+               rigidbody_count=0, deform_mix=None, seed=0):
+    """
+    return a pmx.ArrayModel.
+
+    :Parameters:
+        vertex_count
+            vertices of a triangle strip
+        bone_count
+            bones in a chain, named bone0, bone1, ...
+        morph_count
+            vertex morphs, named morph0, morph1, ...
+        morph_offset_count
+            offsets of each morph. default is vertex_count / 10
+        material_count
+            materials that split the faces
+        rigidbody_count
+            rigidbodies on the bones, linked in a chain of joints
+        deform_mix
+            dict of pmx.DEFORM_* to relative frequency.
+            default is DEFAULT_DEFORM_MIX
+        seed
+            random seed
+    """
+    random = _random(seed)
+    bone_count = max(bone_count, 1)
+    model = pmx.ArrayModel(name=u'generated', english_name=u'generated')
+    model.bones = [
+        pmx.Bone(name, name, common.Vector3(0, i, 0), i - 1, 0,
+                 pmx.BONEFLAG_CAN_ROTATE | pmx.BONEFLAG_IS_VISIBLE
+                 | pmx.BONEFLAG_CAN_MANIPULATE)
+        for i, name in enumerate(_names('bone', bone_count))]
+
+    v = pmx.VertexArray(vertex_count)
+    v.position[:] = random.uniform(-10, 10, (vertex_count, 3))
+    normal = random.normal(size=(vertex_count, 3))
+    normal /= numpy.maximum(
+        numpy.linalg.norm(normal, axis=1, keepdims=True), 1e-6)
+    v.normal[:] = normal
+    v.uv[:] = random.uniform(0, 1, (vertex_count, 2))
+    v.edge_factor[:] = 1
+    v.deform_type[:] = _deform_types(
+        random, vertex_count, deform_mix or DEFAULT_DEFORM_MIX,
+        DEFAULT_DEFORM_MIX)
+    v.bone_indices[:] = random.randint(0, bone_count, (vertex_count, 4))
+    weights = random.uniform(0.1, 1, (vertex_count, 4))
+    v.weights[:] = weights / weights.sum(axis=1, keepdims=True)
+    one = v.deform_type == pmx.DEFORM_BDEF1
+    v.bone_indices[one, 1:] = -1
+    v.weights[one] = (1, 0, 0, 0)
+    two = (v.deform_type == pmx.DEFORM_BDEF2) | (
+        v.deform_type == pmx.DEFORM_SDEF)
+    v.bone_indices[two, 2:] = -1
+    w0 = weights[two, 0] / (weights[two, 0] + weights[two, 1])
+    v.weights[two] = numpy.stack(
+        (w0, 1 - w0, numpy.zeros_like(w0), numpy.zeros_like(w0)), axis=1)
+    sdef = v.deform_type == pmx.DEFORM_SDEF
+    v.sdef[sdef] = random.uniform(-1, 1, (int(sdef.sum()), 3, 3))
+    model.vertices = v
+
+    triangles = _triangles(vertex_count)
+    model.indices = triangles.astype(numpy.int32).ravel()
+    model.textures = [u'tex{0}.png'.format(i) for i in range(material_count)]
+    model.materials = [
+        pmx.Material(name, name, common.RGB(0.8, 0.8, 0.8), 1.0, 5,
+                     common.RGB(1, 1, 1), common.RGB(0.2, 0.2, 0.2),
+                     pmx.MATERIALFLAG_EDGE, common.RGBA(0, 0, 0, 1), 1,
+                     i, -1, pmx.MATERIALSPHERE_NONE, 1, 0, u'',
+                     faces * 3)
+        for i, (name, faces) in enumerate(zip(
+            _names('material', material_count),
+            _material_faces(len(triangles), material_count)))]
+
+    if morph_offset_count is None:
+        morph_offset_count = vertex_count // 10
+    morph_offset_count = min(morph_offset_count, vertex_count)
+    model.morphs = []
+    for name in _names('morph', morph_count):
+        offsets = pmx.VertexMorphOffsetArray(morph_offset_count)
+        offsets.vertex_index[:] = numpy.sort(random.choice(
+            vertex_count, morph_offset_count, replace=False))
+        offsets.position_offset[:] = random.uniform(
+            -1, 1, (morph_offset_count, 3))
+        model.morphs.append(pmx.Morph(name, name, 4, 1, offsets))
+    model.display_slots = [
+        pmx.DisplaySlot(u'Root', u'Root', 1, [(0, 0)]),
+        pmx.DisplaySlot(u'表情', u'Exp', 1,
+                        [(1, i) for i in range(morph_count)]),
+        pmx.DisplaySlot(u'bones', u'bones', 0,
+                        [(0, i) for i in range(1, bone_count)]),
+    ]
+
+    v3 = common.Vector3
+    model.rigidbodies = [
+        pmx.RigidBody(name, name, i % bone_count, i % 16, 0,
+                      i % 3, v3(0.5, 1, 0.5), v3(0, i % bone_count, 0),
+                      v3(0, 0, 0), 1.0, 0.5, 0.5, 0, 0.5,
+                      0 if i == 0 else 1)
+        for i, name in enumerate(_names('rigidbody', rigidbody_count))]
+    model.joints = [
+        pmx.Joint(name, name, 0, i, i + 1, v3(0, i + 0.5, 0), v3(0, 0, 0),
+                  v3(0, 0, 0), v3(0, 0, 0), v3(-0.5, -0.5, -0.5),
+                  v3(0.5, 0.5, 0.5), v3(0, 0, 0), v3(0, 0, 0))
+        for i, name in enumerate(_names('joint', rigidbody_count - 1))]
+    return model
+
+
+def create_pmd(vertex_count=1000, bone_count=64, morph_count=16,
+               morph_offset_count=None, material_count=4,
+               rigidbody_count=0, deform_mix=None, seed=0):
+    """
+    return a pmd.ArrayModel. the arguments are the same as create_pmx.
+    pmd deforms are pmx.DEFORM_BDEF1 and pmx.DEFORM_BDEF2 only and
+    vertex_count is at most PMD_MAX_VERTICES.
+    """
+    if vertex_count > PMD_MAX_VERTICES:
+        raise ValueError("pmd vertex_count must be <= {0}: {1}".format(
+            PMD_MAX_VERTICES, vertex_count))
+    random = _random(seed)
+    bone_count = max(bone_count, 1)
+    model = pmd.ArrayModel()
+    model.name = b'generated'
+    model.english_name = b'generated'
+    for i in range(bone_count):
+        bone = pmd.createBone(b'bone%d' % i, 1)
+        bone.english_name = bone.name
+        bone.parent_index = i - 1 if i > 0 else 0xFFFF
+        bone.tail_index = i + 1 if i + 1 < bone_count else 0
+        bone.pos = common.Vector3(0, i, 0)
+        model.bones.append(bone)
+
+    vertices = numpy.zeros(vertex_count, pmd.VERTEX_DTYPE)
+    vertices['pos'] = random.uniform(-10, 10, (vertex_count, 3))
+    normal = random.normal(size=(vertex_count, 3))
+    vertices['normal'] = normal / numpy.maximum(
+        numpy.linalg.norm(normal, axis=1, keepdims=True), 1e-6)
+    vertices['uv'] = random.uniform(0, 1, (vertex_count, 2))
+    vertices['bone0'] = random.randint(0, bone_count, vertex_count)
+    vertices['bone1'] = random.randint(0, bone_count, vertex_count)
+    deform = _deform_types(
+        random, vertex_count, deform_mix or {pmx.DEFORM_BDEF1: 0.5,
+                                             pmx.DEFORM_BDEF2: 0.5},
+        (pmx.DEFORM_BDEF1, pmx.DEFORM_BDEF2))
+    vertices['weight0'] = numpy.where(
+        deform == pmx.DEFORM_BDEF1, 100,
+        random.randint(0, 101, vertex_count))
+    model.vertices = vertices
+
+    triangles = _triangles(vertex_count)
+    model.indices = triangles.astype(numpy.uint16).ravel()
+    rgb = common.RGB
+    model.materials = [
+        pmd.Material(rgb(0.8, 0.8, 0.8), 1.0, 5.0, rgb(0.2, 0.2, 0.2),
+                     rgb(0.5, 0.5, 0.5), i % 10, 1, faces * 3,
+                     b'tex%d.bmp' % i)
+        for i, faces in enumerate(
+            _material_faces(len(triangles), material_count))]
+
+    if morph_offset_count is None:
+        morph_offset_count = vertex_count // 10
+    morph_offset_count = min(morph_offset_count, vertex_count)
+    base = pmd.Morph(b'base')
+    base.type = 0
+    base.indices = numpy.sort(random.choice(
+        vertex_count, morph_offset_count, replace=False)).astype(numpy.uint32)
+    base.pos_list = vertices['pos'][base.indices].astype(numpy.float32)
+    model.morphs = [base]
+    for i in range(morph_count):
+        morph = pmd.Morph(b'morph%d' % i)
+        morph.english_name = morph.name
+        morph.type = 1 + i % 4
+        morph.indices = numpy.arange(morph_offset_count, dtype=numpy.uint32)
+        morph.pos_list = random.uniform(
+            -1, 1, (morph_offset_count, 3)).astype(numpy.float32)
+        model.morphs.append(morph)
+    model.morph_indices = list(range(1, morph_count + 1))
+    model.bone_group_list = [pmd.BoneGroup(b'bones', b'bones')]
+    model.bone_display_list = [(i, 1) for i in range(1, bone_count)]
+
+    v3 = common.Vector3
+    model.rigidbodies = [
+        pmd.RigidBody(b'rigidbody%d' % i, i % bone_count, i % 16, 0,
+                      i % 3, v3(0.5, 1, 0.5), v3(0, 0, 0), v3(0, 0, 0),
+                      1.0, 0.5, 0.5, 0, 0.5,
+                      pmd.RIGIDBODY_KINEMATICS if i == 0
+                      else pmd.RIGIDBODY_PHYSICS)
+        for i in range(rigidbody_count)]
+    model.joints = [
+        pmd.Joint(b'joint%d' % i, i, i + 1, v3(0, i + 0.5, 0), v3(0, 0, 0),
+                  v3(0, 0, 0), v3(0, 0, 0), v3(0.5, 0.5, 0.5),
+                  v3(-0.5, -0.5, -0.5), v3(0, 0, 0), v3(0, 0, 0))
+        for i in range(rigidbody_count - 1)]
+    return model
+
+
+def create_vmd(bone_frame_count=10000, morph_frame_count=None,
+               bone_count=64, morph_count=16, seed=0):
+    """
+    return a vmd.Motion of bone0.. and morph0.., the names of create_pmx
+    and create_pmd. frames are spread over the names in turn.
+
+    :Parameters:
+        bone_frame_count
+            bone keyframes
+        morph_frame_count
+            morph keyframes. default is bone_frame_count / 4
+    """
+    random = _random(seed)
+    if morph_frame_count is None:
+        morph_frame_count = bone_frame_count // 4
+    bone_count = max(bone_count, 1)
+    morph_count = max(morph_count, 1)
+    motion = vmd.Motion()
+    motion.model_name = b'generated'
+
+    frame = numpy.arange(bone_frame_count)
+    bones = numpy.zeros(bone_frame_count, vmd.BONE_FRAME_DTYPE)
+    bones['name'] = numpy.array(
+        [b'bone%d' % i for i in range(bone_count)])[frame % bone_count]
+    bones['frame'] = frame // bone_count
+    bones['pos'] = random.uniform(-1, 1, (bone_frame_count, 3))
+    q = random.normal(size=(bone_frame_count, 4))
+    bones['q'] = q / numpy.maximum(
+        numpy.linalg.norm(q, axis=1, keepdims=True), 1e-6)
+    bones['complement'] = vmd.LINEAR_COMPLEMENT
+    motion.motions = vmd.BoneFrameArray(bones)
+
+    frame = numpy.arange(morph_frame_count)
+    morphs = numpy.zeros(morph_frame_count, vmd.MORPH_FRAME_DTYPE)
+    morphs['name'] = numpy.array(
+        [b'morph%d' % i for i in range(morph_count)])[frame % morph_count]
+    morphs['frame'] = frame // morph_count
+    morphs['ratio'] = random.uniform(0, 1, morph_frame_count)
+    motion.shapes = vmd.MorphFrameArray(morphs)
+    motion.last_frame = max((bone_frame_count - 1) // bone_count,
+                            (morph_frame_count - 1) // morph_count, 0)
+    return motion
+
+
+def _write_lines(ios, line_format, rows):
+    """
+    write line_format % row for each row of a 2d array.
+    """
+    for start in range(0, len(rows), CHUNK):
+        chunk = rows[start:start + CHUNK]
+        ios.write(((line_format * len(chunk)) % tuple(
+            chunk.ravel().tolist())).encode('ascii'))
+
+
+def write_obj(ios, vertex_count=1000, material_count=4, seed=0):
+    """
+    write obj text of a triangle strip with uvs and normals.
+    faces are split into usemtl groups of material_count materials.
+    """
+    random = _random(seed)
+    ios.write(b'# generated by pymeshio\n')
+    _write_lines(ios, 'v %.6f %.6f %.6f\n',
+                 random.uniform(-10, 10, (vertex_count, 3)))
+    _write_lines(ios, 'vt %.6f %.6f\n',
+                 random.uniform(0, 1, (vertex_count, 2)))
+    _write_lines(ios, 'vn %.6f %.6f %.6f\n',
+                 random.uniform(-1, 1, (vertex_count, 3)))
+    triangles = _triangles(vertex_count) + 1
+    start = 0
+    for i, faces in enumerate(
+            _material_faces(len(triangles), material_count)):
+        ios.write('usemtl material{0}\n'.format(i).encode('ascii'))
+        _write_lines(ios, 'f %d/%d/%d %d/%d/%d %d/%d/%d\n',
+                     triangles[start:start + faces].repeat(3, axis=1))
+        start += faces
+
+
+def write_mqo(ios, vertex_count=1000, material_count=4, object_count=1,
+              seed=0):
+    """
+    write mqo text of object_count objects that share vertex_count
+    vertices. each object is a triangle strip with uvs.
+    """
+    random = _random(seed)
+    ios.write(b'Metasequoia Document\r\nFormat Text Ver 1.0\r\n\r\n')
+    material_count = max(material_count, 1)
+    ios.write('Material {0} {{\r\n'.format(material_count).encode('ascii'))
+    for i in range(material_count):
+        ios.write(('\t"material{0}" shader(3) col(0.800 0.800 0.800 1.000)'
+                   ' dif(0.800) amb(0.600) emi(0.000) spc(0.000)'
+                   ' power(5.00)\r\n').format(i).encode('ascii'))
+    ios.write(b'}\r\n')
+    object_count = max(object_count, 1)
+    counts = [vertex_count // object_count] * object_count
+    counts[-1] += vertex_count - sum(counts)
+    for i, count in enumerate(counts):
+        ios.write('Object "object{0}" {{\r\n\tvertex {1} {{\r\n'.format(
+            i, count).encode('ascii'))
+        _write_lines(ios, '\t\t%.4f %.4f %.4f\r\n',
+                     random.uniform(-10, 10, (count, 3)))
+        triangles = _triangles(count)
+        ios.write('\t}}\r\n\tface {0} {{\r\n'.format(
+            len(triangles)).encode('ascii'))
+        rows = numpy.empty((len(triangles), 10))
+        rows[:, :3] = triangles
+        rows[:, 3] = numpy.arange(len(triangles)) % material_count
+        rows[:, 4:] = random.uniform(0, 1, (len(triangles), 6))
+        _write_lines(ios, '\t\t3 V(%d %d %d) M(%d)'
+                     ' UV(%.5f %.5f %.5f %.5f %.5f %.5f)\r\n', rows)
+        ios.write(b'\t}\r\n}\r\n')
+    ios.write(b'Eof\r\n')
+
+
+def generate(ios, extension, **kw):
+    """
+    write generated data of extension('.pmx', '.pmd', '.vmd', '.obj'
+    or '.mqo') to ios. kw are the arguments of the create_ or write_
+    function of the format.
+    """
+    extension = extension.lower()
+    if extension == '.pmx':
+        pmx_writer.write(ios, create_pmx(**kw))
+    elif extension == '.pmd':
+        pmd_writer.write(ios, create_pmd(**kw))
+    elif extension == '.vmd':
+        vmd_writer.write(ios, create_vmd(**kw))
+    elif extension == '.obj':
+        write_obj(ios, **kw)
+    elif extension == '.mqo':
+        write_mqo(ios, **kw)
+    else:
+        raise ValueError("unknown extension: {0}".format(extension))
+
+
+def generate_bytes(extension, **kw):
+    """
+    return generated data of extension as bytes.
+    """
+    ios = io.BytesIO()
+    generate(ios, extension, **kw)
+    return ios.getvalue()
+
+
+def generate_file(path, **kw):
+    """
+    write generated data to path. the format is the extension of path.
+    """
+    with io.open(path, 'wb') as ios:
+        generate(ios, os.path.splitext(path)[1], **kw)
@@ -1,3 +1,8 @@
+import struct
+from . import common
+from . import layout
+
+
 class ParseContext:
     def __init__(self, data, position=0):
         self.data=data
@@ -78,6 +83,379 @@ def parser_builder(generator):
     return parser
 
 
+############################################################
+# binary
+############################################################
+# the parsers above advance one element at a time. the binary parsers
+# below describe fixed width fields instead. a Record or an Array of them
+# is compiled once into a struct.Struct that unpacks all fields at once and
+# a generated function that builds the value from the unpacked tuple.
+# variable fields(counted arrays, length prefixed strings) split a record
+# into several fused structs. parsing reads a memoryview through a Cursor
+# without copying.
+#
+# >>> vertex=Record(pmd.Vertex, vector3, vector3, vector2, u16, u16, u8, u8)
+# >>> vertices=Array(u32, vertex)
+# >>> vertices.parse(Cursor(data))
+
+
+class Cursor(object):
+    """
+    read position over a memoryview.
+    """
+    __slots__=['data', 'position']
+    def __init__(self, data, position=0):
+        self.data=data if isinstance(data, memoryview) else memoryview(data)
+        self.position=position
+
+    def __str__(self):
+        return "<Cursor {0}/{1}>".format(self.position, len(self.data))
+
+    def is_end(self):
+        return self.position>=len(self.data)
+
+    def read(self, size):
+        """return the next size bytes as a memoryview"""
+        position=self.position
+        if position+size>len(self.data):
+            raise common.ParseException("no more data: {0}+{1}/{2}".format(
+                position, size, len(self.data)))
+        self.position=position+size
+        return self.data[position:position+size]
+
+
+class Parser(object):
+    """
+    binary parser.
+
+    :IVariables:
+        fmt
+            struct format(without byte order) of a fixed width parser,
+            None if the width depends on the data
+        items
+            values the struct format unpacks to
+    """
+    fmt=None
+    items=0
+
+    def expression(self, var, start, namespace):
+        """
+        return python source that builds the value of a fixed width parser
+        from the tuple var, whose items from start belong to this parser.
+        referenced objects are added to namespace.
+        """
+        raise NotImplementedError()
+
+    def parse(self, cursor):
+        """return the value at the cursor, then advance the cursor"""
+        raise NotImplementedError()
+
+    def parse_bytes(self, data, position=0):
+        return self.parse(Cursor(data, position))
+
+    def compile_decoder(self):
+        """
+        return function(values tuple) of a fixed width parser.
+        """
+        namespace={}
+        source="lambda v: {0}".format(self.expression('v', 0, namespace))
+        return eval(source, namespace)
+
+
+def _bind(namespace, value):
+    name="_{0}".format(len(namespace))
+    namespace[name]=value
+    return name
+
+
+class _FixedParser(Parser):
+    """
+    parses fmt with one struct and decodes by the compiled expression.
+    """
+    def _compile(self):
+        self.struct=struct.Struct('<'+self.fmt)
+        self.decode=self.compile_decoder()
+
+    def parse(self, cursor):
+        values=self.struct.unpack_from(cursor.data, cursor.position)
+        cursor.position+=self.struct.size
+        return self.decode(values)
+
+
+class Unpack(_FixedParser):
+    """
+    a fixed width field.
+
+    :IVariables:
+        build
+            None for the value(or the tuple if items>1),
+            otherwise called with the tuple, or with the values if star
+    """
+    def __init__(self, fmt, build=None, star=False):
+        self.fmt=fmt
+        self.items=len(struct.unpack('<'+fmt, bytes(struct.calcsize('<'+fmt))))
+        self.build=build
+        self.star=star
+        self._compile()
+
+    def expression(self, var, start, namespace):
+        stop=start+self.items
+        if self.build is None:
+            if self.items==1:
+                return "{0}[{1}]".format(var, start)
+            return "{0}[{1}:{2}]".format(var, start, stop)
+        name=_bind(namespace, self.build)
+        if self.items==1:
+            return "{0}({1}[{2}])".format(name, var, start)
+        if self.star:
+            return "{0}({1})".format(name, ", ".join(
+                "{0}[{1}]".format(var, i) for i in range(start, stop)))
+        return "{0}({1}[{2}:{3}])".format(name, var, start, stop)
+
+    def is_plain(self):
+        """True if the value is the single item of a one letter format"""
+        return self.build is None and self.items==1 and len(self.fmt)==1
+
+    def is_raw(self):
+        """True if the value is the unpacked tuple"""
+        return self.build is None and self.items>1
+
+
+def truncate(src):
+    """cut bytes at the first null"""
+    pos=src.find(b"\x00")
+    if pos==-1:
+        return src
+    return src[:pos]
+
+
+u8=Unpack('B')
+u16=Unpack('H')
+u32=Unpack('I')
+i8=Unpack('b')
+i16=Unpack('h')
+i32=Unpack('i')
+f32=Unpack('f')
+vector2=Unpack('2f', common.Vector2, star=True)
+vector3=Unpack('3f', common.Vector3, star=True)
+
+
+def fixed_bytes(size):
+    """size bytes"""
+    return Unpack('{0}s'.format(size))
+
+
+def text(size):
+    """size bytes cut at the first null"""
+    return Unpack('{0}s'.format(size), truncate)
+
+
+class Ref(object):
+    """
+    the value of an earlier field of the enclosing Record, as the count
+    of an Array.
+    """
+    __slots__=['index']
+    def __init__(self, index):
+        self.index=index
+
+
+class Record(_FixedParser):
+    """
+    fields in sequence, built with build(*values).
+
+    runs of fixed width fields are fused into one struct.Struct. a record
+    of only fixed width fields is fixed width and fuses into the records
+    and arrays that contain it.
+    """
+    def __init__(self, build, *fields):
+        self.build=build
+        self.fields=fields
+        if all(f.fmt is not None for f in fields):
+            self.fmt=''.join(f.fmt for f in fields)
+            self.items=sum(f.items for f in fields)
+            self._compile()
+        else:
+            self.parse=self._compile_plan()
+
+    def expression(self, var, start, namespace):
+        values=[]
+        for f in self.fields:
+            values.append(f.expression(var, start, namespace))
+            start+=f.items
+        return "{0}({1})".format(
+                _bind(namespace, self.build), ", ".join(values))
+
+    def _compile_plan(self):
+        """
+        generate parse(cursor) that unpacks each run of fixed fields with
+        one struct and parses variable fields in between.
+        """
+        namespace={}
+        lines=["def parse(cursor):",
+                "    data=cursor.data",
+                "    pos=cursor.position"]
+        values=[]
+        run=[]
+
+        def flush():
+            if not run:
+                return
+            fused=struct.Struct('<'+''.join(f.fmt for f in run))
+            var="v{0}".format(len(lines))
+            lines.append("    {0}={1}.unpack_from(data, pos)".format(
+                var, _bind(namespace, fused)))
+            lines.append("    pos+={0}".format(fused.size))
+            start=0
+            for f in run:
+                values.append(f.expression(var, start, namespace))
+                start+=f.items
+            del run[:]
+
+        for f in self.fields:
+            if f.fmt is not None:
+                run.append(f)
+                continue
+            flush()
+            var="f{0}".format(len(values))
+            lines.append("    cursor.position=pos")
+            if isinstance(f, Array) and isinstance(f.count, Ref):
+                lines.append("    {0}={1}.parse(cursor, {2})".format(
+                    var, _bind(namespace, f), values[f.count.index]))
+            else:
+                lines.append("    {0}={1}.parse(cursor)".format(
+                    var, _bind(namespace, f)))
+            lines.append("    pos=cursor.position")
+            values.append(var)
+        flush()
+        lines.append("    cursor.position=pos")
+        lines.append("    return {0}({1})".format(
+            _bind(namespace, self.build), ", ".join(values)))
+        exec("\n".join(lines), namespace)
+        return namespace['parse']
+
+
+class Array(Parser):
+    """
+    count elements as a list.
+
+    count is an int, a Parser that reads the count before the elements,
+    a Ref to a field of the enclosing Record, or None if the count is
+    passed to parse. an array of fixed width
+    elements is unpacked by one struct for all elements.
+    """
+    def __init__(self, count, element):
+        self.count=count
+        self.element=element
+        if isinstance(count, int) and element.fmt is not None:
+            self.fmt=element.fmt*count
+            self.items=element.items*count
+        if element.fmt is not None:
+            self.struct=struct.Struct('<'+element.fmt)
+            self.decode=element.compile_decoder()
+            self.plain=isinstance(element, Unpack) and element.is_plain()
+            self.raw=isinstance(element, Unpack) and element.is_raw()
+
+    def expression(self, var, start, namespace):
+        values=[]
+        for _ in range(self.count):
+            values.append(self.element.expression(var, start, namespace))
+            start+=self.element.items
+        return "[{0}]".format(", ".join(values))
+
+    def parse(self, cursor, count=None):
+        if count is None:
+            count=self.count
+            if isinstance(count, Parser):
+                count=count.parse(cursor)
+        element=self.element
+        if element.fmt is None:
+            return [element.parse(cursor) for _ in range(count)]
+        size=self.struct.size*count
+        if self.plain:
+            return list(struct.unpack('<{0}{1}'.format(count, element.fmt),
+                cursor.read(size)))
+        if self.raw:
+            return list(self.struct.iter_unpack(cursor.read(size)))
+        decode=self.decode
+        return [decode(v) for v in self.struct.iter_unpack(cursor.read(size))]
+
+
+class Prefixed(Parser):
+    """
+    bytes prefixed by their length, decoded by decode if given.
+    """
+    def __init__(self, length, decode=None):
+        self.length=length
+        self.decode=decode
+
+    def parse(self, cursor):
+        data=cursor.read(self.length.parse(cursor)).tobytes()
+        if self.decode:
+            return self.decode(data)
+        return data
+
+
+def _layout_build(record):
+    """
+    function(*values of all fields) that calls the build of the
+    layout.Record record with the values of the fields it takes.
+    """
+    if record.build is None:
+        build=lambda *values: values
+    else:
+        build=record.build
+    names=[f.name for f in record.fields]
+    visible=record.names()
+    if names==visible and (record.build is None
+            or layout._positional(record.build)[:len(names)]==names):
+        return build
+    parameters=["v{0}".format(i) for i in range(len(names))]
+    values=dict(zip(names, parameters))
+    if record.build is None:
+        call="({0},)".format(", ".join(values[n] for n in visible))
+    else:
+        call="build({0})".format(", ".join(
+            "{0}={1}".format(n, values[n]) for n in visible))
+    return eval("lambda {0}: {1}".format(", ".join(parameters), call),
+            {'build': build})
+
+
+def from_layout(record, sizes=None):
+    """
+    return the Record parser of the layout.Record record, so a record
+    declared once for pymeshio.layout also parses from a Cursor.
+    sizes are the index sizes as for layout.compile. Bulk
+    representations are ignored, a List parses into a list.
+    """
+    sizes=sizes or {}
+    fields=[]
+    for f in record.fields:
+        if not isinstance(f, layout.Field):
+            raise ValueError("{0} is not supported".format(
+                type(f).__name__))
+        fields.append(_from_layout_type(f.type, record, sizes))
+    return Record(_layout_build(record), *fields)
+
+
+def _from_layout_type(t, record, sizes):
+    if isinstance(t, layout.Scalar):
+        return Unpack(t.fmt(sizes))
+    if isinstance(t, layout.Vector):
+        return Unpack(t.fmt(sizes), t.cls, star=True)
+    if isinstance(t, layout.Bytes):
+        return text(t.size)
+    if isinstance(t, layout.Record):
+        return from_layout(t, sizes)
+    if isinstance(t, layout.List):
+        element=_from_layout_type(t.element, record, sizes)
+        if isinstance(t.count, str):
+            names=[f.name for f in record.fields]
+            return Array(Ref(names.index(t.count)), element)
+        return Array(_from_layout_type(t.count, record, sizes), element)
+    raise ValueError("{0} is not supported".format(type(t).__name__))
+
+
 if __name__=="__main__":
     @parser_builder
     def sub_parser():
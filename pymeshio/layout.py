@@ -0,0 +1,808 @@
+# coding: utf-8
+"""
+declarative binary record layouts
+
+a layout lists the fields of a record in file order. compile() turns a
+layout and the index sizes of a file into a Codec of generated functions:
+
+decode(reader)
+    read a record from a common.BinaryReader
+encode(writer, value, out)
+    append the record to the bytearray out. texts are encoded by
+    writer.encode_text
+skip(reader)
+    step over a record. only the fields that later fields depend on,
+    such as flags and counts, are unpacked
+
+adjacent fixed width fields are fused into one struct.Struct in all three
+functions, and fixed width fields after a When or Switch are fused into
+each branch. a fixed width record also gets pack, decode_values and a
+numpy dtype for bulk decoding.
+
+>>> import collections
+>>> from pymeshio import common, layout
+>>> Point = collections.namedtuple('Point', 'index pos')
+>>> VECTOR3 = layout.Vector(common.Vector3, ('x', 'y', 'z'))
+>>> POINT = layout.Record(Point,
+...     layout.Field('index', layout.Index('vertex')),
+...     layout.Field('pos', VECTOR3))
+>>> codec = layout.compile(POINT, {'vertex': 'H'})
+>>> codec.size
+14
+"""
+import inspect
+import struct
+from . import common
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+DTYPES = {
+    'b': '<i1', 'B': '<u1', 'h': '<i2', 'H': '<u2',
+    'i': '<i4', 'I': '<u4', 'f': '<f4',
+}
+
+
+class Scalar(object):
+    """
+    one number of struct format code.
+    """
+    __slots__ = ['code']
+    items = 1
+
+    def __init__(self, code):
+        self.code = code
+
+    def fmt(self, sizes):
+        return self.code
+
+    def dtype(self, sizes):
+        return DTYPES[self.fmt(sizes)]
+
+    def decode(self, var, start, context):
+        return '{0}[{1}]'.format(var, start)
+
+    def values(self, src, context):
+        return [src]
+
+
+class Index(Scalar):
+    """
+    index into kind('vertex', 'bone', ...). the format code is given by
+    the sizes passed to compile.
+    """
+    __slots__ = ['kind']
+
+    def __init__(self, kind):
+        self.kind = kind
+
+    def fmt(self, sizes):
+        try:
+            return sizes[self.kind]
+        except KeyError:
+            raise common.ParseException(
+                "no index size of {0}".format(self.kind))
+
+
+class Vector(object):
+    """
+    floats built by cls(*values) and encoded from the attributes names.
+    """
+    __slots__ = ['cls', 'names', 'items']
+
+    def __init__(self, cls, names):
+        self.cls = cls
+        self.names = names
+        self.items = len(names)
+
+    def fmt(self, sizes):
+        return '{0}f'.format(self.items)
+
+    def dtype(self, sizes):
+        return ('<f4', (self.items,))
+
+    def decode(self, var, start, context):
+        return '{0}({1})'.format(context.bind(self.cls), ', '.join(
+            '{0}[{1}]'.format(var, i)
+            for i in range(start, start + self.items)))
+
+    def values(self, src, context):
+        return ['{0}.{1}'.format(src, name) for name in self.names]
+
+
+def truncate(src):
+    """cut bytes at the first null
+    """
+    pos = src.find(b"\x00")
+    if pos == -1:
+        return src
+    return src[:pos]
+
+
+class Bytes(object):
+    """
+    size bytes cut at the first null on decode and padded on encode.
+    """
+    __slots__ = ['size']
+    items = 1
+
+    def __init__(self, size):
+        self.size = size
+
+    def fmt(self, sizes):
+        return '{0}s'.format(self.size)
+
+    def dtype(self, sizes):
+        return 'S{0}'.format(self.size)
+
+    def decode(self, var, start, context):
+        return '{0}({1}[{2}])'.format(context.bind(truncate), var, start)
+
+    def values(self, src, context):
+        return [src]
+
+
+class Text(object):
+    """
+    text prefixed by its byte length. decoded by reader.read_text and
+    encoded by writer.encode_text, which know the text encoding.
+    """
+    __slots__ = ['length']
+
+    def __init__(self, length=Scalar('i')):
+        self.length = length
+
+    def fmt(self, sizes):
+        return None
+
+
+class Bulk(object):
+    """
+    numpy representation of a List of fixed width records.
+
+    :IVariables:
+        cls
+            type of the representation. encoded by dump if the value is one
+        load
+            function(structured array) that returns the representation.
+            used by codecs compiled with arrays=True
+        dump
+            function(value, dtype) that returns the bytes
+    """
+    __slots__ = ['cls', 'load', 'dump']
+
+    def __init__(self, cls, load, dump):
+        self.cls = cls
+        self.load = load
+        self.dump = dump
+
+
+class List(object):
+    """
+    count elements.
+
+    count is a Scalar read just before the elements, or the name of an
+    earlier field of the record.
+    """
+    __slots__ = ['count', 'element', 'bulk']
+
+    def __init__(self, count, element, bulk=None):
+        self.count = count
+        self.element = element
+        self.bulk = bulk
+
+    def fmt(self, sizes):
+        return None
+
+
+class Field(object):
+    """
+    a named field.
+
+    :IVariables:
+        name
+            keyword of the record build function, and the name later
+            When, Switch and List refer to
+        type
+            Scalar, Index, Vector, Bytes, Text, List or Record
+        attr
+            how encode gets the value from the record object. a format
+            string of the object expression such as '{0}.param.mass',
+            or a function(object). default is '{0}.<name>'
+        hidden
+            if True, the value is not passed to build. for counts and
+            type codes that build does not take
+    """
+    __slots__ = ['name', 'type', 'attr', 'hidden']
+
+    def __init__(self, name, type, attr=None, hidden=False):
+        self.name = name
+        self.type = type
+        self.attr = attr
+        self.hidden = hidden
+
+    def source(self, src, context):
+        """python expression of the value in the object expression src"""
+        if self.attr is None:
+            return '{0}.{1}'.format(src, self.name)
+        if callable(self.attr):
+            return '{0}({1})'.format(context.bind(self.attr), src)
+        return self.attr.format(src)
+
+
+class When(object):
+    """
+    fields present if test(values of earlier fields) is true, otherwise
+    the otherwise fields. the argument names of test are field names.
+    """
+    __slots__ = ['test', 'fields', 'otherwise']
+
+    def __init__(self, test, fields, otherwise=()):
+        self.test = test
+        self.fields = list(fields)
+        self.otherwise = list(otherwise)
+
+    def arguments(self):
+        code = self.test.__code__
+        return code.co_varnames[:code.co_argcount]
+
+    def branches(self):
+        return [self.fields, self.otherwise]
+
+
+class Switch(object):
+    """
+    fields selected by the value of the earlier field key.
+    an unknown value is a ParseException or WriteException.
+    """
+    __slots__ = ['key', 'cases']
+
+    def __init__(self, key, cases):
+        self.key = key
+        self.cases = cases
+
+    def branches(self):
+        return list(self.cases.values())
+
+
+class Record(object):
+    """
+    fields built into a value by build(name=value, ...).
+    if build is None the value is the tuple of the fields.
+    """
+    __slots__ = ['build', 'fields']
+
+    def __init__(self, build, *fields):
+        self.build = build
+        self.fields = fields
+
+    def fmt(self, sizes):
+        fmts = []
+        for f in self.fields:
+            if not isinstance(f, Field):
+                return None
+            fmt = f.type.fmt(sizes)
+            if fmt is None:
+                return None
+            fmts.append(fmt)
+        return ''.join(fmts)
+
+    @property
+    def items(self):
+        return sum(f.type.items for f in self.fields)
+
+    def dtype(self, sizes):
+        return [(f.name, f.type.dtype(sizes)) for f in self.fields]
+
+    def names(self):
+        return [f.name for f in self.fields if not f.hidden]
+
+    def decode(self, var, start, context):
+        values = {}
+        for f in self.fields:
+            values[f.name] = f.type.decode(var, start, context)
+            start += f.type.items
+        return _build(self, values, context)
+
+    def values(self, src, context):
+        values = []
+        for f in self.fields:
+            values += f.type.values(f.source(src, context), context)
+        return values
+
+
+def _build(record, values, context, optional=()):
+    """
+    build call of record from the expressions of its field values.
+    optional fields are passed by the dict kw.
+    """
+    names = [n for n in _names(record.fields, True) if n not in optional]
+    if record.build is None:
+        return '({0},)'.format(', '.join(values[n] for n in names))
+    leading = 0
+    for a, b in zip(names, _positional(record.build)):
+        if a != b:
+            break
+        leading += 1
+    arguments = [values[n] for n in names[:leading]]
+    arguments += ['{0}={1}'.format(n, values[n]) for n in names[leading:]]
+    if optional:
+        arguments.append('**kw')
+    return '{0}({1})'.format(context.bind(record.build), ', '.join(arguments))
+
+
+def _positional(build):
+    """
+    leading parameter names of build that can be passed by position.
+    keyword calls are noticeably slower for the small record classes
+    """
+    try:
+        parameters = inspect.signature(build).parameters.values()
+    except (TypeError, ValueError):
+        return []
+    names = []
+    for p in parameters:
+        if p.kind not in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD):
+            break
+        names.append(p.name)
+    return names
+
+
+def _names(fields, visible=False):
+    """field names in order, including those in When and Switch"""
+    names = []
+    for f in fields:
+        if isinstance(f, Field):
+            if not (visible and f.hidden) and f.name not in names:
+                names.append(f.name)
+        else:
+            for branch in f.branches():
+                for n in _names(branch, visible):
+                    if n not in names:
+                        names.append(n)
+    return names
+
+
+def _optional(fields):
+    """names of fields not present in every branch"""
+    optional = set()
+    for f in fields:
+        if isinstance(f, Field):
+            continue
+        branches = [set(_names(b)) for b in f.branches()]
+        always = set.intersection(*branches) if branches else set()
+        optional |= set.union(*branches) - always
+        for branch in f.branches():
+            optional |= _optional(branch)
+    return optional
+
+
+def _referenced(fields):
+    """names of fields that When, Switch or List depend on"""
+    names = set()
+    for f in fields:
+        if isinstance(f, When):
+            names.update(f.arguments())
+        elif isinstance(f, Switch):
+            names.add(f.key)
+        elif isinstance(f.type, List) and isinstance(f.type.count, str):
+            names.add(f.type.count)
+        if not isinstance(f, Field):
+            for branch in f.branches():
+                names |= _referenced(branch)
+    return names
+
+
+class Codec(object):
+    """
+    compiled functions of a record. see the module document.
+
+    :IVariables:
+        decode, encode, skip
+            generated functions
+        structs
+            fused struct.Struct of each fixed run in the order generated
+        struct, size, decode_values, pack, dtype
+            for fixed width records. None otherwise.
+            decode_values(tuple) builds the value from struct.unpack,
+            pack(value) returns the bytes
+        source
+            generated python source
+    """
+    __slots__ = ['decode', 'encode', 'skip', 'structs', 'struct', 'size',
+                 'decode_values', 'pack', 'dtype', 'source']
+
+    def __init__(self):
+        self.structs = []
+        self.struct = None
+        self.size = None
+        self.decode_values = None
+        self.pack = None
+        self.dtype = None
+
+
+class _Context(object):
+    """
+    namespace and options of a compile.
+    """
+
+    def __init__(self, sizes, arrays):
+        self.sizes = sizes
+        self.arrays = arrays
+        self.namespace = {
+            'ParseException': common.ParseException,
+            'WriteException': common.WriteException,
+            'numpy': numpy,
+        }
+        self.codecs = {}
+        self.count = 0
+
+    def bind(self, value):
+        """return the name of value in the generated namespace"""
+        for name, v in self.namespace.items():
+            if v is value and name.startswith('_'):
+                return name
+        return self.add(value)
+
+    def add(self, value, prefix='_'):
+        self.count += 1
+        name = '{0}{1}'.format(prefix, self.count)
+        self.namespace[name] = value
+        return name
+
+    def codec(self, record):
+        """codec of a nested record, compiled into the same namespace"""
+        codec = self.codecs.get(id(record))
+        if codec is None:
+            codec = _compile(record, self)
+            self.codecs[id(record)] = codec
+        return codec
+
+
+class _Count(object):
+    """
+    the count of a List field, unpacked with the fixed fields before it.
+    """
+    __slots__ = ['field', 'type']
+    name = None
+
+    def __init__(self, field):
+        self.field = field
+        self.type = field.type.count
+
+
+def _is_fixed(f, sizes):
+    return isinstance(f, Field) and f.type.fmt(sizes) is not None
+
+
+def _trailing(fields, i, sizes):
+    """the run of fixed fields after fields[i]"""
+    j = i + 1
+    while j < len(fields) and _is_fixed(fields[j], sizes):
+        j += 1
+    return fields[i + 1:j]
+
+
+class _Generator(object):
+    """
+    generates the body of decode, encode or skip of a record.
+    """
+
+    def __init__(self, context, record, kind):
+        self.context = context
+        self.record = record
+        self.kind = kind
+        self.lines = []
+        self.structs = []
+        self.optional = _optional(record.fields)
+        self.referenced = _referenced(record.fields)
+        self.run_count = 0
+
+    def emit(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def fields(self, fields, indent):
+        run = []
+        i = 0
+        while i < len(fields):
+            f = fields[i]
+            if _is_fixed(f, self.context.sizes):
+                run.append(f)
+                i += 1
+                continue
+            if isinstance(f, Field):
+                if isinstance(f.type, List) and not isinstance(
+                        f.type.count, str):
+                    # the count is fused into the run before the elements
+                    run.append(_Count(f))
+                self.flush(run, indent)
+                run = []
+                self.variable(f, indent)
+                i += 1
+                continue
+            trailing = _trailing(fields, i, self.context.sizes)
+            self.flush(run, indent)
+            run = []
+            self.branch(f, trailing, indent)
+            i += 1 + len(trailing)
+        self.flush(run, indent)
+
+    def block(self, fields, indent):
+        """fields of a branch. an empty branch is a pass"""
+        count = len(self.lines)
+        self.fields(fields, indent)
+        if len(self.lines) == count:
+            self.emit(indent, 'pass')
+
+    def local(self, name):
+        return 'x_' + name
+
+    def assign(self, name, expression, indent):
+        self.emit(indent, '{0} = {1}'.format(self.local(name), expression))
+        if name in self.optional and self.kind == 'decode':
+            self.emit(indent, "kw['{0}'] = {1}".format(name, self.local(name)))
+
+    def value(self, name):
+        """expression of the value of the field name in encode"""
+        for f in _fields(self.record.fields):
+            if f.name == name:
+                return f.source('o', self.context)
+        raise KeyError(name)
+
+    def fused(self, run):
+        s = struct.Struct('<' + ''.join(
+            f.type.fmt(self.context.sizes) for f in run))
+        self.structs.append(s)
+        return self.context.add(s, 'S')
+
+    def flush(self, run, indent):
+        if not run:
+            return
+        getattr(self, self.kind + '_run')(run, indent)
+
+    def decode_run(self, run, indent):
+        var = 'v{0}'.format(self.run_count)
+        self.run_count += 1
+        self.emit(indent, '{0} = unpack({1})'.format(var, self.fused(run)))
+        start = 0
+        for f in run:
+            if isinstance(f, _Count):
+                self.emit(indent, 'n = {0}[{1}]'.format(var, start))
+                start += 1
+                continue
+            if self.kind == 'decode':
+                needed = not f.hidden or f.name in self.referenced
+            else:
+                needed = f.name in self.referenced
+            if needed:
+                self.assign(f.name, f.type.decode(
+                    var, start, self.context), indent)
+            start += f.type.items
+
+    def encode_run(self, run, indent):
+        values = []
+        for f in run:
+            if isinstance(f, _Count):
+                values.append('len({0})'.format(
+                    f.field.source('o', self.context)))
+                continue
+            values += f.type.values(f.source('o', self.context), self.context)
+        self.emit(indent, 'out += {0}.pack({1})'.format(
+            self.fused(run), ', '.join(values)))
+
+    def skip_run(self, run, indent):
+        if not any(isinstance(f, _Count) or f.name in self.referenced
+                   for f in run):
+            s = self.fused(run)
+            self.emit(indent, 'reader.skip({0}.size)'.format(s))
+            return
+        self.decode_run(run, indent)
+
+    def count(self, t, indent):
+        """emit n = element count of List t counted by a field"""
+        if isinstance(t.count, str):
+            self.emit(indent, 'n = {0}'.format(self.local(t.count)))
+
+    def variable(self, f, indent):
+        t = f.type
+        context = self.context
+        if self.kind == 'encode':
+            src = f.source('o', context)
+            if isinstance(t, Text):
+                self.emit(indent, 'out += writer.encode_text({0})'.format(src))
+            elif isinstance(t, List):
+                self.encode_list(t, src, indent)
+            else:
+                self.emit(indent, '{0}(writer, {1}, out)'.format(
+                    context.bind(context.codec(t).encode), src))
+            return
+        if isinstance(t, Text):
+            if self.kind == 'decode':
+                self.assign(f.name, 'reader.read_text()', indent)
+            else:
+                self.emit(indent, 'reader.skip(unpack({0})[0])'.format(
+                    context.add(struct.Struct('<' + t.length.code), 'S')))
+        elif isinstance(t, List):
+            self.count(t, indent)
+            getattr(self, self.kind + '_list')(f, t, indent)
+        elif self.kind == 'decode':
+            self.assign(f.name, '{0}(reader)'.format(
+                context.bind(context.codec(t).decode)), indent)
+        else:
+            self.emit(indent, '{0}(reader)'.format(
+                context.bind(context.codec(t).skip)))
+
+    def decode_list(self, f, t, indent):
+        context = self.context
+        fmt = t.element.fmt(context.sizes)
+        if fmt is None:
+            self.assign(f.name, '[{0}(reader) for _ in range(n)]'.format(
+                context.bind(context.codec(t.element).decode)), indent)
+            return
+        s = context.add(struct.Struct('<' + fmt), 'S')
+        if context.arrays and t.bulk and numpy:
+            dtype = context.add(numpy.dtype(t.element.dtype(context.sizes)))
+            self.assign(f.name, '{0}(numpy.frombuffer(reader.read_bytes('
+                        'n * {1}.size), {2}, n))'.format(
+                            context.bind(t.bulk.load), s, dtype), indent)
+            return
+        self.assign(f.name, '[{0} for e in {1}.iter_unpack('
+                    'reader.read_bytes(n * {1}.size))]'.format(
+                        t.element.decode('e', 0, context), s), indent)
+
+    def skip_list(self, f, t, indent):
+        context = self.context
+        fmt = t.element.fmt(context.sizes)
+        if fmt is None:
+            self.emit(indent, 'for _ in range(n):')
+            self.emit(indent + 1, '{0}(reader)'.format(
+                context.bind(context.codec(t.element).skip)))
+        else:
+            self.emit(indent, 'reader.skip(n * {0})'.format(
+                struct.calcsize('<' + fmt)))
+
+    def encode_list(self, t, src, indent):
+        context = self.context
+        self.emit(indent, 'items = {0}'.format(src))
+        fmt = t.element.fmt(context.sizes)
+        if fmt is None:
+            self.emit(indent, 'for e in items:')
+            self.emit(indent + 1, '{0}(writer, e, out)'.format(
+                context.bind(context.codec(t.element).encode)))
+            return
+        if t.bulk and numpy:
+            dtype = context.add(numpy.dtype(t.element.dtype(context.sizes)))
+            self.emit(indent, 'if isinstance(items, {0}):'.format(
+                context.bind(t.bulk.cls)))
+            self.emit(indent + 1, 'out += {0}(items, {1})'.format(
+                context.bind(t.bulk.dump), dtype))
+            self.emit(indent, 'else:')
+            indent += 1
+        s = context.add(struct.Struct('<' + fmt), 'S')
+        self.emit(indent, 'for e in items:')
+        self.emit(indent + 1, 'out += {0}.pack({1})'.format(
+            s, ', '.join(t.element.values('e', context))))
+
+    def branch(self, f, trailing, indent):
+        context = self.context
+        if isinstance(f, When):
+            if self.kind == 'encode':
+                arguments = [self.value(n) for n in f.arguments()]
+            else:
+                arguments = [self.local(n) for n in f.arguments()]
+            self.emit(indent, 'if {0}({1}):'.format(
+                context.bind(f.test), ', '.join(arguments)))
+            self.block(f.fields + trailing, indent + 1)
+            if f.otherwise or trailing:
+                self.emit(indent, 'else:')
+                self.block(f.otherwise + trailing, indent + 1)
+            return
+        if self.kind == 'encode':
+            self.emit(indent, 'key = {0}'.format(self.value(f.key)))
+        else:
+            self.emit(indent, 'key = {0}'.format(self.local(f.key)))
+        for i, (value, fields) in enumerate(f.cases.items()):
+            self.emit(indent, '{0} key == {1!r}:'.format(
+                'if' if i == 0 else 'elif', value))
+            self.block(list(fields) + trailing, indent + 1)
+        self.emit(indent, 'else:')
+        self.emit(indent + 1, 'raise {0}("unknown {1}: {{0}}".format(key))'.format(
+            'WriteException' if self.kind == 'encode' else 'ParseException',
+            f.key.replace('_', ' ')))
+
+
+def _fields(fields):
+    """Field objects in fields, including those in When and Switch"""
+    for f in fields:
+        if isinstance(f, Field):
+            yield f
+        else:
+            for branch in f.branches():
+                for g in _fields(branch):
+                    yield g
+
+
+def _compile(record, context):
+    codec = Codec()
+    sources = []
+    for kind, arguments in (('decode', 'reader'),
+                            ('encode', 'writer, o, out'),
+                            ('skip', 'reader')):
+        generator = _Generator(context, record, kind)
+        if kind == 'decode' and generator.optional:
+            generator.emit(1, 'kw = {}')
+        generator.fields(list(record.fields), 1)
+        name = context.add(None, kind + '_')
+        lines = ['def {0}({1}):'.format(name, arguments)]
+        if kind != 'encode':
+            lines.append('    unpack = reader.unpack_struct')
+        lines += generator.lines
+        if kind == 'decode':
+            values = dict((n, generator.local(n))
+                          for n in _names(record.fields))
+            lines.append('    return ' + _build(
+                record, values, context, generator.optional))
+        source = '\n'.join(lines)
+        exec(source, context.namespace)
+        setattr(codec, kind, context.namespace[name])
+        sources.append(source)
+        if kind == 'decode':
+            codec.structs = generator.structs
+    codec.source = '\n\n'.join(sources)
+    return codec
+
+
+def _compile_fixed(record, context):
+    sizes = context.sizes
+    codec = Codec()
+    s = struct.Struct('<' + record.fmt(sizes))
+    codec.source = 'lambda v: ' + record.decode('v', 0, context)
+    codec.decode_values = eval(codec.source, context.namespace)
+    pack = 'lambda o: {0}.pack({1})'.format(
+        context.add(s, 'S'), ', '.join(record.values('o', context)))
+    codec.pack = eval(pack, context.namespace)
+    codec.source += '\n' + pack
+    codec.struct = s
+    codec.size = s.size
+    codec.structs = [s]
+    decode_values = codec.decode_values
+    pack = codec.pack
+    codec.decode = lambda reader: decode_values(reader.unpack_struct(s))
+    codec.skip = lambda reader: reader.skip(s.size)
+
+    def encode(writer, o, out):
+        out += pack(o)
+    codec.encode = encode
+    if numpy:
+        codec.dtype = numpy.dtype(record.dtype(sizes))
+    return codec
+
+
+_CACHE = {}
+
+
+def compile(record, sizes=None, arrays=False):
+    """
+    return the Codec of record for sizes.
+
+    :Parameters:
+        record
+            Record
+        sizes
+            dict of index kind to struct format code
+        arrays
+            if True, Lists with a Bulk decode into it(requires numpy)
+    """
+    sizes = sizes or {}
+    key = (id(record), tuple(sorted(sizes.items())), arrays)
+    codec = _CACHE.get(key)
+    if codec is None:
+        context = _Context(sizes, arrays)
+        if record.fmt(sizes) is not None:
+            codec = _compile_fixed(record, context)
+        else:
+            codec = _compile(record, context)
+        _CACHE[key] = codec
+    return codec
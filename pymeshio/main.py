@@ -5,7 +5,14 @@
 
 import sys
 import os
-import io
+import json
+import struct
+import argparse
+from . import batch
+from . import common
+from . import diff
+from . import generator
+from . import probe
 from .pmd import reader
 from .pmx import writer
 from . import converter
@@ -17,32 +24,119 @@ def pmd_to_pmx():
         sys.exit()
     pmd=reader.read_from_file(sys.argv[1])
     pmx=converter.pmd_to_pmx(pmd)
-    writer.write(io.open(sys.argv[2], "wb"), pmx)
+    writer.write_to_file(pmx, sys.argv[2])
+
+def pmd_to_pmx_batch(argv=None):
+    """
+    convert pmd files to pmx over a process pool.
+    """
+    parser=argparse.ArgumentParser(
+            description="convert pmd files in directories or globs to pmx")
+    parser.add_argument('inputs', nargs='+',
+            help="pmd files, directories or glob patterns")
+    parser.add_argument('-o', '--output-dir',
+            help="output root. default is beside each input")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+            help="worker processes. default is the cpu count")
+    parser.add_argument('--queue', type=int, default=None,
+            help="max files in flight. default is 4 per worker")
+    parser.add_argument('-f', '--force', action='store_true',
+            help="convert even if the output is up to date")
+    parser.add_argument('-q', '--quiet', action='store_true',
+            help="print the summary only")
+    args=parser.parse_args(argv)
+    jobs=batch.plan(args.inputs, args.output_dir)
+    summary=batch.Summary()
+    for result in batch.run(jobs, args.jobs, args.queue, args.force):
+        summary.add(result)
+        if result.status=='failed':
+            print(result, file=sys.stderr)
+        elif not args.quiet:
+            print(result)
+    print(summary)
+    return 1 if summary.counts['failed'] else 0
 
 def pmd_diff():
     if len(sys.argv)<3:
         print("sage: %s {pmd_file} {pmd_file}" % os.path.basename(sys.argv[0]))
         sys.exit()
-    lhs=reader.read_from_file(sys.argv[1])
-    rhs=reader.read_from_file(sys.argv[2])
-    lhs.diff(rhs)
+    lhs=reader.read_from_file(sys.argv[1], arrays=True)
+    rhs=reader.read_from_file(sys.argv[2], arrays=True)
+    report=diff.diff(lhs, rhs)
+    print(report)
+    return 0 if report.is_identical() else 1
 
 def pmd_validator():
     if len(sys.argv)==1:
         print("sage: %s {input pmd_file}" % os.path.basename(sys.argv[0]))
         sys.exit()
-    pmd=reader.read_from_file(sys.argv[1])
-    print("%s(%s)" % (pmd.name.decode('cp932'), pmd.english_name.decode('cp932')))
-    print("vertices: %d" % len(pmd.vertices))
-    print("indices: %d" % len(pmd.indices))
-    print("materials: %d" % len(pmd.materials))
-    print("bones: %d" % len(pmd.bones))
-    print("ik_list: %d" % len(pmd.ik_list))
-    print("morphs: %d" % len(pmd.morphs))
-    print("morph_indices: %d" % len(pmd.morph_indices))
-    print("bone_group_list: %d" % len(pmd.bone_group_list))
-    print("bone_display_list: %d" % len(pmd.bone_group_list))
-    print("toon_textures: %d" % len(pmd.toon_textures))
-    print("rigidbodies: %d" % len(pmd.rigidbodies))
-    print("joints: %d" % len(pmd.joints))
+    info=probe.probe_file(sys.argv[1])
+    print("%s(%s)" % (info.name, info.english_name or ''))
+    for section, count in info.counts:
+        print("%s: %d" % (section, count))
+
+def stat(argv=None):
+    """
+    print name, version and section counts of pmd, pmx and vmd files.
+    directories are searched recursively.
+    """
+    parser=argparse.ArgumentParser(
+            description="probe pmd, pmx and vmd files without decoding them")
+    parser.add_argument('paths', nargs='+', help="files or directories")
+    parser.add_argument('--json', action='store_true',
+            help="print a json object per line")
+    args=parser.parse_args(argv)
+    errors=0
+    for path in probe.find_files(args.paths):
+        try:
+            info=probe.probe_file(path)
+        except (common.ParseException, EnvironmentError, struct.error) as e:
+            errors+=1
+            print("%s: %s" % (path, getattr(e, 'message', e)), file=sys.stderr)
+            continue
+        if args.json:
+            print(json.dumps(info.to_dict(), ensure_ascii=False))
+        else:
+            print(info)
+    return 1 if errors else 0
 
+def generate(argv=None):
+    """
+    write generated pmx, pmd, vmd, obj or mqo files for benchmarks.
+    """
+    parser=argparse.ArgumentParser(
+            description="write a generated model or motion. "
+            "the format is the extension of the output")
+    parser.add_argument('output', help="file path. "
+            "extension is one of "+", ".join(generator.EXTENSIONS))
+    parser.add_argument('-n', '--vertices', type=int, default=1000,
+            help="vertex count, or keyframe count of vmd")
+    parser.add_argument('--bones', type=int, default=64)
+    parser.add_argument('--morphs', type=int, default=16)
+    parser.add_argument('--materials', type=int, default=4)
+    parser.add_argument('--rigidbodies', type=int, default=0)
+    parser.add_argument('--deform', default=None,
+            help="deform mix of pmx and pmd as bdef1:bdef2:bdef4:sdef "
+            "relative frequencies. e.g. 4:4:1.5:0.5")
+    parser.add_argument('--seed', type=int, default=0)
+    args=parser.parse_args(argv)
+    extension=os.path.splitext(args.output)[1].lower()
+    if extension in ('.pmx', '.pmd'):
+        kw=dict(vertex_count=args.vertices, bone_count=args.bones,
+                morph_count=args.morphs, material_count=args.materials,
+                rigidbody_count=args.rigidbodies, seed=args.seed)
+        if args.deform:
+            kw['deform_mix']=dict(
+                    (i, float(w)) for i, w in enumerate(args.deform.split(':'))
+                    if float(w)>0)
+    elif extension=='.vmd':
+        kw=dict(bone_frame_count=args.vertices, bone_count=args.bones,
+                morph_count=args.morphs, seed=args.seed)
+    elif extension in ('.obj', '.mqo'):
+        kw=dict(vertex_count=args.vertices, material_count=args.materials,
+                seed=args.seed)
+    else:
+        parser.error("unknown extension: %s" % extension)
+    generator.generate_file(args.output, **kw)
+    print("%s: %d bytes" % (args.output, os.path.getsize(args.output)))
+    return 0
@@ -23,6 +23,10 @@ import sys
 import math
 import warnings
 from .. import common
+try:
+    import numpy
+except ImportError:
+    numpy=None
 
 
 """
@@ -233,6 +237,92 @@ class Face(object):
     def getUV(self, i): return self.uv[i] if i<len(self.uv) else common.Vector2(0, 0)
 
 
+class FaceArray(object):
+    """mqo faces of one vertex count in numpy arrays
+
+    Attributes:
+        index_count: 2 or 3 or 4
+        indices: int32 (n, index_count)
+        material_index: int32 (n)
+        uv: float32 (n, index_count, 2). 0 if the face has no UV
+        col: uint8 (n, index_count, 4) rgba. None if no face has COL,
+            0 for a face without it
+    """
+    __slots__=[
+            "index_count",
+            "indices", "material_index", "uv", "col",
+            ]
+    def __init__(self, index_count, count=0, col=False):
+        if not numpy:
+            raise ImportError("mqo.FaceArray requires numpy")
+        self.index_count=index_count
+        self.indices=numpy.zeros((count, index_count), numpy.int32)
+        self.material_index=numpy.zeros(count, numpy.int32)
+        self.uv=numpy.zeros((count, index_count, 2), numpy.float32)
+        self.col=(numpy.zeros((count, index_count, 4), numpy.uint8)
+                if col else None)
+
+    def __len__(self):
+        return len(self.indices)
+
+    @staticmethod
+    def from_faces(index_count, faces):
+        """
+        create FaceArray from mqo.Face list of index_count.
+        """
+        has_col=any(f.col for f in faces)
+        array=FaceArray(index_count, len(faces), has_col)
+        for i, f in enumerate(faces):
+            array.indices[i]=f.indices
+            array.material_index[i]=f.material_index
+            array.uv[i]=[f.getUV(j).to_tuple() for j in range(index_count)]
+            if f.col:
+                array.col[i]=numpy.reshape(f.col, (index_count, 4))
+        return array
+
+    def to_faces(self):
+        """
+        return mqo.Face list copied from the arrays.
+        """
+        faces=[]
+        for i in range(len(self)):
+            face=Face.__new__(Face)
+            face.index_count=self.index_count
+            face.indices=self.indices[i].tolist()
+            face.material_index=int(self.material_index[i])
+            face.uv=[common.Vector2(*uv) for uv in self.uv[i].tolist()]
+            face.col=(self.col[i].ravel().tolist()
+                    if self.col is not None else [])
+            faces.append(face)
+        return faces
+
+
+class ArrayObj(Obj):
+    """mqo object that keeps vertices and faces in numpy arrays
+
+    Attributes:
+        vertices: float32 (n, 3)
+        faces: vertex count(3 or 4) to FaceArray, in file order
+        edges: FaceArray of 2 vertices
+    """
+    __slots__=[]
+
+    def __init__(self, name):
+        if not numpy:
+            raise ImportError("mqo.ArrayObj requires numpy")
+        super(ArrayObj, self).__init__(name)
+        self.vertices=numpy.zeros((0, 3), numpy.float32)
+        self.faces={}
+        self.edges=FaceArray(2)
+
+    def face_count(self):
+        return sum(len(f) for f in self.faces.values())
+
+    def __str__(self):
+        return "<ArrayObject %s, %d vertices, %d faces>" % (
+                self.name, len(self.vertices), self.face_count())
+
+
 class Model(object):
     def __init__(self):
         self.has_mikoto=False
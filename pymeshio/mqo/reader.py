@@ -3,8 +3,47 @@
 mqo reader
 """
 import io
+import warnings
+from logging import getLogger
 from .. import mqo
 from .. import common
+from .. import profiling
+try:
+    import numpy
+except ImportError:
+    numpy=None
+
+logger=getLogger(__name__)
+
+# keys and parentheses of a face line become separators of its numbers
+NUMBER_TABLE=bytes.maketrans(b'()ABCDEFGHIJKLMNOPQRSTUVWXYZ', b' '*28)
+# deleted from a face line, the rest is the same for faces of the same keys
+# and number counts
+SHAPE_DELETE=b'0123456789.+-'
+
+
+def face_columns(line):
+    """
+    return the column of the first number of each key in the numbers of
+    a face line, and the number count of the line. column 0 is the vertex
+    count.
+    """
+    columns={}
+    column=1
+    offset=line.find(b' ')+1
+    while True:
+        leftParenthesis=line.find(b"(", offset)
+        if leftParenthesis==-1:
+            break
+        rightParenthesis=line.find(b")", leftParenthesis+1)
+        if rightParenthesis==-1:
+            raise ValueError("assert")
+        key=line[offset:leftParenthesis].strip()
+        params=line[leftParenthesis+1:rightParenthesis].split()
+        columns[key]=(column, len(params))
+        column+=len(params)
+        offset=rightParenthesis+1
+    return columns, column
 
 
 class Reader(common.TextReader):
@@ -13,15 +52,20 @@ class Reader(common.TextReader):
     __slots__=[
             "has_mikoto",
             "materials", "objects",
+            "profile", "arrays",
             ]
-    def __init__(self, ios):
+    def __init__(self, ios, profile=profiling.NULL, arrays=False):
         super(Reader, self).__init__(ios)
+        self.profile=profile
+        self.arrays=arrays
 
     def __str__(self):
         return "<MQO %d lines, %d materials, %d objects>" % (
                 self.lines, len(self.materials), len(self.objects))
 
     def readObject(self, name):
+        if self.arrays:
+            return self.readArrayObject(name)
         obj=mqo.Obj(name)
         while(True):
             line=self.getline()
@@ -38,24 +82,204 @@ class Reader(common.TextReader):
                 tokens=line.split()
                 key=tokens[0]
                 if key==b"vertex":
-                    if not self.readVertex(obj):
-                        return False
+                    with self.profile.section('vertices', self.ios) as scope:
+                        if not self.readVertex(obj):
+                            return False
+                        scope.count=len(obj.vertices)
+                elif key==b"face":
+                    with self.profile.section('faces', self.ios) as scope:
+                        if not self.readFace(obj):
+                            return False
+                        scope.count=len(obj.faces)
+                elif key==b"depth":
+                    obj.depth=int(tokens[1])
+                elif key==b"visible":
+                    obj.visible=int(tokens[1])
+                else:
+                    logger.debug("%s#readObject unknown key: %s", name, key)
+
+        self.printError("readObject", "invalid eof")
+        return False
+
+    def readArrayObject(self, name):
+        obj=mqo.ArrayObj(name)
+        while(True):
+            line=self.getline()
+            if line==None:
+                # eof
+                break;
+            if line==b"":
+                # empty line
+                continue
+
+            if line==b"}":
+                return obj
+            else:
+                tokens=line.split()
+                key=tokens[0]
+                if key==b"vertex":
+                    with self.profile.section('vertices', self.ios) as scope:
+                        if not self.readVertexArray(obj):
+                            return False
+                        scope.count=len(obj.vertices)
                 elif key==b"face":
-                    if not self.readFace(obj):
-                        return False
+                    with self.profile.section('faces', self.ios) as scope:
+                        if not self.readFaceArray(obj):
+                            return False
+                        scope.count=obj.face_count()
                 elif key==b"depth":
                     obj.depth=int(tokens[1])
                 elif key==b"visible":
                     obj.visible=int(tokens[1])
                 else:
-                    print(
-                            "%s#readObject" % name,
-                            "unknown key: %s" % key
-                            )
+                    logger.debug("%s#readObject unknown key: %s", name, key)
 
         self.printError("readObject", "invalid eof")
         return False
 
+    def readBlock(self):
+        """
+        read the non empty lines up to the closing brace of a chunk.
+        return None on eof.
+        """
+        readline=self.ios.readline
+        lines=[]
+        while True:
+            line=readline()
+            if not line:
+                self.eof=True
+                self.lines+=len(lines)
+                return None
+            line=line.strip()
+            if line==b"}":
+                self.lines+=len(lines)+1
+                return lines
+            if line:
+                lines.append(line)
+
+    def readVertexArray(self, obj):
+        """
+        read a vertex chunk into obj.vertices at once.
+        """
+        lines=self.readBlock()
+        if lines is None:
+            self.printError("readVertex", "invalid eof")
+            return False
+        values=self.parseNumbers(b' '.join(lines), 3*len(lines))
+        if values is None:
+            self.printError("readVertex", "invalid vertex")
+            return False
+        obj.vertices=values.astype(numpy.float32).reshape(-1, 3)
+        return True
+
+    def parseNumbers(self, text, count):
+        """
+        parse count numbers separated by white spaces into float64 array.
+        return None if text has other than count numbers.
+        """
+        with warnings.catch_warnings():
+            # fromstring warns and stops at a non number
+            warnings.simplefilter('ignore')
+            values=numpy.fromstring(text, numpy.float64, sep=' ')
+        if len(values)!=count:
+            return None
+        return values
+
+    def readFaceArray(self, obj):
+        """
+        read a face chunk into obj.faces and obj.edges by vertex count.
+
+        faces of the same keys and number counts are parsed together by
+        one numpy.fromstring.
+        """
+        lines=self.readBlock()
+        if lines is None:
+            self.printError("readFace", "invalid eof")
+            return False
+        if not lines:
+            return True
+        shapes=numpy.array(
+                b'\n'.join(lines).translate(None, SHAPE_DELETE).split(b'\n'))
+        shapes, inverse=numpy.unique(shapes, return_inverse=True)
+        parts={}
+        for i in range(len(shapes)):
+            if len(shapes)==1:
+                positions=numpy.arange(len(lines))
+                group=lines
+            else:
+                positions=numpy.nonzero(inverse.ravel()==i)[0]
+                group=[lines[j] for j in positions]
+            faces=self.parseFaces(group)
+            if faces is not None:
+                parts.setdefault(faces.index_count, []).append(
+                        (positions, faces))
+
+        for index_count, faces in sorted(parts.items()):
+            if len(faces)==1:
+                faces=faces[0][1]
+            else:
+                faces=_concatenate(index_count, faces)
+            if index_count==2:
+                obj.edges=faces
+            else:
+                obj.faces[index_count]=faces
+        return True
+
+    def parseFaces(self, lines):
+        """
+        parse face lines of the same shape into a mqo.FaceArray.
+        return None if the faces are invalid.
+        """
+        first=lines[0]
+        try:
+            index_count=int(first.split(b' ', 1)[0])
+            columns, width=face_columns(first)
+        except ValueError as ex:
+            self.printError("readFace", ex)
+            return None
+        if index_count<2 or index_count>4:
+            self.printError("readFace",
+                    "invalid vertex count: %d x %d" % (index_count, len(lines)))
+            return None
+        expected={b"V": index_count, b"M": 1,
+                b"UV": 2*index_count, b"COL": index_count}
+        for key, (column, count) in columns.items():
+            if key not in expected:
+                logger.debug("readFace unknown key: %s", key)
+            elif count!=expected[key]:
+                self.printError("readFace", "invalid %s: %s" % (key, first))
+                return None
+        if b"V" not in columns:
+            self.printError("readFace", "no V: %s" % first)
+            return None
+        values=self.parseNumbers(
+                b' '.join(lines).translate(NUMBER_TABLE), len(lines)*width)
+        if values is None:
+            self.printError("readFace", "invalid face: %s" % first)
+            return None
+        values=values.reshape(len(lines), width)
+
+        faces=mqo.FaceArray(index_count)
+        column=columns[b"V"][0]
+        faces.indices=values[:, column:column+index_count].astype(numpy.int32)
+        if b"M" in columns:
+            faces.material_index=values[:, columns[b"M"][0]].astype(
+                    numpy.int32)
+        else:
+            faces.material_index=numpy.zeros(len(lines), numpy.int32)
+        if b"UV" in columns:
+            column=columns[b"UV"][0]
+            faces.uv=values[:, column:column+2*index_count].astype(
+                    numpy.float32).reshape(-1, index_count, 2)
+        else:
+            faces.uv=numpy.zeros((len(lines), index_count, 2), numpy.float32)
+        if b"COL" in columns:
+            # rgba bytes of a little endian uint32
+            column=columns[b"COL"][0]
+            faces.col=values[:, column:column+index_count].astype(
+                    '<u4').view(numpy.uint8).reshape(-1, index_count, 4)
+        return faces
+
     def readFace(self, obj):
         while(True):
             line=self.getline()
@@ -150,14 +374,16 @@ class Reader(common.TextReader):
     def read(self):
         model=mqo.Model()
 
-        line=self.getline()
-        if line!=b"Metasequoia Document":
-            print("invalid signature")
-            return False
+        with self.profile.section('header', self.ios) as scope:
+            line=self.getline()
+            if line!=b"Metasequoia Document":
+                logger.error("invalid signature")
+                return False
 
-        line=self.getline()
-        if line!=b"Format Text Ver 1.0":
-            print("unknown version: %s" % line)
+            line=self.getline()
+            if line!=b"Format Text Ver 1.0":
+                logger.warning("unknown version: %s", line)
+            scope.count=1
 
         while True:
             line=self.getline()
@@ -174,13 +400,17 @@ class Reader(common.TextReader):
                 # success !
                 return model
             elif key==b"Scene":
-                if not self.readChunk():
-                    return
+                with self.profile.section('scene', self.ios) as scope:
+                    if not self.readChunk():
+                        return
+                    scope.count=1
             elif key==b"Material":
-                materials=self.readMaterial()
-                if not materials:
-                    return
-                model.materials=materials
+                with self.profile.section('materials', self.ios) as scope:
+                    materials=self.readMaterial()
+                    if not materials:
+                        return
+                    model.materials=materials
+                    scope.count=len(materials)
             elif key==b"Object":
                 firstQuote=line.find(b'"')
                 secondQuote=line.find(b'"', firstQuote+1)
@@ -189,40 +419,83 @@ class Reader(common.TextReader):
                     return
                 model.objects.append(obj)
             elif key==b"BackImage":
-                if not self.readChunk():
-                    return
+                with self.profile.section('chunks', self.ios) as scope:
+                    if not self.readChunk():
+                        return
+                    scope.count=1
             elif key==b"IncludeXml":
                 firstQuote=line.find(b'"')
                 secondQuote=line.find(b'"', firstQuote+1)
-                print("IncludeXml", line[firstQuote+1:secondQuote])
+                logger.info("IncludeXml %s", line[firstQuote+1:secondQuote])
             else:
-                print("unknown key: %s" % key)
-                if not self.readChunk():
-                    return
+                logger.debug("unknown key: %s", key)
+                with self.profile.section('chunks', self.ios) as scope:
+                    if not self.readChunk():
+                        return
+                    scope.count=1
         # error not reach here
         raise ParseException("invalid eof")
 
 
-def read_from_file(path):
+def _concatenate(index_count, parts):
+    """
+    join (positions, mqo.FaceArray) parts of index_count into one
+    mqo.FaceArray in the order of the positions.
+    """
+    positions=numpy.concatenate([p for p, _ in parts])
+    order=numpy.argsort(positions, kind='stable')
+    faces=mqo.FaceArray(index_count)
+    faces.indices=numpy.concatenate([f.indices for _, f in parts])[order]
+    faces.material_index=numpy.concatenate(
+            [f.material_index for _, f in parts])[order]
+    faces.uv=numpy.concatenate([f.uv for _, f in parts])[order]
+    if any(f.col is not None for _, f in parts):
+        faces.col=numpy.concatenate([
+            f.col if f.col is not None
+            else numpy.zeros((len(f), index_count, 4), numpy.uint8)
+            for _, f in parts])[order]
+    return faces
+
+
+def read_from_file(path, profile=None, arrays=False):
     """
     read from file path, then return the pymeshio.mqo.Model.
 
     :Parameters:
       path
         file path
+      profile
+        pymeshio.profiling.Profile to record the sections in
+      arrays
+        if True, objects are mqo.ArrayObj(requires numpy)
     """
     with io.open(path, 'rb') as ios:
-        return read(ios)
+        return read(ios, profile, arrays)
 
 
-def read(ios):
+def read(ios, profile=None, arrays=False):
     """
     read from ios, then return the pymeshio.mqo.Model.
 
     :Parameters:
       ios
         input stream (in io.IOBase)
+      profile
+        pymeshio.profiling.Profile to record the sections in.
+        vertices and faces accumulate over the objects
+      arrays
+        if True, objects are mqo.ArrayObj(requires numpy). each vertex
+        chunk is parsed into one float32 array, and faces into
+        mqo.FaceArray by vertex count
     """
     assert(isinstance(ios, io.IOBase))
-    return Reader(ios).read()
+    if arrays and not numpy:
+        raise common.ParseException("arrays=True requires numpy")
+    if profile is None:
+        profile=profiling.NULL
+    profile.begin('mqo')
+    try:
+        return Reader(ios, profile, arrays).read()
+    finally:
+        profile.end()
 
@@ -1,4 +1,9 @@
 # coding: utf-8
+from .. import common
+try:
+    import numpy
+except ImportError:
+    numpy=None
 
 
 class FaceVertex:
@@ -107,8 +112,87 @@ class Model(object):
         return material
 
     def get_vertex(self, ref):
+        if isinstance(ref, FaceVertex):
+            # reader indices are 0 origin
+            return (self.vertices[ref.v],
+                    None if ref.vt is None else self.uv[ref.vt],
+                    None if ref.vn is None else self.normals[ref.vn]
+                    )
         return (self.vertices[ref[0]-1], 
                 ref[1] and self.uv[ref[1]-1],
                 ref[2] and self.normals[ref[2]-1]
                 )
 
+
+
+class ArrayModel(Model):
+    """
+    obj model that keeps vertices and faces in numpy arrays.
+
+    :IVariables:
+        vertices
+            float32 (n, 3)
+        uv
+            float32 (n, 2)
+        normals
+            float32 (n, 3)
+        corners
+            int32 (m, 3) of v, vt and vn of each face corner. 0 origin,
+            -1 if the corner has no vt or vn
+        face_offsets
+            int64 (faces + 1). the corners of face i are
+            corners[face_offsets[i]:face_offsets[i+1]]
+        material_spans
+            int64 (s, 3) of material index, first face and face end in
+            file order. materials keep no faces
+    """
+    __slots__=[
+            "corners",
+            "face_offsets",
+            "material_spans",
+            ]
+    def __init__(self):
+        if not numpy:
+            raise ImportError("obj.ArrayModel requires numpy")
+        super(ArrayModel, self).__init__()
+        self.vertices=numpy.zeros((0, 3), numpy.float32)
+        self.uv=numpy.zeros((0, 2), numpy.float32)
+        self.normals=numpy.zeros((0, 3), numpy.float32)
+        self.corners=numpy.zeros((0, 3), numpy.int32)
+        self.face_offsets=numpy.zeros(1, numpy.int64)
+        self.material_spans=numpy.zeros((0, 3), numpy.int64)
+
+    def face_count(self):
+        return len(self.face_offsets)-1
+
+    def to_model(self):
+        """
+        return obj.Model copied from the arrays.
+        """
+        model=Model()
+        model.path=self.path
+        model.comment=self.comment
+        model.mtl=self.mtl
+        model.vertices=[common.Vector3(*v) for v in self.vertices.tolist()]
+        model.uv=[common.Vector2(*v) for v in self.uv.tolist()]
+        model.normals=[common.Vector3(*v) for v in self.normals.tolist()]
+        for src in self.materials:
+            material=model.get_or_create_material(src.name)
+            for key in Material.__slots__:
+                if key!="faces":
+                    setattr(material, key, getattr(src, key))
+        corners=self.corners.tolist()
+        offsets=self.face_offsets.tolist()
+        for index, start, end in self.material_spans.tolist():
+            faces=model.materials[index].faces
+            for i in range(start, end):
+                face=Face()
+                for v, vt, vn in corners[offsets[i]:offsets[i+1]]:
+                    ref=FaceVertex(v=v)
+                    if vt>=0:
+                        ref.vt=vt
+                    if vn>=0:
+                        ref.vn=vn
+                    face.vertex_references.append(ref)
+                faces.append(face)
+        return model
@@ -10,22 +10,52 @@ import os
 import sys
 from .. import obj
 from .. import common
+from .. import profiling
+
+
+# profile section of each line key. other keys are 'other'
+SECTION_NAMES = {
+    b"v": 'vertices',
+    b"vt": 'uvs',
+    b"vn": 'normals',
+    b"f": 'faces',
+}
 
 
 class Reader(common.TextReader):
     """obj reader
     """
     __slots__ = [
+        "profile", "scope",
     ]
 
-    def __init__(self, ios):
+    def __init__(self, ios, profile=profiling.NULL):
         super(Reader, self).__init__(ios)
+        self.profile = profile
 
     def read(self):
+        # a run of lines of the same section is measured at once
+        self.scope = self.profile.section('other', self.ios)
+        self.scope.__enter__()
+        try:
+            return self._read()
+        finally:
+            self.scope.__exit__(None, None, None)
+
+    def switch_section(self, name):
+        """
+        end the profile section of the previous lines, then begin name.
+        """
+        self.scope.__exit__(None, None, None)
+        self.scope = self.profile.section(name, self.ios)
+        self.scope.__enter__()
+
+    def _read(self):
         model = obj.Model()
         material = model.get_or_create_material(b"default")
 
         order = []
+        section = 'other'
 
         while True:
             line = self.getline()
@@ -42,6 +72,11 @@ class Reader(common.TextReader):
                 continue
 
             token = line.split()
+            name = SECTION_NAMES.get(token[0], 'other')
+            if name != section:
+                section = name
+                self.switch_section(section)
+            self.scope.count += 1
             if token[0] == b"v":
                 if len(model.vertices) == 0:
                     order.append(b"v")
@@ -78,7 +113,7 @@ class Reader(common.TextReader):
             elif token[0] == b"s":
                 material.s = token[1]
             else:
-                print(b"unknown key: " + line)
+                logger.debug("unknown key: %s", line)
 
         if len(model.materials[0].faces) == 0:
             del model.materials[0]
@@ -104,16 +139,18 @@ class Reader(common.TextReader):
         return face
 
 
-def read_from_file(path):
+def read_from_file(path, profile=None):
     """
     read from file path, then return the pymeshio.mqo.Model.
 
     :Parameters:
       path
         file path
+      profile
+        pymeshio.profiling.Profile to record the sections in
     """
     with io.open(path, 'rb') as ios:
-        model = read(ios)
+        model = read(ios, profile)
         if model:
             model.path = path
             if model.mtl:
@@ -125,16 +162,26 @@ def read_from_file(path):
             return model
 
 
-def read(ios):
+def read(ios, profile=None):
     """
     read from ios, then return the pymeshio.mqo.Model.
 
     :Parameters:
       ios
         input stream (in io.IOBase)
+      profile
+        pymeshio.profiling.Profile to record the sections in. each run
+        of v, vt, vn or f lines is measured as vertices, uvs, normals
+        or faces, and counts the lines. other lines are 'other'
     """
     assert(isinstance(ios, io.IOBase))
-    return Reader(ios).read()
+    if profile is None:
+        profile = profiling.NULL
+    profile.begin('obj')
+    try:
+        return Reader(ios, profile).read()
+    finally:
+        profile.end()
 
 
 class MaterialReader(common.TextReader):
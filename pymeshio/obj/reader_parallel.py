@@ -0,0 +1,339 @@
+# coding: utf-8
+"""
+chunk parallel obj reader
+
+the file is memory mapped and split into line aligned chunks. each chunk
+is parsed in a worker process: v, vt, vn and f lines are collected by
+regular expressions and converted by numpy.fromstring, faces of the same
+shape at once. the chunk results are stitched into one obj.ArrayModel.
+face indices of obj are absolute, so they need no rebasing, and each
+chunk continues the material of the previous one until its first usemtl.
+relative(negative) face indices would depend on the lines before the
+chunk and raise common.ParseException.
+
+>>> import pymeshio.obj.reader_parallel
+>>> m = pymeshio.obj.reader_parallel.read_from_file('scan.obj', workers=8)
+>>> m.face_count()
+"""
+import concurrent.futures
+import io
+import mmap
+import os
+import re
+import warnings
+from .. import common
+from .. import obj
+from .. import profiling
+from . import reader
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+CHUNK_SIZE = 32 * 1024 * 1024
+"""default chunk bytes. files up to one chunk are read in process"""
+
+# lines are matched after a newline, which re finds by a fast literal
+# search. a chunk is parsed with a newline prepended
+VERTEX = re.compile(rb'\nv[ \t]+([^\r\n]*)')
+UV = re.compile(rb'\nvt[ \t]+([^\r\n]*)')
+NORMAL = re.compile(rb'\nvn[ \t]+([^\r\n]*)')
+FACE = re.compile(rb'\nf[ \t]+([^\r\n]*)')
+USEMTL = re.compile(rb'\nusemtl[ \t]+(\S+)')
+MTLLIB = re.compile(rb'\nmtllib[ \t]+(\S+)')
+COMMENT = re.compile(rb'\n#([^\r\n]*)')
+INDENT = re.compile(rb'\n[ \t]+')
+
+# slashes of face corners become separators of the indices
+SLASH_TABLE = bytes.maketrans(b'/', b' ')
+
+
+class Chunk(object):
+    """
+    parsed lines of a chunk.
+
+    :IVariables:
+        vertices, uv, normals
+            float32 arrays as obj.ArrayModel
+        corners
+            int32 (m, 3) as obj.ArrayModel
+        face_sizes
+            int32 corner count of each face
+        spans
+            (usemtl name, face count) list. the name of the first span is
+            None, the material of the previous chunk
+        mtl
+            mtllib name or None
+        comment
+            first non empty comment or b''
+    """
+    __slots__ = ['vertices', 'uv', 'normals', 'corners', 'face_sizes',
+                 'spans', 'mtl', 'comment']
+
+
+def _numbers(text, dtype):
+    with warnings.catch_warnings():
+        # fromstring warns and stops at a non number
+        warnings.simplefilter('ignore')
+        return numpy.fromstring(text, dtype, sep=' ')
+
+
+def _rows(payloads, columns):
+    """
+    parse lines of numbers into float32 (n, columns). lines of more
+    numbers(v with w or colors) are cut, and of less are padded by 0.
+    """
+    count = len(payloads)
+    values = _numbers(b' '.join(payloads), numpy.float64)
+    if len(values) == count * columns:
+        return values.reshape(count, columns).astype(numpy.float32)
+    rows = numpy.zeros((count, columns), numpy.float32)
+    try:
+        for i, payload in enumerate(payloads):
+            numbers = payload.split()[:columns]
+            rows[i, :len(numbers)] = [float(n) for n in numbers]
+    except ValueError as e:
+        raise common.ParseException(str(e))
+    return rows
+
+
+def _faces(payloads):
+    """
+    parse f lines into corners and face_sizes. lines of the same shape,
+    the corner count and v, v/vt, v//vn or v/vt/vn, are parsed at once.
+    """
+    if not payloads:
+        return (numpy.zeros((0, 3), numpy.int32),
+                numpy.zeros(0, numpy.int32))
+    # v//vn as v/0/vn, vt 0 becomes -1
+    text = b'\n'.join(payloads).replace(b'//', b'/0/')
+    if b'-' in text:
+        raise common.ParseException("relative face index is not supported")
+    lines = text.split(b'\n')
+    shapes = numpy.array(text.translate(None, b'0123456789').split(b'\n'))
+    shapes, inverse = numpy.unique(shapes, return_inverse=True)
+    inverse = inverse.ravel()
+
+    groups = []
+    for i in range(len(shapes)):
+        # lines of a shape differ only in digits
+        line = lines[numpy.nonzero(inverse == i)[0][0]]
+        corners = set(c.translate(None, b'0123456789') for c in line.split())
+        if len(corners) != 1:
+            raise common.ParseException("invalid face: {0}".format(line))
+        corners = line.split()
+        fields = corners[0].count(b'/') + 1
+        if len(shapes) == 1:
+            positions = None
+            group = lines
+        else:
+            positions = numpy.nonzero(inverse == i)[0]
+            group = [lines[j] for j in positions]
+        values = _numbers(b' '.join(group).translate(SLASH_TABLE),
+                          numpy.int64)
+        if len(values) != len(group) * len(corners) * fields or fields > 3:
+            raise common.ParseException("invalid face: {0}".format(group[0]))
+        references = numpy.full((len(values) // fields, 3), -1, numpy.int32)
+        references[:, :fields] = values.reshape(-1, fields) - 1
+        groups.append((positions, len(corners), references))
+
+    if len(groups) == 1:
+        _, size, references = groups[0]
+        return references, numpy.full(len(lines), size, numpy.int32)
+    # back to file order
+    sizes = numpy.zeros(len(lines), numpy.int32)
+    for positions, size, _ in groups:
+        sizes[positions] = size
+    starts = numpy.zeros(len(lines), numpy.int64)
+    numpy.cumsum(sizes[:-1], out=starts[1:])
+    corners = numpy.zeros((int(sizes.sum()), 3), numpy.int32)
+    for positions, size, references in groups:
+        index = starts[positions][:, None] + numpy.arange(size)
+        corners[index.ravel()] = references
+    return corners, sizes
+
+
+def parse_chunk(data):
+    """
+    parse data of whole lines, then return Chunk.
+    """
+    data = b'\n' + data
+    if b'\n ' in data or b'\n\t' in data:
+        data = INDENT.sub(b'\n', data)
+    chunk = Chunk()
+    chunk.vertices = _rows(VERTEX.findall(data), 3)
+    chunk.uv = _rows(UV.findall(data), 2)
+    chunk.normals = _rows(NORMAL.findall(data), 3)
+
+    # faces between usemtl lines
+    payloads = []
+    chunk.spans = []
+    name = None
+    position = 0
+    for m in USEMTL.finditer(data):
+        faces = FACE.findall(data, position, m.start() + 1)
+        chunk.spans.append((name, len(faces)))
+        payloads += faces
+        name = m.group(1)
+        position = m.end()
+    faces = FACE.findall(data, position)
+    chunk.spans.append((name, len(faces)))
+    payloads += faces
+    chunk.corners, chunk.face_sizes = _faces(payloads)
+
+    m = MTLLIB.search(data)
+    chunk.mtl = m.group(1) if m else None
+    chunk.comment = b''
+    for m in COMMENT.finditer(data):
+        comment = m.group(1).strip()
+        if comment:
+            chunk.comment = comment
+            break
+    return chunk
+
+
+def _parse_file_chunk(path, start, end):
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return parse_chunk(data[start:end])
+
+
+def split(data, chunk_size):
+    """
+    return line aligned (start, end) list of about chunk_size bytes
+    that covers data.
+    """
+    ranges = []
+    start = 0
+    size = len(data)
+    while start < size:
+        end = data.find(b'\n', min(start + chunk_size, size) - 1)
+        end = size if end == -1 else end + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def stitch(chunks):
+    """
+    join Chunk list in file order into obj.ArrayModel.
+    """
+    model = obj.ArrayModel()
+    if chunks:
+        model.vertices = numpy.concatenate([c.vertices for c in chunks])
+        model.uv = numpy.concatenate([c.uv for c in chunks])
+        model.normals = numpy.concatenate([c.normals for c in chunks])
+        model.corners = numpy.concatenate([c.corners for c in chunks])
+        sizes = numpy.concatenate([c.face_sizes for c in chunks])
+        model.face_offsets = numpy.zeros(len(sizes) + 1, numpy.int64)
+        numpy.cumsum(sizes, out=model.face_offsets[1:])
+    model.comment = next((c.comment for c in chunks if c.comment), b'')
+    model.mtl = next((c.mtl for c in chunks if c.mtl), None)
+
+    material = model.get_or_create_material(b"default")
+    spans = []
+    face = 0
+    for c in chunks:
+        for name, count in c.spans:
+            if name is not None:
+                material = model.get_or_create_material(name)
+            if not count:
+                continue
+            index = model.materials.index(material)
+            if spans and spans[-1][0] == index and spans[-1][2] == face:
+                spans[-1][2] += count
+            else:
+                spans.append([index, face, face + count])
+            face += count
+    if not any(index == 0 for index, _, _ in spans):
+        del model.materials[0]
+        for span in spans:
+            span[0] -= 1
+    model.material_spans = numpy.array(spans, numpy.int64).reshape(-1, 3)
+    return model
+
+
+def read_from_file(path, workers=None, chunk_size=CHUNK_SIZE, profile=None):
+    """
+    read from file path, then return the pymeshio.obj.ArrayModel.
+
+    :Parameters:
+      path
+        file path
+      workers
+        worker processes. default is os.cpu_count(). 1 parses in this
+        process
+      chunk_size
+        bytes of a chunk
+      profile
+        pymeshio.profiling.Profile to record the chunks and stitch
+        sections in
+    """
+    if not numpy:
+        raise common.ParseException("obj.reader_parallel requires numpy")
+    if profile is None:
+        profile = profiling.NULL
+    profile.begin('obj')
+    try:
+        with profile.section('chunks') as scope:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    ranges = []
+                else:
+                    with mmap.mmap(f.fileno(), 0,
+                                   access=mmap.ACCESS_READ) as data:
+                        ranges = split(data, chunk_size)
+            chunks = _parse_ranges(path, ranges, workers)
+            scope.count = len(chunks)
+        with profile.section('stitch') as scope:
+            model = stitch(chunks)
+            scope.count = model.face_count()
+    finally:
+        profile.end()
+    model.path = path
+    if model.mtl:
+        reader.material_from_file(os.path.join(
+            os.path.dirname(path), model.mtl.decode("utf-8")), model)
+    return model
+
+
+def _parse_ranges(path, ranges, workers):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(ranges) <= 1:
+        return [_parse_file_chunk(path, start, end) for start, end in ranges]
+    with concurrent.futures.ProcessPoolExecutor(
+            min(workers, len(ranges))) as executor:
+        return list(executor.map(
+            _parse_file_chunk, *zip(*[(path, start, end)
+                                      for start, end in ranges])))
+
+
+def read(ios, profile=None):
+    """
+    read from ios in this process, then return the pymeshio.obj.ArrayModel.
+
+    :Parameters:
+      ios
+        input stream (in io.IOBase)
+      profile
+        pymeshio.profiling.Profile to record the chunks and stitch
+        sections in
+    """
+    assert(isinstance(ios, io.IOBase))
+    if not numpy:
+        raise common.ParseException("obj.reader_parallel requires numpy")
+    if profile is None:
+        profile = profiling.NULL
+    profile.begin('obj')
+    try:
+        with profile.section('chunks', ios) as scope:
+            data = ios.read()
+            chunks = [parse_chunk(data)] if data else []
+            scope.count = len(chunks)
+        with profile.section('stitch') as scope:
+            model = stitch(chunks)
+            scope.count = model.face_count()
+        return model
+    finally:
+        profile.end()
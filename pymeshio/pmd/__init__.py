@@ -22,6 +22,30 @@ import sys
 import struct
 import warnings
 from .. import common
+try:
+    import numpy
+except ImportError:
+    numpy=None
+
+
+if numpy:
+    # 38 bytes vertex record
+    VERTEX_DTYPE=numpy.dtype([
+        ('pos', '<f4', 3),
+        ('normal', '<f4', 3),
+        ('uv', '<f4', 2),
+        ('bone0', '<u2'),
+        ('bone1', '<u2'),
+        ('weight0', 'u1'),
+        ('edge_flag', 'u1'),
+        ])
+    assert(VERTEX_DTYPE.itemsize==38)
+    # 16 bytes morph record
+    MORPH_OFFSET_DTYPE=numpy.dtype([
+        ('index', '<u4'),
+        ('pos', '<f4', 3),
+        ])
+    assert(MORPH_OFFSET_DTYPE.itemsize==16)
 
 
 class Vertex(common.Diff):
@@ -419,6 +443,15 @@ class IK(common.Diff):
 
 
 class Morph(common.Diff):
+    """
+    pmd morph(skin)
+
+    :IVariables:
+        indices
+            vertex index list, or uint32 array in pmd.ArrayModel
+        pos_list
+            Vector3 list, or float32 (n, 3) array in pmd.ArrayModel
+    """
     __slots__=['name', 'type', 'indices', 'pos_list', 'english_name',
             'vertex_count']
     def __init__(self, name):
@@ -441,8 +474,8 @@ class Morph(common.Diff):
         return (
                 self.name==rhs.name
                 and self.type==rhs.type
-                and self.indices==rhs.indices
-                and self.pos_list==rhs.pos_list
+                and _sequence_equal(self.indices, rhs.indices)
+                and _sequence_equal(self.pos_list, rhs.pos_list)
                 and self.english_name==rhs.english_name
                 and self.vertex_count==rhs.vertex_count
                 )
@@ -619,6 +652,50 @@ class Joint(common.Diff):
         self._diff(rhs, 'spring_constant_rotation')
 
 
+def vertices_to_array(vertices):
+    """
+    return VERTEX_DTYPE array copied from a pmd.Vertex sequence.
+    """
+    if isinstance(vertices, numpy.ndarray):
+        return vertices
+    return numpy.array([
+        ((v.pos.x, v.pos.y, v.pos.z),
+            (v.normal.x, v.normal.y, v.normal.z),
+            (v.uv.x, v.uv.y),
+            v.bone0, v.bone1, v.weight0, v.edge_flag)
+        for v in vertices], VERTEX_DTYPE)
+
+
+def array_to_vertices(array):
+    """
+    return a pmd.Vertex list copied from a VERTEX_DTYPE array.
+    """
+    return [Vertex(common.Vector3(*pos), common.Vector3(*normal),
+                common.Vector2(*uv), bone0, bone1, weight0, edge_flag)
+            for pos, normal, uv, bone0, bone1, weight0, edge_flag
+            in array.tolist()]
+
+
+def _to_array(values, like):
+    if isinstance(values, numpy.ndarray):
+        return values
+    if like.dtype==VERTEX_DTYPE:
+        return vertices_to_array(values)
+    if like.ndim==2:
+        return numpy.array([(v.x, v.y, v.z) for v in values],
+                like.dtype).reshape(-1, 3)
+    return numpy.array(values, like.dtype)
+
+
+def _sequence_equal(lhs, rhs):
+    if numpy and isinstance(lhs, numpy.ndarray):
+        return (len(lhs)==len(rhs)
+                and numpy.array_equal(lhs, _to_array(rhs, lhs)))
+    if numpy and isinstance(rhs, numpy.ndarray):
+        return _sequence_equal(rhs, lhs)
+    return lhs==rhs
+
+
 class Model(common.Diff):
     """pmd loader class.
 
@@ -679,8 +756,8 @@ class Model(common.Diff):
                 and self.comment==rhs.comment
                 and self.english_name==rhs.english_name
                 and self.english_comment==rhs.english_comment
-                and self.vertices==rhs.vertices
-                and self.indices==rhs.indices
+                and _sequence_equal(self.vertices, rhs.vertices)
+                and _sequence_equal(self.indices, rhs.indices)
                 and self.materials==rhs.materials
                 and self.bones==rhs.bones
                 and self.ik_list==rhs.ik_list
@@ -714,3 +791,70 @@ class Model(common.Diff):
         self._diff_array(rhs, "rigidbodies")
         self._diff_array(rhs, "joints")
 
+
+class ArrayModel(Model):
+    """
+    pmd model that keeps vertices, indices and morph offsets
+    in numpy arrays.
+
+    :IVariables:
+        vertices
+            VERTEX_DTYPE structured array
+        indices
+            uint16 array
+        morphs
+            indices is uint32 array, pos_list is float32 (n, 3) array
+    """
+    __slots__=[]
+
+    def __init__(self, version=1.0):
+        if not numpy:
+            raise ImportError("pmd.ArrayModel requires numpy")
+        super(ArrayModel, self).__init__(version)
+        self.vertices=numpy.zeros(0, VERTEX_DTYPE)
+        self.indices=numpy.zeros(0, numpy.uint16)
+
+    @staticmethod
+    def from_model(model):
+        """
+        create ArrayModel from pmd.Model.
+        vertices, indices and morph offsets are converted to arrays,
+        other attributes are shared with model.
+        """
+        dst=ArrayModel(model.version)
+        for key in Model.__slots__:
+            setattr(dst, key, getattr(model, key))
+        dst.vertices=vertices_to_array(model.vertices)
+        dst.indices=numpy.array(model.indices, numpy.uint16)
+        dst.morphs=[]
+        for m in model.morphs:
+            morph=Morph(m.name)
+            morph.type=m.type
+            morph.english_name=m.english_name
+            morph.vertex_count=m.vertex_count
+            morph.indices=numpy.array(m.indices, numpy.uint32)
+            morph.pos_list=_to_array(m.pos_list,
+                    numpy.zeros((0, 3), numpy.float32))
+            dst.morphs.append(morph)
+        return dst
+
+    def to_model(self):
+        """
+        return pmd.Model with vertices, indices and morph offsets
+        copied back to lists.
+        """
+        dst=Model(self.version)
+        for key in Model.__slots__:
+            setattr(dst, key, getattr(self, key))
+        dst.vertices=array_to_vertices(self.vertices)
+        dst.indices=self.indices.tolist()
+        dst.morphs=[]
+        for m in self.morphs:
+            morph=Morph(m.name)
+            morph.type=m.type
+            morph.english_name=m.english_name
+            morph.vertex_count=m.vertex_count
+            morph.indices=m.indices.tolist()
+            morph.pos_list=[common.Vector3(*pos) for pos in m.pos_list.tolist()]
+            dst.morphs.append(morph)
+        return dst
@@ -3,8 +3,15 @@
 pmd reader
 """
 import io
+import struct
 from .. import common
 from .. import pmd
+from .. import profiling
+from . import schema
+try:
+    import numpy
+except ImportError:
+    numpy=None
 
 
 class Reader(common.BinaryReader):
@@ -26,114 +33,97 @@ class Reader(common.BinaryReader):
             return src[:pos]
 
     def read_vertex(self):
-        return pmd.Vertex(
-                self.read_vector3(),
-                self.read_vector3(),
-                self.read_vector2(),
-                self.read_uint(2),
-                self.read_uint(2),
-                self.read_uint(1),
-                self.read_uint(1))
+        return schema.CODECS['vertex'].decode(self)
+
+    def read_vertex_array(self, count):
+        """
+        read count vertices into pmd.VERTEX_DTYPE array at once.
+        """
+        return numpy.frombuffer(
+                self.read_bytes(pmd.VERTEX_DTYPE.itemsize*count),
+                pmd.VERTEX_DTYPE, count).copy()
+
+    def read_index_array(self, count):
+        """
+        read count indices into uint16 array at once.
+        """
+        return numpy.frombuffer(
+                self.read_bytes(2*count), '<u2', count).astype(numpy.uint16)
+
+    def read_indices(self, count):
+        """
+        read count uint16 indices into a list.
+        """
+        return list(struct.unpack("<%dH" % count, self.read_bytes(2*count)))
 
     def read_material(self):
-        return pmd.Material(
-                diffuse_color=self.read_rgb(),
-                alpha=self.read_float(),
-                specular_factor=self.read_float(),
-                specular_color=self.read_rgb(),
-                ambient_color=self.read_rgb(),
-                toon_index=self.read_int(1),
-                edge_flag=self.read_uint(1),
-                vertex_count=self.read_uint(4),
-                texture_file=self.read_text(20)
-                )
+        return schema.CODECS['material'].decode(self)
 
     def read_bone(self):
-        name=self.read_text(20)
-        parent_index=self.read_uint(2)
-        tail_index=self.read_uint(2)
-        bone=pmd.createBone(name, self.read_uint(1))
-        bone.parent_index=parent_index
-        bone.tail_index=tail_index
-        bone.ik_index = self.read_uint(2)
-        bone.pos = self.read_vector3()
-        return bone
+        return schema.CODECS['bone'].decode(self)
 
     def read_ik(self):
-        ik=pmd.IK(self.read_uint(2), self.read_uint(2))
-        ik.length = self.read_uint(1)
-        ik.iterations = self.read_uint(2)
-        ik.weight = self.read_float()
-        ik.children=[self.read_uint(2) for _ in range(ik.length)]
-        return ik
-
-    def read_morph(self):
-        morph=pmd.Morph(self.read_text(20))
-        morph_size = self.read_uint(4)
-        morph.type = self.read_uint(1)
-        for j in range(morph_size):
-            morph.indices.append(self.read_uint(4))
-            morph.pos_list.append(self.read_vector3())
-        return morph
+        return schema.CODECS['ik'].decode(self)
+
+    def read_morph(self, arrays=False):
+        if arrays:
+            return schema.ARRAY_CODECS['morph'].decode(self)
+        return schema.CODECS['morph'].decode(self)
 
     def read_rigidbody(self):
-        return pmd.RigidBody(
-                name=self.read_text(20), 
-                bone_index=self.read_int(2),
-                collision_group=self.read_int(1),
-                no_collision_group=self.read_int(2),
-                shape_type=self.read_uint(1),
-                shape_size=self.read_vector3(),
-                shape_position=self.read_vector3(),
-                shape_rotation=self.read_vector3(),
-                mass=self.read_float(),
-                linear_damping=self.read_float(),
-                angular_damping=self.read_float(),
-                restitution=self.read_float(),
-                friction=self.read_float(),
-                mode=self.read_uint(1)
-                )
+        return schema.CODECS['rigidbody'].decode(self)
 
     def read_joint(self):
-        return pmd.Joint(
-                name=self.read_text(20),
-                rigidbody_index_a=self.read_uint(4),
-                rigidbody_index_b=self.read_uint(4),
-                position=self.read_vector3(),
-                rotation=self.read_vector3(),
-                translation_limit_min=self.read_vector3(),
-                translation_limit_max=self.read_vector3(),
-                rotation_limit_min=self.read_vector3(),
-                rotation_limit_max=self.read_vector3(),
-                spring_constant_translation=self.read_vector3(),
-                spring_constant_rotation=self.read_vector3())
-
-
-
-def __read(reader, model):
+        return schema.CODECS['joint'].decode(self)
+
+    def read_records(self, record, count):
+        """
+        read count records of record(a name of pmd.schema.RECORDS).
+        """
+        decode=schema.CODECS[record].decode
+        return [decode(self) for _ in range(count)]
+
+
+
+def __read(reader, model, arrays=False, profile=profiling.NULL):
+    ios=reader.ios
+
+    def read_list(section, count_size, record):
+        with profile.section(section, ios) as scope:
+            scope.count=reader.read_uint(count_size)
+            return reader.read_records(record, scope.count)
+
     # model info
-    model.name=reader.read_text(20)
-    model.comment=reader.read_text(256) 
+    with profile.section('header', ios):
+        reader.read_text=profile.timed('text', reader.read_text)
+        model.name=reader.read_text(20)
+        model.comment=reader.read_text(256) 
 
     # model data
-    model.vertices=[reader.read_vertex()
-            for _ in range(reader.read_uint(4))]
-    model.indices=[reader.read_uint(2)
-            for _ in range(reader.read_uint(4))]
-    model.materials=[reader.read_material()
-            for _ in range(reader.read_uint(4))]
-    model.bones=[reader.read_bone()
-            for _ in range(reader.read_uint(2))]
-    model.ik_list=[reader.read_ik()
-            for _ in range(reader.read_uint(2))]
-    model.morphs=[reader.read_morph()
-            for _ in range(reader.read_uint(2))]
-    model.morph_indices=[reader.read_uint(2)
-            for _ in range(reader.read_uint(1))]
-    model.bone_group_list=[pmd.BoneGroup(reader.read_text(50))
-            for _ in range(reader.read_uint(1))]
-    model.bone_display_list=[(reader.read_uint(2), reader.read_uint(1))
-            for _i in range(reader.read_uint(4))]
+    if arrays:
+        with profile.section('vertices', ios) as scope:
+            scope.count=reader.read_uint(4)
+            model.vertices=reader.read_vertex_array(scope.count)
+        with profile.section('indices', ios) as scope:
+            scope.count=reader.read_uint(4)
+            model.indices=reader.read_index_array(scope.count)
+    else:
+        model.vertices=read_list('vertices', 4, 'vertex')
+        with profile.section('indices', ios) as scope:
+            scope.count=reader.read_uint(4)
+            model.indices=reader.read_indices(scope.count)
+    model.materials=read_list('materials', 4, 'material')
+    model.bones=read_list('bones', 2, 'bone')
+    model.ik_list=read_list('ik_list', 2, 'ik')
+    with profile.section('morphs', ios) as scope:
+        scope.count=reader.read_uint(2)
+        model.morphs=[reader.read_morph(arrays) for _ in range(scope.count)]
+    with profile.section('morph_indices', ios) as scope:
+        scope.count=reader.read_uint(1)
+        model.morph_indices=reader.read_indices(scope.count)
+    model.bone_group_list=read_list('bone_group_list', 1, 'bone_group')
+    model.bone_display_list=read_list('bone_display_list', 4,
+            'bone_display')
 
     if reader.is_end():
         # EOF
@@ -142,18 +132,20 @@ def __read(reader, model):
     ############################################################
     # extend1: english name
     ############################################################
-    if reader.read_uint(1)==1:
-        #return True
-        model.english_name=reader.read_text(20)
-        model.english_comment=reader.read_text(256)
-        for bone in model.bones:
-            bone.english_name=reader.read_text(20)
-        for morph in model.morphs:
-            if morph.name==b'base':
-                continue
-            morph.english_name=reader.read_text(20)
-        for g in model.bone_group_list:
-            g.english_name=reader.read_text(50)
+    with profile.section('english', ios) as scope:
+        if reader.read_uint(1)==1:
+            #return True
+            model.english_name=reader.read_text(20)
+            model.english_comment=reader.read_text(256)
+            for bone in model.bones:
+                bone.english_name=reader.read_text(20)
+            for morph in model.morphs:
+                if morph.name==b'base':
+                    continue
+                morph.english_name=reader.read_text(20)
+            for g in model.bone_group_list:
+                g.english_name=reader.read_text(50)
+            scope.count=1
 
 
     ############################################################
@@ -162,8 +154,10 @@ def __read(reader, model):
     if reader.is_end():
         # EOF
         return True
-    model.toon_textures=[reader.read_text(100)
-            for _ in range(10)]
+    with profile.section('toon_textures', ios) as scope:
+        model.toon_textures=[reader.read_text(100)
+                for _ in range(10)]
+        scope.count=10
 
     ############################################################
     # extend2: rigidbodies and joints
@@ -172,21 +166,43 @@ def __read(reader, model):
         # EOF
         return True
 
-    model.rigidbodies=[reader.read_rigidbody()
-            for _ in range(reader.read_uint(4))]
-    model.joints=[reader.read_joint()
-            for _ in range(reader.read_uint(4))]
+    model.rigidbodies=read_list('rigidbodies', 4, 'rigidbody')
+    model.joints=read_list('joints', 4, 'joint')
 
     return True
 
 
-def read_from_file(path):
+def build_bone_tree(model):
+    """
+    set index, parent, children and tail of the bones read.
+    """
+    for i, child in enumerate(model.bones):
+        child.index=i
+        if child.parent_index==0xFFFF:
+            # no parent
+            model.no_parent_bones.append(child)
+            child.parent=None
+        else:
+            # has parent
+            parent=model.bones[child.parent_index]
+            child.parent=parent
+            parent.children.append(child)
+        # 後位置
+        if child.hasChild():
+            child.tail=model.bones[child.tail_index].pos
+
+
+def read_from_file(path, arrays=False, profile=None):
     """
     read from file path, then return the pymeshio.pmd.Model.
 
     :Parameters:
       path
         file path
+      arrays
+        if True, return pmd.ArrayModel(requires numpy)
+      profile
+        pymeshio.profiling.Profile to record the sections in
 
     >>> import pymeshio.pmd.reader
     >>> m=pymeshio.pmd.reader.read_from_file('resources/初音ミクVer2.pmd')
@@ -194,18 +210,24 @@ def read_from_file(path):
     <pmd-2.0 "Miku Hatsune" 12354vertices>
 
     """
-    pmd=read(io.BytesIO(common.readall(path)))
+    with common.open_mapped(path) as ios:
+        pmd=read(ios, arrays, profile)
     pmd.path=path
     return pmd
 
 
-def read(ios: io.IOBase):
+def read(ios: io.IOBase, arrays=False, profile=None):
     """
     read from ios, then return the pymeshio.pmd.Model.
 
     :Parameters:
       ios
         input stream (in io.IOBase)
+      arrays
+        if True, return pmd.ArrayModel(requires numpy)
+      profile
+        pymeshio.profiling.Profile to record the sections and the
+        nested text reads in
 
     >>> import pymeshio.pmd.reader
     >>> m=pymeshio.pmd.reader.read(io.open('resources/初音ミクVer2.pmd', 'rb'))
@@ -214,38 +236,43 @@ def read(ios: io.IOBase):
 
     """
     assert(isinstance(ios, io.IOBase))
+    if profile is None:
+        profile=profiling.NULL
+    profile.begin('pmd')
+    try:
+        return _read(ios, arrays, profile)
+    finally:
+        profile.end()
+
+
+def _read(ios, arrays, profile):
     reader=common.BinaryReader(ios)
 
     # header
-    signature=reader.unpack("3s", 3)
-    if signature!=b"Pmd":
-        raise common.ParseException(
-                "invalid signature: {0}".format(signature))
-    version=reader.read_float()
-
-    model=pmd.Model(version)
+    with profile.section('header', ios) as scope:
+        signature=reader.unpack("3s", 3)
+        if signature!=b"Pmd":
+            raise common.ParseException(
+                    "invalid signature: {0}".format(signature))
+        version=reader.read_float()
+        scope.count=1
+
+    if arrays:
+        if not numpy:
+            raise common.ParseException("arrays=True requires numpy")
+        model=pmd.ArrayModel(version)
+    else:
+        model=pmd.Model(version)
     reader=Reader(reader.ios, version)
-    if(__read(reader, model)):
+    if(__read(reader, model, arrays, profile)):
         # check eof
         if not reader.is_end():
             #print("can not reach eof.")
             pass
 
         # build bone tree
-        for i, child in enumerate(model.bones):
-            child.index=i
-            if child.parent_index==0xFFFF:
-                # no parent
-                model.no_parent_bones.append(child)
-                child.parent=None
-            else:
-                # has parent
-                parent=model.bones[child.parent_index]
-                child.parent=parent
-                parent.children.append(child)
-            # 後位置
-            if child.hasChild():
-                child.tail=model.bones[child.tail_index].pos
+        with profile.section('bone_tree') as scope:
+            scope.count=len(model.bones)
+            build_bone_tree(model)
 
         return model
-
@@ -0,0 +1,125 @@
+#coding: utf-8
+"""
+pmd reader built on the konbu binary parsers
+
+the records are the layouts of pymeshio.pmd.schema compiled by
+konbu.from_layout into fused struct.Struct plans, so a vertex is one
+unpack and a vertex list is one iter_unpack over a memoryview. returns
+the same pymeshio.pmd.Model as pymeshio.pmd.reader.read.
+"""
+import io
+import struct
+from .. import common
+from .. import konbu
+from .. import pmd
+from . import reader
+from . import schema
+
+
+HEADER=konbu.Record(lambda *values: values,
+        konbu.fixed_bytes(3), konbu.f32, konbu.text(20), konbu.text(256))
+
+VERTEX=konbu.from_layout(schema.VERTEX_RECORD)
+MATERIAL=konbu.from_layout(schema.MATERIAL_RECORD)
+BONE=konbu.from_layout(schema.BONE_RECORD)
+IK=konbu.from_layout(schema.IK_RECORD)
+MORPH=konbu.from_layout(schema.MORPH_RECORD)
+BONE_GROUP=konbu.from_layout(schema.BONE_GROUP_RECORD)
+BONE_DISPLAY=konbu.from_layout(schema.BONE_DISPLAY_RECORD)
+RIGIDBODY=konbu.from_layout(schema.RIGIDBODY_RECORD)
+JOINT=konbu.from_layout(schema.JOINT_RECORD)
+
+VERTICES=konbu.Array(konbu.u32, VERTEX)
+INDICES=konbu.Array(konbu.u32, konbu.u16)
+MATERIALS=konbu.Array(konbu.u32, MATERIAL)
+BONES=konbu.Array(konbu.u16, BONE)
+IK_LIST=konbu.Array(konbu.u16, IK)
+MORPHS=konbu.Array(konbu.u16, MORPH)
+MORPH_INDICES=konbu.Array(konbu.u8, konbu.u16)
+BONE_GROUPS=konbu.Array(konbu.u8, BONE_GROUP)
+BONE_DISPLAYS=konbu.Array(konbu.u32, BONE_DISPLAY)
+ENGLISH=konbu.Record(lambda *values: values, konbu.text(20), konbu.text(256))
+NAMES=konbu.Array(None, konbu.text(20))
+GROUP_NAMES=konbu.Array(None, konbu.text(50))
+TOON_TEXTURES=konbu.Array(10, konbu.text(100))
+RIGIDBODIES=konbu.Array(konbu.u32, RIGIDBODY)
+JOINTS=konbu.Array(konbu.u32, JOINT)
+
+
+def _parse(cursor):
+    signature, version, name, comment=HEADER.parse(cursor)
+    if signature!=b"Pmd":
+        raise common.ParseException(
+                "invalid signature: {0}".format(signature))
+    model=pmd.Model(version)
+    model.name=name
+    model.comment=comment
+
+    model.vertices=VERTICES.parse(cursor)
+    model.indices=INDICES.parse(cursor)
+    model.materials=MATERIALS.parse(cursor)
+    model.bones=BONES.parse(cursor)
+    model.ik_list=IK_LIST.parse(cursor)
+    model.morphs=MORPHS.parse(cursor)
+    model.morph_indices=MORPH_INDICES.parse(cursor)
+    model.bone_group_list=BONE_GROUPS.parse(cursor)
+    model.bone_display_list=BONE_DISPLAYS.parse(cursor)
+
+    # extend1: english name
+    if not cursor.is_end() and konbu.u8.parse(cursor)==1:
+        model.english_name, model.english_comment=ENGLISH.parse(cursor)
+        for bone, name in zip(model.bones,
+                NAMES.parse(cursor, len(model.bones))):
+            bone.english_name=name
+        morphs=[m for m in model.morphs if m.name!=b'base']
+        for morph, name in zip(morphs, NAMES.parse(cursor, len(morphs))):
+            morph.english_name=name
+        for g, name in zip(model.bone_group_list,
+                GROUP_NAMES.parse(cursor, len(model.bone_group_list))):
+            g.english_name=name
+
+    # extend2: toon_textures
+    if not cursor.is_end():
+        model.toon_textures=TOON_TEXTURES.parse(cursor)
+
+    # extend2: rigidbodies and joints
+    if not cursor.is_end():
+        model.rigidbodies=RIGIDBODIES.parse(cursor)
+        model.joints=JOINTS.parse(cursor)
+
+    reader.build_bone_tree(model)
+    return model
+
+
+def read_from_bytes(data):
+    """
+    read from bytes(or any buffer), then return the pymeshio.pmd.Model.
+
+    >>> import pymeshio.pmd.reader_konbu
+    >>> m=pymeshio.pmd.reader_konbu.read_from_bytes(
+    ...     pymeshio.common.readall('resources/初音ミクVer2.pmd'))
+    >>> print(m)
+    <pmd-2.0 "Miku Hatsune" 12354vertices>
+
+    """
+    try:
+        return _parse(konbu.Cursor(data))
+    except struct.error as e:
+        raise common.ParseException(str(e))
+
+
+def read_from_file(path):
+    """
+    read from file path, then return the pymeshio.pmd.Model.
+    """
+    pmd=read_from_bytes(common.readall(path))
+    pmd.path=path
+    return pmd
+
+
+def read(ios: io.IOBase):
+    """
+    read from ios, then return the pymeshio.pmd.Model.
+    """
+    assert(isinstance(ios, io.IOBase))
+    return read_from_bytes(ios.read())
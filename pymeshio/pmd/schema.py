@@ -0,0 +1,212 @@
+# coding: utf-8
+"""
+pmd record layouts
+
+every pmd record is declared once below with pymeshio.layout and compiled
+at import into decode, encode and skip functions, shared by pmd.reader,
+pmd.writer and pymeshio.probe. pmd has no index size options, so one set
+of codecs serves all files.
+"""
+from .. import common
+from .. import layout
+from .. import pmd
+from ..layout import Field, List, Record
+try:
+    import numpy
+except ImportError:
+    numpy=None
+
+
+U8=layout.Scalar('B')
+I8=layout.Scalar('b')
+U16=layout.Scalar('H')
+I16=layout.Scalar('h')
+U32=layout.Scalar('I')
+F32=layout.Scalar('f')
+VECTOR2=layout.Vector(common.Vector2, ('x', 'y'))
+VECTOR3=layout.Vector(common.Vector3, ('x', 'y', 'z'))
+RGB=layout.Vector(common.RGB, ('r', 'g', 'b'))
+NAME=layout.Bytes(20)
+
+truncate=layout.truncate
+
+
+def _bone(name, parent_index, tail_index, type, ik_index, pos):
+    bone=pmd.createBone(name, type)
+    bone.parent_index=parent_index
+    bone.tail_index=tail_index
+    bone.ik_index=ik_index
+    bone.pos=pos
+    return bone
+
+
+def _ik(index, target, iterations, weight, children):
+    ik=pmd.IK(index, target)
+    ik.length=len(children)
+    ik.iterations=iterations
+    ik.weight=weight
+    ik.children=children
+    return ik
+
+
+def _morph(name, type, offsets):
+    morph=pmd.Morph(name)
+    morph.type=type
+    if numpy and isinstance(offsets, numpy.ndarray):
+        morph.indices=offsets['index'].astype(numpy.uint32)
+        morph.pos_list=offsets['pos'].astype(numpy.float32)
+    else:
+        morph.indices=[o[0] for o in offsets]
+        morph.pos_list=[o[1] for o in offsets]
+    return morph
+
+
+def _morph_offsets(morph):
+    """(index, pos) records of a pmd.Morph or pmd.ArrayModel morph"""
+    if numpy and isinstance(morph.indices, numpy.ndarray):
+        records=numpy.zeros(len(morph.indices), pmd.MORPH_OFFSET_DTYPE)
+        records['index']=morph.indices
+        records['pos']=morph.pos_list
+        return records
+    return list(zip(morph.indices, morph.pos_list))
+
+
+VERTEX_RECORD=Record(pmd.Vertex,
+        Field('pos', VECTOR3),
+        Field('normal', VECTOR3),
+        Field('uv', VECTOR2),
+        Field('bone0', U16),
+        Field('bone1', U16),
+        Field('weight0', U8),
+        Field('edge_flag', U8))
+
+MATERIAL_RECORD=Record(pmd.Material,
+        Field('diffuse_color', RGB),
+        Field('alpha', F32),
+        Field('specular_factor', F32),
+        Field('specular_color', RGB),
+        Field('ambient_color', RGB),
+        Field('toon_index', I8),
+        Field('edge_flag', U8),
+        Field('vertex_count', U32),
+        Field('texture_file', NAME))
+
+BONE_RECORD=Record(_bone,
+        Field('name', NAME),
+        Field('parent_index', U16),
+        Field('tail_index', U16),
+        Field('type', U8),
+        Field('ik_index', U16),
+        Field('pos', VECTOR3))
+
+IK_RECORD=Record(_ik,
+        Field('index', U16),
+        Field('target', U16),
+        Field('length', U8, 'len({0}.children)', hidden=True),
+        Field('iterations', U16),
+        Field('weight', F32),
+        Field('children', List('length', U16)))
+
+MORPH_OFFSET_RECORD=Record(None,
+        Field('index', U32, '{0}[0]'),
+        Field('pos', VECTOR3, '{0}[1]'))
+
+MORPH_OFFSETS=layout.Bulk(numpy.ndarray if numpy else None,
+        lambda records: records.copy(),
+        lambda records, dtype: records.astype(dtype).tobytes())
+
+MORPH_RECORD=Record(_morph,
+        Field('name', NAME),
+        Field('offset_count', U32, 'len({0}.indices)', hidden=True),
+        Field('type', U8),
+        Field('offsets',
+            List('offset_count', MORPH_OFFSET_RECORD, MORPH_OFFSETS),
+            _morph_offsets))
+
+BONE_GROUP_RECORD=Record(pmd.BoneGroup,
+        Field('name', layout.Bytes(50)))
+
+BONE_DISPLAY_RECORD=Record(None,
+        Field('bone_index', U16, '{0}[0]'),
+        Field('group_index', U8, '{0}[1]'))
+
+RIGIDBODY_RECORD=Record(pmd.RigidBody,
+        Field('name', NAME),
+        Field('bone_index', I16),
+        Field('collision_group', I8),
+        Field('no_collision_group', I16),
+        Field('shape_type', U8),
+        Field('shape_size', VECTOR3),
+        Field('shape_position', VECTOR3),
+        Field('shape_rotation', VECTOR3),
+        Field('mass', F32),
+        Field('linear_damping', F32),
+        Field('angular_damping', F32),
+        Field('restitution', F32),
+        Field('friction', F32),
+        Field('mode', U8))
+
+JOINT_RECORD=Record(pmd.Joint,
+        Field('name', NAME),
+        Field('rigidbody_index_a', U32),
+        Field('rigidbody_index_b', U32),
+        Field('position', VECTOR3),
+        Field('rotation', VECTOR3),
+        Field('translation_limit_min', VECTOR3),
+        Field('translation_limit_max', VECTOR3),
+        Field('rotation_limit_min', VECTOR3),
+        Field('rotation_limit_max', VECTOR3),
+        Field('spring_constant_translation', VECTOR3),
+        Field('spring_constant_rotation', VECTOR3))
+
+RECORDS={
+        'vertex': VERTEX_RECORD,
+        'material': MATERIAL_RECORD,
+        'bone': BONE_RECORD,
+        'ik': IK_RECORD,
+        'morph': MORPH_RECORD,
+        'morph_offset': MORPH_OFFSET_RECORD,
+        'bone_group': BONE_GROUP_RECORD,
+        'bone_display': BONE_DISPLAY_RECORD,
+        'rigidbody': RIGIDBODY_RECORD,
+        'joint': JOINT_RECORD,
+        }
+"""record name to layout"""
+
+CODECS=dict((name, layout.compile(record))
+        for name, record in RECORDS.items())
+"""record name to pymeshio.layout.Codec"""
+
+ARRAY_CODECS=dict(CODECS)
+"""CODECS whose morph decodes offsets into numpy arrays(pmd.ArrayModel)"""
+if numpy:
+    ARRAY_CODECS['morph']=layout.compile(MORPH_RECORD, arrays=True)
+
+
+# struct and struct.unpack tuple <-> record of the fixed size records
+VERTEX=CODECS['vertex'].struct
+assert(VERTEX.size==38)
+
+MORPH_OFFSET=CODECS['morph_offset'].struct
+assert(MORPH_OFFSET.size==16)
+
+MATERIAL=CODECS['material'].struct
+assert(MATERIAL.size==70)
+
+BONE=CODECS['bone'].struct
+assert(BONE.size==39)
+
+RIGIDBODY=CODECS['rigidbody'].struct
+assert(RIGIDBODY.size==83)
+
+JOINT=CODECS['joint'].struct
+assert(JOINT.size==124)
+
+decode_material=CODECS['material'].decode_values
+encode_material=CODECS['material'].pack
+decode_bone=CODECS['bone'].decode_values
+encode_bone=CODECS['bone'].pack
+decode_rigidbody=CODECS['rigidbody'].decode_values
+encode_rigidbody=CODECS['rigidbody'].pack
+decode_joint=CODECS['joint'].decode_values
+encode_joint=CODECS['joint'].pack
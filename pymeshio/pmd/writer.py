@@ -6,117 +6,70 @@ import io
 import struct
 from .. import common
 from .. import pmd
+from . import schema
+try:
+    import numpy
+except ImportError:
+    numpy=None
 
 
 class Writer(common.BinaryWriter):
+    """
+    pmd writer. records are encoded by the pmd.schema codecs.
+    """
+    def write_records(self, record, items, count_size):
+        """
+        write items as a section of record(a name of pmd.schema.RECORDS)
+        after their count of count_size bytes.
+        """
+        encode=schema.CODECS[record].encode
+        buf=bytearray()
+        for item in items:
+            encode(self, item, buf)
+        self.write_uint(len(items), count_size)
+        self.ios.write(buf)
+
     def write_veritices(self, vertices):
-        self.write_uint(len(vertices), 4)
-        for v in vertices:
-            self.write_vector3(v.pos)
-            self.write_vector3(v.normal)
-            self.write_vector2(v.uv)
-            self.write_uint(v.bone0, 2)
-            self.write_uint(v.bone1, 2)
-            self.write_uint(v.weight0, 1)
-            self.write_uint(v.edge_flag, 1)
+        if numpy and isinstance(vertices, numpy.ndarray):
+            self.write_uint(len(vertices), 4)
+            self.ios.write(vertices.astype(pmd.VERTEX_DTYPE).tobytes())
+            return
+        self.write_records('vertex', vertices, 4)
 
     def write_indices(self, indices):
         self.write_uint(len(indices), 4)
+        if numpy and isinstance(indices, numpy.ndarray):
+            self.ios.write(indices.astype('<u2').tobytes())
+            return
         self.ios.write(struct.pack("=%dH" % len(indices), *indices))
 
     def write_materials(self, materials):
-        self.write_uint(len(materials), 4)
-        for m in materials:
-            self.write_rgb(m.diffuse_color)
-            self.write_float(m.alpha)
-            self.write_float(m.specular_factor)
-            self.write_rgb(m.specular_color)
-            self.write_rgb(m.ambient_color)
-            self.write_uint(m.toon_index, 1)
-            self.write_uint(m.edge_flag, 1)
-            self.write_uint(m.vertex_count, 4)
-            self.write_bytes(m.texture_file, 20)
+        self.write_records('material', materials, 4)
 
     def write_bones(self, bones):
-        self.write_uint(len(bones), 2)
-        sBone=struct.Struct("=20sHHBH3f")
-        assert(sBone.size==39)
-        for b in bones:
-            self.write_bytes(b.name, 20)
-            self.write_uint(b.parent_index, 2)
-            self.write_uint(b.tail_index, 2)
-            self.write_uint(b.type, 1)
-            self.write_uint(b.ik_index, 2)
-            self.write_vector3(b.pos)
+        self.write_records('bone', bones, 2)
 
     def write_ik_list(self, ik_list):
-        self.write_uint(len(ik_list), 2)
-        for ik in ik_list:
-            self.write_uint(ik.index, 2)
-            self.write_uint(ik.target, 2)
-            self.write_uint(len(ik.children), 1)
-            self.write_uint(ik.iterations, 2)
-            self.write_float(ik.weight)
-            self.ios.write(struct.pack("=%dH" % len(ik.children), *ik.children))
+        self.write_records('ik', ik_list, 2)
 
     def write_morphs(self, morphs):
-        self.write_uint(len(morphs), 2)
-        for morph in morphs:
-            self.write_bytes(morph.name, 20)
-            self.write_uint(len(morph.indices), 4)
-            self.write_uint(morph.type, 1)
-            for i, v in zip(morph.indices, morph.pos_list):
-                self.write_uint(i, 4)
-                self.write_vector3(v)
+        self.write_records('morph', morphs, 2)
 
     def write_morph_indices(self, morph_indices):
         self.write_uint(len(morph_indices), 1)
         self.ios.write(struct.pack("=%dH" % len(morph_indices), *morph_indices))
 
     def write_bone_group_list(self, bone_group_list):
-        self.write_uint(len(bone_group_list), 1)
-        for g in bone_group_list:
-            self.write_bytes(g.name, 50)
+        self.write_records('bone_group', bone_group_list, 1)
 
     def write_bone_display_list(self, bone_display_list):
-        self.write_uint(len(bone_display_list), 4)
-        for l in bone_display_list:
-            self.write_uint(l[0], 2)
-            self.write_uint(l[1], 1)
+        self.write_records('bone_display', bone_display_list, 4)
 
     def write_rigidbodies(self, rigidbodies):
-        self.write_uint(len(rigidbodies), 4)
-        for r in rigidbodies:
-            self.write_bytes(r.name, 20)
-            self.write_int(r.bone_index, 2)
-            self.write_uint(r.collision_group, 1)
-            self.write_int(r.no_collision_group, 2)
-            self.write_uint(r.shape_type, 1)
-            self.write_vector3(r.shape_size)
-            self.write_vector3(r.shape_position)
-            self.write_vector3(r.shape_rotation)
-            self.write_float(r.mass)
-            self.write_float(r.linear_damping)
-            self.write_float(r.angular_damping)
-            self.write_float(r.restitution)
-            self.write_float(r.friction)
-            self.write_uint(r.mode, 1)
+        self.write_records('rigidbody', rigidbodies, 4)
 
     def write_joints(self, joints):
-        self.write_uint(len(joints), 4)
-        for j in joints:
-            self.write_bytes(j.name, 20)
-            self.write_uint(j.rigidbody_index_a, 4)
-            self.write_uint(j.rigidbody_index_b, 4)
-            self.write_vector3(j.position)
-            self.write_vector3(j.rotation)
-            self.write_vector3(j.translation_limit_min)
-            self.write_vector3(j.translation_limit_max)
-            self.write_vector3(j.rotation_limit_min)
-            self.write_vector3(j.rotation_limit_max)
-            self.write_vector3(j.spring_constant_translation)
-            self.write_vector3(j.spring_constant_rotation)
-
+        self.write_records('joint', joints, 4)
 
 def write(ios, model):
     """
@@ -34,6 +34,7 @@ class BoneFrame(BaseFrame):
     __slots__=[
             'pos',
             'rot',
+            'is_selected',
             ]
     def __init__(self, frame_index):
         super(BoneFrame, self).__init__(frame_index)
@@ -53,6 +54,10 @@ class Bone(common.Diff):
 
 
 class MorphFrame(BaseFrame):
+    __slots__=[
+            'expression',
+            'is_selected',
+            ]
     def __init__(self, frame_index):
         super(MorphFrame, self).__init__(frame_index)
 
@@ -87,6 +92,7 @@ class Model(common.Diff):
     __slots__=[
             'name',
             'path',
+            'is_visible',
             'bones',
             ]
     def __init__(self):
@@ -110,9 +116,36 @@ class Project(common.Diff):
             'screen_width',
             'screen_height',
             'timelineview_width',
+            'fovy',
             'is_camera_mode',
             'models',
+            'view_flag',
+            # play info
+            'use_repeat',
+            'use_end',
+            'use_start',
+            'start',
+            'end',
+            'use_wav',
+            'wav_path',
+            'bgmovie_path',
+            'use_bgmovie',
+            'bgimage_path',
+            'use_bgimage',
+            'show_info',
+            'show_grid',
+            'show_groundshadow',
+            'screencapture_flag',
+            'groundshadow_color',
+            'use_groundshadow_transparency',
+            # physics
+            'physics_flag',
             'gravity',
+            'physics_noise',
+            'gravity_orientation',
+            'physics_use_noise',
+            'edge_color',
+            'use_black_background',
             ]
     def __init__(self):
         self.models=[]
@@ -2,11 +2,14 @@
 import io
 import os
 import sys
+from logging import getLogger
 from .. import common
 from .. import pmm
 from .. import pmd
 from ..pmd import reader as pmd_reader
 
+logger=getLogger(__name__)
+
 
 class Reader(common.BinaryReader):
     """pmx reader
@@ -40,7 +43,8 @@ def read_from_file(path):
 
     """
     #assert(isinstance(path, unicode))
-    pmm=read(io.BytesIO(common.readall(path)), os.path.dirname(path))
+    with common.open_mapped(path) as ios:
+        pmm=read(ios, os.path.dirname(path))
     pmm.path=path
     return pmm
 
@@ -70,7 +74,7 @@ def read(ios, base_dir):
     p=pmm.Project()
     p.screen_width=reader.read_int(4)
     p.screen_height=reader.read_int(4)
-    p.timeline_view_width=reader.read_int(4)
+    p.timelineview_width=reader.read_int(4)
     p.fovy=reader.read_float()
     p.is_camera_mode=reader.read_uint(1)
 
@@ -85,13 +89,13 @@ def read(ios, base_dir):
     model_count=reader.read_uint(1)
     model_names=[reader.read_text(20).decode('cp932') for _ in range(model_count)]
     for i in range(model_count):
-        print('model', reader)
+        logger.debug("model %s", reader)
 
         n=reader.read_uint(1)
 
         model=pmm.Model()
         model.name=reader.read_text(20).decode('cp932')
-        print('name', model.name)
+        logger.debug("name %s", model.name)
         model.path=reader.read_text(256).decode('cp932')
         # path - base_dir
         pos=model.path.index("\\UserFile\\")
@@ -114,9 +118,9 @@ def read(ios, base_dir):
 
         # nazo
         nazo_count=reader.read_uint(1)
-        print('nazo_count', nazo_count)
+        logger.debug("nazo_count %s", nazo_count)
         nazo=[reader.read_uint(1) for _ in range(nazo_count)]
-        print(nazo)
+        logger.debug("%s", nazo)
 
         # ?
         reader.read_uint(1)
@@ -125,7 +129,7 @@ def read(ios, base_dir):
         reader.read_uint(1)
 
         max_frame_number=reader.read_uint(4)
-        print('max_frame_number', max_frame_number, reader)
+        logger.debug("max_frame_number %s %s", max_frame_number, reader)
 
         ############################################################
         # ボーン情報
@@ -174,7 +178,7 @@ def read(ios, base_dir):
 
         # 後続のボーンフレーム数
         remain_bone_frame_count=reader.read_int(4)
-        print('remain_bone_frame_count', remain_bone_frame_count)
+        logger.debug("remain_bone_frame_count %s", remain_bone_frame_count)
 
         # ボーンのフレーム情報
         for i in range(remain_bone_frame_count):
@@ -202,7 +206,7 @@ def read(ios, base_dir):
             read_morphframe(i)
 
         remain_morph_frame_count=reader.read_int(4)
-        print('remain_morph_frame_count', remain_morph_frame_count)
+        logger.debug("remain_morph_frame_count %s", remain_morph_frame_count)
 
         for i in range(remain_morph_frame_count):
             index=reader.read_int(4)
@@ -210,7 +214,7 @@ def read(ios, base_dir):
 
         ############################################################
         # model state
-        print(reader)
+        logger.debug("%s", reader)
 
         def read_stateframe(frame_index):
             f=pmm.StateFrame(frame_index)
@@ -222,12 +226,12 @@ def read(ios, base_dir):
             f.ik_enables=[reader.read_uint(1) for ik in pmd_model.ik_list]
             f.is_selected=reader.read_uint(1)
 
-            print(f)
+            logger.debug("%s", f)
 
         read_stateframe(0)
 
         model_state_frame_count=reader.read_int(4)
-        print('model_state_frame_count', model_state_frame_count)
+        logger.debug("model_state_frame_count %s", model_state_frame_count)
         for i in range(model_state_frame_count):
             index=reader.read_int(4)
             read_stateframe(index)
@@ -235,7 +239,7 @@ def read(ios, base_dir):
         ############################################################
         # edit
         # pose
-        print('bone', reader)
+        logger.debug("bone %s", reader)
         for i, b in enumerate(pmd_model.bones):
             # 34 byte
             edit_pos=reader.read_vector3()
@@ -245,18 +249,18 @@ def read(ios, base_dir):
             is_selected=reader.read_uint(1)
 
         # morph
-        print('morph', reader)
+        logger.debug("morph %s", reader)
         for i, m in enumerate(pmd_model.morphs):
             #print i, m
             expression=reader.read_float()
 
         # ik
-        print('ik', reader)
+        logger.debug("ik %s", reader)
         for i, ik in enumerate(pmd_model.ik_list):
             is_enable=reader.read_uint(1)
 
-        print(reader)
-        print()
+        logger.debug("%s", reader)
+        p.models.append(model)
 
     ############################################################
     # camera
@@ -303,22 +307,22 @@ def read(ios, base_dir):
 
         reader.read_int(4)
 
-        print(f)
+        logger.debug("%s", f)
 
     read_cameraframe(0)
 
     camera_frame_count=reader.read_int(4)
-    print('camera_frame_count', camera_frame_count)
+    logger.debug("camera_frame_count %s", camera_frame_count)
     for i in range(camera_frame_count):
         index=reader.read_int(4)
         read_cameraframe(index)
  
-    print(reader)
+    logger.debug("%s", reader)
 
     ############################################################
     # light
     reader.read_text(37)
-    print(reader)
+    logger.debug("%s", reader)
 
     def read_lightframe(frame_index):
         f=pmm.LightFrame(frame_index)
@@ -327,12 +331,12 @@ def read(ios, base_dir):
         f.next_frame_index=reader.read_int(4)
 
         reader.read_text(25)
-        print(f)
+        logger.debug("%s", f)
 
     read_lightframe(0)
 
     light_frame_count=reader.read_int(4)
-    print('light_frame_count', light_frame_count)
+    logger.debug("light_frame_count %s", light_frame_count)
     for i in range(light_frame_count):
         index=reader.read_int(4)
         read_lightframe(index)
@@ -342,7 +346,7 @@ def read(ios, base_dir):
     light_color=reader.read_vector3()
     light_xyz=reader.read_vector3()
 
-    print(reader)
+    logger.debug("%s", reader)
 
     ############################################################
     # accessory
@@ -352,21 +356,21 @@ def read(ios, base_dir):
     assert(n==3)
 
     accessory_count=reader.read_uint(1)
-    print('accessory_count', accessory_count)
+    logger.debug("accessory_count %s", accessory_count)
     for i in range(accessory_count):
         name=reader.read_text(100).decode('cp932')
-        print(i, name)
-    print(reader)
+        logger.debug("%s %s", i, name)
+    logger.debug("%s", reader)
     for i in range(accessory_count):
         # 451 byte
         n=reader.read_uint(1)
         name=reader.read_text(100).decode('cp932')
         #print i, name
         path=reader.read_text(256).decode('cp932')
-        print(i, path)
+        logger.debug("%s %s", i, path)
         reader.read_text(94)
 
-    print(reader)
+    logger.debug("%s", reader)
 
     reader.read_text(55)
 
@@ -383,40 +387,40 @@ def read(ios, base_dir):
     p.use_start=reader.read_uint(1)
     p.start=reader.read_uint(4)
     p.end=reader.read_uint(4)
-    print("playinfo: repeat(%d) start: %d(%d) -> end: %d(%d)" % (p.use_repeat, 
-            p.start, p.use_start, p.end, p.use_end))
+    logger.debug("playinfo: repeat(%d) start: %d(%d) -> end: %d(%d)",
+            p.use_repeat, p.start, p.use_start, p.end, p.use_end)
     reader.read_text(2)
-    print(reader)
+    logger.debug("%s", reader)
 
     ############################################################
     # Wav
     p.use_wav=reader.read_uint(1)
     p.wav_path=reader.read_text(256)
-    print('wav', p.use_wav, p.wav_path)
+    logger.debug("wav %s %s", p.use_wav, p.wav_path)
     reader.read_text(12)
 
     ############################################################
     # 背景動画
     p.bgmovie_path=reader.read_text(256)
     p.use_bgmovie=reader.read_uint(1)
-    print('bgmovie', p.use_bgmovie, p.bgmovie_path)
+    logger.debug("bgmovie %s %s", p.use_bgmovie, p.bgmovie_path)
     reader.read_text(15)
 
     ############################################################
     # 背景画像
     p.bgimage_path=reader.read_text(256)
     p.use_bgimage=reader.read_uint(1)
-    print('bgimage', p.use_bgimage, p.bgimage_path)
+    logger.debug("bgimage %s %s", p.use_bgimage, p.bgimage_path)
     ############################################################
 
-    print(reader)
+    logger.debug("%s", reader)
 
     p.show_info=reader.read_uint(1)
     p.show_grid=reader.read_uint(1)
     p.show_groundshadow=reader.read_uint(1)
     n=reader.read_uint(1)
-    print('情報: %d, グリッド: %d, 地面影: %d' % (
-            p.show_info, p.show_grid, p.show_groundshadow))
+    logger.debug("情報: %d, グリッド: %d, 地面影: %d",
+            p.show_info, p.show_grid, p.show_groundshadow)
 
     n=reader.read_uint(1)
     assert(n==0x70)
@@ -424,7 +428,7 @@ def read(ios, base_dir):
     assert(n==0x42)
 
     p.screencapture_flag=reader.read_uint(1)
-    print('screencapture_flag', p.screencapture_flag)
+    logger.debug("screencapture_flag %s", p.screencapture_flag)
     n=reader.read_uint(1)
     n=reader.read_uint(1)
     n=reader.read_uint(1)
@@ -432,17 +436,17 @@ def read(ios, base_dir):
     assert(n==1)
 
     p.groundshadow_color=reader.read_float()
-    print(p.groundshadow_color)
+    logger.debug("%s", p.groundshadow_color)
 
     for i in range(model_count+accessory_count):
         n=reader.read_uint(1)
 
-    print(reader)
+    logger.debug("%s", reader)
     f=reader.read_float()
     assert(f==1)
 
     p.use_groundshadow_transparency=reader.read_uint(1)
-    print(p.use_groundshadow_transparency)
+    logger.debug("%s", p.use_groundshadow_transparency)
     n=reader.read_uint(1)
     assert(n==1)
 
@@ -452,13 +456,13 @@ def read(ios, base_dir):
     n=reader.read_uint(1)
     assert(n==1)
 
-    print('Gravity', reader)
+    logger.debug("Gravity %s", reader)
     p.physics_flag=reader.read_uint(1)
     p.gravity=reader.read_float()
     p.physics_noise=reader.read_uint(4)
     p.gravity_orientation=reader.read_vector3()
     p.physics_use_noise=reader.read_uint(1)
-    print(p.physics_flag, p.gravity_orientation, p.gravity, p.physics_noise, p.physics_use_noise)
+    logger.debug("%s %s %s %s %s", p.physics_flag, p.gravity_orientation, p.gravity, p.physics_noise, p.physics_use_noise)
 
     n=reader.read_uint(1)
     assert(n==1)
@@ -468,20 +472,20 @@ def read(ios, base_dir):
     ############################################################
     # self shadow
     f=reader.read_float()
-    print(f)
+    logger.debug("%s", f)
 
     reader.read_text(14)
     for j in range(model_count):
         n=reader.read_uint(1)
 
     f=reader.read_float()
-    print(f)
+    logger.debug("%s", f)
 
     n=reader.read_uint(1)
     assert(n==0)
 
     selfshadow_frame_count=reader.read_uint(4)
-    print(selfshadow_frame_count)
+    logger.debug("%s", selfshadow_frame_count)
     for i in range(selfshadow_frame_count):
         n=reader.read_uint(1)
         for j in range(model_count):
@@ -493,15 +497,15 @@ def read(ios, base_dir):
     assert(n==1)
 
     p.edge_color=[reader.read_uint(4) for _ in range(3)]
-    print(p.edge_color)
+    logger.debug("%s", p.edge_color)
 
     # unknown
     n=reader.read_uint(1)
     assert(n==1)
 
     p.use_black_background=reader.read_uint(1)
-    print('use_black_background', p.use_black_background)
-    print(reader)
+    logger.debug("use_black_background %s", p.use_black_background)
+    logger.debug("%s", reader)
 
     return p
 
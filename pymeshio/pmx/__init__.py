@@ -26,6 +26,10 @@ import io
 import os
 import struct
 from .. import common
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class Ik(common.Diff):
@@ -568,6 +572,255 @@ class Vertex(common.Diff):
         self._diff(rhs, "edge_factor")
 
 
+DEFORM_BDEF1 = 0
+DEFORM_BDEF2 = 1
+DEFORM_BDEF4 = 2
+DEFORM_SDEF = 3
+
+
+class VertexView(common.Diff):
+    """
+    pmx.Vertex compatible view of a VertexArray item.
+
+    attributes are read from the array on access and written back on
+    assignment.
+    """
+    __slots__ = ['array', 'index']
+
+    def __init__(self, array, index):
+        self.array = array
+        self.index = index
+
+    @property
+    def position(self):
+        return common.Vector3(*self.array.position[self.index].tolist())
+
+    @position.setter
+    def position(self, value):
+        self.array.position[self.index] = value.to_tuple()
+
+    @property
+    def normal(self):
+        return common.Vector3(*self.array.normal[self.index].tolist())
+
+    @normal.setter
+    def normal(self, value):
+        self.array.normal[self.index] = value.to_tuple()
+
+    @property
+    def uv(self):
+        return common.Vector2(*self.array.uv[self.index].tolist())
+
+    @uv.setter
+    def uv(self, value):
+        self.array.uv[self.index] = value.to_tuple()
+
+    @property
+    def deform(self):
+        return self.array.get_deform(self.index)
+
+    @deform.setter
+    def deform(self, value):
+        self.array.set_deform(self.index, value)
+
+    @property
+    def edge_factor(self):
+        return self.array.edge_factor[self.index].item()
+
+    @edge_factor.setter
+    def edge_factor(self, value):
+        self.array.edge_factor[self.index] = value
+
+    __str__ = Vertex.__str__
+    __eq__ = Vertex.__eq__
+    __ne__ = Vertex.__ne__
+    diff = Vertex.diff
+
+
+class VertexArray(object):
+    """
+    ================
+    pmx vertex array
+    ================
+    columnar vertex storage. each attribute is a numpy array.
+    items are accessed as pmx.VertexView.
+
+    :IVariables:
+        position
+            float32 (n, 3)
+        normal
+            float32 (n, 3)
+        uv
+            float32 (n, 2)
+        edge_factor
+            float32 (n)
+        deform_type
+            int8 (n). DEFORM_BDEF1, DEFORM_BDEF2, DEFORM_BDEF4 or DEFORM_SDEF
+        bone_indices
+            int32 (n, 4). unused slot is -1
+        weights
+            float32 (n, 4). Bdef1 is (1, 0, 0, 0), Bdef2 and Sdef is (w0, 1-w0, 0, 0)
+        sdef
+            float32 (n, 3, 3). sdef_c, sdef_r0 and sdef_r1. zero if not Sdef
+    """
+    __slots__ = ['position', 'normal', 'uv', 'edge_factor',
+                 'deform_type', 'bone_indices', 'weights', 'sdef']
+
+    def __init__(self, count=0):
+        if not numpy:
+            raise ImportError("pmx.VertexArray requires numpy")
+        self.position = numpy.zeros((count, 3), numpy.float32)
+        self.normal = numpy.zeros((count, 3), numpy.float32)
+        self.uv = numpy.zeros((count, 2), numpy.float32)
+        self.edge_factor = numpy.zeros(count, numpy.float32)
+        self.deform_type = numpy.zeros(count, numpy.int8)
+        self.bone_indices = numpy.full((count, 4), -1, numpy.int32)
+        self.weights = numpy.zeros((count, 4), numpy.float32)
+        self.sdef = numpy.zeros((count, 3, 3), numpy.float32)
+
+    def __str__(self):
+        return "<pmx.VertexArray {0}>".format(len(self))
+
+    def __len__(self):
+        return len(self.deform_type)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [VertexView(self, i)
+                    for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if key < 0 or key >= len(self):
+            raise IndexError(key)
+        return VertexView(self, key)
+
+    def __setitem__(self, key, vertex):
+        self.position[key] = vertex.position.to_tuple()
+        self.normal[key] = vertex.normal.to_tuple()
+        self.uv[key] = vertex.uv.to_tuple()
+        self.edge_factor[key] = vertex.edge_factor
+        self.set_deform(key, vertex.deform)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield VertexView(self, i)
+
+    def get_deform(self, i):
+        t = self.deform_type[i]
+        b = self.bone_indices[i].tolist()
+        w = self.weights[i].tolist()
+        if t == DEFORM_BDEF1:
+            return Bdef1(b[0])
+        elif t == DEFORM_BDEF2:
+            return Bdef2(b[0], b[1], w[0])
+        elif t == DEFORM_BDEF4:
+            return Bdef4(b[0], b[1], b[2], b[3], w[0], w[1], w[2], w[3])
+        elif t == DEFORM_SDEF:
+            c, r0, r1 = self.sdef[i].tolist()
+            return Sdef(b[0], b[1], w[0],
+                        common.Vector3(*c),
+                        common.Vector3(*r0),
+                        common.Vector3(*r1))
+        else:
+            raise ValueError("unknown deform type: {0}".format(t))
+
+    def set_deform(self, i, d):
+        self.bone_indices[i] = -1
+        self.weights[i] = 0
+        self.sdef[i] = 0
+        if isinstance(d, Bdef1):
+            self.deform_type[i] = DEFORM_BDEF1
+            self.bone_indices[i, 0] = d.index0
+            self.weights[i, 0] = 1.0
+        elif isinstance(d, Bdef2):
+            self.deform_type[i] = DEFORM_BDEF2
+            self.bone_indices[i, :2] = (d.index0, d.index1)
+            self.weights[i, :2] = (d.weight0, 1.0 - d.weight0)
+        elif isinstance(d, Bdef4):
+            self.deform_type[i] = DEFORM_BDEF4
+            self.bone_indices[i] = (d.index0, d.index1, d.index2, d.index3)
+            self.weights[i] = (d.weight0, d.weight1, d.weight2, d.weight3)
+        elif isinstance(d, Sdef):
+            self.deform_type[i] = DEFORM_SDEF
+            self.bone_indices[i, :2] = (d.index0, d.index1)
+            self.weights[i, :2] = (d.weight0, 1.0 - d.weight0)
+            self.sdef[i] = (d.sdef_c.to_tuple(),
+                            d.sdef_r0.to_tuple(),
+                            d.sdef_r1.to_tuple())
+        else:
+            raise ValueError("unknown deform: {0}".format(d))
+
+    def to_vertices(self):
+        """
+        return a list of pmx.Vertex copied from the arrays.
+        """
+        # tolist() converts float32 to python float without loss
+        position = self.position.tolist()
+        normal = self.normal.tolist()
+        uv = self.uv.tolist()
+        edge_factor = self.edge_factor.tolist()
+        deform_type = self.deform_type.tolist()
+        bone_indices = self.bone_indices.tolist()
+        weights = self.weights.tolist()
+        sdef = self.sdef.tolist()
+        vertices = []
+        for i, t in enumerate(deform_type):
+            b = bone_indices[i]
+            w = weights[i]
+            if t == DEFORM_BDEF1:
+                deform = Bdef1(b[0])
+            elif t == DEFORM_BDEF2:
+                deform = Bdef2(b[0], b[1], w[0])
+            elif t == DEFORM_BDEF4:
+                deform = Bdef4(b[0], b[1], b[2], b[3], w[0], w[1], w[2], w[3])
+            elif t == DEFORM_SDEF:
+                c, r0, r1 = sdef[i]
+                deform = Sdef(b[0], b[1], w[0],
+                              common.Vector3(*c),
+                              common.Vector3(*r0),
+                              common.Vector3(*r1))
+            else:
+                raise ValueError("unknown deform type: {0}".format(t))
+            vertices.append(Vertex(
+                common.Vector3(*position[i]),
+                common.Vector3(*normal[i]),
+                common.Vector2(*uv[i]),
+                deform,
+                edge_factor[i]))
+        return vertices
+
+    def __eq__(self, rhs):
+        if len(self) != len(rhs):
+            return False
+        if isinstance(rhs, VertexArray):
+            return (
+                    numpy.array_equal(self.deform_type, rhs.deform_type)
+                    and numpy.array_equal(self.bone_indices, rhs.bone_indices)
+                    and numpy.allclose(self.weights, rhs.weights, rtol=0, atol=1e-5)
+                    and numpy.allclose(self.position, rhs.position, rtol=0, atol=11e-3)
+                    and numpy.allclose(self.normal, rhs.normal, rtol=0, atol=11e-3)
+                    and numpy.allclose(self.sdef, rhs.sdef, rtol=0, atol=11e-3)
+                    and numpy.array_equal(self.uv, rhs.uv)
+                    and numpy.array_equal(self.edge_factor, rhs.edge_factor)
+            )
+        return self.to_vertices() == list(rhs)
+
+    def __ne__(self, rhs):
+        return not self.__eq__(rhs)
+
+    @staticmethod
+    def from_vertices(vertices):
+        """
+        create VertexArray from a pmx.Vertex sequence.
+        """
+        if isinstance(vertices, VertexArray):
+            return vertices
+        array = VertexArray(len(vertices))
+        for i, v in enumerate(vertices):
+            array[i] = v
+        return array
+
+
 class Morph(common.Diff):
     """pmx morph
 
@@ -643,6 +896,108 @@ class VertexMorphOffset(common.Diff):
         self._diff(rhs, 'position_offset')
 
 
+class VertexMorphOffsetView(common.Diff):
+    """
+    pmx.VertexMorphOffset compatible view of a VertexMorphOffsetArray item.
+    """
+    __slots__ = ['array', 'index']
+
+    def __init__(self, array, index):
+        self.array = array
+        self.index = index
+
+    @property
+    def vertex_index(self):
+        return self.array.vertex_index[self.index].item()
+
+    @vertex_index.setter
+    def vertex_index(self, value):
+        self.array.vertex_index[self.index] = value
+
+    @property
+    def position_offset(self):
+        return common.Vector3(*self.array.position_offset[self.index].tolist())
+
+    @position_offset.setter
+    def position_offset(self, value):
+        self.array.position_offset[self.index] = value.to_tuple()
+
+    __eq__ = VertexMorphOffset.__eq__
+    __ne__ = VertexMorphOffset.__ne__
+    diff = VertexMorphOffset.diff
+
+
+class VertexMorphOffsetArray(object):
+    """pmx vertex morph offsets in columnar storage
+
+    Attributes:
+        vertex_index: int32 (n)
+        position_offset: float32 (n, 3)
+    """
+    __slots__ = [
+        'vertex_index',
+        'position_offset',
+    ]
+
+    def __init__(self, count=0):
+        if not numpy:
+            raise ImportError("pmx.VertexMorphOffsetArray requires numpy")
+        self.vertex_index = numpy.zeros(count, numpy.int32)
+        self.position_offset = numpy.zeros((count, 3), numpy.float32)
+
+    def __len__(self):
+        return len(self.vertex_index)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [VertexMorphOffsetView(self, i)
+                    for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if key < 0 or key >= len(self):
+            raise IndexError(key)
+        return VertexMorphOffsetView(self, key)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield VertexMorphOffsetView(self, i)
+
+    def to_offsets(self):
+        """
+        return a list of pmx.VertexMorphOffset copied from the arrays.
+        """
+        return [VertexMorphOffset(i, common.Vector3(*p))
+                for i, p in zip(self.vertex_index.tolist(),
+                                self.position_offset.tolist())]
+
+    def __eq__(self, rhs):
+        if len(self) != len(rhs):
+            return False
+        if isinstance(rhs, VertexMorphOffsetArray):
+            return (
+                    numpy.array_equal(self.vertex_index, rhs.vertex_index)
+                    and numpy.allclose(self.position_offset, rhs.position_offset,
+                                       rtol=0, atol=11e-3)
+            )
+        return self.to_offsets() == list(rhs)
+
+    def __ne__(self, rhs):
+        return not self.__eq__(rhs)
+
+    @staticmethod
+    def from_offsets(offsets):
+        """
+        create VertexMorphOffsetArray from a pmx.VertexMorphOffset sequence.
+        """
+        if isinstance(offsets, VertexMorphOffsetArray):
+            return offsets
+        array = VertexMorphOffsetArray(len(offsets))
+        for i, o in enumerate(offsets):
+            array.vertex_index[i] = o.vertex_index
+            array.position_offset[i] = o.position_offset.to_tuple()
+        return array
+
+
 class BoneMorphData(common.Diff):
     """pmx bone morph data
 
@@ -1051,6 +1406,12 @@ class Joint(common.Diff):
         self._diff(rhs, 'spring_constant_rotation')
 
 
+def _sequence_equal(lhs, rhs):
+    if numpy and (isinstance(lhs, numpy.ndarray) or isinstance(rhs, numpy.ndarray)):
+        return len(lhs) == len(rhs) and numpy.array_equal(lhs, rhs)
+    return lhs == rhs
+
+
 class Model(common.Diff):
     """
     ==========
@@ -1169,7 +1530,7 @@ class Model(common.Diff):
                 and self.comment == rhs.comment
                 and self.english_comment == rhs.english_comment
                 and self.vertices == rhs.vertices
-                and self.indices == rhs.indices
+                and _sequence_equal(self.indices, rhs.indices)
                 and self.textures == rhs.textures
                 and self.materials == rhs.materials
                 and self.bones == rhs.bones
@@ -1197,3 +1558,170 @@ class Model(common.Diff):
         self._diff_array(rhs, "display_slots")
         self._diff_array(rhs, "rigidbodies")
         self._diff_array(rhs, "joints")
+
+
+class ArrayModel(Model):
+    """
+    ================
+    pmx array model
+    ================
+
+    pmx.Model that keeps vertices, indices and vertex morph offsets
+    in numpy arrays.
+
+    :IVariables:
+        vertices
+            pmx.VertexArray
+        indices
+            int32 array
+        morphs
+            vertex morph offsets are pmx.VertexMorphOffsetArray
+    """
+    __slots__ = []
+
+    def __init__(self, *args, **kw):
+        super(ArrayModel, self).__init__(*args, **kw)
+        self.vertices = VertexArray()
+        self.indices = numpy.zeros(0, numpy.int32)
+
+    @staticmethod
+    def from_model(model):
+        """
+        create ArrayModel from pmx.Model.
+        vertices, indices and vertex morph offsets are converted to arrays,
+        other attributes are shared with model.
+        """
+        dst = ArrayModel(model.version, model.name, model.english_name,
+                         model.comment, model.english_comment)
+        dst.path = model.path
+        dst.vertices = VertexArray.from_vertices(model.vertices)
+        dst.indices = numpy.asarray(model.indices, numpy.int32)
+        dst.textures = model.textures
+        dst.materials = model.materials
+        dst.bones = model.bones
+        dst.morphs = []
+        for m in model.morphs:
+            if m.morph_type == 1:
+                m = Morph(m.name, m.english_name, m.panel, m.morph_type,
+                          VertexMorphOffsetArray.from_offsets(m.offsets))
+            dst.morphs.append(m)
+        dst.display_slots = model.display_slots
+        dst.rigidbodies = model.rigidbodies
+        dst.joints = model.joints
+        return dst
+
+    def to_model(self):
+        """
+        return pmx.Model that has python object lists.
+        """
+        dst = Model(self.version, self.name, self.english_name,
+                    self.comment, self.english_comment)
+        dst.path = self.path
+        dst.vertices = self.vertices.to_vertices()
+        dst.indices = self.indices.tolist()
+        dst.textures = self.textures
+        dst.materials = self.materials
+        dst.bones = self.bones
+        dst.morphs = []
+        for m in self.morphs:
+            if isinstance(m.offsets, VertexMorphOffsetArray):
+                m = Morph(m.name, m.english_name, m.panel, m.morph_type,
+                          m.offsets.to_offsets())
+            dst.morphs.append(m)
+        dst.display_slots = self.display_slots
+        dst.rigidbodies = self.rigidbodies
+        dst.joints = self.joints
+        return dst
+
+
+SECTIONS = (
+    'vertices',
+    'indices',
+    'textures',
+    'materials',
+    'bones',
+    'morphs',
+    'display_slots',
+    'rigidbodies',
+    'joints',
+)
+"""model attributes stored as counted sections, in file order"""
+
+
+class LazyModel(Model):
+    """
+    ===============
+    pmx lazy model
+    ===============
+
+    pmx.Model that decodes each section on the first access of its
+    attribute. created by pmx.reader.read(ios, lazy=True).
+    the input stream is used until every section is decoded or
+    close() is called.
+
+    :IVariables:
+        reader
+            section reader (pmx.reader.LazyReader). None after close()
+    """
+    __slots__ = ['reader']
+
+    def __init__(self, reader, *args, **kw):
+        super(LazyModel, self).__init__(*args, **kw)
+        for section in SECTIONS:
+            delattr(self, section)
+        self.reader = reader
+
+    def __getattr__(self, name):
+        # called only for unset slots
+        if name not in SECTIONS or self.reader is None:
+            raise AttributeError(name)
+        value = self.reader.read_section(name)
+        setattr(self, name, value)
+        if all(self.is_loaded(section) for section in SECTIONS):
+            self.close()
+        return value
+
+    def __str__(self):
+        return ('<pmx-{version} "{name}" {vertices}vertices>'.format(
+            version=self.version,
+            name=self.english_name,
+            vertices=self.count('vertices')
+        ))
+
+    def is_loaded(self, section):
+        """
+        return True if section is decoded.
+        """
+        try:
+            object.__getattribute__(self, section)
+            return True
+        except AttributeError:
+            return False
+
+    def count(self, section):
+        """
+        return the element count of section without decoding it.
+        """
+        if self.is_loaded(section):
+            return len(getattr(self, section))
+        return self.reader.counts[section]
+
+    def load(self):
+        """
+        decode all remaining sections, then release the input stream.
+        """
+        for section in SECTIONS:
+            getattr(self, section)
+        self.close()
+        return self
+
+    def close(self):
+        """
+        release the input stream. sections not decoded raise
+        AttributeError after this.
+        """
+        if self.reader is None:
+            return
+        reader = self.reader
+        self.reader = None
+        reader.close()
@@ -4,8 +4,36 @@ pmx reader
 """
 import io
 import os
+import struct
+from logging import getLogger
 from .. import common
 from .. import pmx
+from .. import profiling
+from . import schema
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = getLogger(__name__)
+
+
+# records per gather step in read_vertex_array
+GATHER_CHUNK = 65536
+
+
+def _gather(raw, offsets, start, dtype, width):
+    """
+    copy width elements of dtype at offsets+start for each offset.
+    """
+    dtype = numpy.dtype(dtype)
+    out = numpy.empty((len(offsets), width), dtype)
+    view = out.view(numpy.uint8).reshape(len(offsets), dtype.itemsize * width)
+    span = numpy.arange(start, start + dtype.itemsize * width)
+    for i in range(0, len(offsets), GATHER_CHUNK):
+        chunk = offsets[i:i + GATHER_CHUNK]
+        view[i:i + len(chunk)] = raw[chunk[:, None] + span]
+    return out
 
 
 class Reader(common.BinaryReader):
@@ -23,19 +51,28 @@ class Reader(common.BinaryReader):
                  rigidbody_index_size
                  ):
         super(Reader, self).__init__(ios)
+        self.vertex_index_size = vertex_index_size
+        self.bone_index_size = bone_index_size
         self.read_text = self.get_read_text(text_encoding)
         if extended_uv > 0:
             raise common.ParseException(
                 "extended uv is not supported", extended_uv)
-        if vertex_index_size <= 2:
-            self.read_vertex_index = lambda: self.read_uint(vertex_index_size)
-        else:
-            self.read_vertex_index = lambda: self.read_int(vertex_index_size)
-        self.read_texture_index = lambda: self.read_int(texture_index_size)
-        self.read_material_index = lambda: self.read_int(material_index_size)
-        self.read_bone_index = lambda: self.read_int(bone_index_size)
-        self.read_morph_index = lambda: self.read_int(morph_index_size)
-        self.read_rigidbody_index = lambda: self.read_int(rigidbody_index_size)
+        self.schema = schema.Schema(vertex_index_size,
+                                    texture_index_size,
+                                    material_index_size,
+                                    bone_index_size,
+                                    morph_index_size,
+                                    rigidbody_index_size)
+
+        def index_reader(s):
+            return lambda: self.unpack_struct(s)[0]
+
+        self.read_vertex_index = index_reader(self.schema.vertex_index)
+        self.read_texture_index = index_reader(self.schema.texture_index)
+        self.read_material_index = index_reader(self.schema.material_index)
+        self.read_bone_index = index_reader(self.schema.bone_index)
+        self.read_morph_index = index_reader(self.schema.morph_index)
+        self.read_rigidbody_index = index_reader(self.schema.rigidbody_index)
 
     def __str__(self):
         return '<pmx.Reader>'
@@ -54,288 +91,251 @@ class Reader(common.BinaryReader):
 
             return read_text
         else:
-            print("unknown text encoding", text_encoding)
+            logger.warning("unknown text encoding: %s", text_encoding)
 
     def read_vertex(self):
-        return pmx.Vertex(
-            self.read_vector3(),  # pos
-            self.read_vector3(),  # normal
-            self.read_vector2(),  # uv
-            self.read_deform(),  # deform(bone weight)
-            self.read_float()  # edge factor
-        )
-
-    def read_deform(self):
-        deform_type = self.read_int(1)
-        if deform_type == 0:
-            return pmx.Bdef1(self.read_bone_index())
-        elif deform_type == 1:
-            return pmx.Bdef2(
-                self.read_bone_index(),
-                self.read_bone_index(),
-                self.read_float()
-            )
-        elif deform_type == 2:
-            return pmx.Bdef4(
-                self.read_bone_index(),
-                self.read_bone_index(),
-                self.read_bone_index(),
-                self.read_bone_index(),
-                self.read_float(),
-                self.read_float(),
-                self.read_float(),
-                self.read_float()
-            )
-        elif deform_type == 3:
-            return pmx.Sdef(
-                self.read_bone_index(),
-                self.read_bone_index(),
-                self.read_float(),
-                self.read_vector3(),
-                self.read_vector3(),
-                self.read_vector3()
-            )
-        else:
-            raise common.ParseException(
-                "unknown deform type: {0}".format(deform_type))
+        return self.schema.records['vertex'].decode(self)
+
+    def _scan_vertices(self, data, count, offsets=None):
+        """
+        return the size of count vertex records at the head of data.
+        the offset of each record is stored to offsets if given.
+        """
+        record_sizes = [s.size for s in self.schema.vertices]
+        offset = self.schema.deform_type_offset
+        pos = 0
+        try:
+            if offsets is None:
+                for _ in range(count):
+                    pos += record_sizes[data[pos + offset]]
+            else:
+                for i in range(count):
+                    offsets[i] = pos
+                    pos += record_sizes[data[pos + offset]]
+        except IndexError:
+            if pos + offset < len(data):
+                raise common.ParseException(
+                    "unknown deform type: {0}".format(data[pos + offset]))
+            raise common.ParseException("unexpected end of vertices")
+        if pos > len(data):
+            raise common.ParseException("unexpected end of vertices")
+        return pos
+
+    def read_vertex_array(self, count):
+        """
+        read count vertices into pmx.VertexArray.
+
+        scan the variable length records once, then copy each attribute
+        by numpy fancy indexing.
+        """
+        if not numpy:
+            raise common.ParseException("read_vertex_array requires numpy")
+        start = self.tell()
+        data = self.peek()
+        bone_size = self.bone_index_size
+        bone_format = schema.INDEX_DTYPES[bone_size]
+        record_sizes = [s.size for s in self.schema.vertices]
+        offsets = [0] * count
+        pos = self._scan_vertices(data, count, offsets)
+        self.seek(start + pos)
+
+        raw = numpy.frombuffer(data, numpy.uint8, pos)
+        offsets = numpy.array(offsets, numpy.int64)
+        vertices = pmx.VertexArray(count)
+        if count == 0:
+            return vertices
+        head = _gather(raw, offsets, 0, '<f4', 8)
+        vertices.position[:] = head[:, 0:3]
+        vertices.normal[:] = head[:, 3:6]
+        vertices.uv[:] = head[:, 6:8]
+        deform_type = raw[offsets + 32].view(numpy.int8)
+        vertices.deform_type[:] = deform_type
+        sizes = numpy.array(record_sizes, numpy.int64)[deform_type]
+        vertices.edge_factor[:] = _gather(
+            raw, offsets + sizes - 4, 0, '<f4', 1)[:, 0]
+
+        # deform
+        def weight1(w0):
+            return (1.0 - w0.astype(numpy.float64)).astype(numpy.float32)
+
+        mask = deform_type == pmx.DEFORM_BDEF1
+        if mask.any():
+            o = offsets[mask]
+            vertices.bone_indices[mask, :1] = _gather(raw, o, 33, bone_format, 1)
+            vertices.weights[mask, 0] = 1.0
+        mask = deform_type == pmx.DEFORM_BDEF2
+        if mask.any():
+            o = offsets[mask]
+            vertices.bone_indices[mask, :2] = _gather(raw, o, 33, bone_format, 2)
+            w0 = _gather(raw, o, 33 + bone_size * 2, '<f4', 1)[:, 0]
+            vertices.weights[mask, 0] = w0
+            vertices.weights[mask, 1] = weight1(w0)
+        mask = deform_type == pmx.DEFORM_BDEF4
+        if mask.any():
+            o = offsets[mask]
+            vertices.bone_indices[mask] = _gather(raw, o, 33, bone_format, 4)
+            vertices.weights[mask] = _gather(
+                raw, o, 33 + bone_size * 4, '<f4', 4)
+        mask = deform_type == pmx.DEFORM_SDEF
+        if mask.any():
+            o = offsets[mask]
+            vertices.bone_indices[mask, :2] = _gather(raw, o, 33, bone_format, 2)
+            params = _gather(raw, o, 33 + bone_size * 2, '<f4', 10)
+            vertices.weights[mask, 0] = params[:, 0]
+            vertices.weights[mask, 1] = weight1(params[:, 0])
+            vertices.sdef[mask] = params[:, 1:].reshape(-1, 3, 3)
+        return vertices
+
+    def read_indices(self, count):
+        """
+        read count vertex indices into a list.
+        """
+        size = self.vertex_index_size
+        return list(self.unpack_struct(struct.Struct('<{0}{1}'.format(
+            count, schema.VERTEX_INDEX_FORMATS[size]))))
+
+    def read_index_array(self, count):
+        """
+        read count vertex indices into int32 array.
+        """
+        size = self.vertex_index_size
+        dtype = schema.VERTEX_INDEX_DTYPES[size]
+        return numpy.frombuffer(
+            self.read_bytes(size * count), dtype, count).astype(numpy.int32)
 
     def read_material(self):
-        material = pmx.Material(
-            name=self.read_text(),
-            english_name=self.read_text(),
-            diffuse_color=self.read_rgb(),
-            alpha=self.read_float(),
-            specular_color=self.read_rgb(),
-            specular_factor=self.read_float(),
-            ambient_color=self.read_rgb(),
-            flag=self.read_int(1),
-            edge_color=self.read_rgba(),
-            edge_size=self.read_float(),
-            texture_index=self.read_texture_index(),
-            sphere_texture_index=self.read_texture_index(),
-            sphere_mode=self.read_int(1),
-            toon_sharing_flag=self.read_int(1),
-        )
-        if material.toon_sharing_flag == 0:
-            material.toon_texture_index = self.read_texture_index()
-        elif material.toon_sharing_flag == 1:
-            material.toon_texture_index = self.read_int(1)
-        else:
-            raise common.ParseException(
-                "unknown toon_sharing_flag {0}".format(
-                    material.toon_sharing_flag))
-        material.comment = self.read_text()
-        material.vertex_count = self.read_int(4)
-        return material
+        return self.schema.records['material'].decode(self)
 
     def read_bone(self):
-        bone = pmx.Bone(
-            name=self.read_text(),
-            english_name=self.read_text(),
-            position=self.read_vector3(),
-            parent_index=self.read_bone_index(),
-            layer=self.read_int(4),
-            flag=self.read_int(2)
-        )
-        if not bone.getConnectionFlag():
-            bone.tail_position = self.read_vector3()
-        elif bone.getConnectionFlag():
-            bone.tail_index = self.read_bone_index()
-        else:
-            raise common.ParseException(
-                "unknown bone conenction flag: {0}".format(
-                    bone.getConnectionFlag()))
+        return self.schema.records['bone'].decode(self)
 
-        if bone.getExternalRotationFlag() or bone.getExternalTranslationFlag():
-            bone.effect_index = self.read_bone_index()
-            bone.effect_factor = self.read_float()
+    def read_ik(self):
+        return self.schema.records['ik'].decode(self)
 
-        if bone.getFixedAxisFlag():
-            bone.fixed_axis = self.read_vector3()
+    def read_morgh(self, arrays=False):
+        records = self.schema.arrays if arrays else self.schema.records
+        return records['morph'].decode(self)
 
-        if bone.getLocalCoordinateFlag():
-            bone.local_x_vector = self.read_vector3()
-            bone.local_z_vector = self.read_vector3()
+    def read_display_slot(self):
+        return self.schema.records['display_slot'].decode(self)
 
-        if bone.getExternalParentDeformFlag():
-            bone.external_key = self.read_int(4)
+    def read_rigidbody(self):
+        return self.schema.records['rigidbody'].decode(self)
 
-        if bone.getIkFlag():
-            bone.ik = self.read_ik()
+    def read_joint(self):
+        return self.schema.records['joint'].decode(self)
+
+    def read_section(self, section, count, arrays=False):
+        """
+        read count elements of section(one of pmx.SECTIONS).
+        """
+        if section == 'vertices' and arrays:
+            return self.read_vertex_array(count)
+        elif section == 'indices':
+            if arrays:
+                return self.read_index_array(count)
+            return self.read_indices(count)
+        elif section == 'textures':
+            return [self.read_text() for _ in range(count)]
+        try:
+            record = schema.SECTION_RECORDS[section]
+        except KeyError:
+            raise common.ParseException(
+                "unknown section: {0}".format(section))
+        records = self.schema.arrays if arrays else self.schema.records
+        decode = records[record].decode
+        return [decode(self) for _ in range(count)]
 
-        return bone
 
-    def read_ik(self):
-        ik = pmx.Ik(
-            target_index=self.read_bone_index(),
-            loop=self.read_int(4),
-            limit_radian=self.read_float())
-        link_size = self.read_int(4)
-        ik.link = [self.read_ik_link()
-                   for _ in range(link_size)]
-        return ik
-
-    def read_ik_link(self):
-        link = pmx.IkLink(
-            self.read_bone_index(),
-            self.read_int(1))
-        if link.limit_angle == 0:
-            pass
-        elif link.limit_angle == 1:
-            link.limit_min = self.read_vector3()
-            link.limit_max = self.read_vector3()
-        else:
-            raise common.ParseException(
-                "invalid ik link limit_angle: {0}".format(
-                    link.limit_angle))
-        return link
-
-    def read_morgh(self):
-        name = self.read_text()
-        english_name = self.read_text()
-        panel = self.read_int(1)
-        morph_type = self.read_int(1)
-        offset_size = self.read_int(4)
-        morph = pmx.Morph(name, english_name,
-                          panel, morph_type)
-        if morph_type == 0:
-            # group
-            morph.offsets = [self.read_group_morph_data()
-                             for _ in range(offset_size)]
-        elif morph_type == 1:
-            # vertex
-            morph.offsets = [self.read_vertex_position_morph_offset()
-                             for _ in range(offset_size)]
-        elif morph_type == 2:
-            # bone
-            morph.offsets = [self.read_bone_morph_data()
-                             for _ in range(offset_size)]
-        elif morph_type == 3:
-            # uv
-            morph.offsets = [self.read_uv_morph_data()
-                             for _ in range(offset_size)]
-        elif morph_type == 4:
-            # uv extended1
-            morph.offsets = [self.read_uv_morph_data()
-                             for _ in range(offset_size)]
-        elif morph_type == 5:
-            # uv extended2
-            morph.offsets = [self.read_uv_morph_data()
-                             for _ in range(offset_size)]
-        elif morph_type == 6:
-            # uv extended3
-            morph.offsets = [self.read_uv_morph_data()
-                             for _ in range(offset_size)]
-        elif morph_type == 7:
-            # uv extended4
-            morph.offsets = [self.read_uv_morph_data()
-                             for _ in range(offset_size)]
-        elif morph_type == 8:
-            # material
-            morph.data = [self.read_material_morph_data()
-                          for _ in range(offset_size)]
-        else:
-            raise common.ParseException(
-                "unknown morph type: {0}".format(morph_type))
-        return morph
-
-    def read_group_morph_data(self):
-        return pmx.GroupMorphData(
-            self.read_morph_index(),
-            self.read_float()
-        )
-
-    def read_vertex_position_morph_offset(self):
-        return pmx.VertexMorphOffset(
-            self.read_vertex_index(), self.read_vector3())
-
-    def read_bone_morph_data(self):
-        return pmx.BoneMorphData(
-            self.read_bone_index(),
-            self.read_vector3(),
-            self.read_quaternion()
-        )
-
-    def read_uv_morph_data(self):
-        return pmx.UVMorphData(
-            self.read_vertex_index(),
-            self.read_vector4(),
-        )
-
-    def read_material_morph_data(self):
-        return pmx.MaterialMorphData(
-            self.read_material_index(),
-            self.read_int(1),
-            self.read_rgba(),
-            self.read_rgb(), self.read_float(),
-            self.read_rgb(),
-            self.read_rgba(),
-            self.read_float(),
-            self.read_rgba(),
-            self.read_rgba(),
-            self.read_rgba()
-        )
+class LazyReader(Reader):
+    """
+    locate every pmx section in one pass, then decode sections on demand.
+
+    the pass unpacks only text lengths, counts and the fields later
+    fields depend on, by the skip functions of pmx.schema.
+
+    :IVariables:
+        arrays
+            decode vertices, indices and vertex morph offsets into arrays
+        offsets
+            section name to the offset of its first element
+        counts
+            section name to its element count
+        owner
+            if True, close() closes the input stream
+    """
 
-    def read_display_slot(self):
-        display_slot = pmx.DisplaySlot(self.read_text(), self.read_text(),
-                                       self.read_int(1))
-        display_count = self.read_int(4)
-        for _ in range(display_count):
-            display_type = self.read_int(1)
-            if display_type == 0:
-                display_slot.references.append(
-                    (display_type, self.read_bone_index()))
-            elif display_type == 1:
-                display_slot.references.append(
-                    (display_type, self.read_morph_index()))
-            else:
+    def __init__(self, ios, *args):
+        super(LazyReader, self).__init__(ios, *args)
+        self.arrays = False
+        self.owner = False
+        self.offsets = {}
+        self.counts = {}
+
+    def __str__(self):
+        return '<pmx.LazyReader>'
+
+    def scan(self):
+        """
+        record offsets and counts of all sections from the current position,
+        which is just after the model info.
+        """
+        for section in pmx.SECTIONS:
+            count = self.read_int(4)
+            self.offsets[section] = self.tell()
+            self.counts[section] = count
+            self.skip_section(section, count)
+            if self.tell() > self.end:
                 raise common.ParseException(
-                    "unknown display_type: {0}".format(display_type))
-        return display_slot
+                    "unexpected end of {0}".format(section))
+
+    def skip_section(self, section, count):
+        """
+        step over count elements of section(one of pmx.SECTIONS).
+        """
+        if section == 'vertices':
+            self.skip(self._scan_vertices(self.peek(), count))
+        elif section == 'indices':
+            self.skip(self.schema.vertex_index.size * count)
+        elif section == 'textures':
+            for _ in range(count):
+                self.skip_text()
+        else:
+            skip = self.schema.records[schema.SECTION_RECORDS[section]].skip
+            for _ in range(count):
+                skip(self)
 
-    def read_rigidbody(self):
-        return pmx.RigidBody(
-            name=self.read_text(),
-            english_name=self.read_text(),
-            bone_index=self.read_bone_index(),
-            collision_group=self.read_int(1),
-            no_collision_group=self.read_int(2),
-            shape_type=self.read_int(1),
-            shape_size=self.read_vector3(),
-            shape_position=self.read_vector3(),
-            shape_rotation=self.read_vector3(),
-            mass=self.read_float(),
-            linear_damping=self.read_float(),
-            angular_damping=self.read_float(),
-            restitution=self.read_float(),
-            friction=self.read_float(),
-            mode=self.read_int(1)
-        )
+    def skip_text(self):
+        self.skip(self.read_int(4))
 
-    def read_joint(self):
-        return pmx.Joint(
-            name=self.read_text(),
-            english_name=self.read_text(),
-            joint_type=self.read_int(1),
-            rigidbody_index_a=self.read_rigidbody_index(),
-            rigidbody_index_b=self.read_rigidbody_index(),
-            position=self.read_vector3(),
-            rotation=self.read_vector3(),
-            translation_limit_min=self.read_vector3(),
-            translation_limit_max=self.read_vector3(),
-            rotation_limit_min=self.read_vector3(),
-            rotation_limit_max=self.read_vector3(),
-            spring_constant_translation=self.read_vector3(),
-            spring_constant_rotation=self.read_vector3())
-
-
-def read_from_file(path):
+    def read_section(self, section):
+        """
+        decode section(one of pmx.SECTIONS).
+        """
+        self.seek(self.offsets[section])
+        return super(LazyReader, self).read_section(
+            section, self.counts[section], self.arrays)
+
+    def close(self):
+        if self.owner:
+            self.ios.close()
+        self.ios = None
+
+
+def read_from_file(path, arrays=False, lazy=False, profile=None):
     """
     read from file path, then return the pmx.Model.
 
     :Parameters:
       path
         file path
+      arrays
+        if True, return pmx.ArrayModel(requires numpy)
+      lazy
+        if True, return pmx.LazyModel. the file stays mapped until
+        every section is decoded or the model is closed
+      profile
+        pymeshio.profiling.Profile to record the sections in
 
     >>> import pmx.reader
     >>> m=pmx.reader.read_from_file('resources/初音ミクVer2.pmx')
@@ -344,46 +344,52 @@ def read_from_file(path):
 
     """
     if not os.path.exists(path):
-        print("{0} is not exist !".format(path))
+        logger.error("%s is not exist !", path)
         return
-    pmx = read(io.BytesIO(common.readall(path)))
+    if lazy:
+        ios = common.open_mapped(path)
+        try:
+            pmx = read(ios, arrays, lazy, profile)
+        except:
+            ios.close()
+            raise
+        pmx.reader.owner = True
+    else:
+        with common.open_mapped(path) as ios:
+            pmx = read(ios, arrays, profile=profile)
     pmx.path = path
     return pmx
 
 
-def read(ios):
+def read_header(ios, reader_class=Reader):
     """
-    read from ios, then return the pmx pmx.Model.
+    read the header from ios.
 
     :Parameters:
       ios
         input stream (in io.IOBase)
+      reader_class
+        Reader or its subclass to read the rest
 
-    >>> import pmx.reader
-    >>> m=pmx.reader.read(io.open('resources/初音ミクVer2.pmx', 'rb'))
-    >>> print(m)
-    <pmx-2.0 "Miku Hatsune" 12354vertices>
-
+    :return: (version, reader)
     """
-    assert (isinstance(ios, io.IOBase))
     reader = common.BinaryReader(ios)
 
     # header
     signature = reader.unpack("4s", 4)
     if signature != b"PMX ":
         raise common.ParseException(
-            "invalid signature", signature)
+            "invalid signature: {0}".format(signature))
 
     version = reader.read_float()
     if version != 2.0:
-        print("unknown version", version)
-    model = pmx.Model(version)
+        logger.warning("unknown version: %s", version)
 
     # flags
     flag_bytes = reader.read_int(1)
     if flag_bytes != 8:
         raise common.ParseException(
-            "invalid flag length", reader.flag_bytes)
+            "invalid flag length: {0}".format(flag_bytes))
     text_encoding = reader.read_int(1)
     extended_uv = reader.read_int(1)
     vertex_index_size = reader.read_int(1)
@@ -394,41 +400,81 @@ def read(ios):
     rigidbody_index_size = reader.read_int(1)
 
     # pmx custom reader
-    reader = Reader(reader.ios,
-                    text_encoding,
-                    extended_uv,
-                    vertex_index_size,
-                    texture_index_size,
-                    material_index_size,
-                    bone_index_size,
-                    morph_index_size,
-                    rigidbody_index_size
-                    )
-
-    # model info
-    model.name = reader.read_text()
-    model.english_name = reader.read_text()
-    model.comment = reader.read_text()
-    model.english_comment = reader.read_text()
+    return version, reader_class(reader.ios,
+                                 text_encoding,
+                                 extended_uv,
+                                 vertex_index_size,
+                                 texture_index_size,
+                                 material_index_size,
+                                 bone_index_size,
+                                 morph_index_size,
+                                 rigidbody_index_size
+                                 )
+
+
+def read(ios, arrays=False, lazy=False, profile=None):
+    """
+    read from ios, then return the pmx pmx.Model.
+
+    :Parameters:
+      ios
+        input stream (in io.IOBase)
+      arrays
+        if True, return pmx.ArrayModel(requires numpy)
+      lazy
+        if True, locate the sections in one pass, then return
+        pmx.LazyModel that decodes each section on first access.
+        ios must stay open until then
+      profile
+        pymeshio.profiling.Profile to record the header, each section
+        and the nested text decoding in. the lazy scan is one section
+
+    >>> import pmx.reader
+    >>> m=pmx.reader.read(io.open('resources/初音ミクVer2.pmx', 'rb'))
+    >>> print(m)
+    <pmx-2.0 "Miku Hatsune" 12354vertices>
+
+    """
+    assert (isinstance(ios, io.IOBase))
+    if arrays and not numpy:
+        raise common.ParseException("arrays=True requires numpy")
+    if profile is None:
+        profile = profiling.NULL
+    profile.begin('pmx')
+    try:
+        return _read(ios, arrays, lazy, profile)
+    finally:
+        profile.end()
+
+
+def _read(ios, arrays, lazy, profile):
+    with profile.section('header', ios) as scope:
+        version, reader = read_header(ios, LazyReader if lazy else Reader)
+        reader.read_text = profile.timed('text', reader.read_text)
+
+        # model info
+        info = (reader.read_text(),
+                reader.read_text(),
+                reader.read_text(),
+                reader.read_text())
+        scope.count = 1
+
+    if lazy:
+        reader.arrays = arrays
+        with profile.section('scan', ios):
+            reader.scan()
+        return pmx.LazyModel(reader, version, *info)
+
+    if arrays:
+        model = pmx.ArrayModel(version, *info)
+    else:
+        model = pmx.Model(version, *info)
 
     # model data
-    model.vertices = [reader.read_vertex()
-                      for _ in range(reader.read_int(4))]
-    model.indices = [reader.read_vertex_index()
-                     for _ in range(reader.read_int(4))]
-    model.textures = [reader.read_text()
-                      for _ in range(reader.read_int(4))]
-    model.materials = [reader.read_material()
-                       for _ in range(reader.read_int(4))]
-    model.bones = [reader.read_bone()
-                   for _ in range(reader.read_int(4))]
-    model.morphs = [reader.read_morgh()
-                    for _ in range(reader.read_int(4))]
-    model.display_slots = [reader.read_display_slot()
-                           for _ in range(reader.read_int(4))]
-    model.rigidbodies = [reader.read_rigidbody()
-                         for _ in range(reader.read_int(4))]
-    model.joints = [reader.read_joint()
-                    for _ in range(reader.read_int(4))]
+    for section in pmx.SECTIONS:
+        with profile.section(section, ios) as scope:
+            scope.count = reader.read_int(4)
+            setattr(model, section,
+                    reader.read_section(section, scope.count, arrays))
 
     return model
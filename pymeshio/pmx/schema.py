@@ -0,0 +1,408 @@
+# coding: utf-8
+"""
+pmx record layouts
+
+Every pmx record is declared once below with pymeshio.layout. Index widths
+vary per file, so Schema compiles the layouts for the header's index sizes
+into decode, encode and skip functions, shared by pmx.reader, pmx.writer
+and the lazy scan. Compiled codecs are cached per set of index sizes.
+"""
+import struct
+from .. import common
+from .. import layout
+from .. import pmx
+from ..layout import Field, List, Record, Switch, When
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+INDEX_FORMATS = {1: 'b', 2: 'h', 4: 'i'}
+VERTEX_INDEX_FORMATS = {1: 'B', 2: 'H', 4: 'i'}
+# numpy dtypes of the same indices
+INDEX_DTYPES = {1: '<i1', 2: '<i2', 4: '<i4'}
+VERTEX_INDEX_DTYPES = {1: '<u1', 2: '<u2', 4: '<i4'}
+
+I8 = layout.Scalar('b')
+I16 = layout.Scalar('h')
+I32 = layout.Scalar('i')
+F32 = layout.Scalar('f')
+VECTOR2 = layout.Vector(common.Vector2, ('x', 'y'))
+VECTOR3 = layout.Vector(common.Vector3, ('x', 'y', 'z'))
+VECTOR4 = layout.Vector(common.Vector4, ('x', 'y', 'z', 'w'))
+QUATERNION = layout.Vector(common.Quaternion, ('x', 'y', 'z', 'w'))
+RGB = layout.Vector(common.RGB, ('r', 'g', 'b'))
+RGBA = layout.Vector(common.RGBA, ('r', 'g', 'b', 'a'))
+TEXT = layout.Text()
+VERTEX_INDEX = layout.Index('vertex')
+TEXTURE_INDEX = layout.Index('texture')
+MATERIAL_INDEX = layout.Index('material')
+BONE_INDEX = layout.Index('bone')
+MORPH_INDEX = layout.Index('morph')
+RIGIDBODY_INDEX = layout.Index('rigidbody')
+
+NAMES = (Field('name', TEXT), Field('english_name', TEXT))
+
+
+############################################################
+# vertex
+############################################################
+DEFORMS = {
+    pmx.DEFORM_BDEF1: Record(
+        pmx.Bdef1,
+        Field('index0', BONE_INDEX)),
+    pmx.DEFORM_BDEF2: Record(
+        pmx.Bdef2,
+        Field('index0', BONE_INDEX),
+        Field('index1', BONE_INDEX),
+        Field('weight0', F32)),
+    pmx.DEFORM_BDEF4: Record(
+        pmx.Bdef4,
+        Field('index0', BONE_INDEX),
+        Field('index1', BONE_INDEX),
+        Field('index2', BONE_INDEX),
+        Field('index3', BONE_INDEX),
+        Field('weight0', F32),
+        Field('weight1', F32),
+        Field('weight2', F32),
+        Field('weight3', F32)),
+    pmx.DEFORM_SDEF: Record(
+        pmx.Sdef,
+        Field('index0', BONE_INDEX),
+        Field('index1', BONE_INDEX),
+        Field('weight0', F32),
+        Field('sdef_c', VECTOR3),
+        Field('sdef_r0', VECTOR3),
+        Field('sdef_r1', VECTOR3)),
+}
+DEFORM_TYPES = dict((r.build, t) for t, r in DEFORMS.items())
+
+
+def deform_type(vertex):
+    try:
+        return DEFORM_TYPES[type(vertex.deform)]
+    except KeyError:
+        raise common.WriteException(
+            "unknown deform type: {0}".format(type(vertex.deform)))
+
+
+VERTEX_HEAD = (
+    Field('position', VECTOR3),
+    Field('normal', VECTOR3),
+    Field('uv', VECTOR2),
+    Field('deform_type', I8, deform_type, hidden=True),
+)
+
+VERTEX = Record(
+    pmx.Vertex,
+    *VERTEX_HEAD,
+    Switch('deform_type', dict(
+        (t, [Field('deform', r)]) for t, r in DEFORMS.items())),
+    Field('edge_factor', F32))
+
+
+############################################################
+# material
+############################################################
+MATERIAL = Record(
+    pmx.Material,
+    *NAMES,
+    Field('diffuse_color', RGB),
+    Field('alpha', F32),
+    Field('specular_color', RGB),
+    Field('specular_factor', F32),
+    Field('ambient_color', RGB),
+    Field('flag', I8),
+    Field('edge_color', RGBA),
+    Field('edge_size', F32),
+    Field('texture_index', TEXTURE_INDEX),
+    Field('sphere_texture_index', TEXTURE_INDEX),
+    Field('sphere_mode', I8),
+    Field('toon_sharing_flag', I8),
+    Switch('toon_sharing_flag', {
+        0: [Field('toon_texture_index', TEXTURE_INDEX)],
+        1: [Field('toon_texture_index', I8)],
+    }),
+    Field('comment', TEXT),
+    Field('vertex_count', I32))
+
+
+############################################################
+# bone
+############################################################
+IK_LINK = Record(
+    pmx.IkLink,
+    Field('bone_index', BONE_INDEX),
+    Field('limit_angle', I8),
+    Switch('limit_angle', {
+        0: [],
+        1: [Field('limit_min', VECTOR3), Field('limit_max', VECTOR3)],
+    }))
+
+IK = Record(
+    pmx.Ik,
+    Field('target_index', BONE_INDEX),
+    Field('loop', I32),
+    Field('limit_radian', F32),
+    Field('link', List(I32, IK_LINK)))
+
+BONE = Record(
+    pmx.Bone,
+    *NAMES,
+    Field('position', VECTOR3),
+    Field('parent_index', BONE_INDEX),
+    Field('layer', I32),
+    Field('flag', I16),
+    When(lambda flag: flag & pmx.BONEFLAG_TAILPOS_IS_BONE,
+         [Field('tail_index', BONE_INDEX)],
+         [Field('tail_position', VECTOR3)]),
+    When(lambda flag: flag & (pmx.BONEFLAG_IS_EXTERNAL_ROTATION
+                              | pmx.BONEFLAG_IS_EXTERNAL_TRANSLATION),
+         [Field('effect_index', BONE_INDEX), Field('effect_factor', F32)]),
+    When(lambda flag: flag & pmx.BONEFLAG_HAS_FIXED_AXIS,
+         [Field('fixed_axis', VECTOR3)]),
+    When(lambda flag: flag & pmx.BONEFLAG_HAS_LOCAL_COORDINATE,
+         [Field('local_x_vector', VECTOR3), Field('local_z_vector', VECTOR3)]),
+    When(lambda flag: flag & pmx.BONEFLAG_IS_EXTERNAL_PARENT_DEFORM,
+         [Field('external_key', I32)]),
+    When(lambda flag: flag & pmx.BONEFLAG_IS_IK,
+         [Field('ik', IK)]))
+
+
+############################################################
+# morph
+############################################################
+GROUP_MORPH_OFFSET = Record(
+    pmx.GroupMorphData,
+    Field('morph_index', MORPH_INDEX),
+    Field('value', F32))
+
+VERTEX_MORPH_OFFSET = Record(
+    pmx.VertexMorphOffset,
+    Field('vertex_index', VERTEX_INDEX),
+    Field('position_offset', VECTOR3))
+
+BONE_MORPH_OFFSET = Record(
+    pmx.BoneMorphData,
+    Field('bone_index', BONE_INDEX),
+    Field('position', VECTOR3),
+    Field('rotation', QUATERNION))
+
+UV_MORPH_OFFSET = Record(
+    pmx.UVMorphData,
+    Field('vertex_index', VERTEX_INDEX),
+    Field('uv', VECTOR4))
+
+MATERIAL_MORPH_OFFSET = Record(
+    pmx.MaterialMorphData,
+    Field('material_index', MATERIAL_INDEX),
+    Field('calc_mode', I8),
+    Field('diffuse', RGBA),
+    Field('specular', RGB),
+    Field('specular_factor', F32),
+    Field('ambient', RGB),
+    Field('edge_color', RGBA),
+    Field('edge_size', F32),
+    Field('texture_factor', RGBA),
+    Field('sphere_texture_factor', RGBA),
+    Field('toon_texture_factor', RGBA))
+
+
+def _load_vertex_morph_offsets(records):
+    offsets = pmx.VertexMorphOffsetArray(len(records))
+    offsets.vertex_index[:] = records['vertex_index']
+    offsets.position_offset[:] = records['position_offset']
+    return offsets
+
+
+def _dump_vertex_morph_offsets(offsets, dtype):
+    records = numpy.empty(len(offsets), dtype)
+    records['vertex_index'] = offsets.vertex_index
+    records['position_offset'] = offsets.position_offset
+    return records.tobytes()
+
+
+VERTEX_MORPH_OFFSETS = layout.Bulk(
+    pmx.VertexMorphOffsetArray,
+    _load_vertex_morph_offsets, _dump_vertex_morph_offsets)
+
+MORPH_OFFSETS = {
+    0: GROUP_MORPH_OFFSET,
+    1: VERTEX_MORPH_OFFSET,
+    2: BONE_MORPH_OFFSET,
+    # uv and extended uv1-4
+    3: UV_MORPH_OFFSET,
+    4: UV_MORPH_OFFSET,
+    5: UV_MORPH_OFFSET,
+    6: UV_MORPH_OFFSET,
+    7: UV_MORPH_OFFSET,
+    8: MATERIAL_MORPH_OFFSET,
+}
+
+MORPH = Record(
+    pmx.Morph,
+    *NAMES,
+    Field('panel', I8),
+    Field('morph_type', I8),
+    Field('offset_count', I32, 'len({0}.offsets)', hidden=True),
+    Switch('morph_type', dict(
+        (t, [Field('offsets', List(
+            'offset_count', r,
+            VERTEX_MORPH_OFFSETS if r is VERTEX_MORPH_OFFSET else None))])
+        for t, r in MORPH_OFFSETS.items())))
+
+
+############################################################
+# display slot, rigidbody and joint
+############################################################
+DISPLAY_REFERENCE = Record(
+    None,
+    Field('display_type', I8, '{0}[0]'),
+    Switch('display_type', {
+        0: [Field('index', BONE_INDEX, '{0}[1]')],
+        1: [Field('index', MORPH_INDEX, '{0}[1]')],
+    }))
+
+DISPLAY_SLOT = Record(
+    pmx.DisplaySlot,
+    *NAMES,
+    Field('special_flag', I8),
+    Field('references', List(I32, DISPLAY_REFERENCE)))
+
+RIGIDBODY = Record(
+    pmx.RigidBody,
+    *NAMES,
+    Field('bone_index', BONE_INDEX),
+    Field('collision_group', I8),
+    Field('no_collision_group', I16),
+    Field('shape_type', I8),
+    Field('shape_size', VECTOR3),
+    Field('shape_position', VECTOR3),
+    Field('shape_rotation', VECTOR3),
+    Field('mass', F32, '{0}.param.mass'),
+    Field('linear_damping', F32, '{0}.param.linear_damping'),
+    Field('angular_damping', F32, '{0}.param.angular_damping'),
+    Field('restitution', F32, '{0}.param.restitution'),
+    Field('friction', F32, '{0}.param.friction'),
+    Field('mode', I8))
+
+JOINT = Record(
+    pmx.Joint,
+    *NAMES,
+    Field('joint_type', I8),
+    Field('rigidbody_index_a', RIGIDBODY_INDEX),
+    Field('rigidbody_index_b', RIGIDBODY_INDEX),
+    Field('position', VECTOR3),
+    Field('rotation', VECTOR3),
+    Field('translation_limit_min', VECTOR3),
+    Field('translation_limit_max', VECTOR3),
+    Field('rotation_limit_min', VECTOR3),
+    Field('rotation_limit_max', VECTOR3),
+    Field('spring_constant_translation', VECTOR3),
+    Field('spring_constant_rotation', VECTOR3))
+
+RECORDS = {
+    'vertex': VERTEX,
+    'material': MATERIAL,
+    'bone': BONE,
+    'ik': IK,
+    'morph': MORPH,
+    'display_slot': DISPLAY_SLOT,
+    'rigidbody': RIGIDBODY,
+    'joint': JOINT,
+    'vertex_morph_offset': VERTEX_MORPH_OFFSET,
+}
+"""record name to layout. Schema compiles each into a pymeshio.layout.Codec"""
+
+SECTION_RECORDS = {
+    'vertices': 'vertex',
+    'materials': 'material',
+    'bones': 'bone',
+    'morphs': 'morph',
+    'display_slots': 'display_slot',
+    'rigidbodies': 'rigidbody',
+    'joints': 'joint',
+}
+"""pmx.SECTIONS made of RECORDS"""
+
+
+class Schema(object):
+    """
+    compiled records for one set of index sizes.
+
+    Attributes:
+        sizes: index kind to struct format code
+        records: RECORDS name to pymeshio.layout.Codec
+        arrays: codecs that decode vertex morph offsets into
+            pmx.VertexMorphOffsetArray(requires numpy)
+        vertex_index: struct of a vertex index(unsigned if size <= 2)
+        texture_index, material_index, bone_index, morph_index,
+        rigidbody_index: struct of each index(signed)
+        vertices: whole vertex record struct of each deform type
+            (Bdef1, Bdef2, Bdef4, Sdef)
+        deform_type_offset: offset of deform_type in a vertex record
+        vertex_morph_offset: vertex index and position offset
+        material: after names, up to toon_sharing_flag
+        rigidbody: after names
+        joint: after names
+    """
+    __slots__ = [
+        'sizes',
+        'records',
+        'arrays',
+        'vertex_index',
+        'texture_index',
+        'material_index',
+        'bone_index',
+        'morph_index',
+        'rigidbody_index',
+        'vertices',
+        'deform_type_offset',
+        'vertex_morph_offset',
+        'material',
+        'rigidbody',
+        'joint',
+    ]
+
+    def __init__(self,
+                 vertex_index_size,
+                 texture_index_size,
+                 material_index_size,
+                 bone_index_size,
+                 morph_index_size,
+                 rigidbody_index_size):
+        try:
+            self.sizes = {
+                'vertex': VERTEX_INDEX_FORMATS[vertex_index_size],
+                'texture': INDEX_FORMATS[texture_index_size],
+                'material': INDEX_FORMATS[material_index_size],
+                'bone': INDEX_FORMATS[bone_index_size],
+                'morph': INDEX_FORMATS[morph_index_size],
+                'rigidbody': INDEX_FORMATS[rigidbody_index_size],
+            }
+        except KeyError as e:
+            raise common.ParseException(
+                "invalid index size: {0}".format(e.args[0]))
+        for kind in ('vertex', 'texture', 'material', 'bone', 'morph',
+                     'rigidbody'):
+            setattr(self, kind + '_index',
+                    struct.Struct('<' + self.sizes[kind]))
+        self.records = dict((name, layout.compile(record, self.sizes))
+                            for name, record in RECORDS.items())
+        self.arrays = dict(self.records)
+        if numpy:
+            self.arrays['morph'] = layout.compile(MORPH, self.sizes, True)
+        self.vertices = tuple(
+            struct.Struct('<' + Record(
+                None, *VERTEX_HEAD + (Field('deform', DEFORMS[t]),
+                                      Field('edge_factor', F32))
+            ).fmt(self.sizes))
+            for t in sorted(DEFORMS))
+        self.deform_type_offset = struct.calcsize(
+            '<' + Record(None, *VERTEX_HEAD[:-1]).fmt(self.sizes))
+        self.vertex_morph_offset = self.records['vertex_morph_offset'].struct
+        # the first fused run after the names
+        self.material = self.records['material'].structs[0]
+        self.rigidbody = self.records['rigidbody'].structs[0]
+        self.joint = self.records['joint'].structs[0]
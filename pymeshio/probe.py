@@ -0,0 +1,241 @@
+# coding: utf-8
+"""
+header only probe of pmd, pmx and vmd files
+
+report name, version, index sizes and section counts without decoding
+the records. fixed size records are stepped over with seeks, variable
+length records are read only as far as their sizes require.
+
+>>> import pymeshio.probe
+>>> info = pymeshio.probe.probe_file('resources/初音ミクVer2.pmx')
+>>> print(info)
+resources/初音ミクVer2.pmx: pmx 2.0 "初音ミク" vertices=12354 indices=68883 ...
+>>> info.count('bones')
+140
+"""
+import os
+from . import common
+from . import pmx
+from .pmd import reader as pmd_reader
+from .pmd import schema as pmd_schema
+from .pmx import reader as pmx_reader
+from .vmd import reader as vmd_reader
+
+
+EXTENSIONS = ('.pmd', '.pmx', '.vmd')
+"""file extensions probe_file knows"""
+
+
+class Info(object):
+    """
+    probe result of a file.
+
+    :IVariables:
+        path
+            file path. empty for a stream
+        format
+            'pmd', 'pmx' or 'vmd'
+        version
+            format version
+        name
+            model name(str)
+        english_name
+            english model name(str). None if the file has no english name
+        index_sizes
+            pmx index sizes by kind('vertex', 'texture', 'material',
+            'bone', 'morph', 'rigidbody'). None for pmd and vmd
+        counts
+            (section, count) list in file order
+        size
+            file size in bytes
+    """
+    __slots__ = ['path', 'format', 'version', 'name', 'english_name',
+                 'index_sizes', 'counts', 'size']
+
+    def __init__(self, format, version, name, english_name=None,
+                 index_sizes=None, counts=None, size=0, path=''):
+        self.path = path
+        self.format = format
+        self.version = version
+        self.name = name
+        self.english_name = english_name
+        self.index_sizes = index_sizes
+        self.counts = counts or []
+        self.size = size
+
+    def __str__(self):
+        return '{0}: {1} {2} "{3}" {4}'.format(
+            self.path, self.format, self.version, self.name,
+            ' '.join('{0}={1}'.format(s, c) for s, c in self.counts))
+
+    def count(self, section):
+        """
+        return the element count of section.
+        """
+        for s, c in self.counts:
+            if s == section:
+                return c
+        raise KeyError(section)
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'format': self.format,
+            'version': self.version,
+            'name': self.name,
+            'english_name': self.english_name,
+            'index_sizes': self.index_sizes,
+            'counts': dict(self.counts),
+            'size': self.size,
+        }
+
+
+def _decode_cp932(src):
+    return src.decode('cp932', 'replace')
+
+
+def probe_pmd(ios):
+    """
+    probe a pmd stream, then return Info.
+    """
+    reader = pmd_reader.Reader(ios, 0)
+    signature = reader.unpack("3s", 3)
+    if signature != b"Pmd":
+        raise common.ParseException(
+            "invalid signature: {0}".format(signature))
+    reader.version = reader.read_float()
+    name = reader.read_text(20)
+    reader.skip(256)
+    counts = []
+
+    def section(name, count_size, record_size):
+        count = reader.read_uint(count_size)
+        reader.skip(count * record_size)
+        counts.append((name, count))
+        return count
+
+    section('vertices', 4, pmd_schema.VERTEX.size)
+    section('indices', 4, 2)
+    section('materials', 4, pmd_schema.MATERIAL.size)
+    bone_count = section('bones', 2, pmd_schema.BONE.size)
+    ik_count = reader.read_uint(2)
+    skip_ik = pmd_schema.CODECS['ik'].skip
+    for _ in range(ik_count):
+        skip_ik(reader)
+    counts.append(('ik_list', ik_count))
+    morph_count = reader.read_uint(2)
+    base_count = 0
+    for _ in range(morph_count):
+        if reader.read_text(20) == b'base':
+            base_count += 1
+        size = reader.read_uint(4)
+        # type, (index, pos) list
+        reader.skip(1 + pmd_schema.MORPH_OFFSET.size * size)
+    counts.append(('morphs', morph_count))
+    section('morph_indices', 1, 2)
+    group_count = section('bone_group_list', 1, 50)
+    section('bone_display_list', 4, 3)
+
+    english_name = None
+    if not reader.is_end() and reader.read_uint(1) == 1:
+        english_name = _decode_cp932(reader.read_text(20))
+        reader.skip(256 + 20 * bone_count + 20 * (morph_count - base_count)
+                    + 50 * group_count)
+    if reader.is_end():
+        counts.append(('toon_textures', 0))
+    else:
+        reader.skip(100 * 10)
+        counts.append(('toon_textures', 10))
+    if reader.is_end():
+        counts.append(('rigidbodies', 0))
+        counts.append(('joints', 0))
+    else:
+        section('rigidbodies', 4, pmd_schema.RIGIDBODY.size)
+        section('joints', 4, pmd_schema.JOINT.size)
+    if reader.tell() > reader.end:
+        raise common.ParseException("unexpected end of pmd")
+    return Info('pmd', reader.version, _decode_cp932(name), english_name,
+                counts=counts, size=reader.end)
+
+
+def probe_pmx(ios):
+    """
+    probe a pmx stream, then return Info.
+
+    vertices, materials, bones, morphs and display slots are variable
+    length. their records are stepped over by pmx.reader.LazyReader.
+    """
+    version, reader = pmx_reader.read_header(ios, pmx_reader.LazyReader)
+    name = reader.read_text()
+    english_name = reader.read_text()
+    reader.skip_text()
+    reader.skip_text()
+    reader.scan()
+    schema = reader.schema
+    index_sizes = {
+        'vertex': schema.vertex_index.size,
+        'texture': schema.texture_index.size,
+        'material': schema.material_index.size,
+        'bone': schema.bone_index.size,
+        'morph': schema.morph_index.size,
+        'rigidbody': schema.rigidbody_index.size,
+    }
+    return Info('pmx', version, name, english_name, index_sizes,
+                [(s, reader.counts[s]) for s in pmx.SECTIONS],
+                reader.end)
+
+
+def probe_vmd(ios):
+    """
+    probe a vmd stream, then return Info. name is the target model name.
+    """
+    reader = vmd_reader.StreamReader(ios)
+    return Info('vmd', reader.version, reader.model_name,
+                counts=[(s, reader.count(s)) for s in vmd_reader.SECTIONS],
+                size=reader.end)
+
+
+PROBES = {
+    b'Pmd': probe_pmd,
+    b'PMX ': probe_pmx,
+    b'Vocaloid Motion Data': probe_vmd,
+}
+
+
+def probe(ios):
+    """
+    probe a pmd, pmx or vmd stream by its signature, then return Info.
+    """
+    current = ios.tell()
+    head = ios.read(20)
+    ios.seek(current)
+    for signature, function in PROBES.items():
+        if head.startswith(signature):
+            return function(ios)
+    raise common.ParseException("unknown signature: {0}".format(head[:4]))
+
+
+def probe_file(path):
+    """
+    probe file path, then return Info.
+    """
+    with common.open_mapped(path) as ios:
+        info = probe(ios)
+    info.path = path
+    return info
+
+
+def find_files(paths, extensions=EXTENSIONS):
+    """
+    generate files in paths. directories are walked recursively for
+    files with extensions.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for f in sorted(files):
+                    if os.path.splitext(f)[1].lower() in extensions:
+                        yield os.path.join(root, f)
+        else:
+            yield path
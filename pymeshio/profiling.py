@@ -0,0 +1,266 @@
+# coding: utf-8
+"""
+per section profile of the readers
+
+pass a Profile as the profile argument of pmx.reader.read, pmd.reader.read,
+vmd.reader.read, mqo.reader.read, x.reader.read or obj.reader.read. each
+section records wall time, bytes consumed, element count and, if
+trace_memory is set, tracemalloc deltas. the profile is a report after the
+read, and the callback is called with each finished Section.
+
+>>> import pymeshio.profiling
+>>> import pymeshio.pmx.reader
+>>> profile = pymeshio.profiling.Profile()
+>>> m = pymeshio.pmx.reader.read_from_file('a.pmx', profile=profile)
+>>> print(profile)
+section                seconds        bytes    count
+header                  0.0005          129        1
+  text                  0.0040            0      186
+vertices                0.6520       899517    20000
+...
+"""
+import time
+import tracemalloc
+from collections import OrderedDict
+
+
+class Section(object):
+    """
+    measurement of a section. a section that is entered again accumulates.
+
+    :IVariables:
+        name
+            section name
+        seconds
+            wall time
+        bytes
+            bytes consumed from the stream
+        count
+            elements read
+        calls
+            times the section was entered
+        memory
+            bytes allocated and kept. None unless trace_memory
+        peak
+            peak bytes allocated above the start. None unless trace_memory
+        nested
+            True if the section runs inside other sections, such as
+            text decoding. nested sections are not part of the total
+    """
+    __slots__ = ['name', 'seconds', 'bytes', 'count', 'calls',
+                 'memory', 'peak', 'nested']
+
+    def __init__(self, name, nested=False):
+        self.name = name
+        self.seconds = 0.0
+        self.bytes = 0
+        self.count = 0
+        self.calls = 0
+        self.memory = None
+        self.peak = None
+        self.nested = nested
+
+    def __str__(self):
+        text = '{0:<20}{1:>10.4f}{2:>13}{3:>9}'.format(
+            ('  ' if self.nested else '') + self.name,
+            self.seconds, self.bytes, self.count)
+        if self.memory is not None:
+            text += '{0:>13}{1:>13}'.format(self.memory, self.peak)
+        return text
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'seconds': self.seconds,
+            'bytes': self.bytes,
+            'count': self.count,
+            'calls': self.calls,
+            'memory': self.memory,
+            'peak': self.peak,
+            'nested': self.nested,
+        }
+
+
+class _Scope(object):
+    """
+    context of a running section. count is added to the section on exit.
+    """
+    __slots__ = ['profile', 'section', 'ios', 'count',
+                 'start', 'position', 'traced']
+
+    def __init__(self, profile, section, ios):
+        self.profile = profile
+        self.section = section
+        self.ios = ios
+        self.count = 0
+
+    def __enter__(self):
+        if self.profile.trace_memory:
+            self.traced = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.position = self.ios.tell() if self.ios is not None else 0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        seconds = time.perf_counter() - self.start
+        section = self.section
+        section.seconds += seconds
+        section.calls += 1
+        section.count += self.count
+        if self.ios is not None:
+            section.bytes += self.ios.tell() - self.position
+        if self.profile.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            section.memory = (section.memory or 0) + current - self.traced
+            section.peak = max(section.peak or 0, peak - self.traced)
+        if self.profile.callback:
+            self.profile.callback(section)
+        return False
+
+
+class _NullScope(object):
+    """
+    section of NULL. accepts count and measures nothing.
+    """
+    __slots__ = ['count']
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class Profile(object):
+    """
+    section report of a read.
+
+    :IVariables:
+        format
+            'pmx', 'pmd', 'vmd', 'mqo', 'x' or 'obj'. set by the reader
+        sections
+            OrderedDict of name to Section in first entered order
+        callback
+            function(Section) called when a section is left, or None
+        trace_memory
+            if True, sections record tracemalloc deltas. tracemalloc is
+            started by the reader and stopped after it unless it was
+            already tracing
+    """
+    __slots__ = ['format', 'sections', 'callback', 'trace_memory',
+                 'started_tracing']
+
+    def __init__(self, callback=None, trace_memory=False):
+        self.format = None
+        self.sections = OrderedDict()
+        self.callback = callback
+        self.trace_memory = trace_memory
+        self.started_tracing = False
+
+    def __str__(self):
+        header = '{0:<20}{1:>10}{2:>13}{3:>9}'.format(
+            'section', 'seconds', 'bytes', 'count')
+        if self.trace_memory:
+            header += '{0:>13}{1:>13}'.format('memory', 'peak')
+        lines = [header]
+        lines += [str(s) for s in self.sections.values()]
+        lines.append('{0:<20}{1:>10.4f}{2:>13}'.format(
+            'total', self.seconds(), self.bytes()))
+        return '\n'.join(lines)
+
+    def __getitem__(self, name):
+        return self.sections[name]
+
+    def __contains__(self, name):
+        return name in self.sections
+
+    def __iter__(self):
+        return iter(self.sections.values())
+
+    def seconds(self):
+        return sum(s.seconds for s in self if not s.nested)
+
+    def bytes(self):
+        return sum(s.bytes for s in self if not s.nested)
+
+    def _get(self, name, nested=False):
+        section = self.sections.get(name)
+        if section is None:
+            section = Section(name, nested)
+            self.sections[name] = section
+        return section
+
+    def begin(self, format):
+        """
+        called by a reader before reading.
+        """
+        self.format = format
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def end(self):
+        """
+        called by a reader after reading, even if it failed.
+        """
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def section(self, name, ios=None):
+        """
+        return a context manager that measures name.
+        set count of the returned scope to the elements read.
+        bytes are measured by ios.tell() if ios is given.
+        """
+        return _Scope(self, self._get(name), ios)
+
+    def timed(self, name, function):
+        """
+        return function wrapped to accumulate into the nested section name.
+        each call counts as an element.
+        """
+        section = self._get(name, True)
+
+        def timed(*args):
+            start = time.perf_counter()
+            result = function(*args)
+            section.seconds += time.perf_counter() - start
+            section.calls += 1
+            section.count += 1
+            return result
+        return timed
+
+    def to_dict(self):
+        return {
+            'format': self.format,
+            'seconds': self.seconds(),
+            'bytes': self.bytes(),
+            'sections': [s.to_dict() for s in self],
+        }
+
+
+class _NullProfile(object):
+    """
+    profile of readers called without one. measures nothing.
+    """
+    __slots__ = []
+
+    def begin(self, format):
+        pass
+
+    def end(self):
+        pass
+
+    def section(self, name, ios=None):
+        return _NullScope()
+
+    def timed(self, name, function):
+        return function
+
+
+NULL = _NullProfile()
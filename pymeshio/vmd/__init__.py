@@ -14,6 +14,44 @@ import io
 import os
 import struct
 from .. import common
+try:
+    import numpy
+except ImportError:
+    numpy=None
+
+
+if numpy:
+    # 111 bytes bone frame record
+    BONE_FRAME_DTYPE=numpy.dtype([
+        ('name', 'S15'),
+        ('frame', '<u4'),
+        ('pos', '<f4', 3),
+        ('q', '<f4', 4),
+        ('complement', 'u1', 64),
+        ])
+    assert(BONE_FRAME_DTYPE.itemsize==111)
+    # 23 bytes morph frame record
+    MORPH_FRAME_DTYPE=numpy.dtype([
+        ('name', 'S15'),
+        ('frame', '<u4'),
+        ('ratio', '<f4'),
+        ])
+    assert(MORPH_FRAME_DTYPE.itemsize==23)
+
+
+def _linear_complement():
+    # x1, y1, x2, y2 of x, y, z and rotation curves. the other 3 rows are
+    # the first row shifted by one byte each
+    row=[20]*8+[107]*8
+    complement=[]
+    for i in range(4):
+        complement+=row[i:]+[0]*i
+    return complement
+
+LINEAR_COMPLEMENT=_linear_complement()
+
+# x1, x2, y1, y2 of x, y, z, rotation, length and angle curves
+LINEAR_CAMERA_COMPLEMENT=[20, 107, 20, 107]*6
 
 
 class MorphFrame(object):
@@ -40,6 +78,7 @@ class BoneFrame(object):
         self.frame=-1
         self.pos=common.Vector3()
         self.q=common.Quaternion()
+        self.complement=list(LINEAR_COMPLEMENT)
 
     def __cmp__(self, other):
         return cmp(self.frame, other.frame)
@@ -58,7 +97,7 @@ class CameraFrame(object):
         self.length=0
         self.pos=common.Vector3()
         self.euler=common.Vector3()
-        self.complement=None
+        self.complement=list(LINEAR_CAMERA_COMPLEMENT)
         self.angle=0
         self.perspective=True
 
@@ -69,13 +108,195 @@ class CameraFrame(object):
         return '<CameraFrame %d %s%s>' % (self.frame, self.pos, self.euler)
 
 
+class LightFrame(object):
+    """
+    light animation data.
+    """
+    __slots__=['frame', 'color', 'pos']
+    def __init__(self):
+        self.frame=-1
+        self.color=common.RGB(0.6, 0.6, 0.6)
+        self.pos=common.Vector3(-0.5, -1.0, 0.5)
+
+    def __cmp__(self, other):
+        return cmp(self.frame, other.frame)
+
+    def __str__(self):
+        return '<LightFrame %d %s%s>' % (self.frame, self.color, self.pos)
+
+
+class ShadowFrame(object):
+    """
+    self shadow animation data.
+
+    mode 0: off, 1: mode1, 2: mode2
+    """
+    __slots__=['frame', 'mode', 'distance']
+    def __init__(self):
+        self.frame=-1
+        self.mode=1
+        self.distance=0.0
+
+    def __cmp__(self, other):
+        return cmp(self.frame, other.frame)
+
+    def __str__(self):
+        return '<ShadowFrame %d %d %f>' % (self.frame, self.mode, self.distance)
+
+
+class FrameArray(object):
+    """
+    columnar frames sorted by name, then by frame.
+
+    records is a structured array. the frames of one name are a contiguous
+    slice of it, looked up by index.
+
+    :IVariables:
+        records
+            structured array(BONE_FRAME_DTYPE or MORPH_FRAME_DTYPE)
+        index
+            dict of name(str) to (start, stop) of records
+    """
+    __slots__=['records', 'index']
+    dtype=None
+
+    def __init__(self, records=None):
+        if not numpy:
+            raise ImportError("vmd.FrameArray requires numpy")
+        if records is None:
+            records=numpy.zeros(0, self.dtype)
+        records=numpy.array(records, self.dtype)
+        # name is null terminated. clear garbage after null
+        names=numpy.ascontiguousarray(records['name'])
+        raw=names.view(numpy.uint8).reshape(len(records), 15)
+        raw[numpy.cumsum(raw==0, axis=1)>0]=0
+        records['name']=names
+        names, inverse, counts=numpy.unique(records['name'],
+                return_inverse=True, return_counts=True)
+        order=numpy.lexsort((records['frame'], inverse))
+        self.records=records[order]
+        self.index={}
+        start=0
+        for name, count in zip(names.tolist(), counts.tolist()):
+            self.index[name.decode("shift-jis")]=(start, start+count)
+            start+=count
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __getitem__(self, name):
+        """
+        return frames of name as a slice of records
+        """
+        start, stop=self.index[name]
+        return self.records[start:stop]
+
+    def names(self):
+        return list(self.index.keys())
+
+    def __iter__(self):
+        return iter(self.to_frames())
+
+    def __str__(self):
+        return '<%s %d frames, %d names>' % (
+                self.__class__.__name__, len(self.records), len(self.index))
+
+
+class BoneFrameArray(FrameArray):
+    """
+    columnar bone frames.
+    """
+    __slots__=[]
+    dtype=BONE_FRAME_DTYPE if numpy else None
+
+    @staticmethod
+    def from_frames(frames):
+        """
+        create BoneFrameArray from a BoneFrame sequence.
+        """
+        if isinstance(frames, BoneFrameArray):
+            return frames
+        return BoneFrameArray(numpy.array([
+            (f.name.encode("shift-jis") if isinstance(f.name, str) else f.name,
+                f.frame,
+                (f.pos.x, f.pos.y, f.pos.z),
+                (f.q.x, f.q.y, f.q.z, f.q.w),
+                list(f.complement))
+            for f in frames], BONE_FRAME_DTYPE))
+
+    def to_frames(self):
+        """
+        return a BoneFrame list in name and frame order.
+        """
+        frames=[]
+        for name, (start, stop) in self.index.items():
+            for frame, pos, q, complement in zip(
+                    self.records['frame'][start:stop].tolist(),
+                    self.records['pos'][start:stop].tolist(),
+                    self.records['q'][start:stop].tolist(),
+                    self.records['complement'][start:stop].tolist()):
+                f=BoneFrame(name)
+                f.frame=frame
+                f.pos=common.Vector3(*pos)
+                f.q=common.Quaternion(*q)
+                f.complement=complement
+                frames.append(f)
+        return frames
+
+
+class MorphFrameArray(FrameArray):
+    """
+    columnar morph frames.
+    """
+    __slots__=[]
+    dtype=MORPH_FRAME_DTYPE if numpy else None
+
+    @staticmethod
+    def from_frames(frames):
+        """
+        create MorphFrameArray from a MorphFrame sequence.
+        """
+        if isinstance(frames, MorphFrameArray):
+            return frames
+        return MorphFrameArray(numpy.array([
+            (f.name.encode("shift-jis") if isinstance(f.name, str) else f.name,
+                f.frame, f.ratio)
+            for f in frames], MORPH_FRAME_DTYPE))
+
+    def to_frames(self):
+        """
+        return a MorphFrame list in name and frame order.
+        """
+        frames=[]
+        for name, (start, stop) in self.index.items():
+            for frame, ratio in zip(
+                    self.records['frame'][start:stop].tolist(),
+                    self.records['ratio'][start:stop].tolist()):
+                f=MorphFrame(name)
+                f.frame=frame
+                f.ratio=ratio
+                frames.append(f)
+        return frames
+
+
 class Motion(object):
+    """
+    :IVariables:
+        motions
+            BoneFrame list, or BoneFrameArray if read with arrays=True
+        shapes
+            MorphFrame list, or MorphFrameArray if read with arrays=True
+    """
     __slots__=[
             'model_name',
             'motions',
             'shapes',
             'cameras',
             'lights',
+            'shadows',
             'last_frame',
             ]
     def __init__(self):
@@ -84,10 +305,11 @@ class Motion(object):
         self.shapes=[]
         self.cameras=[]
         self.lights=[]
+        self.shadows=[]
         self.last_frame=0
 
     def __str__(self):
-        return '<VMDLoader model: "%s", motion: %d, shape: %d, camera: %d, light: %d>' % (
+        return '<VMDLoader model: "%s", motion: %d, shape: %d, camera: %d, light: %d, shadow: %d>' % (
             self.model_name, len(self.motions), len(self.shapes),
-            len(self.cameras), len(self.lights))
+            len(self.cameras), len(self.lights), len(self.shadows))
 
@@ -4,8 +4,29 @@ vmd reader
 """
 import io
 import struct
+from logging import getLogger
 from .. import common
+from .. import profiling
 from .. import vmd
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = getLogger(__name__)
+
+
+BONE_FRAME_STRUCT = struct.Struct('<I7f64B')
+MORPH_FRAME_STRUCT = struct.Struct('<If')
+CAMERA_FRAME_STRUCT = struct.Struct('<If3f3f24BfB')
+LIGHT_FRAME_STRUCT = struct.Struct('<I3f3f')
+SHADOW_FRAME_STRUCT = struct.Struct('<IBf')
+
+SECTIONS = ('bone', 'morph', 'camera', 'light', 'shadow')
+"""sections in file order"""
+
+SECTION_RECORD_SIZES = (111, 23, CAMERA_FRAME_STRUCT.size,
+                        LIGHT_FRAME_STRUCT.size, SHADOW_FRAME_STRUCT.size)
 
 
 class Reader(common.BinaryReader):
@@ -30,20 +51,35 @@ class Reader(common.BinaryReader):
         フレームひとつ分を読み込む(111 bytes)
         """
         frame = vmd.BoneFrame(self.read_text(15))
+        values = self.unpack_struct(BONE_FRAME_STRUCT)
         (frame.frame, frame.pos.x, frame.pos.y, frame.pos.z,
-         frame.q.x, frame.q.y, frame.q.z, frame.q.w) = struct.unpack(
-            'I7f', self.ios.read(32))
+         frame.q.x, frame.q.y, frame.q.z, frame.q.w) = values[:8]
         # complement data
-        # frame.complement= ''.join(['%x' % x for x in struct.unpack('64B', self.ios.read(64))])
-        frame.complement = [int(x) for x in struct.unpack('64B', self.ios.read(64))]
+        frame.complement = list(values[8:])
         return frame
 
+    def read_bone_frame_array(self, count):
+        """
+        read count bone frames into vmd.BoneFrameArray at once.
+        """
+        return vmd.BoneFrameArray(numpy.frombuffer(
+            self.read_bytes(vmd.BONE_FRAME_DTYPE.itemsize * count),
+            vmd.BONE_FRAME_DTYPE, count))
+
+    def read_morph_frame_array(self, count):
+        """
+        read count morph frames into vmd.MorphFrameArray at once.
+        """
+        return vmd.MorphFrameArray(numpy.frombuffer(
+            self.read_bytes(vmd.MORPH_FRAME_DTYPE.itemsize * count),
+            vmd.MORPH_FRAME_DTYPE, count))
+
     def read_morph_frame(self):
         """
         モーフデータひとつ分を読み込む(23 bytes)
         """
         frame = vmd.MorphFrame(self.read_text(15))
-        (frame.frame, frame.ratio) = struct.unpack('If', self.ios.read(8))
+        (frame.frame, frame.ratio) = self.unpack_struct(MORPH_FRAME_STRUCT)
         return frame
 
     def read_camera_frame(self):
@@ -51,57 +87,236 @@ class Reader(common.BinaryReader):
         カメラデータひとつ分を読み込む(61 bytes)
         """
         frame = vmd.CameraFrame()
+        values = self.unpack_struct(CAMERA_FRAME_STRUCT)
         (frame.frame, frame.length,
          frame.pos.x, frame.pos.y, frame.pos.z,
          frame.euler.x, frame.euler.y, frame.euler.z
-         ) = struct.unpack('If3f3f', self.ios.read(32))
+         ) = values[:8]
         # complement data
-        frame.complement = ''.join(
-            ['%x' % x for x in struct.unpack('24B', self.ios.read(24))])
-        (frame.angle, frame.perspective
-         ) = struct.unpack('fB', self.ios.read(5))
+        frame.complement = list(values[8:32])
+        (frame.angle, frame.perspective) = values[32:]
+        return frame
+
+    def read_light_frame(self):
+        """
+        照明データひとつ分を読み込む(28 bytes)
+        """
+        frame = vmd.LightFrame()
+        (frame.frame,
+         frame.color.r, frame.color.g, frame.color.b,
+         frame.pos.x, frame.pos.y, frame.pos.z
+         ) = self.unpack_struct(LIGHT_FRAME_STRUCT)
+        return frame
+
+    def read_shadow_frame(self):
+        """
+        セルフシャドウデータひとつ分を読み込む(9 bytes)
+        """
+        frame = vmd.ShadowFrame()
+        (frame.frame, frame.mode, frame.distance
+         ) = self.unpack_struct(SHADOW_FRAME_STRUCT)
         return frame
 
 
-def read_from_file(path):
+class StreamReader(Reader):
+    """
+    read vmd sections on demand.
+
+    every section is a record count followed by fixed size records, so a
+    section is located by seeking over the sections before it without
+    decoding them. sections missing at the end of old files are empty.
+
+    >>> with pymeshio.common.open_mapped('motion.vmd') as ios:
+    ...     stream = pymeshio.vmd.reader.StreamReader(ios)
+    ...     for frame in stream.morph_frames():
+    ...         print(frame.name, frame.frame, frame.ratio)
+
+    :IVariables:
+        version
+            1 or 2
+        model_name
+            model name
+    """
+
+    def __init__(self, ios):
+        super(StreamReader, self).__init__(ios)
+        signature = self.unpack("30s", 30)
+        if signature[:25] == b"Vocaloid Motion Data 0002":
+            self.version = 2
+        elif signature[:25] == b"Vocaloid Motion Data file":
+            self.version = 1
+        else:
+            raise common.ParseException(
+                "invalid signature: {0}".format(signature))
+        self.model_name = self.read_text(20)
+        # offsets and record counts of the sections found so far
+        self.offsets = [self.tell()]
+        self.counts = []
+
+    def seek_section(self, section):
+        """
+        move to the first record of section, then return the record count.
+        """
+        index = SECTIONS.index(section)
+        while len(self.counts) <= index:
+            offset = self.offsets[-1]
+            self.seek(offset)
+            if self.is_end():
+                count = 0
+                offset = self.end
+            else:
+                count = self.unpack('I', 4)
+                offset += 4 + count * SECTION_RECORD_SIZES[len(self.counts)]
+            self.counts.append(count)
+            self.offsets.append(offset)
+        if self.counts[index] > 0:
+            self.seek(self.offsets[index] + 4)
+        return self.counts[index]
+
+    def count(self, section):
+        """
+        return the record count of section without decoding records.
+        """
+        current = self.tell()
+        count = self.seek_section(section)
+        self.seek(current)
+        return count
+
+    def _frames(self, section, read_frame):
+        count = self.seek_section(section)
+        pos = self.offsets[SECTIONS.index(section)] + 4
+        size = SECTION_RECORD_SIZES[SECTIONS.index(section)]
+        for _ in range(count):
+            # the caller may read other sections between frames
+            if self.tell() != pos:
+                self.seek(pos)
+            yield read_frame()
+            pos += size
+
+    def bone_frames(self):
+        """generate vmd.BoneFrame"""
+        return self._frames('bone', self.read_bone_frame)
+
+    def morph_frames(self):
+        """generate vmd.MorphFrame"""
+        return self._frames('morph', self.read_morph_frame)
+
+    def camera_frames(self):
+        """generate vmd.CameraFrame"""
+        return self._frames('camera', self.read_camera_frame)
+
+    def light_frames(self):
+        """generate vmd.LightFrame"""
+        return self._frames('light', self.read_light_frame)
+
+    def shadow_frames(self):
+        """generate vmd.ShadowFrame"""
+        return self._frames('shadow', self.read_shadow_frame)
+
+    def bone_frame_array(self):
+        """read bone section into vmd.BoneFrameArray"""
+        return self.read_bone_frame_array(self.seek_section('bone'))
+
+    def morph_frame_array(self):
+        """read morph section into vmd.MorphFrameArray"""
+        return self.read_morph_frame_array(self.seek_section('morph'))
+
+
+def read_from_file(path, arrays=False, sections=SECTIONS, profile=None):
     """
     read from file path
 
     :Parameters:
       path
         file path
+      arrays
+        if True, bone and morph frames are read into
+        vmd.BoneFrameArray and vmd.MorphFrameArray(requires numpy)
+      sections
+        sections to read. others are skipped and left empty
+      profile
+        pymeshio.profiling.Profile to record the sections in
 
     >>> import pymeshio.vmd.reader
     >>> m=pymeshio.vmd.reader.read_from_file('resources/motion.vmd')
     >>> print(m)
 
     """
-    return read(io.BytesIO(common.readall(path)))
+    with common.open_mapped(path) as ios:
+        return read(ios, arrays, sections, profile)
 
 
-def read(ios):
+def read(ios, arrays=False, sections=SECTIONS, profile=None):
+    """
+    read from ios, then return the vmd.Motion.
+
+    :Parameters:
+      ios
+        input stream (in io.IOBase)
+      arrays
+        if True, bone and morph frames are read into
+        vmd.BoneFrameArray and vmd.MorphFrameArray(requires numpy)
+      sections
+        sections to read. others are skipped and left empty
+      profile
+        pymeshio.profiling.Profile to record the header, each section
+        and the nested text reads in
+    """
     assert (isinstance(ios, io.IOBase))
-    reader = common.BinaryReader(ios)
-
-    signature = reader.unpack("30s", 30)
-    version = None
-    if signature[:25].decode() == "Vocaloid Motion Data 0002":
-        version = 2
-    elif signature[:25].decode() == "Vocaloid Motion Data file":
-        version = 1
-    else:
-        print("invalid signature", signature)
+    if arrays and not numpy:
+        raise common.ParseException("arrays=True requires numpy")
+    for section in sections:
+        if section not in SECTIONS:
+            raise common.ParseException(
+                "unknown section: {0}".format(section))
+    if profile is None:
+        profile = profiling.NULL
+    profile.begin('vmd')
+    try:
+        return _read(ios, arrays, sections, profile)
+    finally:
+        profile.end()
+
+
+def _read(ios, arrays, sections, profile):
+    try:
+        with profile.section('header', ios) as scope:
+            reader = StreamReader(ios)
+            scope.count = 1
+    except common.ParseException as e:
+        logger.error("%s", e.message)
         return
+    reader.read_text = profile.timed('text', reader.read_text)
 
-    reader = Reader(reader.ios)
     motion = vmd.Motion()
-    motion.model_name = reader.read_text(20)
-    motion.motions = [reader.read_bone_frame()
-                      for _ in range(reader.unpack('I', 4))]
-    motion.shapes = [reader.read_morph_frame()
-                     for _ in range(reader.unpack('I', 4))]
-    motion.cameras = [reader.read_camera_frame()
-                      for _ in range(reader.unpack('I', 4))]
-    motion.lights = [reader.read_light_frame()
-                     for _ in range(reader.unpack('I', 4))]
+    motion.model_name = reader.model_name
+    if arrays:
+        motion.motions = vmd.BoneFrameArray()
+        motion.shapes = vmd.MorphFrameArray()
+    if 'bone' in sections:
+        with profile.section('bone', ios) as scope:
+            if arrays:
+                motion.motions = reader.bone_frame_array()
+            else:
+                motion.motions = list(reader.bone_frames())
+            scope.count = len(motion.motions)
+    if 'morph' in sections:
+        with profile.section('morph', ios) as scope:
+            if arrays:
+                motion.shapes = reader.morph_frame_array()
+            else:
+                motion.shapes = list(reader.morph_frames())
+            scope.count = len(motion.shapes)
+    if 'camera' in sections:
+        with profile.section('camera', ios) as scope:
+            motion.cameras = list(reader.camera_frames())
+            scope.count = len(motion.cameras)
+    if 'light' in sections:
+        with profile.section('light', ios) as scope:
+            motion.lights = list(reader.light_frames())
+            scope.count = len(motion.lights)
+    if 'shadow' in sections:
+        with profile.section('shadow', ios) as scope:
+            motion.shadows = list(reader.shadow_frames())
+            scope.count = len(motion.shadows)
     return motion
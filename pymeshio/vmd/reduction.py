@@ -0,0 +1,146 @@
+# coding: utf-8
+"""
+vmd keyframe reduction
+
+drop keys that are reproduced by interpolating the keys kept around them.
+bone keys are interpolated like vmd.sampler(bezier curve of the later key,
+slerp for rotation), morph keys linearly. the first and the last key of
+each bone and morph are always kept. requires numpy.
+
+>>> import pymeshio.vmd.reader
+>>> import pymeshio.vmd.writer
+>>> motion=pymeshio.vmd.reader.read_from_file('baked.vmd', arrays=True)
+>>> pymeshio.vmd.writer.write_to_file(motion, 'reduced.vmd', tolerance=1e-3)
+"""
+import numpy
+from .. import vmd
+from . import sampler
+
+
+def keep_indices(count, reproduced):
+    """
+    return sorted indices of keys to keep out of count keys.
+
+    reproduced(a, b) tells if the keys between a and b are reproduced
+    by interpolating a and b. from each kept key, the farthest next key
+    is searched by doubling the span, then bisecting it.
+    """
+    if count <= 2:
+        return list(range(count))
+    keep = [0]
+    a = 0
+    last = count - 1
+    while a < last:
+        good = a + 1
+        step = 2
+        while good < last:
+            b = min(a + step, last)
+            if reproduced(a, b):
+                good = b
+                step *= 2
+                continue
+            # reproduced(a, good) and not reproduced(a, b)
+            while b - good > 1:
+                middle = (good + b) // 2
+                if reproduced(a, middle):
+                    good = middle
+                else:
+                    b = middle
+            break
+        keep.append(good)
+        a = good
+    return keep
+
+
+def _progress(frames, a, b):
+    middle = frames[a + 1:b]
+    length = frames[b] - frames[a]
+    if length <= 0:
+        return numpy.zeros(len(middle))
+    return (middle - frames[a]) / length
+
+
+def reduce_bone_frames(frames, tolerance, angle_tolerance=None):
+    """
+    return bone frames without keys reproduced within tolerance.
+
+    :Parameters:
+        frames
+            vmd.BoneFrameArray or BoneFrame list. the same type is returned
+        tolerance
+            max position error
+        angle_tolerance
+            max rotation error in radian. default is tolerance
+    """
+    if angle_tolerance is None:
+        angle_tolerance = tolerance
+    bones = vmd.BoneFrameArray.from_frames(frames)
+    records = bones.records
+    curves = sampler.decode_curves(records['complement'])
+    unique, inverse = numpy.unique(curves.reshape(-1, 4), axis=0,
+                                   return_inverse=True)
+    tables = sampler.bezier_tables(unique)
+    curve_index = inverse.reshape(-1, 4)
+    key_frames = records['frame'].astype(numpy.float64)
+    positions = records['pos'].astype(numpy.float64)
+    rotations = records['q'].astype(numpy.float64)
+    norms = numpy.linalg.norm(rotations, axis=1, keepdims=True)
+    rotations = rotations / numpy.where(norms > 0, norms, 1.0)
+    min_dot = numpy.cos(angle_tolerance / 2.0)
+
+    keep = []
+    for start, stop in sorted(bones.index.values()):
+        f = key_frames[start:stop]
+        p = positions[start:stop]
+        q = rotations[start:stop]
+        c = curve_index[start:stop]
+
+        def reproduced(a, b):
+            t = _progress(f, a, b)
+            eased = sampler.ease(tables, c[b][None, :],
+                                 numpy.repeat(t[:, None], 4, axis=1))
+            position = p[a] + (p[b] - p[a]) * eased[:, :3]
+            if numpy.abs(position - p[a + 1:b]).max() > tolerance:
+                return False
+            rotation = sampler.slerp(q[a], q[b], eased[:, 3])
+            dot = numpy.abs(numpy.sum(rotation * q[a + 1:b], axis=1))
+            return dot.min() >= min_dot
+
+        keep.extend(start + i for i in keep_indices(stop - start, reproduced))
+
+    reduced = vmd.BoneFrameArray(records[keep])
+    if isinstance(frames, vmd.BoneFrameArray):
+        return reduced
+    return reduced.to_frames()
+
+
+def reduce_morph_frames(frames, tolerance):
+    """
+    return morph frames without keys reproduced within tolerance.
+
+    :Parameters:
+        frames
+            vmd.MorphFrameArray or MorphFrame list. the same type is returned
+        tolerance
+            max ratio error
+    """
+    morphs = vmd.MorphFrameArray.from_frames(frames)
+    records = morphs.records
+    key_frames = records['frame'].astype(numpy.float64)
+    ratios = records['ratio'].astype(numpy.float64)
+
+    keep = []
+    for start, stop in sorted(morphs.index.values()):
+        f = key_frames[start:stop]
+        r = ratios[start:stop]
+
+        def reproduced(a, b):
+            ratio = r[a] + (r[b] - r[a]) * _progress(f, a, b)
+            return numpy.abs(ratio - r[a + 1:b]).max() <= tolerance
+
+        keep.extend(start + i for i in keep_indices(stop - start, reproduced))
+
+    reduced = vmd.MorphFrameArray(records[keep])
+    if isinstance(frames, vmd.MorphFrameArray):
+        return reduced
+    return reduced.to_frames()
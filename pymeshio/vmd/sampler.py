@@ -0,0 +1,279 @@
+# coding: utf-8
+"""
+vmd pose sampler
+
+evaluate bone translations, rotations and morph weights of a vmd.Motion
+at a batch of frames at once. requires numpy.
+
+The 64 bytes complement of a bone frame holds the bezier control points
+of the x, y, z and rotation curves in its first 16 bytes::
+
+    x1(x, y, z, r), y1(x, y, z, r), x2(x, y, z, r), y2(x, y, z, r)
+
+each in 0-127. The curve of a key interpolates the section from the
+previous key to that key.
+
+>>> import pymeshio.vmd.reader
+>>> import pymeshio.vmd.sampler
+>>> motion=pymeshio.vmd.reader.read_from_file('motion.vmd', arrays=True)
+>>> sampler=pymeshio.vmd.sampler.Sampler(motion)
+>>> translations, rotations=sampler.sample(numpy.arange(0, 300, 0.5))
+"""
+import numpy
+from .. import vmd
+
+
+LUT_SIZE = 257
+"""samples of a bezier lookup table"""
+
+BEZIER_STEPS = 1024
+"""curve parameter samples to build a lookup table"""
+
+TABLE_CHUNK = 1024
+"""curves per table building step"""
+
+CACHE_SIZE = 65536
+"""cached tables. the cache is cleared when it is full"""
+
+_tables = {}
+
+
+def _build_tables(curves):
+    """
+    return (n, LUT_SIZE) tables of (n, 4) x1, y1, x2, y2 control points.
+    """
+    s = numpy.linspace(0.0, 1.0, BEZIER_STEPS)
+    r = 1.0 - s
+    a = 3.0 * r * r * s
+    b = 3.0 * r * s * s
+    c = s * s * s
+    grid = numpy.linspace(0.0, 1.0, LUT_SIZE)
+    p = numpy.asarray(curves, numpy.float64).reshape(-1, 4) / 127.0
+    x = p[:, 0:1] * a + p[:, 2:3] * b + c
+    y = p[:, 1:2] * a + p[:, 3:4] * b + c
+    # x is monotonic for control points in [0, 1]. offset each row to
+    # search all rows in one flat sorted array
+    x = numpy.maximum.accumulate(x, axis=1)
+    offset = numpy.arange(len(p))[:, None] * 2.0
+    flat = (x + offset).reshape(-1)
+    query = (grid[None, :] + offset).reshape(-1)
+    right = numpy.searchsorted(flat, query, side='left')
+    rows = numpy.repeat(numpy.arange(len(p)) * BEZIER_STEPS, LUT_SIZE)
+    right = numpy.clip(right, rows + 1, rows + BEZIER_STEPS - 1)
+    left = right - 1
+    x0 = flat[left]
+    x1 = flat[right]
+    y = y.reshape(-1)
+    t = numpy.where(x1 > x0, (query - x0) / numpy.where(x1 > x0, x1 - x0, 1.0),
+                    0.0)
+    return (y[left] + (y[right] - y[left]) * t).astype(
+        numpy.float32).reshape(len(p), LUT_SIZE)
+
+
+def bezier_tables(curves):
+    """
+    return (n, LUT_SIZE) y of the bezier curves (0, 0), (x1, y1), (x2, y2),
+    (1, 1) for LUT_SIZE evenly spaced x in [0, 1].
+
+    curves are (n, 4) x1, y1, x2, y2 in 0-127 as stored in vmd.
+    tables are cached by control points.
+    """
+    keys = [tuple(c) for c in numpy.asarray(curves).reshape(-1, 4).tolist()]
+    tables = numpy.empty((len(keys), LUT_SIZE), numpy.float32)
+    missing = []
+    for i, k in enumerate(keys):
+        table = _tables.get(k)
+        if table is None:
+            missing.append(i)
+        else:
+            tables[i] = table
+    for i in range(0, len(missing), TABLE_CHUNK):
+        rows = missing[i:i + TABLE_CHUNK]
+        tables[rows] = _build_tables([keys[row] for row in rows])
+    if len(_tables) + len(missing) > CACHE_SIZE:
+        _tables.clear()
+    for row in missing[:CACHE_SIZE]:
+        _tables[keys[row]] = tables[row].copy()
+    return tables
+
+
+def bezier_table(x1, y1, x2, y2):
+    """
+    return the lookup table of one curve. see bezier_tables.
+    """
+    return bezier_tables([(x1, y1, x2, y2)])[0]
+
+
+def ease(tables, curve, progress):
+    """
+    return eased progress of (...) curve rows of tables at (...) progress.
+    """
+    x = progress * (LUT_SIZE - 1)
+    i = numpy.minimum(x.astype(numpy.int64), LUT_SIZE - 2)
+    frac = x - i
+    flat = tables.reshape(-1)
+    position = curve * LUT_SIZE + i
+    y0 = flat[position]
+    y1 = flat[position + 1]
+    return y0 + (y1 - y0) * frac
+
+
+def decode_curves(complement):
+    """
+    return (n, 4, 4) control points of x, y, z and rotation curves
+    from (n, 64) complement bytes.
+    """
+    complement = numpy.asarray(complement, numpy.uint8)
+    return complement[:, :16].reshape(-1, 4, 4).transpose(0, 2, 1)
+
+
+def slerp(q0, q1, t):
+    """
+    spherical linear interpolation of (..., 4) xyzw quaternions by (...) t.
+    """
+    q0 = numpy.asarray(q0, numpy.float64)
+    q1 = numpy.asarray(q1, numpy.float64)
+    t = numpy.asarray(t, numpy.float64)[..., None]
+    dot = numpy.sum(q0 * q1, axis=-1, keepdims=True)
+    # shortest path
+    q1 = numpy.where(dot < 0, -q1, q1)
+    dot = numpy.abs(dot)
+    linear = dot > 0.9995
+    theta = numpy.arccos(numpy.clip(dot, -1.0, 1.0))
+    sin_theta = numpy.where(linear, 1.0, numpy.sin(theta))
+    s0 = numpy.where(linear, 1.0 - t, numpy.sin((1.0 - t) * theta) / sin_theta)
+    s1 = numpy.where(linear, t, numpy.sin(t * theta) / sin_theta)
+    q = s0 * q0 + s1 * q1
+    return q / numpy.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def _locate(records, index, names, frames):
+    """
+    return (T, N) indices of the keys before and after each frame and
+    the progress between them. names without keys are -1.
+    """
+    key_frames = records['frame'].astype(numpy.float64)
+    span = key_frames.max() + 2.0
+    # records are sorted by name then frame, so name_id*span+frame is sorted
+    ranges = sorted(index.values())
+    name_ids = numpy.zeros(len(records), numpy.float64)
+    for i, (start, stop) in enumerate(ranges):
+        name_ids[start:stop] = i
+    order = dict((r, i) for i, r in enumerate(ranges))
+    ids = numpy.zeros(len(names), numpy.float64)
+    starts = numpy.zeros(len(names), numpy.int64)
+    stops = numpy.ones(len(names), numpy.int64)
+    valid = numpy.zeros(len(names), bool)
+    for i, name in enumerate(names):
+        if name in index:
+            starts[i], stops[i] = index[name]
+            ids[i] = order[index[name]]
+            valid[i] = True
+    keys = name_ids * span + key_frames
+
+    query = ids[None, :] * span + numpy.clip(frames, 0.0, span - 1.0)[:, None]
+    before = numpy.searchsorted(keys, query, side='right') - 1
+    before = numpy.clip(before, starts, stops - 1)
+    after = numpy.minimum(before + 1, stops - 1)
+    f0 = key_frames[before]
+    f1 = key_frames[after]
+    length = f1 - f0
+    progress = numpy.where(
+        length > 0,
+        (frames[:, None] - f0) / numpy.where(length > 0, length, 1.0), 0.0)
+    progress = numpy.clip(progress, 0.0, 1.0)
+    before = numpy.where(valid, before, -1)
+    after = numpy.where(valid, after, -1)
+    return before, after, progress
+
+
+class Sampler(object):
+    """
+    evaluate a vmd.Motion at a batch of frames.
+
+    :IVariables:
+        bone_names
+            bone names in output order
+        morph_names
+            morph names in output order
+        bones
+            vmd.BoneFrameArray
+        morphs
+            vmd.MorphFrameArray
+        tables
+            float32 (curves, LUT_SIZE) bezier lookup tables
+        curve_index
+            (bone frames, 4) row of tables for x, y, z and rotation curves
+    """
+    __slots__ = ['bone_names', 'morph_names', 'bones', 'morphs',
+                 'tables', 'curve_index']
+
+    def __init__(self, motion, bone_names=None, morph_names=None):
+        self.bones = vmd.BoneFrameArray.from_frames(motion.motions)
+        self.morphs = vmd.MorphFrameArray.from_frames(motion.shapes)
+        self.bone_names = (list(bone_names) if bone_names is not None
+                           else self.bones.names())
+        self.morph_names = (list(morph_names) if morph_names is not None
+                            else self.morphs.names())
+        curves = decode_curves(self.bones.records['complement'])
+        unique, inverse = numpy.unique(curves.reshape(-1, 4), axis=0,
+                                       return_inverse=True)
+        self.tables = bezier_tables(unique)
+        self.curve_index = inverse.reshape(-1, 4)
+
+    def ease(self, curve, progress):
+        """
+        return eased progress of (...) curve rows at (...) progress.
+        """
+        return ease(self.tables, curve, progress)
+
+    def sample(self, frames):
+        """
+        return (translations, rotations) of bone_names at frames.
+
+        translations is float32 (T, N, 3), rotations is float32 (T, N, 4)
+        xyzw quaternion. bones without keys are zero and identity.
+        frames out of the keys are clamped to the first or last key.
+        """
+        frames = numpy.asarray(frames, numpy.float64).reshape(-1)
+        records = self.bones.records
+        shape = (len(frames), len(self.bone_names))
+        translations = numpy.zeros(shape + (3,), numpy.float32)
+        rotations = numpy.zeros(shape + (4,), numpy.float32)
+        rotations[..., 3] = 1
+        if len(records) == 0 or len(self.bone_names) == 0:
+            return translations, rotations
+        before, after, progress = _locate(
+            records, self.bones.index, self.bone_names, frames)
+        valid = before >= 0
+        b = before[valid]
+        a = after[valid]
+        t = progress[valid]
+        # curves of the key after
+        curves = self.curve_index[a]
+        eased = self.ease(curves, numpy.repeat(t[:, None], 4, axis=1))
+        p0 = records['pos'][b].astype(numpy.float64)
+        p1 = records['pos'][a].astype(numpy.float64)
+        translations[valid] = p0 + (p1 - p0) * eased[:, :3]
+        rotations[valid] = slerp(records['q'][b], records['q'][a],
+                                 eased[:, 3])
+        return translations, rotations
+
+    def sample_morphs(self, frames):
+        """
+        return float32 (T, M) weights of morph_names at frames.
+        morphs are linearly interpolated.
+        """
+        frames = numpy.asarray(frames, numpy.float64).reshape(-1)
+        records = self.morphs.records
+        weights = numpy.zeros((len(frames), len(self.morph_names)),
+                              numpy.float32)
+        if len(records) == 0 or len(self.morph_names) == 0:
+            return weights
+        before, after, progress = _locate(
+            records, self.morphs.index, self.morph_names, frames)
+        valid = before >= 0
+        r0 = records['ratio'][before[valid]].astype(numpy.float64)
+        r1 = records['ratio'][after[valid]].astype(numpy.float64)
+        weights[valid] = r0 + (r1 - r0) * progress[valid]
+        return weights
@@ -1,49 +1,134 @@
 # coding: utf-8
+"""
+vmd writer
+"""
 import io
 import struct
 from .. import common
 from .. import vmd
+try:
+    import numpy
+except ImportError:
+    numpy=None
 
-def write(ios, motion):
+
+BONE_FRAME_STRUCT=struct.Struct('<15sI7f64B')
+MORPH_FRAME_STRUCT=struct.Struct('<15sIf')
+CAMERA_FRAME_STRUCT=struct.Struct('<If3f3f24BfB')
+LIGHT_FRAME_STRUCT=struct.Struct('<I3f3f')
+SHADOW_FRAME_STRUCT=struct.Struct('<IBf')
+COUNT_STRUCT=struct.Struct('<I')
+
+
+def encode_name(name):
+    """str to cp932 bytes. bytes are not changed"""
+    if isinstance(name, bytes):
+        return name
+    return name.encode('shift-jis')
+
+
+def pack_bone_frames(frames):
+    """
+    return bytes of the bone frame section(without count).
+    """
+    if numpy and isinstance(frames, vmd.BoneFrameArray):
+        return frames.records.tobytes()
+    buf=bytearray(BONE_FRAME_STRUCT.size*len(frames))
+    for i, f in enumerate(frames):
+        BONE_FRAME_STRUCT.pack_into(buf, BONE_FRAME_STRUCT.size*i,
+                encode_name(f.name), f.frame,
+                f.pos.x, f.pos.y, f.pos.z, f.q.x, f.q.y, f.q.z, f.q.w,
+                *f.complement)
+    return buf
+
+
+def pack_morph_frames(frames):
+    """
+    return bytes of the morph frame section(without count).
+    """
+    if numpy and isinstance(frames, vmd.MorphFrameArray):
+        return frames.records.tobytes()
+    buf=bytearray(MORPH_FRAME_STRUCT.size*len(frames))
+    for i, f in enumerate(frames):
+        MORPH_FRAME_STRUCT.pack_into(buf, MORPH_FRAME_STRUCT.size*i,
+                encode_name(f.name), f.frame, f.ratio)
+    return buf
+
+
+def pack_camera_frames(frames):
+    buf=bytearray(CAMERA_FRAME_STRUCT.size*len(frames))
+    for i, f in enumerate(frames):
+        CAMERA_FRAME_STRUCT.pack_into(buf, CAMERA_FRAME_STRUCT.size*i,
+                f.frame, f.length,
+                f.pos.x, f.pos.y, f.pos.z,
+                f.euler.x, f.euler.y, f.euler.z,
+                *(list(f.complement)+[f.angle, int(f.perspective)]))
+    return buf
+
+
+def pack_light_frames(frames):
+    buf=bytearray(LIGHT_FRAME_STRUCT.size*len(frames))
+    for i, f in enumerate(frames):
+        LIGHT_FRAME_STRUCT.pack_into(buf, LIGHT_FRAME_STRUCT.size*i,
+                f.frame, f.color.r, f.color.g, f.color.b,
+                f.pos.x, f.pos.y, f.pos.z)
+    return buf
+
+
+def pack_shadow_frames(frames):
+    buf=bytearray(SHADOW_FRAME_STRUCT.size*len(frames))
+    for i, f in enumerate(frames):
+        SHADOW_FRAME_STRUCT.pack_into(buf, SHADOW_FRAME_STRUCT.size*i,
+                f.frame, f.mode, f.distance)
+    return buf
+
+
+def write(ios, motion, tolerance=None, angle_tolerance=None):
     """
+    write motion to ios.
+
+    :Parameters:
+        ios
+            output stream (in io.IOBase)
+        motion
+            vmd.Motion
+        tolerance
+            if not None, drop bone and morph keys reproduced by
+            interpolating their neighbours within tolerance
+            (position and morph ratio). see vmd.reduction
+        angle_tolerance
+            rotation tolerance in radian. default is tolerance
+
+    >>> import pymeshio.vmd.writer
+    >>> pymeshio.vmd.writer.write(io.open('out.vmd', 'wb'), motion)
+
     """
     assert(isinstance(ios, io.IOBase))
     assert(isinstance(motion, vmd.Motion))
-    writer=common.BinaryWriter(ios)
+    bone_frames=motion.motions
+    morph_frames=motion.shapes
+    if tolerance is not None:
+        from . import reduction
+        bone_frames=reduction.reduce_bone_frames(bone_frames,
+                tolerance, angle_tolerance)
+        morph_frames=reduction.reduce_morph_frames(morph_frames, tolerance)
 
     # 30 bytes
-    writer.write_bytes(b"Vocaloid Motion Data 0002", 30)
+    ios.write(struct.pack('30s', b"Vocaloid Motion Data 0002"))
     # 20 bytes
-    writer.write_bytes(b"", 20)
-
-    # bone motions
-    print(len(motion.motions))
-    writer.write_uint(len(motion.motions), 4)
-    for m in motion.motions:
-        """
-        フレームひとつ分(111 bytes)
-        """
-        writer.write_bytes(m.name, 15)
-        writer.write_uint(m.frame, 4)
-        writer.write_float(m.pos.x)
-        writer.write_float(m.pos.y)
-        writer.write_float(m.pos.z)
-        writer.write_float(m.q.x)
-        writer.write_float(m.q.y)
-        writer.write_float(m.q.z)
-        writer.write_float(m.q.w)
-        writer.write_bytes(m.complement, 64)
-
-    # shape motions
-    writer.write_uint(len(motion.shapes), 4)
-    for s in motion.shapes:
-        writer.write_bytes(s.name, 15)
-        writer.write_uint(s.frame, 4)
-        writer.write_float(s.ratio)
-
-    # ToDo
-    writer.write_uint(0, 4)
-    writer.write_uint(0, 4)
-
+    ios.write(struct.pack('20s', encode_name(motion.model_name)))
+    for frames, pack in (
+            (bone_frames, pack_bone_frames),
+            (morph_frames, pack_morph_frames),
+            (motion.cameras, pack_camera_frames),
+            (motion.lights, pack_light_frames),
+            (motion.shadows, pack_shadow_frames),
+            ):
+        ios.write(COUNT_STRUCT.pack(len(frames)))
+        ios.write(pack(frames))
     return True
 
+
+def write_to_file(motion, path, tolerance=None, angle_tolerance=None):
+    with io.open(path, "wb") as f:
+        return write(f, motion, tolerance, angle_tolerance)
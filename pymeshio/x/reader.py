@@ -4,9 +4,13 @@ x reader
 """
 import io
 import re
+from logging import getLogger
 from .. import common
+from .. import profiling
 from .. import x
 
+logger=getLogger(__name__)
+
 
 class Reader(common.TextReader):
     """x reader
@@ -16,9 +20,11 @@ class Reader(common.TextReader):
             'eof',
             'lines',
             'model',
+            'profile',
             ]
-    def __init__(self, ios):
+    def __init__(self, ios, profile=profiling.NULL):
         super(Reader, self).__init__(ios)
+        self.profile=profile
 
     def getline(self):
         while not self.eof:
@@ -68,11 +74,6 @@ class Reader(common.TextReader):
 
 
     def readMeshChunkBody(self):
-        ####################
-        # vertices
-        ####################
-        vertex_count=int(self.getline().split(b";")[0].strip())
-        print("vertex_count: %d" % vertex_count)
         def get_vertex(line):
             splited=line.split(b";")
             return common.Vector3(
@@ -81,22 +82,32 @@ class Reader(common.TextReader):
                     float(splited[2])
                     )
 
-        for _ in range(vertex_count):
-            self.model.vertices.append(get_vertex(self.getline()))
-
-        ####################
-        # faces
-        ####################
-        face_count=int(self.getline().split(b";")[0].strip())
-        print("face_count: %d" % face_count)
         def get_face(line):
             splited=line.split(b";")
             face_vertex_count=int(splited[0])
             face=[int(i) for i in splited[1].split(b",")]
             assert(face_vertex_count==len(face))
             return face
-        for _ in range(face_count):
-            self.model.faces.append(get_face(self.getline()))
+
+        ####################
+        # vertices
+        ####################
+        with self.profile.section('vertices', self.ios) as scope:
+            vertex_count=int(self.getline().split(b";")[0].strip())
+            logger.debug("vertex_count: %d", vertex_count)
+            for _ in range(vertex_count):
+                self.model.vertices.append(get_vertex(self.getline()))
+            scope.count=vertex_count
+
+        ####################
+        # faces
+        ####################
+        with self.profile.section('faces', self.ios) as scope:
+            face_count=int(self.getline().split(b";")[0].strip())
+            logger.debug("face_count: %d", face_count)
+            for _ in range(face_count):
+                self.model.faces.append(get_face(self.getline()))
+            scope.count=face_count
 
         # nested chunks
         while not self.eof:
@@ -113,22 +124,28 @@ class Reader(common.TextReader):
             line=line[0:-1].strip()
 
             splited=line.split()
-            print(splited)
+            logger.debug("%s", splited)
             chunk=splited[0]
 
             if chunk==b"MeshMaterialList":
-                self.readMeshMaterialListChunkBody()
+                with self.profile.section('materials', self.ios) as scope:
+                    self.readMeshMaterialListChunkBody()
+                    scope.count=len(self.model.materials)
             elif chunk==b"MeshNormals":
-                self.readNormalChunkBody()
+                with self.profile.section('normals', self.ios) as scope:
+                    self.readNormalChunkBody()
+                    scope.count=len(self.model.normals)
             elif chunk==b"MeshTextureCoords":
-                self.readUVChunkBody()
+                with self.profile.section('uvs', self.ios) as scope:
+                    self.readUVChunkBody()
+                    scope.count=len(self.model.uvs)
             else:
                 raise "unknown chunk !: [%s]" % chunk
 
 
     def readMeshMaterialListChunkBody(self):
         material_count=int(self.getline().split(b";")[0].strip())
-        print(material_count)
+        logger.debug("material_count: %d", material_count)
         face_material_count=int(self.getline().split(b";")[0].strip())
 
         num_p=re.compile(b"\d+")
@@ -144,7 +161,7 @@ class Reader(common.TextReader):
             chunk=splited[0]
             
             assert(chunk==b"Material")
-            print(splited[1])
+            logger.debug("%s", splited[1])
 
             material=x.Material()
 
@@ -230,7 +247,7 @@ class Reader(common.TextReader):
             if line==b"}":
                 break
 
-            print(line)
+            logger.debug("%s", line)
 
 
     def readUVChunkBody(self):
@@ -256,9 +273,11 @@ class Reader(common.TextReader):
 
 
     def read(self):
-        magic, major, minor, type, float_size=self.readHeader()
+        with self.profile.section('header', self.ios) as scope:
+            magic, major, minor, type, float_size=self.readHeader()
+            scope.count=1
         if not magic:
-            print("no magic number")
+            logger.error("no magic number")
             return
 
         self.model=x.Model()
@@ -268,24 +287,27 @@ class Reader(common.TextReader):
                 continue
             line=line.strip()
 
-            print(line)
+            logger.debug("%s", line)
             assert(line.endswith(b"{"))
             # drop {
             line=line[0:-1].strip()
 
             splited=line.split()
-            print(splited)
+            logger.debug("%s", splited)
             chunk=splited[0]
 
             if chunk==b"template":
-                body=self.readChunkBody()
-                self.model.templates.append(
-                        chunk+b" {\r\n"+
-                        body+b"\r\n"+
-                        b"}\r\n"
-                        )
+                with self.profile.section('templates', self.ios) as scope:
+                    body=self.readChunkBody()
+                    self.model.templates.append(
+                            chunk+b" {\r\n"+
+                            body+b"\r\n"+
+                            b"}\r\n"
+                            )
+                    scope.count=1
             elif chunk==b"Header":
-                self.readHeaderChunkBody()
+                with self.profile.section('header', self.ios) as scope:
+                    self.readHeaderChunkBody()
             elif chunk==b"Mesh":
                 self.readMeshChunkBody()
             else:
@@ -294,30 +316,40 @@ class Reader(common.TextReader):
         return self.model
 
 
-def read(ios):
+def read(ios, profile=None):
     """
     read from ios, then return the pymeshio.mqo.Model.
 
     :Parameters:
       ios
         input stream (in io.IOBase)
+      profile
+        pymeshio.profiling.Profile to record the chunks in
     """
     assert(isinstance(ios, io.IOBase))
-    return Reader(ios).read()
+    if profile is None:
+        profile=profiling.NULL
+    profile.begin('x')
+    try:
+        return Reader(ios, profile).read()
+    finally:
+        profile.end()
 
 
-def read_from_file(path):
+def read_from_file(path, profile=None):
     """
     read from file path, then return the x.Model.
 
     :Parameters:
       path
         file path
+      profile
+        pymeshio.profiling.Profile to record the chunks in
 
     >>> import x.reader
     >>> m=x.reader.read_from_file('resources/cube.x')
 
     """
     with io.open(path, 'rb') as ios:
-        return read(ios)
+        return read(ios, profile)
 
@@ -12,7 +12,7 @@ import os
 import shutil
 from zipfile import ZipFile
 
-from distutils.core import setup, Command
+from setuptools import setup, Command
 from pkgutil import walk_packages
 
 
@@ -87,6 +87,13 @@ setup(
         'pymeshio/vmd',
         'pymeshio/x',
     ],
+    entry_points={
+        'console_scripts': [
+            'pymeshio-stat = pymeshio.main:stat',
+            'pymeshio-pmd2pmx = pymeshio.main:pmd_to_pmx_batch',
+            'pymeshio-generate = pymeshio.main:generate',
+        ],
+    },
     cmdclass={'blender': BlenderAddOn}
     )
 
@@ -0,0 +1,192 @@
+# coding: utf-8
+import io
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import pymeshio.cache
+import pymeshio.pmd.reader
+import pymeshio.pmx
+import pymeshio.pmx.reader
+import pymeshio.vmd.reader
+from . import pmd_test
+from . import pmx_test
+from . import vmd_test
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory=tempfile.mkdtemp()
+        self.cache=pymeshio.cache.DiskCache(
+                os.path.join(self.directory, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, buf):
+        path=os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(buf)
+        return path
+
+    def test_pmx(self):
+        model=pmx_test.create_model()
+        # large enough to go to the blob
+        v=model.vertices[0]
+        model.vertices=[pymeshio.pmx.Vertex(v.position, v.normal, v.uv,
+            v.deform, 1.0) for _ in range(300)]
+        path=self.write('model.pmx', pmx_test.create_bytes(model))
+        expected=pymeshio.pmx.reader.read_from_file(path, arrays=True)
+        first=self.cache.read_from_file(path, arrays=True)
+        second=self.cache.read_from_file(path, arrays=True)
+        self.assertEqual((1, 1), (self.cache.misses, self.cache.hits))
+        self.assertEqual(expected, second)
+        self.assertEqual(path, second.path)
+        position=second.vertices.position
+        self.assertFalse(position.flags.owndata)
+        # copy on write
+        position[0]=(9, 9, 9)
+        third=self.cache.read_from_file(path, arrays=True)
+        self.assertEqual(expected.vertices.position[0].tolist(),
+                third.vertices.position[0].tolist())
+        # object model from the same entry
+        objects=self.cache.read_from_file(path)
+        self.assertEqual(pymeshio.pmx.Model, type(objects))
+        self.assertEqual(pymeshio.pmx.reader.read_from_file(path), objects)
+        self.assertEqual(1, len(self.cache.entries()))
+
+    def test_pmd_and_vmd(self):
+        pmd_path=self.write('model.pmd',
+                pmd_test.create_bytes(pmd_test.create_model()))
+        vmd_path=self.write('motion.vmd', vmd_test.create_motion_bytes())
+        for _ in range(2):
+            pmd=self.cache.read_from_file(pmd_path, arrays=True)
+            motion=self.cache.read_from_file(vmd_path)
+        self.assertEqual((2, 2), (self.cache.misses, self.cache.hits))
+        self.assertEqual(pymeshio.pmd.reader.read_from_file(pmd_path,
+            arrays=True), pmd)
+        self.assertEqual(
+                [(f.name, f.frame) for f in
+                    pymeshio.vmd.reader.read_from_file(vmd_path).motions],
+                [(f.name, f.frame) for f in motion.motions])
+        # content change is a new key
+        self.write('motion.vmd', vmd_test.create_bytes([], []))
+        self.assertEqual(0, len(self.cache.read_from_file(vmd_path).motions))
+        self.assertEqual(3, self.cache.misses)
+
+    def test_pmd_bone_chain(self):
+        path=self.write('chain.pmd', pmd_test.create_bytes(
+            pmd_test.create_model(bone_count=1000)))
+        stored=self.cache.read_from_file(path, arrays=True)
+        loaded=self.cache.read_from_file(path, arrays=True)
+        self.assertEqual((1, 1), (self.cache.misses, self.cache.hits))
+        for model in (stored, loaded):
+            bones=model.bones
+            self.assertEqual([bones[0]], model.no_parent_bones)
+            self.assertIs(bones[499], bones[500].parent)
+            self.assertEqual([bones[501]], bones[500].children)
+            self.assertIs(bones[501].pos, bones[500].tail)
+
+    def test_evict(self):
+        paths=[self.write('model%d.pmd' % i,
+            pmd_test.create_bytes(pmd_test.create_model())+b'\x00'*i)
+            for i in range(3)]
+        for path in paths:
+            self.cache.read_from_file(path, arrays=True)
+            time.sleep(0.01)
+        entries=self.cache.entries()
+        self.assertEqual(3, len(entries))
+        # touch the oldest, then fit two entries
+        self.cache.read_from_file(paths[0], arrays=True)
+        size=max(size for _, size, _ in entries)
+        self.cache.evict(size*2)
+        self.assertEqual(2, len(self.cache.entries()))
+        misses=self.cache.misses
+        self.cache.read_from_file(paths[0], arrays=True)
+        self.cache.read_from_file(paths[2], arrays=True)
+        self.assertEqual(misses, self.cache.misses)
+        self.cache.clear()
+        self.assertEqual([], self.cache.entries())
+
+
+class TestMemoryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory=tempfile.mkdtemp()
+
+    def tearDown(self):
+        pymeshio.cache.uninstall()
+        shutil.rmtree(self.directory)
+
+    def write(self, name, buf):
+        path=os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(buf)
+        return path
+
+    def test_read(self):
+        cache=pymeshio.cache.MemoryCache()
+        path=self.write('model.pmx', pmx_test.create_bytes(pmx_test.create_model()))
+        model=cache.read_from_file(path)
+        self.assertTrue(model is cache.read_from_file(path))
+        self.assertFalse(model is cache.read_from_file(path, arrays=True))
+        self.assertEqual((1, 2, 0), (cache.hits, cache.misses, cache.evictions))
+        self.assertEqual(2, len(cache))
+        self.assertTrue(cache.size > 0)
+        # file change
+        self.write('model.pmx', pmx_test.create_bytes(pmx_test.create_model(8)))
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(8, len(cache.read_from_file(path).bones))
+        self.assertEqual((3, 1), (cache.misses, cache.evictions))
+
+    def test_evict(self):
+        paths=[self.write('model%d.pmd' % i,
+            pmd_test.create_bytes(pmd_test.create_model())) for i in range(3)]
+        size=pymeshio.cache.estimate_size(
+                pymeshio.pmd.reader.read_from_file(paths[0]))
+        cache=pymeshio.cache.MemoryCache(size*2)
+        for path in paths:
+            cache.read_from_file(path)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.evictions)
+        cache.read_from_file(paths[0])
+        self.assertEqual(4, cache.misses)
+        # too large to keep
+        cache.max_bytes=size//2
+        cache.evict()
+        cache.read_from_file(paths[0])
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.size)
+
+    def test_estimate_size(self):
+        small=pymeshio.cache.estimate_size([1.5]*10)
+        large=pymeshio.cache.estimate_size([float(i) for i in range(10000)])
+        self.assertTrue(large > small*500)
+        model=pymeshio.pmx.reader.read(io.BytesIO(
+            pmx_test.create_bytes(pmx_test.create_model())), arrays=True)
+        self.assertTrue(pymeshio.cache.estimate_size(model)
+                > model.vertices.position.nbytes)
+        chain=pymeshio.pmd.reader.read(io.BytesIO(pmd_test.create_bytes(
+            pmd_test.create_model(bone_count=1000))))
+        self.assertTrue(pymeshio.cache.estimate_size(chain) > 0)
+
+    def test_install(self):
+        path=self.write('motion.vmd', vmd_test.create_motion_bytes())
+        cache=pymeshio.cache.install()
+        motion=pymeshio.vmd.reader.read_from_file(path)
+        self.assertTrue(motion is pymeshio.vmd.reader.read_from_file(path))
+        self.assertEqual(1, cache.hits)
+        pymeshio.cache.uninstall()
+        self.assertFalse(motion is pymeshio.vmd.reader.read_from_file(path))
+        self.assertEqual(1, cache.hits)
+
+    def test_install_missing(self):
+        path=os.path.join(self.directory, 'missing.pmx')
+        cache=pymeshio.cache.install()
+        try:
+            self.assertIsNone(pymeshio.pmx.reader.read_from_file(path))
+        finally:
+            pymeshio.cache.uninstall()
+        self.assertEqual(0, len(cache))
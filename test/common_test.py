@@ -0,0 +1,64 @@
+# coding: utf-8
+import unittest
+import io
+import os
+import tempfile
+import pymeshio.common
+import pymeshio.pmx
+import pymeshio.pmx.reader
+from . import pmx_test
+
+
+class TestBinaryReader(unittest.TestCase):
+
+    DATA=b'\x01\x00\x00\x00\x00\x00\x80\x3f\xff\xff'
+
+    def readers(self):
+        yield pymeshio.common.BinaryReader(io.BytesIO(self.DATA))
+        yield pymeshio.common.BinaryReader(
+                pymeshio.common.MemoryStream(self.DATA))
+
+    def test_read(self):
+        for r in self.readers():
+            self.assertEqual(1, r.read_uint(4))
+            self.assertEqual(4, r.tell())
+            self.assertEqual(b'\x00\x00\x80\x3f\xff\xff', bytes(r.peek()))
+            self.assertEqual(1.0, r.read_float())
+            self.assertEqual(-1, r.read_int(2))
+            r.seek(0)
+            r.skip(8)
+            self.assertEqual(b'\xff\xff', bytes(r.read_bytes(2)))
+
+    def test_read_past_end(self):
+        for ios in (io.BytesIO(b'\x01'), pymeshio.common.MemoryStream(b'\x01')):
+            r=pymeshio.common.BinaryReader(ios)
+            self.assertRaises(pymeshio.common.ParseException, r.read_bytes, 2)
+
+    def test_seek_past_end(self):
+        for ios in (io.BytesIO(self.DATA[:3]),
+                pymeshio.common.MemoryStream(self.DATA[:3])):
+            ios.seek(10)
+            self.assertEqual(b'', ios.read())
+            self.assertEqual(b'', ios.read(2))
+            self.assertEqual(10, ios.tell())
+
+    def test_invalid_size(self):
+        for r in self.readers():
+            self.assertRaises(pymeshio.common.ParseException, r.read_int, 3)
+
+    def test_open_mapped(self):
+        data=pmx_test.create_bytes(pmx_test.create_model())
+        fd, path=tempfile.mkstemp(suffix='.pmx')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            with pymeshio.common.open_mapped(path) as ios:
+                self.assertEqual(data, ios.read())
+            self.assertTrue(ios.closed)
+            expected=pymeshio.pmx.reader.read(io.BytesIO(data))
+            self.assertEqual(expected, pymeshio.pmx.reader.read_from_file(path))
+            self.assertEqual(expected,
+                    pymeshio.pmx.reader.read_from_file(path, arrays=True))
+        finally:
+            os.remove(path)
+
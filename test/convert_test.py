@@ -2,12 +2,17 @@
 import unittest
 import os
 import io
+import shutil
+import tempfile
+import unittest.mock
 import pymeshio.common
 import pymeshio.pmd.reader
 import pymeshio.pmx.reader
 import pymeshio.pmx.writer
+import pymeshio.batch
 import pymeshio.converter
 from .fixture import PYMESHIO_TEST_RESOURCES
+from .pmd_test import create_model, create_bytes
 
 PMD_FILE = pymeshio.common.unicode(PYMESHIO_TEST_RESOURCES + '/初音ミクVer2.pmd')
 PMX_FILE = pymeshio.common.unicode(PYMESHIO_TEST_RESOURCES + '/初音ミクVer2.pmx')
@@ -30,3 +35,68 @@ class TestConvert(unittest.TestCase):
         else:
             with io.open(PMX_FILE, "wb") as f:
                 pymeshio.pmx.writer.write(f, converted)
+
+    def test_convert_arrays(self):
+        buf = create_bytes(create_model())
+        converted = pymeshio.converter.pmd_to_pmx(
+            pymeshio.pmd.reader.read(io.BytesIO(buf)))
+        array_converted = pymeshio.converter.pmd_to_pmx(
+            pymeshio.pmd.reader.read(io.BytesIO(buf), arrays=True))
+        self.assertTrue(isinstance(array_converted, pymeshio.pmx.ArrayModel))
+        self.assertEqual(converted.vertices, list(array_converted.vertices))
+        self.assertEqual(converted, array_converted)
+        out = io.BytesIO()
+        pymeshio.pmx.writer.write(out, converted)
+        array_out = io.BytesIO()
+        pymeshio.pmx.writer.write(array_out, array_converted)
+        self.assertEqual(out.getvalue(), array_out.getvalue())
+
+    def test_batch(self):
+        root = tempfile.mkdtemp()
+        try:
+            src = os.path.join(root, 'src')
+            os.makedirs(os.path.join(src, 'sub'))
+            buf = create_bytes(create_model())
+            for name in ('a.pmd', 'sub/b.pmd'):
+                with open(os.path.join(src, name), 'wb') as f:
+                    f.write(buf)
+            with open(os.path.join(src, 'broken.pmd'), 'wb') as f:
+                f.write(b'Pmd')
+            out = os.path.join(root, 'out')
+            jobs = pymeshio.batch.plan([src], out)
+            self.assertEqual(
+                [os.path.join(out, 'a.pmx'), os.path.join(out, 'broken.pmx'),
+                 os.path.join(out, 'sub', 'b.pmx')],
+                [dst for _, dst in jobs])
+            for workers in (1, 2):
+                summary = pymeshio.batch.Summary()
+                for result in pymeshio.batch.run(jobs, workers, force=True):
+                    summary.add(result)
+                self.assertEqual(
+                    {'converted': 2, 'skipped': 0, 'failed': 1}, summary.counts)
+            expected = pymeshio.converter.pmd_to_pmx(
+                pymeshio.pmd.reader.read(io.BytesIO(buf)))
+            self.assertEqual(expected, pymeshio.pmx.reader.read_from_file(
+                os.path.join(out, 'sub', 'b.pmx')))
+            self.assertFalse(os.path.exists(os.path.join(out, 'broken.pmx')))
+            # up to date outputs are skipped
+            statuses = sorted(r.status for r in pymeshio.batch.run(
+                pymeshio.batch.plan([os.path.join(src, '**', '*.pmd')], out), 1))
+            self.assertEqual(['failed', 'skipped', 'skipped'], statuses)
+        finally:
+            shutil.rmtree(root)
+
+    def test_batch_write_error(self):
+        root = tempfile.mkdtemp()
+        try:
+            src = os.path.join(root, 'a.pmd')
+            with open(src, 'wb') as f:
+                f.write(create_bytes(create_model()))
+            dst = os.path.join(root, 'a.pmx')
+            with unittest.mock.patch.object(pymeshio.batch.writer, 'write',
+                                            side_effect=IOError('disk full')):
+                result = pymeshio.batch.convert(src, dst)
+            self.assertEqual('failed', result.status)
+            self.assertEqual(['a.pmd'], os.listdir(root))
+        finally:
+            shutil.rmtree(root)
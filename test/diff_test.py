@@ -0,0 +1,82 @@
+# coding: utf-8
+import io
+import unittest
+import pymeshio.common
+import pymeshio.diff
+import pymeshio.pmd.reader
+import pymeshio.pmx
+import pymeshio.pmx.reader
+from . import pmd_test
+from . import pmx_test
+
+
+class TestDiff(unittest.TestCase):
+
+    def test_pmx(self):
+        buf=pmx_test.create_bytes(pmx_test.create_model())
+        lhs=pymeshio.pmx.reader.read(io.BytesIO(buf), arrays=True)
+        rhs=pymeshio.pmx.reader.read(io.BytesIO(buf), arrays=True)
+        report=pymeshio.diff.diff(lhs, rhs)
+        self.assertTrue(report.is_identical())
+        self.assertEqual(list(pymeshio.diff.PMX_SECTIONS), report.identical)
+
+        rhs.name='changed'
+        rhs.vertices.position[2:5]+=1
+        rhs.vertices.uv[4, 0]=0.5
+        rhs.vertices.position[8]+=1e-7
+        rhs.vertices.weights[9, 0]=0.5
+        rhs.indices=rhs.indices[:-3]
+        rhs.bones[1].position=pymeshio.common.Vector3(1, 2, 3)
+        rhs.bones[3].name='renamed'
+        rhs.morphs[0].offsets.position_offset[0]=(1, 0, 0)
+        rhs.rigidbodies.append(rhs.rigidbodies[0])
+        report=pymeshio.diff.diff(lhs, rhs)
+        C=pymeshio.diff.Change
+        self.assertEqual([
+            C('header', 'changed', name='name'),
+            C('vertices', 'changed', 2, 5, fields=['position', 'uv']),
+            C('vertices', 'changed', 9, 10, fields=['weights']),
+            C('indices', 'removed', 9, 12),
+            C('bones', 'changed', 1, 2, 'bone1', ['position']),
+            C('bones', 'changed', 3, 4, 'bone3', ['name']),
+            C('morphs', 'changed', 0, 1, 'morph', ['offsets']),
+            C('rigidbodies', 'added', 2, 3),
+            ], report.changes)
+        self.assertEqual(['header', 'vertices', 'indices', 'bones',
+            'morphs', 'rigidbodies'], report.sections())
+        self.assertEqual('vertices[2:5] changed: position, uv',
+                str(report.changes[1]))
+        self.assertEqual(8, len(report.to_dict()['changes']))
+
+        # object models give the same report
+        self.assertEqual(report.changes,
+                pymeshio.diff.diff(lhs.to_model(), rhs.to_model()).changes)
+
+    def test_pmd(self):
+        model=pmd_test.create_model()
+        buf=pmd_test.create_bytes(model)
+        lhs=pymeshio.pmd.reader.read(io.BytesIO(buf), arrays=True)
+        rhs=pymeshio.pmd.reader.read(io.BytesIO(buf))
+        self.assertTrue(pymeshio.diff.diff(lhs, rhs).is_identical())
+        rhs.vertices[11].edge_flag=0
+        rhs.vertices[10].pos=pymeshio.common.Vector3(0, 0, 0)
+        rhs.morphs[1].type=2
+        report=pymeshio.diff.diff(lhs, rhs)
+        C=pymeshio.diff.Change
+        self.assertEqual([
+            C('vertices', 'changed', 10, 12, fields=['pos', 'edge_flag']),
+            C('morphs', 'changed', 1, 2, b'morph', ['type']),
+            ], report.changes)
+        self.assertRaises(ValueError, pymeshio.diff.diff,
+                lhs, pymeshio.pmx.Model())
+
+    def test_pmd_bone_chain(self):
+        buf=pmd_test.create_bytes(pmd_test.create_model(bone_count=1000))
+        lhs=pymeshio.pmd.reader.read(io.BytesIO(buf))
+        rhs=pymeshio.pmd.reader.read(io.BytesIO(buf))
+        self.assertTrue(pymeshio.diff.diff(lhs, rhs).is_identical())
+        rhs.bones[500].pos=pymeshio.common.Vector3(1, 2, 3)
+        self.assertEqual(
+                [pymeshio.diff.Change('bones', 'changed', 500, 501,
+                    b'bone500', ['pos'])],
+                pymeshio.diff.diff(lhs, rhs).changes)
@@ -0,0 +1,81 @@
+# coding: utf-8
+import io
+import unittest
+import pymeshio.common
+import pymeshio.converter
+import pymeshio.fingerprint
+import pymeshio.pmd
+import pymeshio.pmd.reader
+import pymeshio.pmx.reader
+import pymeshio.pmx.writer
+from . import pmd_test
+from . import pmx_test
+
+
+def create_pmd_model():
+    """
+    pmd_test.create_model with an ik chain and a joint
+    """
+    v3=pymeshio.common.Vector3
+    model=pmd_test.create_model()
+    ik_bone=pymeshio.pmd.createBone(b'ik', 2)
+    ik_bone.english_name=b'ik'
+    ik_bone.parent_index=0
+    ik_bone.tail_index=0
+    ik_bone.pos=v3(0, 2, 0)
+    model.bones.append(ik_bone)
+    ik=pymeshio.pmd.IK(2, 1)
+    ik.iterations=40
+    ik.weight=0.5
+    ik.children=[0]
+    ik.length=1
+    model.ik_list=[ik]
+    model.rigidbodies.append(model.rigidbodies[0])
+    model.joints=[pymeshio.pmd.Joint(b'joint', 0, 1,
+        v3(0, 1, 0), v3(0, 0, 0), v3(1, 1, 1), v3(-1, -1, -1),
+        v3(0.5, 0.5, 0.5), v3(-0.5, -0.5, -0.5), v3(0, 0, 0), v3(1, 2, 3))]
+    return model
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def test_pmd_to_pmx(self):
+        buf=pmd_test.create_bytes(create_pmd_model())
+        expected=pymeshio.fingerprint.fingerprint(io.BytesIO(buf))
+        self.assertEqual('pmd', expected.format)
+        for arrays in (False, True):
+            pmd=pymeshio.pmd.reader.read(io.BytesIO(buf), arrays)
+            pmx=pymeshio.converter.pmd_to_pmx(pmd)
+            fingerprint=pymeshio.fingerprint.fingerprint(
+                    io.BytesIO(pmx_test.create_bytes(pmx)))
+            self.assertEqual('pmx', fingerprint.format)
+            self.assertEqual([], expected.changed(fingerprint))
+            self.assertEqual(expected, fingerprint)
+            self.assertEqual(expected.hexdigest(), fingerprint.hexdigest())
+
+    def test_pmd_base_morph(self):
+        model=create_pmd_model()
+        model.morphs.reverse()
+        self.assertRaises(pymeshio.common.ParseException,
+                pymeshio.fingerprint.fingerprint,
+                io.BytesIO(pmd_test.create_bytes(model)))
+
+    def test_changed(self):
+        model=pmx_test.create_model()
+        expected=pymeshio.fingerprint.fingerprint(
+                io.BytesIO(pmx_test.create_bytes(model)))
+        # smaller index sizes do not matter
+        out=io.BytesIO()
+        pymeshio.pmx.writer.write(out, model, index_sizes=(4, 4, 4, 4, 4, 4))
+        self.assertEqual(expected,
+                pymeshio.fingerprint.fingerprint(io.BytesIO(out.getvalue())))
+        model.vertices[3].uv=pymeshio.common.Vector2(0.5, 0.5)
+        model.bones[2].english_name='renamed'
+        model.rigidbodies[0].param.mass=2.0
+        fingerprint=pymeshio.fingerprint.fingerprint(
+                io.BytesIO(pmx_test.create_bytes(model)))
+        self.assertEqual(['geometry', 'skeleton', 'physics'],
+                expected.changed(fingerprint))
+        self.assertNotEqual(expected, fingerprint)
+        self.assertEqual(sorted(pymeshio.fingerprint.SECTIONS
+            + ('format', 'digest')), sorted(fingerprint.to_dict()))
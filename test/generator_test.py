@@ -0,0 +1,70 @@
+# coding: utf-8
+import io
+import unittest
+import pymeshio.diff
+import pymeshio.generator
+import pymeshio.mqo.reader
+import pymeshio.obj.reader
+import pymeshio.pmd.reader
+import pymeshio.pmx
+import pymeshio.pmx.reader
+import pymeshio.vmd.reader
+
+
+class TestGenerator(unittest.TestCase):
+
+    def test_pmx(self):
+        model=pymeshio.generator.create_pmx(3000, bone_count=8,
+                morph_count=3, rigidbody_count=4)
+        data=pymeshio.generator.generate_bytes('.pmx', vertex_count=3000,
+                bone_count=8, morph_count=3, rigidbody_count=4)
+        read=pymeshio.pmx.reader.read(io.BytesIO(data), arrays=True)
+        self.assertEqual(3000, len(read.vertices))
+        self.assertEqual(2998*3, len(read.indices))
+        self.assertEqual(3, len(read.morphs))
+        self.assertEqual(3, len(read.joints))
+        self.assertEqual([], pymeshio.diff.diff(model, read).by_section('vertices'))
+        self.assertEqual(len(read.indices),
+                sum(m.vertex_count for m in read.materials))
+        # same arguments, same bytes
+        self.assertEqual(data, pymeshio.generator.generate_bytes('.pmx',
+            vertex_count=3000, bone_count=8, morph_count=3, rigidbody_count=4))
+
+    def test_deform_mix(self):
+        model=pymeshio.generator.create_pmx(1000,
+                deform_mix={pymeshio.pmx.DEFORM_SDEF: 1})
+        self.assertTrue((model.vertices.deform_type==pymeshio.pmx.DEFORM_SDEF).all())
+        self.assertRaises(ValueError, pymeshio.generator.create_pmd, 1000,
+                deform_mix={pymeshio.pmx.DEFORM_SDEF: 1})
+
+    def test_pmd(self):
+        data=pymeshio.generator.generate_bytes('.pmd', vertex_count=2000,
+                rigidbody_count=2)
+        model=pymeshio.pmd.reader.read(io.BytesIO(data))
+        self.assertEqual(2000, len(model.vertices))
+        self.assertEqual(17, len(model.morphs))
+        self.assertEqual(1, len(model.joints))
+        self.assertRaises(ValueError, pymeshio.generator.create_pmd, 70000)
+
+    def test_vmd(self):
+        data=pymeshio.generator.generate_bytes('.vmd', bone_frame_count=640)
+        motion=pymeshio.vmd.reader.read(io.BytesIO(data))
+        self.assertEqual(640, len(motion.motions))
+        self.assertEqual(160, len(motion.shapes))
+
+    def test_obj(self):
+        data=pymeshio.generator.generate_bytes('.obj', vertex_count=500,
+                material_count=2)
+        model=pymeshio.obj.reader.read(io.BytesIO(data))
+        self.assertEqual(500, len(model.vertices))
+        self.assertEqual(2, len(model.materials))
+        self.assertEqual(498, sum(len(m.faces) for m in model.materials))
+
+    def test_mqo(self):
+        data=pymeshio.generator.generate_bytes('.mqo', vertex_count=500,
+                object_count=2)
+        model=pymeshio.mqo.reader.read(io.BytesIO(data))
+        self.assertEqual(2, len(model.objects))
+        self.assertEqual(500, sum(len(o.vertices) for o in model.objects))
+        self.assertEqual(496, sum(len(o.faces) for o in model.objects))
+
@@ -0,0 +1,71 @@
+# coding: utf-8
+import io
+import struct
+import unittest
+import pymeshio.common
+import pymeshio.generator
+import pymeshio.konbu as konbu
+import pymeshio.layout as layout
+import pymeshio.pmd.reader
+import pymeshio.pmd.reader_konbu
+import pymeshio.pmd.schema
+
+
+class TestKonbu(unittest.TestCase):
+
+    def test_record(self):
+        record=konbu.Record(lambda *values: values,
+                konbu.u8, konbu.vector3, konbu.text(4), konbu.i16)
+        self.assertEqual('B3f4sh', record.fmt)
+        data=struct.pack('<B3f4sh', 7, 1, 2, 3, b'ab\x00c', -2)
+        cursor=konbu.Cursor(data)
+        self.assertEqual((7, pymeshio.common.Vector3(1, 2, 3), b'ab', -2),
+                record.parse(cursor))
+        self.assertTrue(cursor.is_end())
+
+    def test_array(self):
+        data=struct.pack('<I3H', 3, 1, 2, 3)
+        self.assertEqual([1, 2, 3],
+                konbu.Array(konbu.u32, konbu.u16).parse_bytes(data))
+        # counted by an earlier field, followed by a fixed field
+        record=konbu.Record(lambda *values: values, konbu.u8,
+                konbu.Array(konbu.Ref(0), konbu.Unpack('Hf')), konbu.u8)
+        data=struct.pack('<BHfHfB', 2, 1, 0.5, 2, 1.5, 9)
+        self.assertEqual((2, [(1, 0.5), (2, 1.5)], 9), record.parse_bytes(data))
+        self.assertEqual(b'abc', konbu.Prefixed(konbu.u32).parse_bytes(
+            struct.pack('<I3s', 3, b'abc')))
+
+    def test_from_layout(self):
+        record=layout.Record(None,
+                layout.Field('name', layout.Bytes(4)),
+                layout.Field('count', layout.Scalar('B'), hidden=True),
+                layout.Field('values', layout.List('count',
+                    layout.Record(None,
+                        layout.Field('index', layout.Index('vertex')),
+                        layout.Field('pos', layout.Vector(
+                            pymeshio.common.Vector2, ('x', 'y')))))))
+        data=struct.pack('<4sBH2fH2f', b'ab', 2, 1, 0.5, 1, 3, 0, 0)
+        v2=pymeshio.common.Vector2
+        self.assertEqual((b'ab', [(1, v2(0.5, 1)), (3, v2(0, 0))]),
+                konbu.from_layout(record, {'vertex': 'H'}).parse_bytes(data))
+        # the same bytes as the layout codec
+        self.assertEqual(
+                pymeshio.pmd.schema.CODECS['joint'].struct.format.lstrip('<'),
+                konbu.from_layout(pymeshio.pmd.schema.JOINT_RECORD).fmt)
+
+    def test_no_more_data(self):
+        self.assertRaises(pymeshio.common.ParseException,
+                konbu.Array(konbu.u32, konbu.u16).parse_bytes,
+                struct.pack('<IH', 2, 1))
+
+    def test_pmd(self):
+        data=pymeshio.generator.generate_bytes('.pmd', vertex_count=500,
+                rigidbody_count=2)
+        model=pymeshio.pmd.reader_konbu.read_from_bytes(data)
+        self.assertEqual(pymeshio.pmd.reader.read(io.BytesIO(data)), model)
+        self.assertEqual(model.bones[1].parent, model.bones[0])
+        self.assertRaises(pymeshio.common.ParseException,
+                pymeshio.pmd.reader_konbu.read_from_bytes, data[:1000])
+        self.assertRaises(pymeshio.common.ParseException,
+                pymeshio.pmd.reader_konbu.read_from_bytes, b'Pmx'+data[3:])
+
@@ -0,0 +1,96 @@
+# coding: utf-8
+import io
+import struct
+import types
+import unittest
+import pymeshio.common
+import pymeshio.generator
+import pymeshio.layout as layout
+import pymeshio.pmd
+import pymeshio.pmd.reader
+import pymeshio.pmd.schema
+from pymeshio.layout import Field, List, Record, Switch, When
+
+
+V3=layout.Vector(pymeshio.common.Vector3, ('x', 'y', 'z'))
+
+POINT=Record(None,
+        Field('index', layout.Index('vertex'), '{0}[0]'),
+        Field('pos', V3, '{0}[1]'))
+
+SHAPE=Record(types.SimpleNamespace,
+        Field('kind', layout.Scalar('B')),
+        Switch('kind', {
+            0: [Field('radius', layout.Scalar('f'))],
+            1: [Field('size', V3)],
+            }),
+        Field('flag', layout.Scalar('B')),
+        When(lambda flag: flag & 1, [Field('name', layout.Bytes(4))]),
+        Field('points', List(layout.Scalar('H'), POINT)),
+        Field('tail', layout.Scalar('h')))
+
+
+def encode(codec, value):
+    out=bytearray()
+    codec.encode(None, value, out)
+    return bytes(out)
+
+
+class TestLayout(unittest.TestCase):
+
+    def test_fixed(self):
+        codec=layout.compile(POINT, {'vertex': 'H'})
+        self.assertEqual(14, codec.size)
+        value=(3, pymeshio.common.Vector3(1, 2, 3))
+        data=codec.pack(value)
+        self.assertEqual(struct.pack('<H3f', 3, 1, 2, 3), data)
+        self.assertEqual(value, codec.decode_values(codec.struct.unpack(data)))
+        # compiled once per sizes
+        self.assertIs(codec, layout.compile(POINT, {'vertex': 'H'}))
+        self.assertEqual(16, layout.compile(POINT, {'vertex': 'i'}).size)
+
+    def test_branches(self):
+        codec=layout.compile(SHAPE, {'vertex': 'B'})
+        self.assertIsNone(codec.size)
+        v3=pymeshio.common.Vector3
+        values=[
+                types.SimpleNamespace(kind=0, radius=0.5, flag=0, points=[],
+                    tail=-1),
+                types.SimpleNamespace(kind=1, size=v3(1, 2, 3), flag=1,
+                    name=b'ab', points=[(1, v3(0, 1, 0)), (2, v3(0, 0, 1))],
+                    tail=7),
+                ]
+        for value in values:
+            data=encode(codec, value)
+            reader=pymeshio.common.BinaryReader(io.BytesIO(data + b'!'))
+            self.assertEqual(value, codec.decode(reader))
+            reader=pymeshio.common.BinaryReader(io.BytesIO(data + b'!'))
+            codec.skip(reader)
+            self.assertEqual(len(data), reader.tell())
+        self.assertRaises(pymeshio.common.WriteException, encode, codec,
+                types.SimpleNamespace(kind=2, flag=0, points=[], tail=0))
+        reader=pymeshio.common.BinaryReader(io.BytesIO(b'\x02'))
+        self.assertRaises(pymeshio.common.ParseException, codec.decode, reader)
+
+    def test_pmd(self):
+        schema=pymeshio.pmd.schema
+        self.assertEqual(38, schema.VERTEX.size)
+        data=pymeshio.generator.generate_bytes('.pmd', vertex_count=300)
+        model=pymeshio.pmd.reader.read(io.BytesIO(data))
+        ik=pymeshio.pmd.IK(1, 2)
+        ik.iterations=40
+        ik.weight=0.5
+        ik.children=[3, 4]
+        for record, item in (('ik', ik), ('morph', model.morphs[1])):
+            codec=schema.CODECS[record]
+            data=encode(codec, item)
+            reader=pymeshio.common.BinaryReader(io.BytesIO(data))
+            decoded=codec.decode(reader)
+            self.assertEqual(data, encode(codec, decoded))
+            reader=pymeshio.common.BinaryReader(io.BytesIO(data))
+            codec.skip(reader)
+            self.assertTrue(reader.is_end())
+        self.assertEqual(model.morphs[1].pos_list, decoded.pos_list)
+
+if __name__=='__main__':
+    unittest.main()
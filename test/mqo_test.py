@@ -19,3 +19,59 @@ def test_mqo_read():
     assert pymeshio.mqo.Model == model.__class__, "class"
     assert 1 == len(model.materials), "materials"
     assert 1 == len(model.objects), "objects"
+
+
+MIXED_MQO = b"""Metasequoia Document
+Format Text Ver 1.0
+
+Object "mixed" {
+\tvertex 5 {
+\t\t0.0000 1.0000 -2.5000
+\t\t1.0000 0.0000 0.0000
+\t\t0.0000 0.0000 1.0000
+\t\t-1.5000 2.0000 3.0000
+\t\t4.0000 -5.0000 6.0000
+\t}
+\tface 6 {
+\t\t3 V(0 1 2) M(1) UV(0.1 0.2 0.3 0.4 0.5 0.6)
+\t\t4 V(0 1 2 3) M(0) UV(0 0 1 0 1 1 0 1) COL(4278190335 65280 16711680 4294967295)
+\t\t3 V(2 3 4)
+\t\t2 V(0 4)
+\t\t5 V(0 1 2 3 4)
+\t\t3 V(1 2 3) M(2) UV(0.7 0.8 0.9 1 0 0)
+\t}
+}
+Eof
+"""
+
+
+def test_mqo_arrays():
+    import io
+    import numpy
+    model = pymeshio.mqo.reader.read(io.BytesIO(MIXED_MQO))
+    arrays = pymeshio.mqo.reader.read(io.BytesIO(MIXED_MQO), arrays=True)
+    obj = model.objects[0]
+    array_obj = arrays.objects[0]
+    assert isinstance(array_obj, pymeshio.mqo.ArrayObj)
+    assert numpy.float32 == array_obj.vertices.dtype
+    assert [list(v.to_tuple()) for v in obj.vertices] == \
+        array_obj.vertices.tolist()
+    # grouped by vertex count in file order, the 5 vertex face is dropped
+    assert [3, 4] == sorted(array_obj.faces)
+    assert 4 == array_obj.face_count()
+    triangles = array_obj.faces[3]
+    assert [[0, 1, 2], [2, 3, 4], [1, 2, 3]] == triangles.indices.tolist()
+    assert [1, 0, 2] == triangles.material_index.tolist()
+    assert triangles.col is None
+    quad = array_obj.faces[4].to_faces()[0]
+    expected = [f for f in obj.faces if f.index_count == 4][0]
+    assert expected.indices == quad.indices
+    assert expected.col == quad.col
+    assert [255, 0, 0, 255] == quad.col[:4]
+    for i in range(4):
+        assert expected.getUV(i) == quad.getUV(i)
+    assert [[0, 4]] == array_obj.edges.indices.tolist()
+    faces = [f for f in obj.faces if f.index_count == 3]
+    converted = pymeshio.mqo.FaceArray.from_faces(3, faces)
+    assert triangles.indices.tolist() == converted.indices.tolist()
+    assert numpy.allclose(triangles.uv, converted.uv)
@@ -2,14 +2,43 @@
 import sys
 import io
 import unittest
+import os
+import tempfile
 import pymeshio.common
+import pymeshio.generator
 import pymeshio.obj
 import pymeshio.obj.reader
+import pymeshio.obj.reader_parallel
 #import pymeshio.obj.writer
 
 
 OBJ_FILE = pymeshio.common.unicode('resources/cube.obj')
 
+MIXED_OBJ = b'''# mixed
+v 0 0 0
+v 1 0 0 1
+v 1 1 0
+  v 0 1 0
+vt 0 0
+vt 1 1
+vn 0 0 1
+f 1 2 3
+usemtl red
+f 1/1 2/2 3/1 4/2
+f 1//1 3//1 4//1
+# switch back
+usemtl default
+f 1/1/1 2/2/1 3/1/1
+usemtl red
+f 2 3 4
+'''
+
+
+def references(model):
+    return [(material.name, [[(r.v, r.vt, r.vn) for r in f.vertex_references]
+                             for f in material.faces])
+            for material in model.materials]
+
 
 class TestObj(unittest.TestCase):
 
@@ -21,6 +50,44 @@ class TestObj(unittest.TestCase):
         self.assertEqual(pymeshio.obj.Model, model.__class__)
         self.assertEqual(8, len(model.vertices))
 
+    def test_read_parallel(self):
+        model = pymeshio.obj.reader_parallel.read(io.BytesIO(MIXED_OBJ))
+        self.assertEqual(pymeshio.obj.ArrayModel, model.__class__)
+        self.assertEqual(b'mixed', model.comment)
+        self.assertEqual((4, 3), model.vertices.shape)
+        self.assertEqual(5, model.face_count())
+        self.assertEqual([[0, 0, 1], [1, 1, 3], [0, 3, 4], [1, 4, 5]],
+                         model.material_spans.tolist())
+        self.assertEqual([
+            (b'default', [[(0, None, None), (1, None, None), (2, None, None)],
+                          [(0, 0, 0), (1, 1, 0), (2, 0, 0)]]),
+            (b'red', [[(0, 0, None), (1, 1, None), (2, 0, None), (3, 1, None)],
+                      [(0, None, 0), (2, None, 0), (3, None, 0)],
+                      [(1, None, None), (2, None, None), (3, None, None)]]),
+            ], references(model.to_model()))
+
+    def test_read_parallel_chunks(self):
+        data = pymeshio.generator.generate_bytes('.obj', vertex_count=500)
+        expected = pymeshio.obj.reader.read(io.BytesIO(data))
+        fd, path = tempfile.mkstemp(suffix='.obj')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            model = pymeshio.obj.reader_parallel.read_from_file(
+                    path, workers=2, chunk_size=4096)
+        finally:
+            os.remove(path)
+        self.assertEqual(references(expected),
+                         references(model.to_model()))
+        self.assertEqual([(v.x, v.y, v.z) for v in expected.vertices],
+                         [tuple(v) for v in
+                          model.vertices.astype(float).round(6).tolist()])
+
+    def test_read_parallel_relative(self):
+        with self.assertRaises(pymeshio.common.ParseException):
+            pymeshio.obj.reader_parallel.read(
+                    io.BytesIO(b'v 0 0 0\nv 1 0 0\nv 1 1 0\nf -3 -2 -1\n'))
+
     def test_write(self):
         pass
         """
@@ -9,12 +9,63 @@ import unittest
 import pymeshio.common
 import pymeshio.pmd
 import pymeshio.pmd.reader
+import pymeshio.pmd.schema
 import pymeshio.pmd.writer
 
 
 PMD_FILE = pymeshio.common.unicode('resources/初音ミクVer2.pmd')
 
 
+def create_model(bone_count=2):
+    """
+    small model with bdef1/bdef2 weights, a base and a vertex morph.
+    the bones are one chain of bone_count
+    """
+    v3 = pymeshio.common.Vector3
+    rgb = pymeshio.common.RGB
+    model = pymeshio.pmd.Model(1.0)
+    model.name = b'model'
+    model.english_name = b'model'
+    for i in range(12):
+        model.vertices.append(pymeshio.pmd.Vertex(
+            v3(i, i * 0.5, -i), v3(0, 1, 0), pymeshio.common.Vector2(i * 0.1, 1),
+            0, 1, [0, 50, 100][i % 3], i % 2))
+    model.indices = list(range(12))
+    model.materials = [pymeshio.pmd.Material(
+        rgb(1, 1, 1), 1.0, 5.0, rgb(0, 0, 0), rgb(0.5, 0.5, 0.5),
+        0, 1, 12, b'tex.bmp*sphere.sph')]
+    for i in range(bone_count):
+        bone = pymeshio.pmd.createBone(b'bone%d' % i, 1)
+        bone.english_name = b'bone%d' % i
+        bone.parent_index = i - 1 if i > 0 else 0xFFFF
+        bone.tail_index = i + 1 if i < bone_count - 1 else 0
+        bone.pos = v3(0, i, 0)
+        model.bones.append(bone)
+    base = pymeshio.pmd.Morph(b'base')
+    base.type = 0
+    for i in range(0, 12, 3):
+        base.append(i, i, i * 0.5, -i)
+    morph = pymeshio.pmd.Morph(b'morph')
+    morph.type = 1
+    morph.english_name = b'morph'
+    for i in range(len(base.indices)):
+        morph.append(i, 0, 0.5, 0)
+    model.morphs = [base, morph]
+    model.morph_indices = [1]
+    model.bone_group_list = [pymeshio.pmd.BoneGroup(b'group', b'group')]
+    model.bone_display_list = [(1, 1)]
+    model.rigidbodies = [pymeshio.pmd.RigidBody(
+        b'rigid', 0, 0, -1, 1, v3(1, 2, 3), v3(0, 1, 0), v3(0, 0, 0),
+        1.0, 0.5, 0.5, 0.25, 0.75, 0)]
+    return model
+
+
+def create_bytes(model):
+    out = io.BytesIO()
+    pymeshio.pmd.writer.write(out, model)
+    return out.getvalue()
+
+
 class PmdTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -64,6 +115,49 @@ class PmdTestCase(unittest.TestCase):
         model.diff(model2)
         self.assertEqual(model, model2)
 
+    def test_read_arrays(self):
+        buf = create_bytes(create_model())
+        model = pymeshio.pmd.reader.read(io.BytesIO(buf))
+        array_model = pymeshio.pmd.reader.read(io.BytesIO(buf), arrays=True)
+        self.assertTrue(isinstance(array_model, pymeshio.pmd.ArrayModel))
+        self.assertEqual(pymeshio.pmd.VERTEX_DTYPE, array_model.vertices.dtype)
+        self.assertEqual(model.indices, array_model.indices.tolist())
+        self.assertEqual((4, 3), array_model.morphs[1].pos_list.shape)
+        self.assertEqual(model, array_model)
+        self.assertEqual(array_model, model)
+        self.assertEqual(model, array_model.to_model())
+        self.assertEqual(array_model, pymeshio.pmd.ArrayModel.from_model(model))
+        # same bytes from both representation
+        self.assertEqual(buf, create_bytes(array_model))
+
+    def test_schema(self):
+        schema = pymeshio.pmd.schema
+        v3 = pymeshio.common.Vector3
+        rgb = pymeshio.common.RGB
+        records = [
+            (schema.MATERIAL, schema.encode_material, schema.decode_material,
+             pymeshio.pmd.Material(rgb(1, 0, 0), 0.5, 5.0, rgb(0, 1, 0),
+                                   rgb(0, 0, 1), -1, 1, 30, b'tex.bmp')),
+            (schema.BONE, schema.encode_bone, schema.decode_bone,
+             pymeshio.pmd.createBone(b'bone', 1)),
+            (schema.RIGIDBODY, schema.encode_rigidbody,
+             schema.decode_rigidbody,
+             pymeshio.pmd.RigidBody(b'rigid', 3, 2, -1, 1, v3(1, 2, 3),
+                                    v3(0, 1, 0), v3(0, 0, 0.5),
+                                    1.0, 0.5, 0.5, 0.25, 0.75, 1)),
+            (schema.JOINT, schema.encode_joint, schema.decode_joint,
+             pymeshio.pmd.Joint(b'joint', 0, 1, v3(0, 1, 0), v3(0, 0, 0),
+                                v3(1, 1, 1), v3(-1, -1, -1),
+                                v3(0.5, 0.5, 0.5), v3(-0.5, -0.5, -0.5),
+                                v3(0, 0, 0), v3(1, 2, 3))),
+        ]
+        for s, encode, decode, record in records:
+            data = encode(record)
+            self.assertEqual(s.size, len(data))
+            decoded = decode(s.unpack(data))
+            self.assertEqual(record, decoded)
+            self.assertEqual(data, encode(decoded))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,8 +1,14 @@
 # coding: utf-8
 import sys
 import io
+import os
+import shutil
+import struct
+import tempfile
 import unittest
 import pymeshio.common
+import pymeshio.generator
+import pymeshio.pmd.reader
 import pymeshio.pmm
 import pymeshio.pmm.reader
 #import pymeshio.pmm.writer
@@ -11,8 +17,89 @@ import pymeshio.pmm.reader
 PMM_FILE=pymeshio.common.unicode('resources/UserFile/サンプル（きしめん).pmm')
 
 
+def text(value, size):
+    return value.ljust(size, b'\x00')
+
+
+def frame(index, frame_number):
+    """frame header. index is None for the initial frame"""
+    head=b'' if index is None else struct.pack('<i', index)
+    return head+struct.pack('<3i', frame_number, 0, 0)
+
+
+def create_bytes(pmd_model, pmd_path):
+    """
+    pmm of one model with one extra bone frame and no accessory.
+    """
+    out=io.BytesIO()
+    out.write(text(b'Polygon Movie maker 0001', 30))
+    out.write(struct.pack('<3ifB6B', 1280, 720, 300, 30.0, 1, *[0]*6))
+    out.write(struct.pack('<B', 1))
+    out.write(text(b'model', 20))
+
+    # model
+    out.write(struct.pack('<B', 0))
+    out.write(text(b'model', 20))
+    out.write(text(b'C:\\MMD\\UserFile\\'+pmd_path, 256))
+    out.write(struct.pack('<BB5i', 0, 1, 0, 1, 0, 0, 0))
+    out.write(struct.pack('<B2B', 2, 0, 0))
+    out.write(struct.pack('<4BI', 0, 0, 0, 0, 30))
+    bone_frame=struct.pack('<16B7fB', *([20]*16+[0, 1, 0, 0, 0, 0, 1, 0]))
+    for _ in pmd_model.bones:
+        out.write(frame(None, 0)+bone_frame)
+    out.write(struct.pack('<i', 1))
+    out.write(frame(len(pmd_model.bones), 30)+bone_frame)
+    for _ in pmd_model.morphs:
+        out.write(frame(None, 0)+struct.pack('<fB', 0.5, 0))
+    out.write(struct.pack('<i', 0))
+    ik=struct.pack('<B', 1)*len(pmd_model.ik_list)
+    out.write(frame(None, 0)+struct.pack('<B', 1)+ik+struct.pack('<B', 0))
+    out.write(struct.pack('<i', 0))
+    for _ in pmd_model.bones:
+        out.write(struct.pack('<7fiBB', *([0]*7+[0, 0, 0])))
+    out.write(struct.pack('<f', 0)*len(pmd_model.morphs))
+    out.write(ik)
+
+    # camera
+    out.write(frame(None, 0)+struct.pack('<7f24BBBi', *([0]*7+[20]*24+[0]*3)))
+    out.write(struct.pack('<i', 0))
+    # light
+    out.write(b'\x00'*37)
+    out.write(frame(None, 0)+b'\x00'*25)
+    out.write(struct.pack('<i', 0))
+    out.write(struct.pack('<6f', 0.6, 0.6, 0.6, -0.5, -1.0, 0.5))
+    # accessory
+    out.write(struct.pack('<BiB', 0, 3, 0))
+    out.write(b'\x00'*(55+15))
+
+    # play info
+    out.write(struct.pack('<4BII', 0, 1, 1, 0, 0, 120))
+    out.write(b'\x00'*2)
+    out.write(struct.pack('<B', 0)+text(b'', 256)+b'\x00'*12)
+    out.write(text(b'', 256)+struct.pack('<B', 0)+b'\x00'*15)
+    out.write(text(b'', 256)+struct.pack('<B', 0))
+    out.write(struct.pack('<4B', 1, 1, 1, 0))
+    out.write(struct.pack('<BB', 0x70, 0x42))
+    out.write(struct.pack('<4Bi', 0, 0, 0, 0, 1))
+    out.write(struct.pack('<f', 0.5))
+    out.write(struct.pack('<B', 0))
+    out.write(struct.pack('<fBB', 1.0, 0, 1))
+    out.write(struct.pack('<f', 0))
+    out.write(struct.pack('<B', 1))
+
+    # physics
+    out.write(struct.pack('<BfI3fB', 1, 9.8, 10, 0, -1, 0, 0))
+    out.write(struct.pack('<BB', 1, 1))
+    # self shadow
+    out.write(struct.pack('<f', 0)+b'\x00'*14+struct.pack('<B', 0))
+    out.write(struct.pack('<fBI', 0, 0, 0))
+    out.write(struct.pack('<B3IB', 1, 0, 0, 0, 1))
+    out.write(struct.pack('<B', 1))
+    return out.getvalue()
+
+
 class TestPmm(unittest.TestCase):
-    
+
     def setUp(self):
         pass
 
@@ -21,3 +108,29 @@ class TestPmm(unittest.TestCase):
         #project=pymeshio.pmm.reader.read_from_file(PMM_FILE)
         #print(project)
 
+    def test_read_synthetic(self):
+        base_dir=tempfile.mkdtemp()
+        try:
+            pmd_path=os.path.join(base_dir, 'model.pmd')
+            pymeshio.generator.generate_file(pmd_path, vertex_count=30)
+            pmd_model=pymeshio.pmd.reader.read_from_file(pmd_path)
+            data=create_bytes(pmd_model, b'model.pmd')
+            ios=io.BytesIO(data)
+            project=pymeshio.pmm.reader.read(ios, base_dir)
+        finally:
+            shutil.rmtree(base_dir)
+        self.assertEqual(len(data), ios.tell())
+        self.assertEqual(1280, project.screen_width)
+        self.assertEqual(300, project.timelineview_width)
+        self.assertEqual(30.0, project.fovy)
+        self.assertEqual(120, project.end)
+        self.assertAlmostEqual(9.8, project.gravity, places=5)
+        self.assertEqual(1, project.use_black_background)
+        self.assertEqual(1, len(project.models))
+        model=project.models[0]
+        self.assertEqual('model', model.name)
+        self.assertEqual('model.pmd', model.path)
+        self.assertEqual(1, model.is_visible)
+        self.assertEqual(len(pmd_model.bones), len(model.bones))
+        self.assertFalse(hasattr(model, '__dict__'))
+
@@ -2,8 +2,10 @@
 import unittest
 import io
 import pymeshio.common
+import pymeshio.pmx
 import pymeshio.pmd.reader
 import pymeshio.pmx.reader
+import pymeshio.pmx.schema
 import pymeshio.pmx.writer
 
 
@@ -12,6 +14,47 @@ PMX_FILE_WITH_BONEMORPH=pymeshio.common.unicode('resources/bonemorph.pmx')
 PMX_FILE_WITH_GROUPMORPH=pymeshio.common.unicode('resources/groupmorph.pmx')
 
 
+def create_model(bone_count=4):
+    """
+    small model with every deform type
+    """
+    v3=pymeshio.common.Vector3
+    model=pymeshio.pmx.Model()
+    model.bones=[
+            pymeshio.pmx.Bone('bone%d' % i, 'bone%d' % i, v3(0, i, 0), i-1, 0, 0)
+            for i in range(bone_count)]
+    last=bone_count-1
+    deforms=[
+            pymeshio.pmx.Bdef1(last),
+            pymeshio.pmx.Bdef2(0, last, 0.25),
+            pymeshio.pmx.Bdef4(0, 1, 2, last, 0.1, 0.2, 0.3, 0.4),
+            pymeshio.pmx.Sdef(1, last, 0.75, v3(1, 2, 3), v3(4, 5, 6), v3(7, 8, 9)),
+            ]
+    for i in range(12):
+        model.vertices.append(pymeshio.pmx.Vertex(
+            v3(i, i*0.5, -i), v3(0, 1, 0), pymeshio.common.Vector2(i*0.1, 1),
+            deforms[i % len(deforms)], 1.0 if i % 2 else 0.0))
+    model.indices=list(range(12))
+    model.materials[0].vertex_count=12
+    model.morphs=[pymeshio.pmx.Morph('morph', 'morph', 1, 1, [
+        pymeshio.pmx.VertexMorphOffset(i, v3(0, 0.5, 0)) for i in range(0, 12, 3)])]
+    model.rigidbodies=[
+            pymeshio.pmx.RigidBody('rigidbody%d' % i, 'rigidbody%d' % i,
+                i, i, -2, 1, v3(1, 2, 3), v3(0, i, 0), v3(0.5, 0, 0),
+                1.0, 0.5, 0.5, 0.25, 0.75, i % 3)
+            for i in range(2)]
+    model.joints=[pymeshio.pmx.Joint('joint', 'joint', 0, 0, 1,
+        v3(0, 1, 0), v3(0, 0, 0), v3(-1, -1, -1), v3(1, 1, 1),
+        v3(-0.5, -0.5, -0.5), v3(0.5, 0.5, 0.5), v3(0, 0, 0), v3(1, 2, 3))]
+    return model
+
+
+def create_bytes(model):
+    out=io.BytesIO()
+    pymeshio.pmx.writer.write(out, model)
+    return out.getvalue()
+
+
 class TestPmx(unittest.TestCase):
     
     def setUp(self):
@@ -60,6 +103,166 @@ class TestPmx(unittest.TestCase):
         model2=pymeshio.pmx.reader.read(io.BytesIO(out.getvalue()))
         self.assertEqual(model, model2)
 
+    def test_read_vertex_array(self):
+        for bone_count in (4, 200):
+            buf=create_bytes(create_model(bone_count))
+            model=pymeshio.pmx.reader.read(io.BytesIO(buf))
+            array_model=pymeshio.pmx.reader.read(io.BytesIO(buf), arrays=True)
+            self.assertTrue(isinstance(array_model, pymeshio.pmx.ArrayModel))
+            self.assertTrue(isinstance(
+                array_model.vertices, pymeshio.pmx.VertexArray))
+            self.assertEqual(model.vertices, list(array_model.vertices))
+            self.assertEqual(model.indices, array_model.indices.tolist())
+            self.assertEqual(model, array_model)
+            # same bytes from both representation
+            self.assertEqual(buf, create_bytes(array_model))
+
+    def test_array_model(self):
+        model=pymeshio.pmx.reader.read(io.BytesIO(create_bytes(create_model())))
+        array_model=pymeshio.pmx.ArrayModel.from_model(model)
+        self.assertTrue(isinstance(array_model.morphs[0].offsets,
+            pymeshio.pmx.VertexMorphOffsetArray))
+        self.assertEqual(model, array_model)
+        self.assertEqual(array_model, model)
+        self.assertEqual(model, array_model.to_model())
+        array_model.diff(model)
+        # views write through to the arrays
+        v=array_model.vertices[-1]
+        v.position=pymeshio.common.Vector3(1, 2, 3)
+        v.deform=pymeshio.pmx.Bdef2(0, 1, 0.5)
+        self.assertEqual([1, 2, 3], array_model.vertices.position[-1].tolist())
+        self.assertEqual([0, 1, -1, -1], array_model.vertices.bone_indices[-1].tolist())
+        self.assertNotEqual(model, array_model)
+
+    def test_schema(self):
+        schema=pymeshio.pmx.schema.Schema(1, 1, 1, 2, 1, 4)
+        self.assertEqual(11*4+1+5*4+2+2, schema.material.size)
+        self.assertEqual(2+1+2+1+56+1, schema.rigidbody.size)
+        self.assertEqual(1+4+4+96, schema.joint.size)
+        self.assertRaises(pymeshio.common.ParseException,
+                pymeshio.pmx.schema.Schema, 1, 1, 1, 3, 1, 1)
+        model=create_model()
+        buf=create_bytes(model)
+        model2=pymeshio.pmx.reader.read(io.BytesIO(buf))
+        self.assertEqual(model.materials, model2.materials)
+        self.assertEqual(model.rigidbodies, model2.rigidbodies)
+        self.assertEqual(model.joints, model2.joints)
+        self.assertEqual(buf, create_bytes(model2))
+
+    def test_index_sizes(self):
+        index_size=pymeshio.pmx.writer.index_size
+        self.assertEqual([1, 1, 2, 2, 4],
+                [index_size(n, True) for n in (0, 256, 257, 65536, 65537)])
+        self.assertEqual([1, 2, 2, 4],
+                [index_size(n) for n in (128, 129, 32768, 32769)])
+        # 256 vertices and 128 bones fit in 1 byte indices
+        model=create_model(128)
+        v=model.vertices[0]
+        model.vertices=[pymeshio.pmx.Vertex(v.position, v.normal, v.uv,
+            pymeshio.pmx.Bdef1(127), 1.0) for _ in range(256)]
+        model.indices=[0, 255, 128]
+        model.morphs[0].offsets[-1].vertex_index=255
+        buf=create_bytes(model)
+        self.assertEqual(bytearray([8, 0, 0, 1, 1, 1, 1, 1, 1]),
+                bytearray(buf[8:17]))
+        model2=pymeshio.pmx.reader.read(io.BytesIO(buf))
+        self.assertEqual([0, 255, 128], model2.indices)
+        self.assertEqual(127, model2.vertices[-1].deform.index0)
+        self.assertEqual(255, model2.morphs[0].offsets[-1].vertex_index)
+        self.assertEqual(-1, model2.bones[0].parent_index)
+        array_model=pymeshio.pmx.reader.read(io.BytesIO(buf), arrays=True)
+        self.assertEqual(buf, create_bytes(array_model))
+        # explicit sizes
+        out=io.BytesIO()
+        pymeshio.pmx.writer.write(out, model, index_sizes=(4, 2, 2, 4, 2, 2))
+        self.assertEqual(bytearray([8, 0, 0, 4, 2, 2, 4, 2, 2]),
+                bytearray(out.getvalue()[8:17]))
+        self.assertEqual(model2,
+                pymeshio.pmx.reader.read(io.BytesIO(out.getvalue())))
+
+    def test_lazy(self):
+        v3=pymeshio.common.Vector3
+        model=create_model()
+        # every optional bone field
+        model.bones[1].flag=(pymeshio.pmx.BONEFLAG_TAILPOS_IS_BONE
+                | pymeshio.pmx.BONEFLAG_IS_EXTERNAL_ROTATION
+                | pymeshio.pmx.BONEFLAG_HAS_FIXED_AXIS
+                | pymeshio.pmx.BONEFLAG_HAS_LOCAL_COORDINATE
+                | pymeshio.pmx.BONEFLAG_IS_EXTERNAL_PARENT_DEFORM)
+        model.bones[1].tail_index=2
+        model.bones[2].flag=pymeshio.pmx.BONEFLAG_IS_IK
+        model.bones[2].ik=pymeshio.pmx.Ik(3, 40, 0.5, [
+            pymeshio.pmx.IkLink(0, 0),
+            pymeshio.pmx.IkLink(1, 1, v3(-1, 0, 0), v3(1, 0, 0))])
+        model.textures=['toon.bmp', 'tex.png']
+        model.materials[0].toon_sharing_flag=0
+        model.materials[0].toon_texture_index=1
+        model.display_slots.append(pymeshio.pmx.DisplaySlot(
+            'slot', 'slot', 0, [(0, 1), (1, 0)]))
+        buf=create_bytes(model)
+        expected=pymeshio.pmx.reader.read(io.BytesIO(buf))
+
+        lazy=pymeshio.pmx.reader.read(
+                pymeshio.common.MemoryStream(buf), lazy=True)
+        self.assertTrue(isinstance(lazy, pymeshio.pmx.LazyModel))
+        self.assertEqual(12, lazy.count('vertices'))
+        self.assertEqual(2, lazy.count('rigidbodies'))
+        self.assertFalse(lazy.is_loaded('bones'))
+        self.assertEqual(expected.bones, lazy.bones)
+        self.assertEqual(expected.joints, lazy.joints)
+        self.assertTrue(lazy.is_loaded('bones'))
+        self.assertFalse(lazy.is_loaded('vertices'))
+        self.assertEqual(expected, lazy)
+        # all sections are decoded, so the stream is released
+        self.assertEqual(None, lazy.reader)
+
+        lazy=pymeshio.pmx.reader.read(io.BytesIO(buf), arrays=True, lazy=True)
+        self.assertTrue(isinstance(lazy.vertices, pymeshio.pmx.VertexArray))
+        self.assertEqual(expected, lazy.load())
+        self.assertRaises(pymeshio.common.ParseException,
+                pymeshio.pmx.reader.read,
+                pymeshio.common.MemoryStream(buf[:-10]), False, True)
+
+    def test_morph_types(self):
+        v3=pymeshio.common.Vector3
+        v4=pymeshio.common.Vector4
+        rgb=pymeshio.common.RGB
+        rgba=pymeshio.common.RGBA
+        model=create_model()
+        model.morphs+=[
+                pymeshio.pmx.Morph('group', 'group', 4, 0, [
+                    pymeshio.pmx.GroupMorphData(0, 0.5)]),
+                pymeshio.pmx.Morph('bone', 'bone', 2, 2, [
+                    pymeshio.pmx.BoneMorphData(1, v3(0, 1, 0),
+                        pymeshio.common.Quaternion(0, 0, 0, 1))]),
+                pymeshio.pmx.Morph('uv1', 'uv1', 3, 4, [
+                    pymeshio.pmx.UVMorphData(5, v4(0.5, 0, 0, 0))]),
+                pymeshio.pmx.Morph('material', 'material', 3, 8, [
+                    pymeshio.pmx.MaterialMorphData(0, 1,
+                        rgba(1, 0, 0, 1), rgb(0, 1, 0), 5.0, rgb(0, 0, 1),
+                        rgba(0, 0, 0, 1), 0.5, rgba(1, 1, 1, 1),
+                        rgba(1, 1, 1, 0), rgba(0, 0, 0, 0))]),
+                ]
+        buf=create_bytes(model)
+        read=pymeshio.pmx.reader.read(io.BytesIO(buf))
+        self.assertEqual([1, 0, 2, 4, 8], [m.morph_type for m in read.morphs])
+        self.assertEqual(0.5, read.morphs[1].offsets[0].value)
+        self.assertEqual(5.0, read.morphs[4].offsets[0].specular_factor)
+        self.assertEqual(buf, create_bytes(read))
+        lazy=pymeshio.pmx.reader.read(io.BytesIO(buf), lazy=True)
+        self.assertEqual(5, lazy.count('morphs'))
+        self.assertEqual(buf, create_bytes(lazy.load()))
+
+    def test_slots(self):
+        model=pymeshio.pmx.reader.read(io.BytesIO(create_bytes(create_model())))
+        records=[model, model.vertices[0], model.vertices[0].deform,
+                model.vertices[0].position, model.morphs[0].offsets[0],
+                model.materials[0], model.materials[0].diffuse_color,
+                model.bones[0], model.rigidbodies[0], model.rigidbodies[0].param,
+                model.joints[0], model.display_slots[0]]
+        for r in records:
+            self.assertFalse(hasattr(r, '__dict__'), type(r))
+
     def test_bonemorph(self):
         model=pymeshio.pmx.reader.read_from_file(
                 PMX_FILE_WITH_BONEMORPH)
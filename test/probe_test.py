@@ -0,0 +1,78 @@
+# coding: utf-8
+import io
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import contextlib
+import pymeshio.common
+import pymeshio.main
+import pymeshio.probe
+from . import pmd_test
+from . import pmx_test
+from . import vmd_test
+
+
+class TestProbe(unittest.TestCase):
+
+    def test_pmd(self):
+        model=pmd_test.create_model()
+        info=pymeshio.probe.probe(
+                pymeshio.common.MemoryStream(pmd_test.create_bytes(model)))
+        self.assertEqual('pmd', info.format)
+        self.assertEqual('model', info.name)
+        self.assertEqual('model', info.english_name)
+        self.assertEqual([
+            ('vertices', 12), ('indices', 12), ('materials', 1),
+            ('bones', 2), ('ik_list', 0), ('morphs', 2),
+            ('morph_indices', 1), ('bone_group_list', 1),
+            ('bone_display_list', 1), ('toon_textures', 10),
+            ('rigidbodies', 1), ('joints', 0)], info.counts)
+
+    def test_pmx(self):
+        buf=pmx_test.create_bytes(pmx_test.create_model(200))
+        info=pymeshio.probe.probe(pymeshio.common.MemoryStream(buf))
+        self.assertEqual('pmx', info.format)
+        self.assertEqual(2.0, info.version)
+        self.assertEqual(2, info.index_sizes['bone'])
+        self.assertEqual(1, info.index_sizes['vertex'])
+        model=pymeshio.pmx.reader.read(io.BytesIO(buf))
+        for section, count in info.counts:
+            self.assertEqual(len(getattr(model, section)), count)
+        self.assertEqual(len(buf), info.size)
+
+    def test_vmd(self):
+        info=pymeshio.probe.probe(
+                pymeshio.common.MemoryStream(vmd_test.create_motion_bytes()))
+        self.assertEqual('vmd', info.format)
+        self.assertEqual('model', info.name)
+        self.assertEqual(9, info.count('bone'))
+        self.assertEqual(6, info.count('morph'))
+        self.assertEqual(0, info.count('shadow'))
+
+    def test_stat(self):
+        directory=tempfile.mkdtemp()
+        try:
+            os.mkdir(os.path.join(directory, 'sub'))
+            files=[
+                    ('a.pmd', pmd_test.create_bytes(pmd_test.create_model())),
+                    ('sub/b.pmx', pmx_test.create_bytes(pmx_test.create_model())),
+                    ('c.vmd', vmd_test.create_motion_bytes()),
+                    ('broken.pmx', b'PMX '),
+                    ('ignored.txt', b''),
+                    ]
+            for name, buf in files:
+                with open(os.path.join(directory, name), 'wb') as f:
+                    f.write(buf)
+            out=io.StringIO()
+            err=io.StringIO()
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                result=pymeshio.main.stat(['--json', directory])
+            self.assertEqual(1, result)
+            infos=[json.loads(l) for l in out.getvalue().splitlines()]
+            self.assertEqual(['pmd', 'vmd', 'pmx'], [i['format'] for i in infos])
+            self.assertEqual(12, infos[0]['counts']['vertices'])
+            self.assertTrue('broken.pmx' in err.getvalue())
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,64 @@
+# coding: utf-8
+import io
+import unittest
+import pymeshio.generator
+import pymeshio.mqo.reader
+import pymeshio.obj.reader
+import pymeshio.pmd.reader
+import pymeshio.pmx
+import pymeshio.pmx.reader
+import pymeshio.profiling
+import pymeshio.vmd.reader
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_pmx(self):
+        data=pymeshio.generator.generate_bytes('.pmx', vertex_count=300,
+                morph_count=2)
+        profile=pymeshio.profiling.Profile()
+        model=pymeshio.pmx.reader.read(io.BytesIO(data), profile=profile)
+        self.assertEqual('pmx', profile.format)
+        self.assertEqual(['header', 'text']+list(pymeshio.pmx.SECTIONS),
+                list(profile.sections))
+        self.assertEqual(300, profile['vertices'].count)
+        self.assertEqual(2, profile['morphs'].count)
+        self.assertEqual(len(data), profile.bytes())
+        self.assertTrue(profile['text'].nested)
+        self.assertIsNone(profile['vertices'].memory)
+        # profiled read gives the same model
+        self.assertEqual(pymeshio.pmx.reader.read(io.BytesIO(data)), model)
+
+    def test_pmd_callback(self):
+        data=pymeshio.generator.generate_bytes('.pmd', vertex_count=300)
+        sections=[]
+        profile=pymeshio.profiling.Profile(
+                callback=lambda s: sections.append(s.name), trace_memory=True)
+        pymeshio.pmd.reader.read(io.BytesIO(data), arrays=True, profile=profile)
+        self.assertEqual('vertices', sections[2])
+        self.assertEqual(len(data), profile.bytes())
+        self.assertGreater(profile['vertices'].peak, 0)
+
+    def test_vmd(self):
+        data=pymeshio.generator.generate_bytes('.vmd', bone_frame_count=100)
+        profile=pymeshio.profiling.Profile()
+        pymeshio.vmd.reader.read(io.BytesIO(data), profile=profile)
+        self.assertEqual(100, profile['bone'].count)
+        self.assertEqual(25, profile['morph'].count)
+        self.assertEqual(125, profile['text'].count)
+        self.assertEqual(len(data), profile.bytes())
+
+    def test_text(self):
+        profile=pymeshio.profiling.Profile()
+        pymeshio.obj.reader.read(io.BytesIO(pymeshio.generator.generate_bytes(
+            '.obj', vertex_count=100)), profile=profile)
+        self.assertEqual(100, profile['normals'].count)
+        self.assertEqual(98, profile['faces'].count)
+        profile=pymeshio.profiling.Profile()
+        pymeshio.mqo.reader.read(io.BytesIO(pymeshio.generator.generate_bytes(
+            '.mqo', vertex_count=100, object_count=2)), profile=profile)
+        self.assertEqual(100, profile['vertices'].count)
+        self.assertEqual(2, profile['vertices'].calls)
+        self.assertEqual(96, profile['faces'].count)
+        self.assertEqual('mqo', profile.to_dict()['format'])
+
@@ -0,0 +1,332 @@
+# coding: utf-8
+import unittest
+import io
+import struct
+import numpy
+import pymeshio.common
+import pymeshio.vmd
+import pymeshio.vmd.reader
+
+
+def encode_name(name, size=15):
+    # null terminated, garbage after null like MMD
+    return (name.encode('shift-jis')+b'\x00'+b'\xfd'*size)[:size]
+
+
+def create_bytes(bone_frames, morph_frames, lights=(), shadows=None):
+    """
+    bone_frames: (name, frame, pos, q, complement) list
+    morph_frames: (name, frame, ratio) list
+    lights: (frame, rgb, xyz) list
+    shadows: (frame, mode, distance) list. None for no shadow section
+    """
+    out=io.BytesIO()
+    out.write(b'Vocaloid Motion Data 0002'.ljust(30, b'\x00'))
+    out.write(encode_name('model', 20))
+    out.write(struct.pack('<I', len(bone_frames)))
+    for name, frame, pos, q, complement in bone_frames:
+        out.write(encode_name(name))
+        out.write(struct.pack('<I7f64B', frame, *(pos+q+tuple(complement))))
+    out.write(struct.pack('<I', len(morph_frames)))
+    for name, frame, ratio in morph_frames:
+        out.write(encode_name(name))
+        out.write(struct.pack('<If', frame, ratio))
+    # camera
+    out.write(struct.pack('<I', 0))
+    out.write(struct.pack('<I', len(lights)))
+    for frame, rgb, xyz in lights:
+        out.write(struct.pack('<I3f3f', frame, *(rgb+xyz)))
+    if shadows is not None:
+        out.write(struct.pack('<I', len(shadows)))
+        for frame, mode, distance in shadows:
+            out.write(struct.pack('<IBf', frame, mode, distance))
+    return out.getvalue()
+
+
+def create_motion_bytes():
+    complement=list(range(64))
+    bone_frames=[
+            (name, frame, (frame, 0.5, 0), (0, 0, 0, 1), complement)
+            for frame in (30, 0, 10)
+            for name in ('センター', 'left', 'right')]
+    morph_frames=[
+            (name, frame, frame*0.01)
+            for frame in (20, 0, 10)
+            for name in ('あ', 'blink')]
+    return create_bytes(bone_frames, morph_frames)
+
+
+class TestVmd(unittest.TestCase):
+
+    def test_read(self):
+        motion=pymeshio.vmd.reader.read(io.BytesIO(create_motion_bytes()))
+        self.assertEqual('model', motion.model_name)
+        self.assertEqual(9, len(motion.motions))
+        self.assertEqual('センター', motion.motions[0].name)
+        self.assertEqual(6, len(motion.shapes))
+
+    def test_read_truncated(self):
+        buf=create_motion_bytes()
+        # in the bone frames and in the morph frames
+        for size in (54+111*5, 54+111*9+4+23*3):
+            for ios in (io.BytesIO(buf[:size]),
+                    pymeshio.common.MemoryStream(buf[:size])):
+                self.assertRaises(pymeshio.common.ParseException,
+                        pymeshio.vmd.reader.read, ios, arrays=True)
+
+    def test_read_arrays(self):
+        buf=create_motion_bytes()
+        motion=pymeshio.vmd.reader.read(io.BytesIO(buf))
+        array_motion=pymeshio.vmd.reader.read(io.BytesIO(buf), arrays=True)
+        bones=array_motion.motions
+        self.assertTrue(isinstance(bones, pymeshio.vmd.BoneFrameArray))
+        self.assertEqual(9, len(bones))
+        self.assertEqual(set(['センター', 'left', 'right']), set(bones.names()))
+        # contiguous and sorted by frame
+        center=bones['センター']
+        self.assertEqual([0, 10, 30], center['frame'].tolist())
+        self.assertEqual([0, 10, 30], center['pos'][:, 0].tolist())
+        self.assertTrue(numpy.shares_memory(center, bones.records))
+        self.assertEqual(list(range(64)), center['complement'][0].tolist())
+        morphs=array_motion.shapes
+        self.assertTrue(isinstance(morphs, pymeshio.vmd.MorphFrameArray))
+        self.assertTrue('あ' in morphs)
+        self.assertFalse('い' in morphs)
+        self.assertEqual([0, 10, 20], morphs['blink']['frame'].tolist())
+        # same frames as the list reader
+        def key(f):
+            return (f.name, f.frame)
+        for l, r in zip(sorted(motion.motions, key=key),
+                sorted(bones.to_frames(), key=key)):
+            self.assertEqual(key(l), key(r))
+            self.assertEqual(l.pos, r.pos)
+            self.assertEqual(l.complement, r.complement)
+        self.assertEqual(
+                sorted((f.name, f.frame, f.ratio) for f in motion.shapes),
+                sorted((f.name, f.frame, f.ratio) for f in morphs))
+
+
+class TestStream(unittest.TestCase):
+
+    def create_bytes(self, shadows=None):
+        complement=list(range(64))
+        return create_bytes(
+                [('bone', i, (i, 0, 0), (0, 0, 0, 1), complement)
+                    for i in range(3)],
+                [('morph', i, 0.5) for i in range(4)],
+                [(0, (0.5, 0.5, 0.5), (-0.5, -1.0, 0.5)),
+                    (30, (1.0, 0.0, 0.0), (0, -1.0, 0))],
+                shadows)
+
+    def test_light_and_shadow(self):
+        buf=self.create_bytes([(0, 1, 0.5), (10, 0, 0.25)])
+        motion=pymeshio.vmd.reader.read(io.BytesIO(buf))
+        self.assertEqual(2, len(motion.lights))
+        self.assertEqual(30, motion.lights[1].frame)
+        self.assertEqual(1.0, motion.lights[1].color.r)
+        self.assertEqual(-1.0, motion.lights[1].pos.y)
+        self.assertEqual([(0, 1, 0.5), (10, 0, 0.25)],
+                [(f.frame, f.mode, f.distance) for f in motion.shadows])
+        # no shadow section in old files
+        motion=pymeshio.vmd.reader.read(io.BytesIO(self.create_bytes()))
+        self.assertEqual(2, len(motion.lights))
+        self.assertEqual([], motion.shadows)
+
+    def test_stream(self):
+        buf=self.create_bytes([(0, 1, 0.5)])
+        stream=pymeshio.vmd.reader.StreamReader(
+                pymeshio.common.MemoryStream(buf))
+        self.assertEqual('model', stream.model_name)
+        self.assertEqual(1, stream.count('shadow'))
+        self.assertEqual(3, stream.count('bone'))
+        # skip bones, then interleave sections
+        morphs=stream.morph_frames()
+        lights=stream.light_frames()
+        self.assertEqual(0, next(morphs).frame)
+        self.assertEqual(0, next(lights).frame)
+        self.assertEqual([1, 2, 3], [f.frame for f in morphs])
+        self.assertEqual([30], [f.frame for f in lights])
+        self.assertEqual([0, 1, 2], [f.frame for f in stream.bone_frames()])
+        self.assertEqual([], list(stream.camera_frames()))
+
+    def test_sections(self):
+        buf=self.create_bytes([(0, 1, 0.5)])
+        motion=pymeshio.vmd.reader.read(io.BytesIO(buf),
+                sections=('morph', 'shadow'))
+        self.assertEqual([], motion.motions)
+        self.assertEqual(4, len(motion.shapes))
+        self.assertEqual([], motion.lights)
+        self.assertEqual(1, len(motion.shadows))
+        motion=pymeshio.vmd.reader.read(io.BytesIO(buf), arrays=True,
+                sections=('morph',))
+        self.assertEqual(0, len(motion.motions))
+        self.assertEqual(4, len(motion.shapes))
+        self.assertRaises(pymeshio.common.ParseException,
+                pymeshio.vmd.reader.read, io.BytesIO(buf), False, ('ik',))
+
+
+class TestSampler(unittest.TestCase):
+
+    def create_motion(self, complement=None):
+        complement=complement or pymeshio.vmd.LINEAR_COMPLEMENT
+        q=(0, numpy.sin(numpy.pi/4), 0, numpy.cos(numpy.pi/4))
+        bone_frames=[
+                ('center', 0, (0, 0, 0), (0, 0, 0, 1), complement),
+                ('center', 10, (10, 20, -10), q, complement),
+                ('arm', 5, (1, 2, 3), q, complement),
+                ]
+        morph_frames=[('blink', 0, 0.0), ('blink', 4, 1.0)]
+        return pymeshio.vmd.reader.read(
+                io.BytesIO(create_bytes(bone_frames, morph_frames)),
+                arrays=True)
+
+    def test_default_complement(self):
+        a=pymeshio.vmd.BoneFrame('a')
+        b=pymeshio.vmd.BoneFrame('b')
+        a.complement[0]=127
+        self.assertEqual(20, b.complement[0])
+        self.assertEqual(20, pymeshio.vmd.LINEAR_COMPLEMENT[0])
+        camera=pymeshio.vmd.CameraFrame()
+        self.assertIsNot(pymeshio.vmd.CameraFrame().complement,
+                camera.complement)
+        self.assertEqual(pymeshio.vmd.LINEAR_CAMERA_COMPLEMENT,
+                camera.complement)
+
+    def test_linear(self):
+        import pymeshio.vmd.sampler
+        sampler=pymeshio.vmd.sampler.Sampler(self.create_motion(),
+                ['center', 'arm', 'none'])
+        translations, rotations=sampler.sample([-1, 0, 5, 10, 20])
+        self.assertEqual((5, 3, 3), translations.shape)
+        self.assertEqual((5, 3, 4), rotations.shape)
+        center=translations[:, 0]
+        numpy.testing.assert_allclose(
+                [[0, 0, 0], [0, 0, 0], [5, 10, -5], [10, 20, -10], [10, 20, -10]],
+                center, atol=0.05)
+        # slerp half of 90 degrees around y
+        numpy.testing.assert_allclose(
+                [0, numpy.sin(numpy.pi/8), 0, numpy.cos(numpy.pi/8)],
+                rotations[2, 0], atol=1e-2)
+        # single key is constant
+        numpy.testing.assert_allclose([[1, 2, 3]]*5, translations[:, 1])
+        # no keys
+        numpy.testing.assert_allclose([[0, 0, 0, 1]]*5, rotations[:, 2])
+        numpy.testing.assert_allclose(
+                [[0], [0.25], [1], [1], [1]],
+                sampler.sample_morphs([0, 1, 4, 10, 20]), atol=1e-6)
+
+    def test_bezier(self):
+        import pymeshio.vmd.sampler
+        # ease in/out on x, linear on others
+        row=[127, 20, 20, 20, 0, 20, 20, 20, 0, 107, 107, 107, 127, 107, 107, 107]
+        complement=row+[0]*48
+        sampler=pymeshio.vmd.sampler.Sampler(self.create_motion(complement),
+                ['center'])
+        frames=numpy.linspace(0, 10, 41)
+        translations, _=sampler.sample(frames)
+        # brute force bezier
+        s=numpy.linspace(0, 1, 100001)
+        x=3*(1-s)**2*s*1.0+3*(1-s)*s*s*0.0+s**3
+        y=3*(1-s)**2*s*0.0+3*(1-s)*s*s*1.0+s**3
+        expected=numpy.interp(frames/10, x, y)*10
+        numpy.testing.assert_allclose(expected, translations[:, 0, 0], atol=1e-2)
+        # y is linear
+        numpy.testing.assert_allclose(frames*2, translations[:, 0, 1], atol=0.05)
+        self.assertTrue((pymeshio.vmd.sampler.decode_curves([complement])[0, 0]
+            ==[127, 0, 0, 127]).all())
+
+    def test_frames(self):
+        import pymeshio.vmd.sampler
+        buf=create_motion_bytes()
+        motion=pymeshio.vmd.reader.read(io.BytesIO(buf))
+        array_motion=pymeshio.vmd.reader.read(io.BytesIO(buf), arrays=True)
+        for l, r in zip(
+                pymeshio.vmd.sampler.Sampler(motion).sample(range(40)),
+                pymeshio.vmd.sampler.Sampler(array_motion).sample(range(40))):
+            numpy.testing.assert_array_equal(l, r)
+
+
+class TestWriter(unittest.TestCase):
+
+    def test_write(self):
+        import pymeshio.vmd.writer
+        buf=TestStream().create_bytes([(0, 1, 0.5), (10, 0, 0.25)])
+        motion=pymeshio.vmd.reader.read(io.BytesIO(buf))
+        camera=pymeshio.vmd.CameraFrame()
+        camera.frame=5
+        camera.length=-45
+        camera.pos=pymeshio.common.Vector3(0, 10, 0)
+        camera.angle=30
+        camera.perspective=False
+        motion.cameras.append(camera)
+        out=io.BytesIO()
+        pymeshio.vmd.writer.write(out, motion)
+        written=pymeshio.vmd.reader.read(io.BytesIO(out.getvalue()))
+        self.assertEqual('model', written.model_name)
+        self.assertEqual(
+                [(f.name, f.frame, f.pos, f.complement) for f in motion.motions],
+                [(f.name, f.frame, f.pos, f.complement) for f in written.motions])
+        self.assertEqual(
+                [(f.name, f.frame, f.ratio) for f in motion.shapes],
+                [(f.name, f.frame, f.ratio) for f in written.shapes])
+        self.assertEqual(1, len(written.cameras))
+        self.assertEqual(-45, written.cameras[0].length)
+        self.assertEqual(pymeshio.vmd.LINEAR_CAMERA_COMPLEMENT,
+                written.cameras[0].complement)
+        self.assertEqual(0, written.cameras[0].perspective)
+        self.assertEqual([0, 30], [f.frame for f in written.lights])
+        self.assertEqual([(0, 1, 0.5), (10, 0, 0.25)],
+                [(f.frame, f.mode, f.distance) for f in written.shadows])
+        # frame arrays are written as is
+        array_motion=pymeshio.vmd.reader.read(io.BytesIO(buf), arrays=True)
+        array_motion.motions=array_motion.motions.to_frames()
+        array_motion.shapes=array_motion.shapes.to_frames()
+        from_list=io.BytesIO()
+        pymeshio.vmd.writer.write(from_list, array_motion)
+        array_motion=pymeshio.vmd.reader.read(io.BytesIO(buf), arrays=True)
+        from_array=io.BytesIO()
+        pymeshio.vmd.writer.write(from_array, array_motion)
+        self.assertEqual(from_list.getvalue(), from_array.getvalue())
+
+    def test_reduction(self):
+        import pymeshio.vmd.reduction
+        import pymeshio.vmd.sampler
+        import pymeshio.vmd.writer
+        complement=pymeshio.vmd.LINEAR_COMPLEMENT
+        # baked every frame: linear move and rotation, then a stop
+        bone_frames=[]
+        for i in range(31):
+            t=min(i, 20)/20.0
+            angle=numpy.pi/4*t
+            bone_frames.append(('center', i, (t*10, 0, -t*5),
+                (0, numpy.sin(angle/2), 0, numpy.cos(angle/2)), complement))
+        bone_frames.append(('still', 0, (1, 2, 3), (0, 0, 0, 1), complement))
+        morph_frames=[('blink', i, min(i, 10)*0.1) for i in range(31)]
+        motion=pymeshio.vmd.reader.read(
+                io.BytesIO(create_bytes(bone_frames, morph_frames)),
+                arrays=True)
+
+        bones=pymeshio.vmd.reduction.reduce_bone_frames(
+                motion.motions, 1e-3, 1e-3)
+        self.assertTrue(isinstance(bones, pymeshio.vmd.BoneFrameArray))
+        self.assertEqual([0, 20, 30], bones['center']['frame'].tolist())
+        self.assertEqual([0], bones['still']['frame'].tolist())
+        morphs=pymeshio.vmd.reduction.reduce_morph_frames(
+                motion.shapes.to_frames(), 1e-4)
+        self.assertEqual([0, 10, 30], [f.frame for f in morphs])
+
+        out=io.BytesIO()
+        pymeshio.vmd.writer.write(out, motion, tolerance=1e-3)
+        reduced=pymeshio.vmd.reader.read(io.BytesIO(out.getvalue()),
+                arrays=True)
+        self.assertEqual(4, len(reduced.motions))
+        self.assertEqual(3, len(reduced.shapes))
+        frames=numpy.arange(31)
+        for l, r in zip(
+                pymeshio.vmd.sampler.Sampler(motion).sample(frames),
+                pymeshio.vmd.sampler.Sampler(reduced).sample(frames)):
+            numpy.testing.assert_allclose(l, r, atol=2e-3)
+        numpy.testing.assert_allclose(
+                pymeshio.vmd.sampler.Sampler(motion).sample_morphs(frames),
+                pymeshio.vmd.sampler.Sampler(reduced).sample_morphs(frames),
+                atol=1e-4)